@@ -0,0 +1,5 @@
+"""
+Suite de benchmarks de endpoints de SmartSales365.
+
+Ver benchmarks/README.md para uso.
+"""
@@ -0,0 +1,133 @@
+"""
+Throughput del procesamiento de devoluciones: de a una con las
+transiciones del modelo (aprobar() y completar() por devolución, lo que
+hacía la acción del admin) contra los endpoints masivos
+(/api/promociones/devoluciones/aprobar-lote/ y completar-lote/).
+
+Crea las compras y devoluciones dentro de una transacción que se revierte
+al terminar, así no deja datos en la base. Las notificaciones a clientes
+se encolan al confirmar, por eso no entran en la medición.
+
+Uso:
+    python -m benchmarks.devoluciones_lote --devoluciones 1000 --productos 50
+    python -m benchmarks.devoluciones_lote --salida devoluciones.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1,testserver')
+
+
+def _crear_devoluciones(cantidad, productos, sufijo):
+    from decimal import Decimal
+
+    from clientes.models import Cliente
+    from compra.models import Compra, CompraItem
+    from productos.models import Producto
+    from promociones.models import DevolucionProducto
+
+    cliente = Cliente.objects.create(nombre=f'Bench devoluciones {sufijo}', email=f'bench_dev_{sufijo}@bench.local')
+    catalogo = Producto.objects.bulk_create([
+        Producto(sku=f'BENCH-DEV-{sufijo}-{i}', nombre=f'Devolución {i}', precio=Decimal('10.00'))
+        for i in range(productos)
+    ])
+    compra = Compra.objects.create(cliente=cliente, total=Decimal('10.00') * cantidad)
+    items = CompraItem.objects.bulk_create([
+        CompraItem(
+            compra=compra, producto=catalogo[i % productos], cantidad=1,
+            precio_unitario=Decimal('10.00'), subtotal=Decimal('10.00'),
+        )
+        for i in range(cantidad)
+    ])
+    devoluciones = DevolucionProducto.objects.bulk_create([
+        DevolucionProducto(
+            compra_item=item, cliente=cliente, motivo='Bench', cantidad=1, monto_reembolso=Decimal('10.00')
+        )
+        for item in items
+    ])
+    return [d.pk for d in devoluciones]
+
+
+def _medir(funcion):
+    from django.db import connection
+
+    consultas = []
+
+    def contar(execute, sql, params, many, context):
+        consultas.append(1)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(contar):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+    return segundos, len(consultas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Devoluciones: de a una vs en lote')
+    parser.add_argument('--devoluciones', type=int, default=1000, help='Devoluciones a procesar (default: 1000)')
+    parser.add_argument('--productos', type=int, default=50, help='Productos distintos devueltos (default: 50)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.db import transaction
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from promociones.models import DevolucionProducto
+    from usuarios.models import Usuario
+
+    resultados = {'devoluciones': args.devoluciones, 'productos': args.productos, 'variantes': {}}
+
+    with transaction.atomic(), override_settings(DEVOLUCIONES_LOTE_MAX=max(args.devoluciones, 1000)):
+        admin = Usuario.objects.create_user('bench_dev_admin', 'bench_dev@bench.local', 'bench-dev', is_staff=True)
+
+        ids = _crear_devoluciones(args.devoluciones, args.productos, 'uno')
+
+        def de_a_una():
+            for devolucion in DevolucionProducto.objects.filter(pk__in=ids).select_related('compra_item'):
+                devolucion.aprobar(usuario=admin, respuesta='Bench')
+                devolucion.completar()
+
+        api = APIClient()
+        api.force_authenticate(admin)
+        ids_lote = _crear_devoluciones(args.devoluciones, args.productos, 'lote')
+        # Calentamiento: el primer request importa las URLs y las vistas
+        api.post('/api/promociones/devoluciones/aprobar-lote/', {'ids': []}, format='json')
+
+        def en_lote():
+            for ruta in ('aprobar-lote', 'completar-lote'):
+                respuesta = api.post(f'/api/promociones/devoluciones/{ruta}/', {'ids': ids_lote}, format='json')
+                assert respuesta.status_code == 200, respuesta.content[:300]
+
+        for nombre, funcion in (('de_a_una', de_a_una), ('lote', en_lote)):
+            segundos, consultas = _medir(funcion)
+            resultados['variantes'][nombre] = {
+                'segundos': round(segundos, 2),
+                'devoluciones_por_segundo': round(args.devoluciones / segundos),
+                'consultas': consultas,
+            }
+        transaction.set_rollback(True)
+
+    print(f"{args.devoluciones} devoluciones de {args.productos} productos (aprobar + completar)\n")
+    print(f"{'variante':<10} {'segundos':>9} {'dev/s':>8} {'consultas':>10}")
+    for nombre, fila in resultados['variantes'].items():
+        print(f"{nombre:<10} {fila['segundos']:>9} {fila['devoluciones_por_segundo']:>8} {fila['consultas']:>10}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
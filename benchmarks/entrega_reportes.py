@@ -0,0 +1,109 @@
+"""
+Tamaño de respuesta, memoria y tiempo de la entrega de un reporte dinámico
+grande según el modo (reportes_dinamicos/entrega.py): data URI en el JSON
+(base64, el comportamiento anterior), enlace firmado (url) y binario.
+
+Pasa por la vista real (interpretación, datos, DRF, storage); solo el
+archivo generado se reemplaza por un PDF de --mb megabytes con contenido
+incompresible, como los streams comprimidos de un PDF real. La memoria es
+el pico de tracemalloc durante el request.
+
+Uso:
+    python -m benchmarks.entrega_reportes --mb 5
+    python -m benchmarks.entrega_reportes --mb 5 --salida entrega.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1,testserver')
+
+
+def _medir(api, modo):
+    import base64
+
+    cuerpo = {'prompt': 'reporte ejecutivo del mes', 'formato': 'pdf', 'incluir_insights': False, 'entrega': modo}
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    respuesta = api.post('/api/reportes-dinamicos/avanzados/', cuerpo, format='json')
+    servidor_ms = (time.perf_counter() - inicio) * 1000
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Lo que hace el cliente para obtener los bytes del PDF
+    inicio = time.perf_counter()
+    if modo == 'binario':
+        descargado = len(respuesta.content)
+    else:
+        datos = json.loads(respuesta.content)
+        if modo == 'base64':
+            descargado = len(base64.b64decode(datos['archivo'].split(',', 1)[1]))
+        else:
+            descarga = api.get(datos['archivo_url'])
+            descargado = len(b''.join(descarga.streaming_content))
+    cliente_ms = (time.perf_counter() - inicio) * 1000
+
+    return {
+        'status': respuesta.status_code,
+        'respuesta_kb': round(len(respuesta.content) / 1024, 1),
+        'pdf_kb': round(descargado / 1024, 1),
+        'servidor_ms': round(servidor_ms, 1),
+        'memoria_pico_mb': round(pico / 1024 / 1024, 1),
+        'cliente_ms': round(cliente_ms, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Entrega de reportes dinámicos: base64 vs enlace vs binario')
+    parser.add_argument('--mb', type=float, default=5, help='Tamaño del PDF en MB (default: 5)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from io import BytesIO
+    from unittest import mock
+
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from reportes_dinamicos.views import GeneradorReportesAvanzado
+    from usuarios.models import Usuario
+
+    contenido = b'%PDF-1.4\n' + os.urandom(int(args.mb * 1024 * 1024))
+    admin = Usuario.objects.filter(is_staff=True).first()
+    if admin is None:
+        sys.exit('Se necesita un usuario staff en la base')
+    api = APIClient()
+    api.force_authenticate(admin)
+
+    resultados = {'mb': args.mb, 'modos': {}}
+    with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media), \
+            mock.patch.object(GeneradorReportesAvanzado, 'generar', lambda self, formato: BytesIO(contenido)):
+        for modo in ('base64', 'url', 'binario'):
+            _medir(api, modo)  # calentamiento
+            resultados['modos'][modo] = _medir(api, modo)
+
+    print(f"PDF de {args.mb} MB\n")
+    print(f"{'modo':<8} {'respuesta KB':>13} {'servidor ms':>12} {'pico MB':>8} {'cliente ms':>11}")
+    for modo, fila in resultados['modos'].items():
+        print(
+            f"{modo:<8} {fila['respuesta_kb']:>13} {fila['servidor_ms']:>12} "
+            f"{fila['memoria_pico_mb']:>8} {fila['cliente_ms']:>11}"
+        )
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
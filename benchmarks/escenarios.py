@@ -0,0 +1,135 @@
+"""
+Escenarios de benchmark: qué endpoints se miden, con qué usuario y cuerpo.
+
+Cada escenario es un request HTTP. Los valores dinámicos (ids de compra o
+producto) se resuelven contra el contexto que arma `preparar_contexto`.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    metodo: str
+    ruta: str
+    grupo: str
+    usuario: str = 'admin'  # 'admin' | 'cliente' | 'admin_jwt' | 'anonimo'
+    cuerpo: dict = field(default=None)
+
+    def resolver_ruta(self, contexto):
+        return self.ruta.format(**contexto)
+
+    def resolver_cuerpo(self, contexto):
+        return _formatear(self.cuerpo, contexto)
+
+
+def _formatear(valor, contexto):
+    """Reemplaza {marcadores} en todos los strings de una estructura JSON"""
+    if isinstance(valor, str):
+        return valor.format(**contexto)
+    if isinstance(valor, dict):
+        return {clave: _formatear(v, contexto) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_formatear(v, contexto) for v in valor]
+    return valor
+
+
+ESCENARIOS = [
+    # Catálogo
+    Escenario('productos_lista', 'GET', '/api/productos/', 'catalogo', usuario='cliente'),
+    Escenario('productos_busqueda', 'GET', '/api/productos/?search=samsung', 'catalogo', usuario='cliente'),
+    Escenario('categorias_lista', 'GET', '/api/productos/categorias/', 'catalogo', usuario='cliente'),
+
+    # Compras
+    Escenario(
+        'checkout', 'POST', '/api/compra/compras/checkout/', 'compra', usuario='cliente',
+        cuerpo={'items': [{'producto': '{producto_id}', 'cantidad': 1}], 'observaciones': 'benchmark'},
+    ),
+    Escenario('compras_lista', 'GET', '/api/compra/compras/', 'compra', usuario='cliente'),
+    Escenario('compras_lista_admin', 'GET', '/api/compra/compras/', 'compra'),
+    Escenario('comprobante_pdf', 'GET', '/api/compra/compras/{compra_id}/receipt/', 'compra'),
+
+    # Reportes (todas las vistas de reportes/)
+    Escenario('reporte_summary', 'GET', '/api/reportes/summary/', 'reportes'),
+    Escenario('reporte_kpis', 'GET', '/api/reportes/kpis/', 'reportes'),
+    Escenario('reporte_ventas_por_dia', 'GET', '/api/reportes/series/ventas-por-dia/?dias=90', 'reportes'),
+    Escenario('reporte_serie_dia', 'GET', '/api/reportes/series/ventas/?granularidad=dia&dias=90', 'reportes'),
+    Escenario('reporte_serie_hora', 'GET', '/api/reportes/series/ventas/?granularidad=hora&dias=7', 'reportes'),
+    Escenario('reporte_por_categoria', 'GET', '/api/reportes/ventas/por-categoria/?dias=90', 'reportes'),
+    Escenario('reporte_por_producto', 'GET', '/api/reportes/ventas/por-producto/?dias=90', 'reportes'),
+    Escenario('reporte_top_clientes', 'GET', '/api/reportes/ventas/top-clientes/?dias=90', 'reportes'),
+    Escenario('reporte_rankings', 'GET', '/api/reportes/rankings/rendimiento/?dias=90', 'reportes'),
+    Escenario('reporte_health', 'GET', '/api/reportes/health/', 'reportes'),
+
+    # Autenticación: el endpoint más liviano, para aislar el costo de resolver
+    # el usuario (token cacheado, JWT sin estado y rechazo anónimo)
+    Escenario('auth_token', 'GET', '/api/reportes/health/', 'auth'),
+    Escenario('auth_jwt', 'GET', '/api/reportes/health/', 'auth', usuario='admin_jwt'),
+    Escenario('auth_anonimo', 'GET', '/api/reportes/health/', 'auth', usuario='anonimo'),
+
+    # IA
+    Escenario(
+        'ia_consulta', 'POST', '/api/ia/consulta/', 'ia',
+        cuerpo={'prompt': 'ventas de los últimos 30 días por producto', 'formato': 'pantalla'},
+    ),
+    Escenario('ia_dashboard', 'GET', '/api/ia/dashboard/?dias_hist=30&dias_pred=7', 'ia'),
+    Escenario(
+        'reporte_dinamico_ejecutivo', 'POST', '/api/reportes-dinamicos/avanzados/', 'ia',
+        cuerpo={'prompt': 'reporte ejecutivo del mes', 'formato': 'pantalla', 'incluir_insights': False},
+    ),
+]
+
+
+def preparar_contexto():
+    """
+    Crea (si no existen) los usuarios y el producto dedicados al benchmark y
+    devuelve los headers Authorization y los ids que usan los escenarios. El producto tiene
+    stock prácticamente infinito para que el checkout no falle a mitad de
+    una corrida.
+    """
+    from decimal import Decimal
+
+    from rest_framework.authtoken.models import Token
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from clientes.models import Cliente
+    from compra.models import Compra
+    from productos.inventario import mover
+    from productos.models import Producto
+    from usuarios.models import Usuario
+
+    admin, _ = Usuario.objects.get_or_create(
+        username='bench_admin',
+        defaults={'email': 'bench_admin@bench.local', 'rol': 'admin', 'is_staff': True},
+    )
+    cliente_usuario, _ = Usuario.objects.get_or_create(
+        username='bench_cliente',
+        defaults={'email': 'bench_cliente@bench.local', 'rol': 'cliente'},
+    )
+    cliente, _ = Cliente.objects.get_or_create(
+        usuario=cliente_usuario,
+        defaults={'nombre': 'Cliente Benchmark', 'email': cliente_usuario.email},
+    )
+    producto, _ = Producto.objects.get_or_create(
+        sku='BENCH-001',
+        defaults={'nombre': 'Producto Benchmark', 'precio': Decimal('10.00'), 'stock': 0},
+    )
+    Producto.objects.filter(pk=producto.pk).update(activo=True)
+    # El stock se repone por el libro de inventario, como cualquier ajuste
+    mover(producto, 10 ** 9 - producto.stock, 'ajuste', 'benchmark')
+
+    compra = Compra.objects.order_by('-id').only('id').first()
+    if compra is None:
+        compra = Compra.objects.create(cliente=cliente, observaciones='benchmark')
+
+    return {
+        'tokens': {
+            'admin': f'Token {Token.objects.get_or_create(user=admin)[0].key}',
+            'cliente': f'Token {Token.objects.get_or_create(user=cliente_usuario)[0].key}',
+            'admin_jwt': f'Bearer {RefreshToken.for_user(admin).access_token}',
+        },
+        'rutas': {
+            'producto_id': producto.id,
+            'compra_id': compra.id,
+        },
+    }
@@ -0,0 +1,125 @@
+"""
+Tamaño de respuesta y latencia del historial de compras de un cliente con
+muchas compras: listado liviano (CompraListSerializer, por defecto) contra
+la representación completa con ítems anidados (la que devolvía antes el
+listado, hoy disponible con ?fields=).
+
+Crea el cliente y sus compras dentro de una transacción que se revierte al
+terminar, así no deja datos en la base.
+
+Uso:
+    python -m benchmarks.historial_compras --compras 500 --items 3
+    python -m benchmarks.historial_compras --repeticiones 10 --salida historial.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1,testserver')
+
+
+def _crear_historial(compras, items):
+    from decimal import Decimal
+
+    from clientes.models import Cliente
+    from compra.models import Compra, CompraItem
+    from productos.models import Producto
+    from usuarios.models import Usuario
+
+    usuario = Usuario.objects.create_user('bench_historial', 'bench_historial@bench.local', 'bench-historial')
+    cliente = Cliente.objects.create(nombre='Bench historial', email=usuario.email, usuario=usuario)
+    productos = list(Producto.objects.order_by('id')[:items]) or [
+        Producto.objects.create(sku='BENCH-HIS', nombre='Producto historial', precio=Decimal('10.00'), stock=0)
+    ]
+    nuevas = Compra.objects.bulk_create(
+        [Compra(cliente=cliente, total=Decimal('30.00')) for _ in range(compras)]
+    )
+    CompraItem.objects.bulk_create([
+        CompraItem(
+            compra=compra, producto=productos[j % len(productos)], cantidad=1,
+            precio_unitario=Decimal('10.00'), subtotal=Decimal('10.00'),
+        )
+        for compra in nuevas for j in range(items)
+    ])
+    return usuario
+
+
+def _recorrer(api, query):
+    """Todas las páginas del historial: (bytes, ms por página, consultas por página)"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    total_bytes = 0
+    tiempos = []
+    consultas = []
+    pagina = 1
+    while pagina:
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = api.get('/api/compra/compras/', {**query, 'page': pagina})
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+        total_bytes += len(respuesta.content)
+        pagina = pagina + 1 if respuesta.json().get('next') else None
+    return total_bytes, tiempos, consultas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Payload y latencia del historial de compras')
+    parser.add_argument('--compras', type=int, default=500, help='Compras del cliente (default: 500)')
+    parser.add_argument('--items', type=int, default=3, help='Ítems por compra (default: 3)')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Recorridos completos por variante (default: 5)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.db import transaction
+    from rest_framework.test import APIClient
+
+    from compra.serializers import CompraSerializer
+
+    variantes = {
+        'liviano': {},
+        'completo': {'fields': ','.join(CompraSerializer.Meta.fields)},
+    }
+    resultados = {'compras': args.compras, 'items_por_compra': args.items, 'variantes': {}}
+
+    with transaction.atomic():
+        api = APIClient()
+        api.force_authenticate(_crear_historial(args.compras, args.items))
+        for nombre, query in variantes.items():
+            _recorrer(api, query)  # calentamiento
+            medidas = [_recorrer(api, query) for _ in range(args.repeticiones)]
+            por_pagina = [ms for _, tiempos, _ in medidas for ms in tiempos]
+            resultados['variantes'][nombre] = {
+                'bytes_total': medidas[0][0],
+                'paginas': len(medidas[0][1]),
+                'ms_pagina_p50': round(statistics.median(por_pagina), 2),
+                'ms_historial_p50': round(statistics.median(sum(tiempos) for _, tiempos, _ in medidas), 1),
+                'consultas_pagina': max(medidas[0][2]),
+            }
+        transaction.set_rollback(True)
+
+    print(f"{args.compras} compras x {args.items} ítems\n")
+    print(f"{'variante':<10} {'KB total':>9} {'páginas':>8} {'ms/página':>10} {'ms historial':>13} {'SQL/página':>11}")
+    for nombre, fila in resultados['variantes'].items():
+        print(
+            f"{nombre:<10} {fila['bytes_total'] / 1024:>9.1f} {fila['paginas']:>8} {fila['ms_pagina_p50']:>10} "
+            f"{fila['ms_historial_p50']:>13} {fila['consultas_pagina']:>11}"
+        )
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Costo de la instrumentación de monitoreo/middleware.py (MetricasMiddleware)
+y del execute_wrapper que cuenta el SQL (monitoreo/metricas.py).
+
+- middleware: una vista trivial llamada directamente y envuelta en
+  MetricasMiddleware (la diferencia es el costo fijo por request:
+  ContextVar, Server-Timing y el registro de histogramas);
+- request: /api/reportes/health/ por el stack completo de Django sin
+  MetricasMiddleware, como referencia de cuánto pesa ese costo fijo;
+- sql: `SELECT 1` por el cursor con el contador activo (dentro de un
+  request), inactivo (fuera de un request) y sin el envoltorio instalado.
+
+Se alternan las variantes en cada ronda y se informa la mediana, para que
+el ruido de la máquina afecte a todas por igual. No escribe en la base.
+
+Uso:
+    python -m benchmarks.metricas_overhead --requests 20000 --consultas 100000
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1,testserver')
+
+MIDDLEWARE = 'monitoreo.middleware.MetricasMiddleware'
+
+
+def _por_operacion(funcion, veces):
+    """Microsegundos por operación"""
+    inicio = time.perf_counter()
+    for _ in range(veces):
+        funcion()
+    return (time.perf_counter() - inicio) / veces * 1e6
+
+
+def _medir_middleware(veces, rondas):
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from monitoreo.metricas import registro
+    from monitoreo.middleware import MetricasMiddleware
+
+    respuesta = HttpResponse('ok')
+
+    def vista(request):
+        return respuesta
+
+    request = RequestFactory().get('/api/reportes/health/')
+    variantes = {'sin metricas': vista, 'con metricas': MetricasMiddleware(vista)}
+    tiempos = {variante: [] for variante in variantes}
+    for _ in range(rondas):
+        for variante, llamar in variantes.items():
+            tiempos[variante].append(_por_operacion(lambda: llamar(request), veces // rondas))
+    registro.limpiar()
+    return {variante: statistics.median(valores) for variante, valores in tiempos.items()}
+
+
+def _medir_request(veces, rondas):
+    from django.test import modify_settings
+    from rest_framework.test import APIClient
+
+    from usuarios.models import Usuario
+
+    with modify_settings(MIDDLEWARE={'remove': [MIDDLEWARE]}):
+        cliente = APIClient()
+        # Usuario sin guardar: force_authenticate no consulta la base
+        cliente.force_authenticate(Usuario(username='bench_metricas', is_staff=True))
+        assert cliente.get('/api/reportes/health/').status_code == 200
+        return statistics.median(
+            _por_operacion(lambda: cliente.get('/api/reportes/health/'), max(veces // 10 // rondas, 1))
+            for _ in range(rondas)
+        )
+
+
+def _medir_sql(veces, rondas):
+    from django.db import connection
+
+    from monitoreo.metricas import MetricasRequest, activar_metricas, desactivar_metricas, envoltorio_sql
+
+    connection.ensure_connection()
+    cursor = connection.cursor()
+
+    def consulta():
+        cursor.execute('SELECT 1')
+
+    def activo():
+        token = activar_metricas(MetricasRequest())
+        try:
+            return _por_operacion(consulta, veces // rondas)
+        finally:
+            desactivar_metricas(token)
+
+    def sin_envoltorio():
+        connection.execute_wrappers.remove(envoltorio_sql)
+        try:
+            return _por_operacion(consulta, veces // rondas)
+        finally:
+            connection.execute_wrappers.append(envoltorio_sql)
+
+    if envoltorio_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(envoltorio_sql)
+    variantes = {
+        'contador activo': activo,
+        'contador inactivo': lambda: _por_operacion(consulta, veces // rondas),
+        'sin envoltorio': sin_envoltorio,
+    }
+    tiempos = {variante: [] for variante in variantes}
+    for _ in range(rondas):
+        for variante, medir in variantes.items():
+            tiempos[variante].append(medir())
+    cursor.close()
+    return {variante: statistics.median(valores) for variante, valores in tiempos.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Costo de MetricasMiddleware y del contador de SQL')
+    parser.add_argument('--requests', type=int, default=20000, help='Requests por variante (default: 20000)')
+    parser.add_argument('--consultas', type=int, default=100000, help='Consultas por variante (default: 100000)')
+    parser.add_argument('--rondas', type=int, default=5, help='Rondas alternando variantes (default: 5)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+
+    middleware = _medir_middleware(args.requests, args.rondas)
+    request = _medir_request(args.requests, args.rondas)
+    sql = _medir_sql(args.consultas, args.rondas)
+    costo = middleware['con metricas'] - middleware['sin metricas']
+    resultados = {
+        'requests': args.requests,
+        'consultas': args.consultas,
+        'middleware_us': {variante: round(valor, 2) for variante, valor in middleware.items()},
+        'costo_us': round(costo, 2),
+        'request_us': round(request, 1),
+        'sql_us': {variante: round(valor, 2) for variante, valor in sql.items()},
+    }
+
+    print(f"Vista trivial ({args.requests} llamadas por variante)")
+    for variante, valor in middleware.items():
+        print(f"  {variante:<18} {valor:>9.2f} µs/request")
+    print(f"  {'costo':<18} {costo:>9.2f} µs/request")
+    print(f"  /api/reportes/health/ sin métricas: {request:.1f} µs/request ({costo / request:.1%} de costo)\n")
+
+    print(f"SELECT 1 ({args.consultas} consultas por variante)")
+    for variante, valor in sql.items():
+        print(f"  {variante:<18} {valor:>9.2f} µs/consulta")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
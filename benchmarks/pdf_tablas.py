@@ -0,0 +1,139 @@
+"""
+Tiempo y memoria del PDF de reportes según la cantidad de filas: antes
+(una sola Table de platypus con todas las filas) y después (bloques de una
+página con anchos y altos precalculados, ver GeneradorReportes._tablas_pdf).
+
+No usa la base: genera filas sintéticas con las columnas de un reporte de
+ventas. Cada caso corre en un subproceso para que el pico de memoria
+(ru_maxrss) sea solo suyo. Sin límite de filas (PDF_MAX_FILAS=0).
+
+Uso:
+    python -m benchmarks.pdf_tablas --filas 1000,10000,100000
+    python -m benchmarks.pdf_tablas --antes-hasta 10000 --salida pdf_tablas.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import resource
+import subprocess
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+COLUMNAS = ['fecha', 'cliente', 'producto', 'cantidad', 'total']
+
+
+def _datos(filas):
+    return {
+        'columnas': COLUMNAS,
+        'datos': [
+            {
+                'fecha': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+                'cliente': f'Cliente {i % 5000}',
+                'producto': f'Producto de prueba número {i % 700}',
+                'cantidad': i % 9 + 1,
+                'total': f'{(i % 9 + 1) * 12.5:.2f}',
+            }
+            for i in range(filas)
+        ],
+    }
+
+
+def _interpretacion():
+    return {'tipo_reporte': 'ventas', 'fecha_inicio': None, 'fecha_fin': None, 'agrupar_por': []}
+
+
+def _antes(datos):
+    """El render anterior: toda la tabla en una sola Table"""
+    from io import BytesIO
+
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
+    tabla = [[col.replace('_', ' ').title() for col in datos['columnas']]]
+    tabla += [[str(fila.get(col, '')) for col in datos['columnas']] for fila in datos['datos']]
+    tabla = Table(tabla, repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
+    ]))
+    doc.build([Paragraph('Reporte de Ventas', getSampleStyleSheet()['Heading1']), tabla])
+    return buffer.getvalue()
+
+
+def _despues(datos):
+    from django.test import override_settings
+
+    from ia.generador_reportes import GeneradorReportes
+
+    with override_settings(PDF_MAX_FILAS=0):
+        return GeneradorReportes(datos, _interpretacion()).dibujar_pdf()
+
+
+def _caso(version, filas):
+    """Corre un caso en este proceso e imprime su resultado como JSON"""
+    import django
+    django.setup()
+
+    datos = _datos(filas)
+    base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    contenido = (_antes if version == 'antes' else _despues)(datos)
+    segundos = time.perf_counter() - inicio
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'segundos': round(segundos, 2),
+        # ru_maxrss está en KB en Linux
+        'memoria_mb': round((pico_kb - base_kb) / 1024, 1),
+        'pdf_kb': round(len(contenido) / 1024, 1),
+    }))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tiempo y memoria del PDF de reportes por cantidad de filas')
+    parser.add_argument('--filas', default='1000,10000,100000', help='Cantidades a medir (default: 1000,10000,100000)')
+    parser.add_argument('--antes-hasta', type=int, default=10000,
+                        help='Medir la versión anterior solo hasta estas filas (default: 10000; tarda minutos con más)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    parser.add_argument('--caso', nargs=2, metavar=('VERSION', 'FILAS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.caso:
+        _caso(args.caso[0], int(args.caso[1]))
+        return
+
+    resultados = {}
+    print(f"{'filas':>8} {'versión':<8} {'segundos':>9} {'memoria MB':>11} {'PDF KB':>9}")
+    for filas in [int(n) for n in args.filas.split(',')]:
+        for version in ('antes', 'despues'):
+            if version == 'antes' and filas > args.antes_hasta:
+                continue
+            salida = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.pdf_tablas', '--caso', version, str(filas)],
+                cwd=BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            medida = json.loads(salida.strip().splitlines()[-1])
+            resultados.setdefault(str(filas), {})[version] = medida
+            print(f"{filas:>8} {version:<8} {medida['segundos']:>9} {medida['memoria_mb']:>11} {medida['pdf_kb']:>9}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
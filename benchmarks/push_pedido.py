@@ -0,0 +1,148 @@
+"""
+Envíos push por ciclo de vida de un pedido ("carrito confirmado" al hacer
+checkout, "compra realizada" al pagar y luego --cambios cambios de estado
+seguidos), sin y con las políticas de entrega de notificaciones/entrega.py.
+
+Para cada escenario cuenta:
+- envíos: POST al servicio push (uno por suscripción y mensaje);
+- en cola: mensajes que recibe al reconectarse un dispositivo que estuvo
+  desconectado todo el ciclo (los que comparten Topic se reemplazan).
+
+El servicio push se reemplaza por un contador (sin red). Los datos se
+crean y se borran al terminar.
+
+Uso:
+    python -m benchmarks.push_pedido --pedidos 20 --suscripciones 2 --ventana 1 --cambios 2
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+from collections import Counter
+from unittest import mock
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+class _ServicioPushFalso:
+    """Cuenta los envíos y arma la cola de cada suscripción respetando el Topic"""
+
+    def __init__(self):
+        self.envios = 0
+        self.colas = {}
+
+    def enviar(self, subscription_info, data, ttl=0, headers=None, timeout=None):
+        self.envios += 1
+        topic = (headers or {}).get('Topic')
+        cola = self.colas.setdefault(subscription_info['endpoint'], [])
+        if topic:
+            cola[:] = [m for m in cola if m != topic]
+        cola.append(topic or object())
+
+
+def _ciclo(push_service, usuario, compra, espera, cambios):
+    push_service.send_notification(
+        usuario=usuario,
+        titulo='🛒 Carrito confirmado',
+        mensaje=f'Tu pedido #{compra.id} ha sido creado. Procede al pago para completar tu compra.',
+        tipo='compra_creada',
+        datos_extra={'compra_id': compra.id, 'total': float(compra.total)},
+        url=f'/mis-pedidos/{compra.id}',
+    )
+    time.sleep(espera)
+    push_service.send_compra_exitosa(compra)
+    for i in range(cambios):
+        push_service.send_notification(
+            usuario=usuario,
+            titulo='📋 Estado actualizado',
+            mensaje=f'El estado de tu pedido #{compra.id} ha cambiado ({i + 1}).',
+            tipo='cambio_estado',
+            datos_extra={'compra_id': compra.id},
+            url=f'/mis-pedidos/{compra.id}',
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Envíos push por ciclo de vida de un pedido')
+    parser.add_argument('--pedidos', type=int, default=20, help='Pedidos por escenario (default: 20)')
+    parser.add_argument('--suscripciones', type=int, default=2, help='Dispositivos del cliente (default: 2)')
+    parser.add_argument('--ventana', type=float, default=1, help='PUSH_AGRUPAR_SEGUNDOS para la medición (default: 1)')
+    parser.add_argument('--cambios', type=int, default=2, help='Cambios de estado seguidos tras el pago (default: 2)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from decimal import Decimal
+
+    from django.test import override_settings
+
+    from clientes.models import Cliente
+    from compra.models import Compra
+    from notificaciones import entrega
+    from notificaciones.models import PushSubscription
+    from notificaciones.push_service import push_service
+    from usuarios.models import Usuario
+
+    usuario = Usuario.objects.create_user('bench_push', 'bench_push@bench.local', 'bench-push')
+    cliente = Cliente.objects.create(usuario=usuario, nombre='Bench push', email='bench_push@bench.local')
+    PushSubscription.objects.bulk_create([
+        PushSubscription(usuario=usuario, endpoint=f'https://push.bench.local/{i}', p256dh='k', auth='a')
+        for i in range(args.suscripciones)
+    ])
+
+    escenarios = (
+        ('pago inmediato', 0),
+        ('pago tras la ventana', args.ventana + 0.2),
+    )
+    variantes = (
+        ('sin politicas', mock.patch.dict(entrega.POLITICAS, clear=True)),
+        ('con politicas', mock.patch.dict(entrega.POLITICAS)),
+    )
+    resultados = {
+        'pedidos': args.pedidos, 'suscripciones': args.suscripciones, 'ventana': args.ventana,
+        'cambios': args.cambios, 'filas': [],
+    }
+    sender_original = push_service.sender
+    try:
+        for escenario, espera in escenarios:
+            for variante, politicas in variantes:
+                falso = _ServicioPushFalso()
+                push_service.sender = falso
+                with politicas, override_settings(PUSH_AGRUPAR_SEGUNDOS=args.ventana):
+                    for _ in range(args.pedidos):
+                        compra = Compra.objects.create(cliente=cliente, total=Decimal('100.00'))
+                        _ciclo(push_service, usuario, compra, espera, args.cambios)
+                    # Esperar a que salgan los envíos agrupados
+                    time.sleep(args.ventana + 0.5)
+                en_cola = Counter(len(cola) for cola in falso.colas.values())
+                resultados['filas'].append({
+                    'escenario': escenario,
+                    'variante': variante,
+                    'envios_por_pedido': round(falso.envios / args.pedidos, 2),
+                    'en_cola_por_dispositivo': round(
+                        sum(n * veces for n, veces in en_cola.items()) / max(sum(en_cola.values()), 1) / args.pedidos, 2
+                    ),
+                })
+    finally:
+        push_service.sender = sender_original
+        Compra.objects.filter(cliente=cliente).delete()
+        usuario.delete()
+        cliente.delete()
+
+    print(f"{args.pedidos} pedidos, {args.suscripciones} dispositivos, ventana {args.ventana} s, {args.cambios} cambios de estado\n")
+    print(f"{'escenario':<22} {'variante':<14} {'envíos/pedido':>14} {'en cola/disp.':>14}")
+    for fila in resultados['filas']:
+        print(f"{fila['escenario']:<22} {fila['variante']:<14} {fila['envios_por_pedido']:>14} {fila['en_cola_por_dispositivo']:>14}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
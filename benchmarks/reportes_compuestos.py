@@ -0,0 +1,97 @@
+"""
+Latencia de los reportes compuestos de reportes dinámicos (ejecutivo,
+comparativo y rendimiento) con las secciones en serie y en paralelo
+(reportes_dinamicos/ejecutor.py), junto al tiempo de cada sección.
+
+Con secciones independientes en paralelo el total debería acercarse al
+de la sección más lenta. El paralelismo rinde cuando las secciones esperan
+a la base (PostgreSQL en red); con SQLite y una sola CPU casi todo es CPU
+y la diferencia es mínima.
+
+Si no hay modelo entrenado se entrena uno temporal (no pisa el instalado).
+
+Uso:
+    python -m benchmarks.reportes_compuestos --repeticiones 10
+    python -m benchmarks.reportes_compuestos --workers 4 --salida compuestos.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+def _medir(funcion, repeticiones):
+    funcion()  # calentamiento
+    tiempos = []
+    secciones = {}
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        for nombre, ms in resultado.get('secciones_ms', {}).items():
+            secciones.setdefault(nombre, []).append(ms)
+    return {
+        'total_ms': round(statistics.median(tiempos), 1),
+        'secciones_ms': {nombre: round(statistics.median(valores), 1) for nombre, valores in secciones.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reportes compuestos: secciones en serie vs en paralelo')
+    parser.add_argument('--repeticiones', type=int, default=10, help='Ejecuciones por reporte (default: 10)')
+    parser.add_argument('--workers', type=int, default=4, help='Hilos para la variante paralela (default: 4)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from unittest import mock
+
+    from django.test import override_settings
+
+    from ia import modelo_ml
+    from reportes_dinamicos.views import ReportesDinamicosAvanzadosView
+
+    vista = ReportesDinamicosAvanzadosView()
+    reportes = {
+        'ejecutivo': lambda: vista._generar_reporte_ejecutivo_ml(30, {}),
+        'comparativo': lambda: vista._generar_reporte_comparativo(30, {}),
+        'rendimiento': lambda: vista._generar_analisis_rendimiento_ml({}),
+    }
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        if not os.path.exists(modelo_ml.MODEL_PATH):
+            parche = mock.patch('ia.modelo_ml.MODEL_PATH', f'{directorio}/modelo.pkl')
+            parche.start()
+            modelo = modelo_ml.ModeloPrediccionVentas()
+            modelo.MODEL_PATH = modelo_ml.MODEL_PATH
+            modelo.entrenar(dias_historico=90)
+
+        for variante, workers in (('serie', 0), ('paralelo', args.workers)):
+            with override_settings(REPORTES_SECCIONES_WORKERS=workers):
+                for nombre, funcion in reportes.items():
+                    resultados.setdefault(nombre, {})[variante] = _medir(funcion, args.repeticiones)
+
+        mock.patch.stopall()
+
+    print(f"{'reporte':<12} {'serie ms':>9} {'paralelo ms':>12}  secciones (paralelo)")
+    for nombre, fila in resultados.items():
+        secciones = ', '.join(f'{s}={ms}' for s, ms in fila['paralelo']['secciones_ms'].items())
+        print(f"{nombre:<12} {fila['serie']['total_ms']:>9} {fila['paralelo']['total_ms']:>12}  {secciones}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Ejecuta los escenarios de benchmark y reporta latencias p50/p95/p99,
+throughput y consultas SQL por endpoint.
+
+Por defecto corre en proceso (WSGI de Django + django.test.Client) contra la
+base configurada en DJANGO_SETTINGS_MODULE, que debe estar poblada
+(ver `generar_datos_masivos`). Con --url mide un servidor ya levantado.
+
+Las consultas SQL se leen del header Server-Timing que agrega
+monitoreo.middleware.MetricasMiddleware (METRICS_ENABLED=True).
+
+Uso:
+    python -m benchmarks.run --concurrencia 8 --iteraciones 200
+    python -m benchmarks.run --grupo reportes --salida benchmarks/baseline.json
+    python -m benchmarks.run --comparar benchmarks/baseline.json
+    python -m benchmarks.run --url http://localhost:8000 --token-admin ... --token-cliente ...
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# El cliente de pruebas de Django usa el host 'testserver'
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1,testserver')
+
+_RE_CONSULTAS = re.compile(r'db;dur=[\d.]+;desc="(\d+) consultas"')
+
+
+def _percentil(valores, p):
+    """Percentil con interpolación lineal (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    posicion = (len(valores) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+
+
+class ClienteEnProceso:
+    """Requests contra el handler WSGI de Django, sin red"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self._local = threading.local()
+
+    def _cliente(self):
+        if not hasattr(self._local, 'cliente'):
+            from django.test import Client
+            self._local.cliente = Client()
+        return self._local.cliente
+
+    def request(self, metodo, ruta, usuario, cuerpo):
+        extra = {}
+        if usuario in self.tokens:
+            extra['HTTP_AUTHORIZATION'] = self.tokens[usuario]
+        cliente = self._cliente()
+        if metodo == 'GET':
+            respuesta = cliente.get(ruta, **extra)
+        else:
+            respuesta = cliente.generic(
+                metodo, ruta, json.dumps(cuerpo or {}), content_type='application/json', **extra
+            )
+        # Consumir respuestas en streaming (FileResponse) para medir completo
+        if getattr(respuesta, 'streaming', False):
+            b''.join(respuesta.streaming_content)
+        return respuesta.status_code, respuesta.headers.get('Server-Timing', '')
+
+    def cerrar(self):
+        from django.db import connections
+        connections.close_all()
+
+
+class ClienteHTTP:
+    """Requests contra un servidor levantado (runserver, daphne, gunicorn)"""
+
+    def __init__(self, base_url, tokens):
+        self.base_url = base_url.rstrip('/')
+        self.tokens = tokens
+
+    def request(self, metodo, ruta, usuario, cuerpo):
+        import urllib.error
+        import urllib.request
+
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else None
+        peticion = urllib.request.Request(self.base_url + ruta, data=datos, method=metodo)
+        peticion.add_header('Content-Type', 'application/json')
+        if usuario in self.tokens:
+            peticion.add_header('Authorization', self.tokens[usuario])
+        try:
+            with urllib.request.urlopen(peticion, timeout=120) as respuesta:
+                respuesta.read()
+                return respuesta.status, respuesta.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get('Server-Timing', '')
+
+    def cerrar(self):
+        pass
+
+
+def medir_escenario(cliente, escenario, contexto, iteraciones, concurrencia, calentamiento):
+    ruta = escenario.resolver_ruta(contexto)
+    cuerpo = escenario.resolver_cuerpo(contexto)
+
+    for _ in range(calentamiento):
+        cliente.request(escenario.metodo, ruta, escenario.usuario, cuerpo)
+
+    def _una():
+        inicio = time.perf_counter()
+        status, server_timing = cliente.request(escenario.metodo, ruta, escenario.usuario, cuerpo)
+        latencia = time.perf_counter() - inicio
+        match = _RE_CONSULTAS.search(server_timing or '')
+        return latencia, status, int(match.group(1)) if match else None
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(lambda _: _una(), range(iteraciones)))
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    consultas = [r[2] for r in resultados if r[2] is not None]
+    errores = sum(1 for r in resultados if r[1] >= 400)
+    return {
+        'ruta': ruta,
+        'metodo': escenario.metodo,
+        'iteraciones': iteraciones,
+        'errores': errores,
+        'status': sorted({r[1] for r in resultados}),
+        'p50_ms': round(_percentil(latencias, 50), 2),
+        'p95_ms': round(_percentil(latencias, 95), 2),
+        'p99_ms': round(_percentil(latencias, 99), 2),
+        'media_ms': round(sum(latencias) / len(latencias), 2),
+        'rps': round(iteraciones / duracion, 2),
+        'sql_promedio': round(sum(consultas) / len(consultas), 1) if consultas else None,
+        'sql_max': max(consultas) if consultas else None,
+    }
+
+
+def comparar(actual, base, tolerancia):
+    """
+    Compara contra un baseline. Es regresión si el p95 empeora más que la
+    tolerancia (porcentaje) o si aumenta el máximo de consultas SQL.
+    """
+    regresiones = []
+    print(f'\n{"escenario":32} {"p95 base":>10} {"p95 actual":>11} {"Δ%":>7} {"sql base":>9} {"sql actual":>11}')
+    for nombre, datos in actual['escenarios'].items():
+        previo = base.get('escenarios', {}).get(nombre)
+        if previo is None:
+            print(f'{nombre:32} {"(nuevo)":>10}')
+            continue
+        delta = (datos['p95_ms'] - previo['p95_ms']) / max(previo['p95_ms'], 0.001) * 100
+        marca = ''
+        if delta > tolerancia:
+            regresiones.append(f'{nombre}: p95 {previo["p95_ms"]} → {datos["p95_ms"]} ms (+{delta:.0f}%)')
+            marca = ' ⚠️'
+        sql_previo, sql_actual = previo.get('sql_max'), datos.get('sql_max')
+        if sql_previo is not None and sql_actual is not None and sql_actual > sql_previo:
+            regresiones.append(f'{nombre}: consultas SQL {sql_previo} → {sql_actual}')
+            marca = ' ⚠️'
+        print(
+            f'{nombre:32} {previo["p95_ms"]:>10} {datos["p95_ms"]:>11} {delta:>6.0f}% '
+            f'{str(sql_previo):>9} {str(sql_actual):>11}{marca}'
+        )
+    return regresiones
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de endpoints SmartSales365')
+    parser.add_argument('--concurrencia', type=int, default=4, help='Requests simultáneos (default: 4)')
+    parser.add_argument('--iteraciones', type=int, default=50, help='Requests por escenario (default: 50)')
+    parser.add_argument('--calentamiento', type=int, default=3, help='Requests previos no medidos (default: 3)')
+    parser.add_argument('--grupo', action='append', help='Solo estos grupos (catalogo, compra, reportes, ia, ...)')
+    parser.add_argument('--escenario', action='append', help='Solo estos escenarios (por nombre)')
+    parser.add_argument('--url', help='Medir un servidor levantado en vez de correr en proceso')
+    parser.add_argument('--token-admin', help='Token de un usuario staff (solo con --url)')
+    parser.add_argument('--token-cliente', help='Token de un usuario cliente (solo con --url)')
+    parser.add_argument('--jwt-admin', help='JWT de acceso del usuario staff (solo con --url)')
+    parser.add_argument('--compra-id', type=int, help='Compra para el comprobante PDF (solo con --url)')
+    parser.add_argument('--producto-id', type=int, help='Producto para el checkout (solo con --url)')
+    parser.add_argument('--canales-memoria', action='store_true',
+                        help='Usar InMemoryChannelLayer (sin Redis) al correr en proceso')
+    parser.add_argument('--salida', help='Guardar resultados JSON (baseline)')
+    parser.add_argument('--comparar', help='Baseline JSON contra el cual comparar')
+    parser.add_argument('--tolerancia', type=float, default=20.0,
+                        help='Empeoramiento de p95 tolerado en %% (default: 20)')
+    args = parser.parse_args(argv)
+
+    from benchmarks.escenarios import ESCENARIOS, preparar_contexto
+
+    if args.url:
+        tokens = {
+            'admin': args.token_admin and f'Token {args.token_admin}',
+            'cliente': args.token_cliente and f'Token {args.token_cliente}',
+            'admin_jwt': args.jwt_admin and f'Bearer {args.jwt_admin}',
+        }
+        tokens = {k: v for k, v in tokens.items() if v}
+        contexto = {'compra_id': args.compra_id or 1, 'producto_id': args.producto_id or 1}
+        cliente = ClienteHTTP(args.url, tokens)
+        vendor = 'remoto'
+    else:
+        import django
+        django.setup()
+        from django.conf import settings
+        from django.db import connection
+        if args.canales_memoria:
+            settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+        preparado = preparar_contexto()
+        contexto = preparado['rutas']
+        cliente = ClienteEnProceso(preparado['tokens'])
+        vendor = connection.vendor
+
+    escenarios = [
+        e for e in ESCENARIOS
+        if (not args.grupo or e.grupo in args.grupo) and (not args.escenario or e.nombre in args.escenario)
+    ]
+
+    resultados = {
+        'meta': {
+            'commit': _commit_actual(),
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'base_de_datos': vendor,
+            'modo': 'http' if args.url else 'en_proceso',
+            'concurrencia': args.concurrencia,
+            'iteraciones': args.iteraciones,
+            'python': platform.python_version(),
+        },
+        'escenarios': {},
+    }
+
+    print(f'{"escenario":32} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>8} {"sql":>6} {"err":>4}')
+    for escenario in escenarios:
+        datos = medir_escenario(
+            cliente, escenario, contexto, args.iteraciones, args.concurrencia, args.calentamiento
+        )
+        resultados['escenarios'][escenario.nombre] = datos
+        print(
+            f'{escenario.nombre:32} {datos["p50_ms"]:>8} {datos["p95_ms"]:>8} {datos["p99_ms"]:>8} '
+            f'{datos["rps"]:>8} {str(datos["sql_max"]):>6} {datos["errores"]:>4}'
+        )
+    cliente.cerrar()
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\n💾 Resultados guardados en {args.salida}')
+
+    if args.comparar:
+        base = json.loads(pathlib.Path(args.comparar).read_text())
+        regresiones = comparar(resultados, base, args.tolerancia)
+        if regresiones:
+            print('\n❌ Regresiones detectadas:')
+            for r in regresiones:
+                print(f'  - {r}')
+            return 1
+        print('\n✅ Sin regresiones respecto al baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
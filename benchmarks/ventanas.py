@@ -0,0 +1,115 @@
+"""
+Planes de ejecución y tiempos de los filtros por fecha: antes
+(`fecha__date__gte`) y después (rango semiabierto de reportes/ventanas.py).
+
+Imprime el EXPLAIN de cada consulta en ambas versiones y el tiempo
+mediano de N ejecuciones. En PostgreSQL usa EXPLAIN (ANALYZE, BUFFERS).
+
+Uso:
+    python -m benchmarks.ventanas --dias 30 --repeticiones 5
+    python -m benchmarks.ventanas --salida benchmarks/ventanas.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+
+def _consultas(dias):
+    """Pares (nombre, antes, después); cada elemento es un callable que devuelve un queryset"""
+    from django.db.models import Count, Sum
+    from django.db.models.functions import TruncDate
+
+    from compra.models import Compra
+    from reportes.ventanas import Ventana, truncar_dia
+
+    ventana = Ventana.ultimos_dias(dias)
+    inicio = ventana.desde
+    cliente_id = Compra.objects.order_by('-id').values_list('cliente_id', flat=True).first()
+
+    return [
+        (
+            'kpi_ventas',
+            lambda: Compra.objects.filter(fecha__date__gte=inicio).values('id'),
+            lambda: Compra.objects.filter(ventana.filtro()).values('id'),
+        ),
+        (
+            'ventas_por_dia',
+            lambda: (Compra.objects.filter(fecha__date__gte=inicio).annotate(dia=TruncDate('fecha'))
+                     .values('dia').annotate(total=Sum('total'), cantidad=Count('id')).order_by('dia')),
+            lambda: (Compra.objects.filter(ventana.filtro()).annotate(dia=truncar_dia())
+                     .values('dia').annotate(total=Sum('total'), cantidad=Count('id')).order_by('dia')),
+        ),
+        (
+            'compras_de_cliente',
+            lambda: Compra.objects.filter(cliente_id=cliente_id, fecha__date__gte=inicio).values('id'),
+            lambda: Compra.objects.filter(ventana.filtro(), cliente_id=cliente_id).values('id'),
+        ),
+    ]
+
+
+def _explain(queryset):
+    from django.db import connection
+
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True, buffers=True)
+    return queryset.explain()
+
+
+def _medir(fabrica, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        list(fabrica())
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tiempos), 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN y tiempos de filtros por fecha (antes/después)')
+    parser.add_argument('--dias', type=int, default=30, help='Días de la ventana (default: 30)')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por consulta (default: 5)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.db import connection
+
+    from compra.models import Compra
+
+    resultados = {
+        'base_de_datos': connection.vendor,
+        'compras': Compra.objects.count(),
+        'dias': args.dias,
+        'consultas': {},
+    }
+    print(f"{resultados['compras']} compras en {connection.vendor}, ventana de {args.dias} días\n")
+
+    for nombre, antes, despues in _consultas(args.dias):
+        fila = {}
+        for version, fabrica in (('antes', antes), ('despues', despues)):
+            plan = _explain(fabrica())
+            fila[version] = {'plan': plan, 'mediana_ms': _medir(fabrica, args.repeticiones)}
+            print(f'── {nombre} [{version}] {fila[version]["mediana_ms"]} ms')
+            print(plan + '\n')
+        resultados['consultas'][nombre] = fila
+
+    print(f"{'consulta':<24} {'antes ms':>10} {'después ms':>11}")
+    for nombre, fila in resultados['consultas'].items():
+        print(f"{nombre:<24} {fila['antes']['mediana_ms']:>10} {fila['despues']['mediana_ms']:>11}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+CPU por envío Web Push: pywebpush.webpush() por suscripción (lo que hacía
+push_service.send_notification) contra notificaciones/webpush_sender.py
+(clave VAPID parseada una vez, cabeceras firmadas por audiencia y payload
+serializado una vez por difusión).
+
+Mide solo CPU del proceso (time.process_time): el POST al servicio push se
+reemplaza por una sesión que responde 201 sin red, así el resultado no
+depende de la latencia. El cifrado por suscripción (ECDH + AES-GCM) queda
+en las dos variantes.
+
+Uso:
+    python -m benchmarks.webpush_envios --envios 10000 --audiencias 3
+    python -m benchmarks.webpush_envios --salida webpush.json
+"""
+import argparse
+import base64
+import json
+import os
+import pathlib
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+SERVICIOS = (
+    'https://fcm.googleapis.com/fcm/send',
+    'https://updates.push.services.mozilla.com/wpush/v2',
+    'https://web.push.apple.com',
+    'https://wns2-par02p.notify.windows.com/w',
+)
+
+
+class _Respuesta:
+    status_code = 201
+    reason = 'Created'
+    text = ''
+
+
+class _SesionSinRed:
+    def post(self, endpoint, data=None, headers=None, timeout=None):
+        return _Respuesta()
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def _clave_vapid():
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    clave = ec.generate_private_key(ec.SECP256R1())
+    return _b64(clave.private_numbers().private_value.to_bytes(32, 'big'))
+
+
+def _suscripciones(envios, audiencias, distintas=200):
+    """`envios` suscripciones repartidas en `audiencias` servicios push (claves de cliente reales)"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    claves = []
+    for _ in range(distintas):
+        publica = ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )
+        claves.append({'p256dh': _b64(publica), 'auth': _b64(os.urandom(16))})
+    return [
+        {'endpoint': f'{SERVICIOS[i % audiencias]}/{i}', 'keys': claves[i % distintas]}
+        for i in range(envios)
+    ]
+
+
+def _payload():
+    return {
+        'title': '🎉 ¡Nueva Promoción Disponible!',
+        'body': '15% de descuento en Semana tecnológica. Descuento en laptops y accesorios...',
+        'icon': '/icon-192x192.png',
+        'badge': '/badge-72x72.png',
+        'data': {'tipo': 'promocion', 'promocion_id': 42, 'codigo': 'TECNO15', 'url': '/productos?promocion=TECNO15'},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CPU por envío Web Push')
+    parser.add_argument('--envios', type=int, default=10000, help='Envíos a medir (default: 10000)')
+    parser.add_argument('--audiencias', type=int, default=3, choices=range(1, len(SERVICIOS) + 1),
+                        help='Servicios push distintos (default: 3)')
+    parser.add_argument('--salida', help='Guardar resultados JSON')
+    args = parser.parse_args(argv)
+
+    from pywebpush import webpush
+
+    from notificaciones.webpush_sender import WebPushSender
+
+    clave = _clave_vapid()
+    claims = {'sub': 'mailto:admin@smartsales365.com'}
+    suscripciones = _suscripciones(args.envios, args.audiencias)
+    sesion = _SesionSinRed()
+
+    def por_mensaje():
+        for suscripcion in suscripciones:
+            # Como antes: claims nuevos por mensaje (el dict compartido fijaba el aud del primero)
+            webpush(suscripcion, data=json.dumps(_payload()), vapid_private_key=clave,
+                    vapid_claims=dict(claims), requests_session=sesion)
+
+    def reutilizando():
+        sender = WebPushSender(clave, claims, crear_sesion=lambda: sesion)
+        data = json.dumps(_payload())
+        for suscripcion in suscripciones:
+            sender.enviar(suscripcion, data)
+
+    resultados = {'envios': args.envios, 'audiencias': args.audiencias, 'variantes': {}}
+    for nombre, funcion in (('webpush()', por_mensaje), ('WebPushSender', reutilizando)):
+        inicio = time.process_time()
+        funcion()
+        cpu = time.process_time() - inicio
+        resultados['variantes'][nombre] = {
+            'cpu_segundos': round(cpu, 2),
+            'cpu_por_10k': round(cpu * 10000 / args.envios, 2),
+            'ms_por_envio': round(cpu * 1000 / args.envios, 3),
+        }
+
+    print(f"{args.envios} envíos a {args.audiencias} servicios push (CPU, sin red)\n")
+    print(f"{'variante':<15} {'cpu (s)':>8} {'cpu/10k (s)':>12} {'ms/envío':>9}")
+    for nombre, fila in resultados['variantes'].items():
+        print(f"{nombre:<15} {fila['cpu_segundos']:>8} {fila['cpu_por_10k']:>12} {fila['ms_por_envio']:>9}")
+
+    if args.salida:
+        pathlib.Path(args.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f'\nResultados guardados en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
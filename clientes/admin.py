@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Cliente
+from .models import Cliente, MetricasCliente
 
 
 @admin.register(Cliente)
@@ -43,3 +43,34 @@ class ClienteAdmin(admin.ModelAdmin):
             '<span style="color: gray;">- Sin cuenta</span>'
         )
     tiene_usuario.short_description = 'Usuario'
+
+
+@admin.register(MetricasCliente)
+class MetricasClienteAdmin(admin.ModelAdmin):
+    """Solo lectura: la tabla se mantiene desde las compras"""
+    list_display = (
+        'cliente',
+        'cantidad_compras',
+        'total_comprado',
+        'ticket_promedio',
+        'total_pagado',
+        'recencia',
+        'actualizado_en'
+    )
+    search_fields = ('cliente__nombre', 'cliente__email')
+    list_select_related = ('cliente',)
+    ordering = ('-total_comprado',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def recencia(self, obj):
+        dias = obj.dias_desde_ultima_compra()
+        if dias is None:
+            return format_html('<span style="color: gray;">- Sin compras</span>')
+        color = 'green' if dias <= 30 else 'orange' if dias <= 90 else 'red'
+        return format_html('<span style="color: {};">{} días</span>', color, dias)
+    recencia.short_description = 'Última compra'
@@ -5,3 +5,7 @@ class ClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clientes'
     verbose_name = 'Clientes'
+
+    def ready(self):
+        # Mantenimiento incremental de MetricasCliente
+        from . import signals  # noqa: F401
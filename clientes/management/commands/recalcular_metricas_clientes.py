@@ -0,0 +1,39 @@
+"""
+Reconstruye la tabla de métricas por cliente (MetricasCliente).
+
+Necesario tras cargas masivas o escrituras que no emiten señales
+(`update()`, `bulk_create`, `generar_datos_masivos`) y tras cambiar el
+cliente de una compra existente.
+
+Uso:
+    python manage.py recalcular_metricas_clientes
+    python manage.py recalcular_metricas_clientes --lote 5000 --limpiar
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from clientes.metricas import recalcular_en_lotes
+from clientes.models import Cliente, MetricasCliente
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las métricas de compra (RFM) de todos los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help='Clientes por consulta (default: 2000)')
+        parser.add_argument('--limpiar', action='store_true', help='Vacía la tabla antes de recalcular')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['limpiar']:
+            MetricasCliente.objects.all().delete()
+            self.stdout.write(self.style.WARNING('🧹 Métricas de clientes eliminadas'))
+
+        ids = list(Cliente.objects.order_by('id').values_list('id', flat=True))
+        con_compras = recalcular_en_lotes(ids, lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(ids):,} clientes procesados ({con_compras:,} con compras) '
+            f'en {time.perf_counter() - inicio:.1f}s'
+        ))
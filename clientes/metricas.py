@@ -0,0 +1,134 @@
+"""
+Mantenimiento de MetricasCliente.
+
+Cada vez que se crea, paga, modifica o borra una compra se recalculan las
+métricas de su cliente con UNA consulta de agregación acotada a ese
+cliente (índice `(cliente, -fecha)` de compras) y un upsert. Dentro de una
+transacción el recálculo se difiere al commit y se agrupa: un checkout que
+guarda la compra varias veces recalcula al cliente una sola vez.
+
+Las escrituras masivas que no emiten señales (`update()`, `bulk_create`,
+`generar_datos_masivos`) deben llamar a `recalcular()` o al comando
+`recalcular_metricas_clientes`.
+
+Los clientes sin compras no tienen fila: los reportes los tratan como ceros.
+"""
+import logging
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_METRICAS = (
+    'cantidad_compras', 'total_comprado', 'ticket_promedio', 'primera_compra', 'ultima_compra',
+    'compras_pagadas', 'total_pagado', 'primera_compra_pagada', 'ultima_compra_pagada',
+)
+
+
+def _agregados(cliente_ids):
+    from compra.models import Compra
+
+    pagadas = Q(pagado_en__isnull=False)
+    return (
+        Compra.objects.filter(cliente_id__in=cliente_ids)
+        .order_by()
+        .values('cliente_id')
+        .annotate(
+            cantidad_compras=Count('id'),
+            total_comprado=Sum('total'),
+            primera_compra=Min('fecha'),
+            ultima_compra=Max('fecha'),
+            compras_pagadas=Count('id', filter=pagadas),
+            total_pagado=Sum('total', filter=pagadas),
+            primera_compra_pagada=Min('fecha', filter=pagadas),
+            ultima_compra_pagada=Max('fecha', filter=pagadas),
+        )
+    )
+
+
+def recalcular(cliente_ids):
+    """Recalcula (upsert) las métricas de los clientes indicados. Devuelve cuántos tienen compras."""
+    from .models import MetricasCliente
+
+    cliente_ids = set(cliente_ids)
+    if not cliente_ids:
+        return 0
+
+    metricas = []
+    for fila in _agregados(cliente_ids):
+        total = fila['total_comprado'] or Decimal('0')
+        metricas.append(MetricasCliente(
+            cliente_id=fila['cliente_id'],
+            cantidad_compras=fila['cantidad_compras'],
+            total_comprado=total,
+            ticket_promedio=(total / fila['cantidad_compras']).quantize(Decimal('0.01')),
+            primera_compra=fila['primera_compra'],
+            ultima_compra=fila['ultima_compra'],
+            compras_pagadas=fila['compras_pagadas'],
+            total_pagado=fila['total_pagado'] or Decimal('0'),
+            primera_compra_pagada=fila['primera_compra_pagada'],
+            ultima_compra_pagada=fila['ultima_compra_pagada'],
+        ))
+
+    with transaction.atomic():
+        if metricas:
+            MetricasCliente.objects.bulk_create(
+                metricas,
+                update_conflicts=True,
+                unique_fields=['cliente'],
+                update_fields=[*CAMPOS_METRICAS, 'actualizado_en'],
+            )
+        sin_compras = cliente_ids - {m.cliente_id for m in metricas}
+        if sin_compras:
+            MetricasCliente.objects.filter(cliente_id__in=sin_compras).delete()
+    return len(metricas)
+
+
+def recalcular_en_lotes(cliente_ids, lote=2000):
+    """Recalcula una lista grande de clientes en lotes de `lote` ids"""
+    cliente_ids = list(cliente_ids)
+    con_compras = 0
+    for i in range(0, len(cliente_ids), lote):
+        con_compras += recalcular(cliente_ids[i:i + lote])
+    return con_compras
+
+
+def _recalcular_seguro(cliente_ids):
+    try:
+        recalcular(cliente_ids)
+    except Exception as e:
+        # Las métricas nunca deben romper el flujo de compra; el comando
+        # de reconstrucción las deja al día
+        logger.error(f"❌ Error recalculando métricas de clientes {sorted(cliente_ids)}: {e}")
+
+
+def _recalcular_pendientes(conexion):
+    """Callback de on_commit: el primero que corre recalcula todo lo acumulado"""
+    cliente_ids = getattr(conexion, '_metricas_clientes_pendientes', None)
+    if not cliente_ids:
+        return
+    conexion._metricas_clientes_pendientes = set()
+    _recalcular_seguro(cliente_ids)
+
+
+def programar_recalculo(cliente_id):
+    """
+    Recalcula al confirmar la transacción actual (o de inmediato si no hay).
+    Los clientes se acumulan en un conjunto propio de la conexión: cada
+    llamada registra un on_commit, pero solo el primero en correr trabaja.
+    Si la transacción se revierte, los ids quedan para el próximo commit de
+    la conexión; recalcular es idempotente, así que solo cuesta una consulta.
+    """
+    conexion = transaction.get_connection()
+    if not conexion.in_atomic_block:
+        _recalcular_seguro({cliente_id})
+        return
+
+    pendientes = getattr(conexion, '_metricas_clientes_pendientes', None)
+    if pendientes is None:
+        pendientes = conexion._metricas_clientes_pendientes = set()
+    pendientes.add(cliente_id)
+    transaction.on_commit(partial(_recalcular_pendientes, conexion))
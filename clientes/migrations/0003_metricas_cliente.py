@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricasCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metricas', serialize=False, to='clientes.cliente')),
+                ('cantidad_compras', models.PositiveIntegerField(default=0)),
+                ('total_comprado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ticket_promedio', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('primera_compra', models.DateTimeField(blank=True, null=True)),
+                ('ultima_compra', models.DateTimeField(blank=True, null=True)),
+                ('compras_pagadas', models.PositiveIntegerField(default=0)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('primera_compra_pagada', models.DateTimeField(blank=True, null=True)),
+                ('ultima_compra_pagada', models.DateTimeField(blank=True, null=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métricas de cliente',
+                'verbose_name_plural': 'Métricas de clientes',
+                'db_table': 'clientes_metricas',
+                'ordering': ['-total_comprado'],
+                'indexes': [models.Index(fields=['-total_comprado'], name='clientes_me_total_c_427fa9_idx'), models.Index(fields=['-total_pagado'], name='clientes_me_total_p_16ef75_idx'), models.Index(fields=['-ultima_compra'], name='clientes_me_ultima__eade40_idx'), models.Index(fields=['-cantidad_compras'], name='clientes_me_cantida_9a2aac_idx')],
+            },
+        ),
+    ]
@@ -38,3 +38,51 @@ class Cliente(models.Model):
 
 	def __str__(self):
 		return self.nombre
+
+
+class MetricasCliente(models.Model):
+	"""
+	Métricas de compra materializadas por cliente (RFM: recencia =
+	ultima_compra, frecuencia = cantidad_compras, monto = total_comprado).
+	Se mantienen al crear, pagar o borrar compras (clientes/metricas.py) y
+	se reconstruyen con `python manage.py recalcular_metricas_clientes`.
+	"""
+	cliente = models.OneToOneField(
+		Cliente,
+		on_delete=models.CASCADE,
+		primary_key=True,
+		related_name='metricas',
+	)
+	# Todas las compras
+	cantidad_compras = models.PositiveIntegerField(default=0)
+	total_comprado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	ticket_promedio = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	primera_compra = models.DateTimeField(null=True, blank=True)
+	ultima_compra = models.DateTimeField(null=True, blank=True)
+	# Solo compras pagadas
+	compras_pagadas = models.PositiveIntegerField(default=0)
+	total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	primera_compra_pagada = models.DateTimeField(null=True, blank=True)
+	ultima_compra_pagada = models.DateTimeField(null=True, blank=True)
+	actualizado_en = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		db_table = 'clientes_metricas'
+		ordering = ['-total_comprado']
+		verbose_name = 'Métricas de cliente'
+		verbose_name_plural = 'Métricas de clientes'
+		indexes = [
+			models.Index(fields=['-total_comprado']),
+			models.Index(fields=['-total_pagado']),
+			models.Index(fields=['-ultima_compra']),
+			models.Index(fields=['-cantidad_compras']),
+		]
+
+	def __str__(self):
+		return f"Métricas de {self.cliente_id}"
+
+	def dias_desde_ultima_compra(self, hoy=None):
+		if not self.ultima_compra:
+			return None
+		from reportes.ventanas import dia_local, hoy as hoy_tienda
+		return ((hoy or hoy_tienda()) - dia_local(self.ultima_compra)).days
@@ -0,0 +1,36 @@
+"""
+Señales que mantienen al día MetricasCliente cuando cambian las compras.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .metricas import programar_recalculo
+
+# Campos de Compra que afectan a las métricas
+CAMPOS_RELEVANTES = {'total', 'pagado_en', 'fecha', 'cliente'}
+
+
+@receiver(post_init, sender='compra.Compra')
+def compra_cargada(sender, instance, **kwargs):
+    # Cliente con el que se cargó la compra, para detectar si se la mueve a
+    # otro (serializer, admin). Por __dict__: con el campo diferido no consulta
+    instance._cliente_id_guardado = instance.__dict__.get('cliente_id')
+
+
+@receiver(post_save, sender='compra.Compra')
+def compra_guardada(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not CAMPOS_RELEVANTES.intersection(update_fields):
+        return
+    anterior = getattr(instance, '_cliente_id_guardado', None)
+    if anterior is not None and anterior != instance.cliente_id and (update_fields is None or 'cliente' in update_fields):
+        # La compra cambió de cliente: el anterior pierde sus totales
+        programar_recalculo(anterior)
+    instance._cliente_id_guardado = instance.cliente_id
+    programar_recalculo(instance.cliente_id)
+
+
+@receiver(post_delete, sender='compra.Compra')
+def compra_borrada(sender, instance, **kwargs):
+    programar_recalculo(instance.cliente_id)
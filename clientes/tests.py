@@ -1,3 +1,103 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from compra.models import Compra
+
+from .metricas import recalcular
+from .models import Cliente, MetricasCliente
+
+
+class MetricasClienteTests(TestCase):
+    """MetricasCliente debe seguir a las compras sin recalcular en cada guardado"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Ana', email='ana@metricas.local')
+
+    def _metricas(self):
+        return MetricasCliente.objects.get(cliente=self.cliente)
+
+    def test_compra_nueva_y_pago(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            compra = Compra.objects.create(cliente=self.cliente, total=Decimal('100.00'))
+            Compra.objects.create(cliente=self.cliente, total=Decimal('50.00'))
+        metricas = self._metricas()
+        self.assertEqual(metricas.cantidad_compras, 2)
+        self.assertEqual(metricas.total_comprado, Decimal('150.00'))
+        self.assertEqual(metricas.ticket_promedio, Decimal('75.00'))
+        self.assertEqual(metricas.compras_pagadas, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            compra.pagado_en = timezone.now()
+            compra.save(update_fields=['pagado_en'])
+        metricas = self._metricas()
+        self.assertEqual(metricas.compras_pagadas, 1)
+        self.assertEqual(metricas.total_pagado, Decimal('100.00'))
+        self.assertEqual(metricas.ultima_compra_pagada, compra.fecha)
+
+    def test_recalculo_agrupado_por_transaccion(self):
+        otro = Cliente.objects.create(nombre='Beto', email='beto@metricas.local')
+        with mock.patch('clientes.metricas.recalcular') as recalcular_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for total in ('10.00', '20.00', '30.00'):
+                        Compra.objects.create(cliente=self.cliente, total=Decimal(total))
+                    Compra.objects.create(cliente=otro, total=Decimal('5.00'))
+        recalcular_mock.assert_called_once_with({self.cliente.id, otro.id})
+
+    def test_rollback_no_deja_clientes_sin_recalcular(self):
+        try:
+            with transaction.atomic():
+                Compra.objects.create(cliente=self.cliente, total=Decimal('10.00'))
+                raise RuntimeError('checkout fallido')
+        except RuntimeError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            Compra.objects.create(cliente=self.cliente, total=Decimal('20.00'))
+        self.assertEqual(self._metricas().total_comprado, Decimal('20.00'))
+
+    def test_compra_movida_a_otro_cliente(self):
+        otro = Cliente.objects.create(nombre='Beto', email='beto@metricas.local')
+        with self.captureOnCommitCallbacks(execute=True):
+            Compra.objects.create(cliente=self.cliente, total=Decimal('10.00'))
+            compra = Compra.objects.create(cliente=self.cliente, total=Decimal('40.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            compra = Compra.objects.get(pk=compra.pk)
+            compra.cliente = otro
+            compra.save()
+        self.assertEqual(self._metricas().total_comprado, Decimal('10.00'))
+        self.assertEqual(MetricasCliente.objects.get(cliente=otro).total_comprado, Decimal('40.00'))
+
+        # Devolverla con update_fields también corrige a los dos
+        with self.captureOnCommitCallbacks(execute=True):
+            compra.cliente = self.cliente
+            compra.save(update_fields=['cliente'])
+        self.assertEqual(self._metricas().total_comprado, Decimal('50.00'))
+        self.assertFalse(MetricasCliente.objects.filter(cliente=otro).exists())
+
+    def test_campos_irrelevantes_no_recalculan(self):
+        compra = Compra.objects.create(cliente=self.cliente, total=Decimal('10.00'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            compra.observaciones = 'nota'
+            compra.save(update_fields=['observaciones'])
+        self.assertEqual(callbacks, [])
+
+    def test_borrar_ultima_compra_elimina_fila(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            compra = Compra.objects.create(cliente=self.cliente, total=Decimal('10.00'))
+        self.assertTrue(MetricasCliente.objects.filter(cliente=self.cliente).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            compra.delete()
+        self.assertFalse(MetricasCliente.objects.filter(cliente=self.cliente).exists())
 
-# Create your tests here.
+    def test_recalcular_repara_escrituras_masivas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Compra.objects.create(cliente=self.cliente, total=Decimal('10.00'))
+        Compra.objects.filter(cliente=self.cliente).update(total=Decimal('99.00'))
+        self.assertEqual(self._metricas().total_comprado, Decimal('10.00'))
+        self.assertEqual(recalcular([self.cliente.id]), 1)
+        self.assertEqual(self._metricas().total_comprado, Decimal('99.00'))
@@ -4,7 +4,7 @@ from .serializers import ClienteSerializer
 
 
 class ClienteViewSet(viewsets.ModelViewSet):
-	queryset = Cliente.objects.all()
+	queryset = Cliente.objects.select_related('usuario', 'asignado_a').all()
 	serializer_class = ClienteSerializer
 	permission_classes = [permissions.IsAuthenticated]
 	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
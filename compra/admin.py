@@ -1,12 +1,35 @@
 from django.contrib import admin, messages
-from django.http import HttpResponse
-from .models import Compra, CompraItem
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Compra, CompraItem, ExportacionCompras
+
+
+# Lo que se imprime en el comprobante guardado (compra/comprobantes.py): en una
+# compra pagada solo lo cambian las devoluciones, no el admin
+CAMPOS_COMPROBANTE = ('cliente', 'total', 'pago_referencia', 'pagado_en')
+
+
+def _pagada(compra):
+    return compra is not None and compra.pagado_en is not None
 
 
 class CompraItemInline(admin.TabularInline):
     model = CompraItem
     extra = 0
 
+    # `obj` es la compra del formulario
+    def has_add_permission(self, request, obj=None):
+        return not _pagada(obj) and super().has_add_permission(request, obj)
+
+    def has_change_permission(self, request, obj=None):
+        return not _pagada(obj) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not _pagada(obj) and super().has_delete_permission(request, obj)
+
 
 @admin.register(Compra)
 class CompraAdmin(admin.ModelAdmin):
@@ -17,122 +40,41 @@ class CompraAdmin(admin.ModelAdmin):
     inlines = [CompraItemInline]
     actions = ['exportar_excel', 'exportar_pdf', 'comprobante_pdf']
 
+    def get_readonly_fields(self, request, obj=None):
+        readonly = super().get_readonly_fields(request, obj)
+        if _pagada(obj):
+            return tuple(readonly) + CAMPOS_COMPROBANTE
+        return readonly
+
+    def _encolar(self, request, queryset, tipo):
+        # El archivo se genera fuera del request (compra/exportaciones.py)
+        from .exportaciones import encolar
+
+        exportacion = encolar(request.user, tipo, queryset)
+        self.message_user(
+            request,
+            format_html(
+                'Exportación #{} en cola ({} compras). Recibirás una notificación cuando esté lista; '
+                'también puedes seguirla en <a href="{}">Exportaciones de compras</a>.',
+                exportacion.id,
+                len(exportacion.compra_ids),
+                reverse('admin:compra_exportacioncompras_changelist'),
+            ),
+            level=messages.INFO,
+        )
+
     def exportar_excel(self, request, queryset):
-        try:
-            from openpyxl import Workbook
-        except ImportError:
-            self.message_user(request, 'Instala openpyxl para exportar a Excel: pip install openpyxl', level=messages.ERROR)
-            return
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Compras'
-        headers = ['ID', 'Cliente', 'Fecha', 'Total', 'Pagado en', 'Referencia', '# Items']
-        ws.append(headers)
-        qs = queryset.select_related('cliente')
-        for c in qs:
-            ws.append([
-                c.id,
-                str(c.cliente),
-                c.fecha.replace(tzinfo=None) if hasattr(c.fecha, 'tzinfo') else c.fecha,
-                float(c.total),
-                (c.pagado_en.replace(tzinfo=None) if c.pagado_en and hasattr(c.pagado_en, 'tzinfo') else c.pagado_en),
-                c.pago_referencia,
-                c.items.count(),
-            ])
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename="compras.xlsx"'
-        wb.save(response)
-        return response
+        self._encolar(request, queryset, 'excel')
 
     exportar_excel.short_description = 'Exportar seleccionadas a Excel'
 
     def exportar_pdf(self, request, queryset):
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-        except ImportError:
-            self.message_user(request, 'Instala reportlab para exportar a PDF: pip install reportlab', level=messages.ERROR)
-            return
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="compras.pdf"'
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        y = height - 40
-        p.setFont('Helvetica-Bold', 12)
-        p.drawString(40, y, 'Reporte de Compras')
-        y -= 20
-        p.setFont('Helvetica', 9)
-        headers = ['ID', 'Cliente', 'Fecha', 'Total', 'Pagado en', 'Ref', 'Items']
-        p.drawString(40, y, ' | '.join(headers))
-        y -= 15
-        qs = queryset.select_related('cliente')
-        for c in qs:
-            row = [
-                str(c.id),
-                str(c.cliente)[:20],
-                c.fecha.strftime('%Y-%m-%d %H:%M'),
-                f"{c.total}",
-                (c.pagado_en.strftime('%Y-%m-%d %H:%M') if c.pagado_en else ''),
-                (c.pago_referencia or '')[:12],
-                str(c.items.count()),
-            ]
-            p.drawString(40, y, ' | '.join(row))
-            y -= 12
-            if y < 40:
-                p.showPage()
-                y = height - 40
-        p.showPage()
-        p.save()
-        return response
+        self._encolar(request, queryset, 'pdf')
 
     exportar_pdf.short_description = 'Exportar seleccionadas a PDF'
 
     def comprobante_pdf(self, request, queryset):
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-        except ImportError:
-            self.message_user(request, 'Instala reportlab para exportar a PDF: pip install reportlab', level=messages.ERROR)
-            return
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="comprobantes.pdf"'
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        for c in queryset.select_related('cliente'):
-            y = height - 40
-            p.setFont('Helvetica-Bold', 14)
-            p.drawString(40, y, 'Nota de Venta')
-            y -= 20
-            p.setFont('Helvetica', 10)
-            p.drawString(40, y, f'Compra ID: {c.id}   Fecha: {c.fecha.strftime("%Y-%m-%d %H:%M")}')
-            y -= 14
-            p.drawString(40, y, f'Cliente: {c.cliente}')
-            y -= 20
-            p.setFont('Helvetica-Bold', 10)
-            p.drawString(40, y, 'Cant.')
-            p.drawString(90, y, 'Producto')
-            p.drawString(300, y, 'P. Unit.')
-            p.drawString(380, y, 'Subtotal')
-            y -= 12
-            p.setFont('Helvetica', 10)
-            for it in c.items.select_related('producto'):
-                if y < 60:
-                    p.showPage(); y = height - 40
-                p.drawString(40, y, str(it.cantidad))
-                p.drawString(90, y, (it.producto.nombre[:36] if it.producto and it.producto.nombre else ''))
-                p.drawRightString(360, y, f"{it.precio_unitario}")
-                p.drawRightString(450, y, f"{it.subtotal}")
-                y -= 12
-            y -= 10
-            p.setFont('Helvetica-Bold', 11)
-            p.drawRightString(450, y, f"TOTAL: {c.total}")
-            y -= 16
-            p.setFont('Helvetica', 9)
-            estado_pago = f"Pagado: {c.pagado_en.strftime('%Y-%m-%d %H:%M')}" if c.pagado_en else 'Pendiente de pago'
-            p.drawString(40, y, estado_pago)
-            p.showPage()
-        p.save()
-        return response
+        self._encolar(request, queryset, 'comprobantes')
 
     comprobante_pdf.short_description = 'Descargar comprobante(s) PDF'
 
@@ -141,3 +83,70 @@ class CompraAdmin(admin.ModelAdmin):
 class CompraItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'compra', 'producto', 'cantidad', 'precio_unitario', 'subtotal')
     search_fields = ('producto__nombre',)
+
+    def has_change_permission(self, request, obj=None):
+        return not (obj and _pagada(obj.compra)) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not (obj and _pagada(obj.compra)) and super().has_delete_permission(request, obj)
+
+
+@admin.register(ExportacionCompras)
+class ExportacionComprasAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado_badge', 'filas', 'usuario', 'creada', 'finalizada', 'descarga')
+    list_filter = ('tipo', 'estado', 'creada')
+    list_select_related = ('usuario',)
+    readonly_fields = ('usuario', 'tipo', 'estado', 'filas', 'archivo', 'error', 'creada', 'iniciada', 'finalizada')
+    exclude = ('compra_ids',)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).defer('compra_ids')
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(usuario=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:exportacion_id>/descargar/',
+                self.admin_site.admin_view(self.descargar),
+                name='compra_exportacioncompras_descargar',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def descargar(self, request, exportacion_id):
+        exportacion = get_object_or_404(ExportacionCompras.objects.defer('compra_ids'), pk=exportacion_id)
+        if exportacion.usuario_id != request.user.id and not request.user.is_superuser:
+            raise PermissionDenied
+        if exportacion.estado != 'completada' or not exportacion.archivo:
+            raise Http404('La exportación todavía no tiene archivo')
+        return FileResponse(
+            exportacion.archivo.open('rb'),
+            as_attachment=True,
+            filename=exportacion.archivo.name.rsplit('/', 1)[-1],
+        )
+
+    def estado_badge(self, obj):
+        colores = {'pendiente': 'gray', 'procesando': 'orange', 'completada': 'green', 'error': 'red'}
+        return format_html(
+            '<span style="color: {};">● {}</span>',
+            colores.get(obj.estado, 'gray'),
+            obj.get_estado_display()
+        )
+    estado_badge.short_description = 'Estado'
+
+    def descarga(self, obj):
+        if obj.estado != 'completada' or not obj.archivo:
+            return '-'
+        return format_html(
+            '<a href="{}">Descargar</a>',
+            reverse('admin:compra_exportacioncompras_descargar', args=[obj.id])
+        )
+    descarga.short_description = 'Archivo'
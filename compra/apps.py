@@ -5,3 +5,7 @@ class CompraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'compra'
     verbose_name = 'Compras'
+
+    def ready(self):
+        # Generación e invalidación de comprobantes PDF
+        from . import signals  # noqa: F401
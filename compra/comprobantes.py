@@ -0,0 +1,151 @@
+"""
+Almacén de comprobantes PDF de compras pagadas.
+
+Una vez pagada, el contenido del comprobante solo cambia si una devolución
+aprobada o completada modifica la compra. Por eso el PDF se genera una vez
+(al confirmarse el pago, en segundo plano, o en la primera descarga), se
+guarda en el storage de medios con el hash de sus datos en el nombre y se
+sirve desde ahí con ese hash como ETag fuerte:
+
+    datos = datos_comprobante(compra)     # dict de tipos simples
+    huella(datos)                         # sha256 de los datos + versión del diseño
+    guardar_comprobante(compra)           # render + archivo + ComprobanteCompra
+    invalidar_por_item(compra_item_id)    # lo llaman las señales de devoluciones
+    invalidar_por_items(ids)              # devoluciones masivas (promociones/devoluciones.py)
+
+El render (compra/pdf.py) corre en el pool de procesos de
+core/render_pdf.py y es determinista, así que compras sin pagar, que
+se renderizan en cada pedido, también pueden responder 304 a un
+If-None-Match con la misma huella.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from core.render_pdf import renderizar
+
+from .models import Compra, CompraItem, ComprobanteCompra
+from .pdf import VERSION_COMPROBANTE, render_comprobante
+
+logger = logging.getLogger(__name__)
+
+# Devoluciones que modifican la compra y aparecen en el comprobante
+ESTADOS_DEVOLUCION = ('aprobada', 'completada')
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M') if valor else None
+
+
+def datos_comprobante(compra):
+    """Todo lo que se imprime en el comprobante, como tipos simples (2 consultas)"""
+    from promociones.models import DevolucionProducto
+
+    devoluciones = Prefetch(
+        'devoluciones',
+        queryset=DevolucionProducto.objects.filter(estado__in=ESTADOS_DEVOLUCION).order_by('id'),
+    )
+    items = (
+        CompraItem.objects.filter(compra_id=compra.id)
+        .select_related('producto')
+        .prefetch_related(devoluciones)
+        .order_by('id')
+    )
+
+    datos_items = []
+    datos_devoluciones = []
+    for item in items:
+        producto = item.producto.nombre if item.producto else 'N/A'
+        datos_items.append({
+            'cantidad': item.cantidad,
+            'producto': producto,
+            'precio_unitario': str(item.precio_unitario),
+            'subtotal': str(item.subtotal),
+        })
+        for devolucion in item.devoluciones.all():
+            datos_devoluciones.append({
+                'id': devolucion.id,
+                'producto': producto,
+                'cantidad': devolucion.cantidad,
+                'tipo': devolucion.get_tipo_display(),
+                'estado': devolucion.get_estado_display(),
+                'monto_reembolso': str(devolucion.monto_reembolso),
+            })
+
+    return {
+        'id': compra.id,
+        'fecha': _fecha(compra.fecha),
+        'cliente': compra.cliente.nombre,
+        'items': datos_items,
+        'total': str(compra.total),
+        'pagado_en': _fecha(compra.pagado_en),
+        'pago_referencia': compra.pago_referencia,
+        'devoluciones': datos_devoluciones,
+    }
+
+
+def huella(datos):
+    contenido = json.dumps({'version': VERSION_COMPROBANTE, **datos}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def guardar_comprobante(compra):
+    """Renderiza, guarda y registra (upsert) el comprobante de una compra pagada"""
+    datos = datos_comprobante(compra)
+    contenido = renderizar(render_comprobante, datos)
+    comprobante = ComprobanteCompra(compra=compra, huella=huella(datos), tamano=len(contenido))
+    comprobante.archivo.save(
+        f'comprobante_{compra.id}_{comprobante.huella[:16]}.pdf', ContentFile(contenido), save=False
+    )
+    anterior = ComprobanteCompra.objects.filter(compra=compra).values_list('archivo', flat=True).first()
+    ComprobanteCompra.objects.bulk_create(
+        [comprobante],
+        update_conflicts=True,
+        unique_fields=['compra'],
+        update_fields=['huella', 'archivo', 'tamano', 'generado_en'],
+    )
+    if anterior and anterior != comprobante.archivo.name:
+        # El upsert reemplazó la fila: su archivo ya no lo referencia nadie
+        transaction.on_commit(lambda: _borrar_archivos([(compra.id, anterior)]))
+    logger.info(f'📄 Comprobante PDF guardado para compra #{compra.id} ({len(contenido)} bytes)')
+    return comprobante
+
+
+def generar_al_pagar(compra_id):
+    """Trabajo en segundo plano tras confirmarse un pago"""
+    compra = Compra.objects.select_related('cliente').filter(pk=compra_id, pagado_en__isnull=False).first()
+    if compra is None or ComprobanteCompra.objects.filter(compra_id=compra_id).exists():
+        return None
+    return guardar_comprobante(compra)
+
+
+def invalidar_por_item(compra_item_id):
+    """Descarta el comprobante guardado de la compra a la que pertenece el ítem"""
+    invalidar_por_items([compra_item_id])
+
+
+def invalidar_por_items(compra_item_ids):
+    """Igual que invalidar_por_item para un lote de ítems (devoluciones masivas)"""
+    # Varios ítems de la misma compra: un comprobante por compra
+    filas = list(dict(
+        ComprobanteCompra.objects.filter(compra__items__id__in=compra_item_ids).values_list('compra_id', 'archivo')
+    ).items())
+    if not filas:
+        return
+    ComprobanteCompra.objects.filter(compra_id__in=[compra_id for compra_id, _ in filas]).delete()
+    transaction.on_commit(lambda: _borrar_archivos(filas))
+
+
+def _borrar_archivos(filas):
+    """Borra del storage los archivos [(compra_id, nombre)] de comprobantes descartados"""
+    storage = ComprobanteCompra._meta.get_field('archivo').storage
+    for compra_id, nombre in filas:
+        try:
+            storage.delete(nombre)
+        except Exception as e:
+            logger.warning(f'⚠️ No se pudo borrar el comprobante de la compra #{compra_id}: {e}')
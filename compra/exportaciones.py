@@ -0,0 +1,265 @@
+"""
+Exportaciones de compras en segundo plano para el admin.
+
+Las acciones del admin solo registran una ExportacionCompras con los ids
+seleccionados y responden de inmediato. El archivo se genera después:
+
+- En el mismo proceso (por defecto): al confirmar la transacción la
+  exportación se envía al pool de hilos de compra/segundo_plano.py
+  (EXPORTACIONES_WORKERS hilos).
+- En un worker aparte: con EXPORTACIONES_EN_PROCESO=False las
+  exportaciones quedan pendientes y las procesa
+  `python manage.py procesar_exportaciones`.
+
+Las compras se leen por lotes de ids (LOTE por consulta) con el conteo de
+ítems anotado. Excel usa un workbook write-only; para los PDF solo se
+extraen las filas como tipos simples y el dibujo (compra/pdf.py) corre en
+el pool de procesos de core/render_pdf.py, así no compite por el GIL con
+las vistas del proceso web.
+Al terminar se guarda el archivo en el storage de medios y se notifica al
+administrador por el canal WebSocket de NotificacionAdmin.
+
+Un reinicio puede perder trabajo: el pool de hilos no sobrevive al proceso
+y un worker que muere deja su exportación en 'procesando'. recuperar()
+devuelve a 'pendiente' las que llevan más de EXPORTACIONES_TIMEOUT segundos
+en 'procesando', y `procesar_exportaciones` la llama en cada vuelta (con el
+pool en proceso, además toma las pendientes que nadie procesó en ese tiempo).
+Si la ejecución original termina después, su resultado se descarta.
+"""
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Count, Prefetch
+from django.urls import reverse
+from django.utils import timezone
+
+from core.render_pdf import renderizar
+
+from .models import Compra, CompraItem, ExportacionCompras
+from .pdf import render_listado_compras, render_notas_venta
+from .segundo_plano import al_confirmar
+
+logger = logging.getLogger(__name__)
+
+LOTE = 2000
+
+EXTENSIONES = {
+    'excel': 'xlsx',
+    'pdf': 'pdf',
+    'comprobantes': 'pdf',
+}
+
+
+def encolar(usuario, tipo, queryset):
+    """Registra la exportación de las compras del queryset y la programa"""
+    exportacion = ExportacionCompras.objects.create(
+        usuario=usuario,
+        tipo=tipo,
+        compra_ids=list(queryset.order_by('id').values_list('id', flat=True)),
+    )
+    if getattr(settings, 'EXPORTACIONES_EN_PROCESO', True):
+        al_confirmar(procesar, exportacion.pk)
+    return exportacion
+
+
+def _timeout():
+    return getattr(settings, 'EXPORTACIONES_TIMEOUT', 1800)
+
+
+def recuperar(ahora=None):
+    """Devuelve a 'pendiente' las exportaciones abandonadas en 'procesando'; devuelve cuántas"""
+    limite = (ahora or timezone.now()) - timedelta(seconds=_timeout())
+    recuperadas = ExportacionCompras.objects.filter(estado='procesando', iniciada__lt=limite).update(
+        estado='pendiente', iniciada=None
+    )
+    if recuperadas:
+        logger.warning(f"⚠️ {recuperadas} exportaciones sin terminar vuelven a la cola")
+    return recuperadas
+
+
+def pendientes(ahora=None):
+    """
+    Ids de las exportaciones a procesar, en orden de llegada. Con el pool en
+    proceso solo las que llevan más de EXPORTACIONES_TIMEOUT esperando: las
+    recientes todavía están en la cola de algún proceso web.
+    """
+    queryset = ExportacionCompras.objects.filter(estado='pendiente')
+    if getattr(settings, 'EXPORTACIONES_EN_PROCESO', True):
+        queryset = queryset.filter(creada__lt=(ahora or timezone.now()) - timedelta(seconds=_timeout()))
+    return list(queryset.order_by('creada').values_list('id', flat=True))
+
+
+def procesar(exportacion_id):
+    """
+    Genera el archivo de una exportación pendiente. Devuelve la exportación,
+    o None si otro worker ya la tomó o la recuperó mientras tanto.
+    """
+    iniciada = timezone.now()
+    tomada = ExportacionCompras.objects.filter(pk=exportacion_id, estado='pendiente').update(
+        estado='procesando', iniciada=iniciada
+    )
+    if not tomada:
+        return None
+    exportacion = ExportacionCompras.objects.select_related('usuario').get(pk=exportacion_id)
+
+    try:
+        generador = GENERADORES[exportacion.tipo]
+        with tempfile.TemporaryFile() as destino:
+            exportacion.filas = generador(exportacion.compra_ids, destino)
+            destino.seek(0)
+            nombre = f"compras_{exportacion.tipo}_{exportacion.id}.{EXTENSIONES[exportacion.tipo]}"
+            exportacion.archivo.save(nombre, File(destino), save=False)
+        exportacion.estado = 'completada'
+    except Exception as e:
+        logger.error(f"❌ Error generando exportación #{exportacion.id}: {e}")
+        exportacion.estado = 'error'
+        exportacion.error = str(e)
+    exportacion.finalizada = timezone.now()
+    # Solo si sigue siendo nuestra: recuperar() pudo devolverla a la cola
+    vigente = ExportacionCompras.objects.filter(pk=exportacion.pk, estado='procesando', iniciada=iniciada).update(
+        estado=exportacion.estado,
+        archivo=exportacion.archivo.name,
+        filas=exportacion.filas,
+        error=exportacion.error,
+        finalizada=exportacion.finalizada,
+    )
+    if not vigente:
+        logger.warning(f"⚠️ Exportación #{exportacion.id} recuperada por otro worker; se descarta este resultado")
+        if exportacion.archivo:
+            exportacion.archivo.delete(save=False)
+        return None
+
+    _notificar(exportacion)
+    return exportacion
+
+
+def _notificar(exportacion):
+    from notificaciones.push_service import push_service
+
+    if exportacion.estado == 'completada':
+        titulo = '📦 Exportación lista'
+        mensaje = f"La exportación #{exportacion.id} ({exportacion.get_tipo_display()}, {exportacion.filas} compras) está lista para descargar"
+        url = reverse('admin:compra_exportacioncompras_descargar', args=[exportacion.id])
+    else:
+        titulo = '⚠️ Exportación fallida'
+        mensaje = f"La exportación #{exportacion.id} ({exportacion.get_tipo_display()}) falló: {exportacion.error[:200]}"
+        url = reverse('admin:compra_exportacioncompras_change', args=[exportacion.id])
+    try:
+        push_service.send_admin_notification(
+            usuario=exportacion.usuario,
+            tipo='exportacion',
+            titulo=titulo,
+            mensaje=mensaje,
+            url=url,
+            datos={
+                'exportacion_id': exportacion.id,
+                'tipo': exportacion.tipo,
+                'estado': exportacion.estado,
+                'filas': exportacion.filas,
+            },
+        )
+    except Exception as e:
+        # El archivo ya está guardado: se puede descargar desde el admin
+        logger.warning(f"⚠️ No se pudo notificar la exportación #{exportacion.id}: {e}")
+
+
+def _por_lotes(compra_ids, queryset):
+    """Recorre las compras de a LOTE ids por consulta (IN acotado)"""
+    for i in range(0, len(compra_ids), LOTE):
+        yield from queryset.filter(id__in=compra_ids[i:i + LOTE]).order_by('id')
+
+
+def _compras(compra_ids):
+    return _por_lotes(compra_ids, Compra.objects.select_related('cliente').annotate(num_items=Count('items')))
+
+
+def _sin_zona(valor):
+    # openpyxl no admite datetimes con zona horaria
+    if valor is None:
+        return None
+    return timezone.localtime(valor).replace(tzinfo=None)
+
+
+def generar_excel(compra_ids, destino):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Compras')
+    ws.append(['ID', 'Cliente', 'Fecha', 'Total', 'Pagado en', 'Referencia', '# Items'])
+    filas = 0
+    for c in _compras(compra_ids):
+        ws.append([
+            c.id,
+            str(c.cliente),
+            _sin_zona(c.fecha),
+            float(c.total),
+            _sin_zona(c.pagado_en),
+            c.pago_referencia,
+            c.num_items,
+        ])
+        filas += 1
+    wb.save(destino)
+    return filas
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M') if valor else ''
+
+
+def _renderizar(funcion, datos, destino):
+    # Exportación en segundo plano: espera turno en el pool y no tiene límite de tiempo
+    destino.write(renderizar(funcion, datos, timeout=0, esperar_cupo=True))
+
+
+def generar_pdf(compra_ids, destino):
+    filas = [
+        [
+            str(c.id),
+            str(c.cliente)[:20],
+            _fecha(c.fecha),
+            f"{c.total}",
+            _fecha(c.pagado_en),
+            (c.pago_referencia or '')[:12],
+            str(c.num_items),
+        ]
+        for c in _compras(compra_ids)
+    ]
+    _renderizar(render_listado_compras, filas, destino)
+    return len(filas)
+
+
+def generar_comprobantes(compra_ids, destino):
+    items = Prefetch('items', queryset=CompraItem.objects.select_related('producto'))
+    compras = Compra.objects.select_related('cliente').prefetch_related(items)
+    # Una consulta de ítems por lote de compras
+    notas = [
+        {
+            'id': c.id,
+            'fecha': _fecha(c.fecha),
+            'cliente': str(c.cliente),
+            'items': [
+                (
+                    it.cantidad,
+                    it.producto.nombre if it.producto and it.producto.nombre else '',
+                    f"{it.precio_unitario}",
+                    f"{it.subtotal}",
+                )
+                for it in c.items.all()
+            ],
+            'total': f"{c.total}",
+            'pagado_en': _fecha(c.pagado_en),
+        }
+        for c in _por_lotes(compra_ids, compras)
+    ]
+    _renderizar(render_notas_venta, notas, destino)
+    return len(notas)
+
+
+GENERADORES = {
+    'excel': generar_excel,
+    'pdf': generar_pdf,
+    'comprobantes': generar_comprobantes,
+}
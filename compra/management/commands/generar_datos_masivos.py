@@ -0,0 +1,427 @@
+"""
+Generador de datos sintéticos a gran escala para benchmarks.
+
+A diferencia de poblar_datos (un create() por fila), este comando escribe en
+lotes: bulk_create en cualquier motor o COPY en PostgreSQL, y reparte la
+generación por mes entre varios procesos. Cada mes usa su propia semilla,
+así el resultado es idéntico sin importar cuántos workers se usen.
+
+Uso:
+    python manage.py generar_datos_masivos --compras 100000
+    python manage.py generar_datos_masivos --compras 10000000 --clientes 500000 \\
+        --productos 5000 --meses 36 --workers 8
+"""
+import io
+import multiprocessing
+import random
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from clientes.models import Cliente
+from compra.models import Compra, CompraItem
+from productos.models import Categoria, MovimientoStock, Producto
+
+# Estacionalidad mensual (ene..dic): campaña de fin de año y bajón de febrero
+ESTACIONALIDAD_MES = [0.85, 0.78, 0.92, 0.95, 1.02, 0.97, 1.00, 0.98, 0.95, 1.05, 1.35, 1.65]
+# Peso por día de la semana (lun..dom)
+PESO_DIA_SEMANA = [0.95, 0.92, 0.95, 1.00, 1.15, 1.25, 0.90]
+# Peso por hora del día: picos al mediodía y por la noche
+PESO_HORA = [
+    0.15, 0.08, 0.05, 0.04, 0.04, 0.08, 0.25, 0.50, 0.80, 1.00, 1.10, 1.20,
+    1.35, 1.25, 1.05, 1.00, 1.05, 1.20, 1.45, 1.65, 1.70, 1.40, 0.90, 0.45,
+]
+# Distribución de ítems por compra (1..6), media ≈ 3
+PESO_ITEMS = [0.12, 0.22, 0.30, 0.20, 0.10, 0.06]
+
+PREFIJO_SKU = 'SYN-'
+OBSERVACION = 'sintetico'
+
+COLUMNAS_COMPRA = (
+    'id', 'cliente_id', 'fecha', 'total', 'observaciones', 'pago_referencia', 'pagado_en',
+    'stripe_session_id', 'stripe_payment_intent', 'promocion_id', 'descuento_aplicado',
+)
+COLUMNAS_ITEM = ('compra_id', 'producto_id', 'cantidad', 'precio_unitario', 'subtotal')
+
+# Catálogo compartido con los workers: se fija antes del fork para no
+# serializar millones de ids en cada tarea.
+_CATALOGO = {}
+
+
+def _repartir(total, pesos):
+    """Reparte `total` proporcionalmente a `pesos` (resto mayor), suma exacta"""
+    suma = sum(pesos)
+    exactos = [total * p / suma for p in pesos]
+    enteros = [int(x) for x in exactos]
+    faltan = total - sum(enteros)
+    orden = sorted(range(len(pesos)), key=lambda i: exactos[i] - enteros[i], reverse=True)
+    for i in orden[:faltan]:
+        enteros[i] += 1
+    return enteros
+
+
+def _pesos_zipf(n, s):
+    """Popularidad sesgada: el producto de rango k pesa 1/k^s"""
+    return [1.0 / (k ** s) for k in range(1, n + 1)]
+
+
+def _generar_mes(tarea):
+    """
+    Genera y escribe las compras de un mes. Se ejecuta en un proceso worker
+    (o en el proceso principal con --workers 1). Devuelve (compras, ítems).
+    """
+    rng = random.Random(tarea['semilla'])
+    inicio_mes = tarea['inicio']
+    dias_mes = tarea['dias']
+    cantidad = tarea['cantidad']
+    siguiente_id = tarea['primer_id']
+
+    productos = _CATALOGO['productos']  # [(id, precio_centavos)]
+    acum_productos = _CATALOGO['acum_productos']
+    clientes = _CATALOGO['clientes']
+    acum_clientes = _CATALOGO['acum_clientes']
+    tope_productos = acum_productos[-1]
+    tope_clientes = acum_clientes[-1]
+
+    ahora = tarea['ahora']
+    # Franjas de una hora del mes, pesadas por día de la semana y hora; el
+    # mes en curso solo llega hasta ahora (sin compras a futuro)
+    franjas = []
+    pesos_franjas = []
+    for dia in range(dias_mes):
+        for hora in range(24):
+            inicio_franja = inicio_mes + timedelta(days=dia, hours=hora)
+            if inicio_franja >= ahora:
+                break
+            franjas.append(inicio_franja)
+            pesos_franjas.append(PESO_DIA_SEMANA[(inicio_mes.weekday() + dia) % 7] * PESO_HORA[hora])
+    acum_franjas = list(accumulate(pesos_franjas))
+    acum_items = list(accumulate(PESO_ITEMS))
+
+    escritor = _EscritorCopy() if tarea['usar_copy'] else _EscritorBulk()
+    total_items = 0
+    generadas = 0
+
+    while generadas < cantidad:
+        lote = min(tarea['lote'], cantidad - generadas)
+        compras = []
+        items = []
+        for _ in range(lote):
+            inicio_franja = franjas[bisect_right(acum_franjas, rng.random() * acum_franjas[-1])]
+            segundos = min(3600, int((ahora - inicio_franja).total_seconds()))
+            fecha = inicio_franja + timedelta(seconds=rng.randrange(max(segundos, 1)))
+            cliente_id = clientes[bisect_right(acum_clientes, rng.random() * tope_clientes)]
+
+            total = 0
+            for _ in range(bisect_right(acum_items, rng.random() * acum_items[-1]) + 1):
+                producto_id, precio = productos[bisect_right(acum_productos, rng.random() * tope_productos)]
+                # Pequeña variación histórica del precio (±5%)
+                precio = max(1, int(precio * rng.uniform(0.95, 1.05)))
+                cantidad_item = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+                subtotal = precio * cantidad_item
+                total += subtotal
+                items.append((siguiente_id, producto_id, cantidad_item, precio, subtotal))
+
+            # Las compras viejas casi siempre están pagadas; las recientes menos
+            antiguedad = (ahora - fecha).days
+            pagada = rng.random() < (0.97 if antiguedad > 7 else 0.75)
+            pagado_en = fecha + timedelta(minutes=rng.randint(1, 120)) if pagada else None
+
+            compras.append((siguiente_id, cliente_id, fecha, total, pagado_en))
+            siguiente_id += 1
+
+        escritor.escribir(compras, items)
+        generadas += lote
+        total_items += len(items)
+
+    connections.close_all()
+    return cantidad, total_items
+
+
+def _centavos(valor):
+    return f'{valor // 100}.{valor % 100:02d}'
+
+
+class _EscritorBulk:
+    """
+    Escritura portable en lotes: las compras con un INSERT multi-fila propio
+    (bulk_create aplicaría auto_now_add y pisaría la fecha histórica) y los
+    ítems con bulk_create
+    """
+
+    def escribir(self, compras, items):
+        ops = connection.ops
+        filas = [
+            (
+                id_, cliente_id, ops.adapt_datetimefield_value(fecha), _centavos(total), OBSERVACION,
+                f'SYN-{id_}' if pagado_en else '', ops.adapt_datetimefield_value(pagado_en), '', '', None, 0,
+            )
+            for id_, cliente_id, fecha, total, pagado_en in compras
+        ]
+        # Respeta el tope de parámetros por sentencia del motor (SQLite)
+        por_sentencia = ops.bulk_batch_size(COLUMNAS_COMPRA, filas) or len(filas)
+        marcadores = f'({", ".join(["%s"] * len(COLUMNAS_COMPRA))})'
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for desde in range(0, len(filas), por_sentencia):
+                    tramo = filas[desde:desde + por_sentencia]
+                    cursor.execute(
+                        f'INSERT INTO {Compra._meta.db_table} ({", ".join(COLUMNAS_COMPRA)}) '
+                        f'VALUES {", ".join([marcadores] * len(tramo))}',
+                        [valor for fila in tramo for valor in fila],
+                    )
+            CompraItem.objects.bulk_create(
+                [
+                    CompraItem(
+                        compra_id=compra_id, producto_id=producto_id, cantidad=cantidad,
+                        precio_unitario=Decimal(_centavos(precio)), subtotal=Decimal(_centavos(subtotal)),
+                    )
+                    for compra_id, producto_id, cantidad, precio, subtotal in items
+                ],
+                batch_size=5000,
+            )
+
+
+class _EscritorCopy:
+    """Escritura con COPY FROM STDIN (PostgreSQL / psycopg2), la más rápida"""
+
+    def escribir(self, compras, items):
+        buffer_compras = io.StringIO()
+        for id_, cliente_id, fecha, total, pagado_en in compras:
+            referencia = f'SYN-{id_}' if pagado_en else ''
+            pagado = pagado_en.isoformat() if pagado_en else r'\N'
+            # stripe_session_id, stripe_payment_intent vacíos; promocion_id NULL
+            buffer_compras.write(
+                f'{id_}\t{cliente_id}\t{fecha.isoformat()}\t{_centavos(total)}\t{OBSERVACION}\t'
+                f'{referencia}\t{pagado}\t\t\t\\N\t0\n'
+            )
+        buffer_items = io.StringIO()
+        for compra_id, producto_id, cantidad, precio, subtotal in items:
+            buffer_items.write(
+                f'{compra_id}\t{producto_id}\t{cantidad}\t{_centavos(precio)}\t{_centavos(subtotal)}\n'
+            )
+        buffer_compras.seek(0)
+        buffer_items.seek(0)
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.cursor.copy_expert(
+                    f'COPY {Compra._meta.db_table} ({", ".join(COLUMNAS_COMPRA)}) FROM STDIN',
+                    buffer_compras,
+                )
+                cursor.cursor.copy_expert(
+                    f'COPY {CompraItem._meta.db_table} ({", ".join(COLUMNAS_ITEM)}) FROM STDIN',
+                    buffer_items,
+                )
+
+
+class Command(BaseCommand):
+    help = 'Genera millones de compras sintéticas (bulk_create/COPY, en paralelo por mes) para benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compras', type=int, default=100000, help='Compras a generar (default: 100000)')
+        parser.add_argument('--clientes', type=int, default=20000, help='Clientes sintéticos (default: 20000)')
+        parser.add_argument('--productos', type=int, default=2000, help='Productos sintéticos (default: 2000)')
+        parser.add_argument('--categorias', type=int, default=25, help='Categorías sintéticas (default: 25)')
+        parser.add_argument('--meses', type=int, default=24, help='Meses de histórico hasta hoy (default: 24)')
+        parser.add_argument('--semilla', type=int, default=365, help='Semilla base (default: 365)')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Procesos en paralelo (default: CPUs; siempre 1 en SQLite)')
+        parser.add_argument('--lote', type=int, default=20000, help='Compras por lote/transacción (default: 20000)')
+        parser.add_argument('--sesgo', type=float, default=1.1,
+                            help='Exponente Zipf de popularidad de productos (default: 1.1)')
+        parser.add_argument('--sin-copy', action='store_true', help='Usar bulk_create también en PostgreSQL')
+        parser.add_argument('--limpiar', action='store_true', help='Elimina antes los datos sintéticos previos')
+
+    def handle(self, *args, **options):
+        es_postgres = connection.vendor == 'postgresql'
+        usar_copy = es_postgres and not options['sin_copy']
+        workers = options['workers'] or multiprocessing.cpu_count()
+        if connection.vendor == 'sqlite':
+            workers = 1  # SQLite no admite escrituras concurrentes
+        if options['compras'] <= 0:
+            raise CommandError('--compras debe ser mayor a 0')
+
+        inicio_total = time.perf_counter()
+        if options['limpiar']:
+            self._limpiar()
+
+        rng = random.Random(options['semilla'])
+        categorias = self._crear_categorias(options['categorias'])
+        productos = self._crear_productos(rng, categorias, options['productos'])
+        clientes = self._crear_clientes(options['clientes'])
+
+        # Popularidad sesgada: Zipf sobre productos y Pareto (80/20) sobre clientes
+        orden_productos = productos[:]
+        rng.shuffle(orden_productos)
+        acum_productos = list(accumulate(_pesos_zipf(len(orden_productos), options['sesgo'])))
+        orden_clientes = clientes[:]
+        rng.shuffle(orden_clientes)
+        acum_clientes = list(accumulate(_pesos_zipf(len(orden_clientes), 0.8)))
+
+        _CATALOGO.update({
+            'productos': [(p.id, int(p.precio * 100)) for p in orden_productos],
+            'acum_productos': acum_productos,
+            'clientes': orden_clientes,
+            'acum_clientes': acum_clientes,
+        })
+
+        tareas = self._planificar(options, usar_copy)
+        self.stdout.write(
+            f'Generando {options["compras"]:,} compras en {len(tareas)} meses '
+            f'({"COPY" if usar_copy else "bulk_create"}, {workers} worker(s))...'
+        )
+
+        total_compras = total_items = 0
+        if workers > 1:
+            # Cada proceso hijo abre su propia conexión
+            connections.close_all()
+            contexto = multiprocessing.get_context('fork')
+            with contexto.Pool(workers) as pool:
+                for compras, items in pool.imap_unordered(_generar_mes, tareas):
+                    total_compras += compras
+                    total_items += items
+                    self._progreso(total_compras, total_items, inicio_total)
+        else:
+            for tarea in tareas:
+                compras, items = _generar_mes(tarea)
+                total_compras += compras
+                total_items += items
+                self._progreso(total_compras, total_items, inicio_total)
+
+        if es_postgres:
+            self._ajustar_secuencias()
+
+        # Las escrituras en lote no emiten señales: métricas de clientes aparte
+        from clientes.metricas import recalcular_en_lotes
+        self.stdout.write('Recalculando métricas de clientes...')
+        recalcular_en_lotes(clientes)
+
+        duracion = time.perf_counter() - inicio_total
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {total_compras:,} compras y {total_items:,} ítems en {duracion:.1f}s '
+            f'({total_compras / max(duracion, 0.001):,.0f} compras/s)'
+        ))
+
+    def _planificar(self, options, usar_copy):
+        """Reparte las compras por mes según estacionalidad y asigna rangos de ids"""
+        ahora = timezone.now()
+        meses = []
+        anio, mes = ahora.year, ahora.month
+        for _ in range(options['meses']):
+            meses.append((anio, mes))
+            anio, mes = (anio, mes - 1) if mes > 1 else (anio - 1, 12)
+        meses.reverse()
+
+        # Estacionalidad + leve crecimiento del negocio mes a mes
+        pesos = [ESTACIONALIDAD_MES[m - 1] * (1.01 ** i) for i, (_, m) in enumerate(meses)]
+        # El mes en curso recibe solo la parte ya transcurrida
+        tz = timezone.get_current_timezone()
+        inicio_actual = datetime(ahora.year, ahora.month, 1, tzinfo=tz)
+        siguiente_actual = datetime(ahora.year + (ahora.month == 12), ahora.month % 12 + 1, 1, tzinfo=tz)
+        pesos[-1] *= max((ahora - inicio_actual) / (siguiente_actual - inicio_actual), 0)
+        cantidades = _repartir(options['compras'], pesos)
+
+        siguiente_id = (Compra.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+        tareas = []
+        for indice, ((anio, mes), cantidad) in enumerate(zip(meses, cantidades)):
+            if cantidad == 0:
+                continue
+            inicio = datetime(anio, mes, 1, tzinfo=tz)
+            siguiente = datetime(anio + (mes == 12), mes % 12 + 1, 1, tzinfo=tz)
+            tareas.append({
+                'semilla': options['semilla'] * 1000 + indice,
+                'inicio': inicio,
+                'dias': (siguiente - inicio).days,
+                'cantidad': cantidad,
+                'primer_id': siguiente_id,
+                'lote': options['lote'],
+                'usar_copy': usar_copy,
+                'ahora': ahora,
+            })
+            siguiente_id += cantidad
+        return tareas
+
+    def _crear_categorias(self, cantidad):
+        existentes = {c.slug: c for c in Categoria.objects.filter(slug__startswith='sintetica-')}
+        nuevas = [
+            Categoria(nombre=f'Sintética {i:03d}', slug=f'sintetica-{i:03d}')
+            for i in range(1, cantidad + 1)
+            if f'sintetica-{i:03d}' not in existentes
+        ]
+        Categoria.objects.bulk_create(nuevas, batch_size=1000)
+        return list(Categoria.objects.filter(slug__startswith='sintetica-'))
+
+    def _crear_productos(self, rng, categorias, cantidad):
+        """Catálogo sintético con precios log-normales (muchos baratos, pocos caros)"""
+        existentes = set(Producto.objects.filter(sku__startswith=PREFIJO_SKU).values_list('sku', flat=True))
+        nuevos = []
+        for i in range(1, cantidad + 1):
+            sku = f'{PREFIJO_SKU}{i:07d}'
+            if sku in existentes:
+                continue
+            precio = min(max(rng.lognormvariate(4.6, 1.0), 1.0), 9999.0)
+            nuevos.append(Producto(
+                sku=sku,
+                nombre=f'Producto sintético {i}',
+                precio=Decimal(f'{precio:.2f}'),
+                stock=rng.randint(0, 500),
+                categoria=categorias[i % len(categorias)] if categorias else None,
+            ))
+        Producto.objects.bulk_create(nuevos, batch_size=5000)
+        # El stock inicial abre el libro de inventario (productos/inventario.py)
+        MovimientoStock.objects.bulk_create(
+            [MovimientoStock(producto=p, cantidad=p.stock, motivo='inicial') for p in nuevos if p.stock],
+            batch_size=5000,
+        )
+        self.stdout.write(f'Productos sintéticos: {len(existentes) + len(nuevos):,}')
+        return list(Producto.objects.filter(sku__startswith=PREFIJO_SKU).only('id', 'precio').order_by('id'))
+
+    def _crear_clientes(self, cantidad):
+        existentes = Cliente.objects.filter(email__endswith='@sintetico.local').count()
+        nuevos = [
+            Cliente(nombre=f'Cliente Sintético {i}', email=f'cliente{i}@sintetico.local')
+            for i in range(existentes + 1, cantidad + 1)
+        ]
+        Cliente.objects.bulk_create(nuevos, batch_size=5000)
+        self.stdout.write(f'Clientes sintéticos: {max(existentes, cantidad):,}')
+        return list(
+            Cliente.objects.filter(email__endswith='@sintetico.local').order_by('id').values_list('id', flat=True)
+        )
+
+    def _limpiar(self):
+        self.stdout.write(self.style.WARNING('Eliminando datos sintéticos previos...'))
+        with transaction.atomic():
+            sinteticas = Compra.objects.filter(observaciones=OBSERVACION)
+            CompraItem.objects.filter(compra__in=sinteticas).delete()
+            # Borrado directo sin cargar las compras ni emitir post_delete
+            # (no quedan relaciones que recorrer); las métricas de los
+            # clientes sintéticos se van en cascada con ellos
+            sinteticas._raw_delete(sinteticas.db)
+            Producto.objects.filter(sku__startswith=PREFIJO_SKU).delete()
+            Cliente.objects.filter(email__endswith='@sintetico.local').delete()
+            Categoria.objects.filter(slug__startswith='sintetica-').delete()
+
+    def _ajustar_secuencias(self):
+        """Con ids explícitos la secuencia de compras queda atrás: se adelanta"""
+        with connection.cursor() as cursor:
+            for tabla in (Compra._meta.db_table, CompraItem._meta.db_table):
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {tabla}), 1))"
+                )
+                cursor.execute(f'ANALYZE {tabla}')
+
+    def _progreso(self, compras, items, inicio):
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(
+            f'  {compras:,} compras / {items:,} ítems '
+            f'({compras / max(transcurrido, 0.001):,.0f} compras/s)'
+        )
@@ -0,0 +1,44 @@
+"""
+Worker de exportaciones de compras del admin.
+
+Procesa las ExportacionCompras pendientes en orden de llegada. Pensado para
+despliegues con EXPORTACIONES_EN_PROCESO=False, donde los procesos web solo
+encolan; varias instancias pueden convivir porque cada exportación se toma
+con un UPDATE condicional.
+
+En cada vuelta devuelve a la cola las que quedaron en 'procesando' más de
+EXPORTACIONES_TIMEOUT segundos (un worker que murió). Con el pool en
+proceso, correrlo con --una-vez desde cron recoge lo que un reinicio dejó
+sin procesar.
+
+Uso:
+    python manage.py procesar_exportaciones              # bucle continuo
+    python manage.py procesar_exportaciones --una-vez    # vacía la cola y termina
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from compra.exportaciones import pendientes, procesar, recuperar
+
+
+class Command(BaseCommand):
+    help = 'Genera los archivos de las exportaciones de compras pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre consultas a la cola (default: 5)')
+
+    def handle(self, *args, **options):
+        while True:
+            recuperadas = recuperar()
+            if recuperadas:
+                self.stdout.write(self.style.WARNING(f'{recuperadas} exportaciones sin terminar vuelven a la cola'))
+            for exportacion_id in pendientes():
+                exportacion = procesar(exportacion_id)
+                if exportacion is not None:
+                    estilo = self.style.SUCCESS if exportacion.estado == 'completada' else self.style.ERROR
+                    self.stdout.write(estilo(f'{exportacion} ({exportacion.filas} compras)'))
+            if options['una_vez']:
+                return
+            time.sleep(options['intervalo'])
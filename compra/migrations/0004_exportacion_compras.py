@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compra', '0003_compra_promocion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportacionCompras',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('excel', 'Excel'), ('pdf', 'PDF'), ('comprobantes', 'Comprobantes PDF')], max_length=20)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20)),
+                ('compra_ids', models.JSONField(default=list, help_text='Compras seleccionadas en el admin')),
+                ('archivo', models.FileField(blank=True, upload_to='exportaciones/%Y/%m/')),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('finalizada', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones_compras', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportación de compras',
+                'verbose_name_plural': 'Exportaciones de compras',
+                'db_table': 'compras_exportaciones',
+                'ordering': ['-creada'],
+                'indexes': [models.Index(fields=['usuario', '-creada'], name='compras_exp_usuario_70f7fc_idx'), models.Index(fields=['estado', 'creada'], name='compras_exp_estado_55ea0a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compra', '0004_exportacion_compras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComprobanteCompra',
+            fields=[
+                ('compra', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='comprobante', serialize=False, to='compra.compra')),
+                ('huella', models.CharField(max_length=64)),
+                ('archivo', models.FileField(upload_to='comprobantes/%Y/%m/')),
+                ('tamano', models.PositiveIntegerField(default=0)),
+                ('generado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Comprobante de compra',
+                'verbose_name_plural': 'Comprobantes de compra',
+                'db_table': 'compras_comprobantes',
+            },
+        ),
+    ]
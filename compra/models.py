@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.db.models import Sum
 from django.core.validators import MinValueValidator
@@ -107,3 +108,77 @@ class CompraItem(models.Model):
         """Auto-calcula el subtotal antes de guardar"""
         self.subtotal = self.precio_unitario * self.cantidad
         super().save(*args, **kwargs)
+
+
+class ExportacionCompras(models.Model):
+    """
+    Exportación de compras solicitada desde el admin. El archivo se genera
+    fuera del request (compra/exportaciones.py) y al terminar se avisa al
+    administrador por WebSocket (NotificacionAdmin).
+    """
+    TIPO_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+        ('comprobantes', 'Comprobantes PDF'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('error', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='exportaciones_compras'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', db_index=True)
+    compra_ids = models.JSONField(default=list, help_text='Compras seleccionadas en el admin')
+    archivo = models.FileField(upload_to='exportaciones/%Y/%m/', blank=True)
+    filas = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    finalizada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'compras_exportaciones'
+        ordering = ['-creada']
+        verbose_name = 'Exportación de compras'
+        verbose_name_plural = 'Exportaciones de compras'
+        indexes = [
+            models.Index(fields=['usuario', '-creada']),
+            models.Index(fields=['estado', 'creada']),
+        ]
+
+    def __str__(self):
+        return f"Exportación #{self.id} ({self.get_tipo_display()}) - {self.get_estado_display()}"
+
+
+class ComprobanteCompra(models.Model):
+    """
+    PDF del comprobante de una compra pagada, generado una sola vez.
+    `huella` es el hash de los datos renderizados (compra/comprobantes.py):
+    nombra el archivo y se usa como ETag. Una devolución que cambia la
+    compra borra el registro y el siguiente pedido lo regenera.
+    """
+    compra = models.OneToOneField(
+        Compra,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='comprobante'
+    )
+    huella = models.CharField(max_length=64)
+    archivo = models.FileField(upload_to='comprobantes/%Y/%m/')
+    tamano = models.PositiveIntegerField(default=0)
+    generado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'compras_comprobantes'
+        verbose_name = 'Comprobante de compra'
+        verbose_name_plural = 'Comprobantes de compra'
+
+    def __str__(self):
+        return f"Comprobante compra #{self.compra_id} ({self.huella[:12]})"
@@ -0,0 +1,180 @@
+"""
+Render de los PDF de compras: comprobante, listado y notas de venta del admin.
+
+Funciones puras: reciben los datos ya extraídos de la base (tipos simples,
+ver `compra/comprobantes.py` y `compra/exportaciones.py`) y devuelven los
+bytes del PDF, así pueden correr en el pool de core/render_pdf.py. El canvas
+del comprobante se crea con `invariant=1`, así los mismos datos producen
+exactamente los mismos bytes y el hash de los datos sirve de ETag fuerte.
+"""
+import io
+
+# Cambiar al modificar el diseño: invalida los comprobantes ya guardados
+VERSION_COMPROBANTE = 2
+
+
+def render_comprobante(datos):
+    """Bytes del PDF del comprobante descrito por `datos`"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    destino = io.BytesIO()
+    p = canvas.Canvas(destino, pagesize=A4, invariant=1)
+    width, height = A4
+    y = height - 40
+
+    # Encabezado
+    p.setFont('Helvetica-Bold', 16)
+    p.drawString(40, y, 'SmartSales365 - Comprobante de Compra')
+    y -= 30
+
+    # Información de la compra
+    p.setFont('Helvetica', 11)
+    p.drawString(40, y, f"Compra ID: {datos['id']}")
+    y -= 16
+    p.drawString(40, y, f"Fecha: {datos['fecha']}")
+    y -= 16
+    p.drawString(40, y, f"Cliente: {datos['cliente']}")
+    y -= 16
+    p.drawString(40, y, f"Estado: {'Pagado' if datos['pagado_en'] else 'Pendiente'}")
+    y -= 30
+
+    # Tabla de items
+    p.setFont('Helvetica-Bold', 10)
+    p.drawString(40, y, 'Cant.')
+    p.drawString(90, y, 'Producto')
+    p.drawString(350, y, 'P. Unit.')
+    p.drawString(450, y, 'Subtotal')
+    y -= 14
+    p.line(40, y, 550, y)
+    y -= 10
+
+    p.setFont('Helvetica', 10)
+    for item in datos['items']:
+        if y < 60:
+            p.showPage()
+            p.setFont('Helvetica', 10)
+            y = height - 40
+
+        p.drawString(40, y, str(item['cantidad']))
+        p.drawString(90, y, item['producto'][:40])
+        p.drawRightString(420, y, f"${item['precio_unitario']}")
+        p.drawRightString(530, y, f"${item['subtotal']}")
+        y -= 14
+
+    # Total
+    y -= 10
+    p.line(40, y, 550, y)
+    y -= 20
+    p.setFont('Helvetica-Bold', 12)
+    p.drawRightString(530, y, f"TOTAL: ${datos['total']}")
+
+    # Información de pago
+    if datos['pagado_en']:
+        y -= 20
+        p.setFont('Helvetica', 9)
+        p.drawString(40, y, f"Pagado el: {datos['pagado_en']}")
+        if datos['pago_referencia']:
+            y -= 12
+            p.drawString(40, y, f"Referencia: {datos['pago_referencia']}")
+
+    # Devoluciones aprobadas o completadas
+    if datos['devoluciones']:
+        y -= 24
+        if y < 80:
+            p.showPage()
+            y = height - 40
+        p.setFont('Helvetica-Bold', 10)
+        p.drawString(40, y, 'Devoluciones')
+        y -= 14
+        p.setFont('Helvetica', 9)
+        for devolucion in datos['devoluciones']:
+            if y < 60:
+                p.showPage()
+                p.setFont('Helvetica', 9)
+                y = height - 40
+            p.drawString(
+                40, y,
+                f"#{devolucion['id']} {devolucion['producto'][:36]} x {devolucion['cantidad']} "
+                f"- {devolucion['tipo']} ({devolucion['estado']})"
+            )
+            p.drawRightString(530, y, f"-${devolucion['monto_reembolso']}")
+            y -= 12
+
+    p.showPage()
+    p.save()
+    return destino.getvalue()
+
+
+def render_listado_compras(filas):
+    """Reporte de compras del admin: una línea por compra (`filas` de strings ya formateados)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    destino = io.BytesIO()
+    p = canvas.Canvas(destino, pagesize=A4)
+    width, height = A4
+    y = height - 40
+    p.setFont('Helvetica-Bold', 12)
+    p.drawString(40, y, 'Reporte de Compras')
+    y -= 20
+    p.setFont('Helvetica', 9)
+    headers = ['ID', 'Cliente', 'Fecha', 'Total', 'Pagado en', 'Ref', 'Items']
+    p.drawString(40, y, ' | '.join(headers))
+    y -= 15
+    for row in filas:
+        p.drawString(40, y, ' | '.join(row))
+        y -= 12
+        if y < 40:
+            p.showPage()
+            p.setFont('Helvetica', 9)
+            y = height - 40
+    p.showPage()
+    p.save()
+    return destino.getvalue()
+
+
+def render_notas_venta(notas):
+    """Una 'Nota de Venta' por compra; cada nota es un dict de tipos simples"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    destino = io.BytesIO()
+    p = canvas.Canvas(destino, pagesize=A4)
+    width, height = A4
+    for nota in notas:
+        y = height - 40
+        p.setFont('Helvetica-Bold', 14)
+        p.drawString(40, y, 'Nota de Venta')
+        y -= 20
+        p.setFont('Helvetica', 10)
+        p.drawString(40, y, f"Compra ID: {nota['id']}   Fecha: {nota['fecha']}")
+        y -= 14
+        p.drawString(40, y, f"Cliente: {nota['cliente']}")
+        y -= 20
+        p.setFont('Helvetica-Bold', 10)
+        p.drawString(40, y, 'Cant.')
+        p.drawString(90, y, 'Producto')
+        p.drawString(300, y, 'P. Unit.')
+        p.drawString(380, y, 'Subtotal')
+        y -= 12
+        p.setFont('Helvetica', 10)
+        for cantidad, producto, precio_unitario, subtotal in nota['items']:
+            if y < 60:
+                p.showPage()
+                p.setFont('Helvetica', 10)
+                y = height - 40
+            p.drawString(40, y, str(cantidad))
+            p.drawString(90, y, producto[:36])
+            p.drawRightString(360, y, precio_unitario)
+            p.drawRightString(450, y, subtotal)
+            y -= 12
+        y -= 10
+        p.setFont('Helvetica-Bold', 11)
+        p.drawRightString(450, y, f"TOTAL: {nota['total']}")
+        y -= 16
+        p.setFont('Helvetica', 9)
+        p.drawString(40, y, f"Pagado: {nota['pagado_en']}" if nota['pagado_en'] else 'Pendiente de pago')
+        p.showPage()
+    p.save()
+    return destino.getvalue()
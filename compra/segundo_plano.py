@@ -0,0 +1,42 @@
+"""
+Pool de hilos para trabajos cortos fuera del request (exportaciones del
+admin, comprobantes PDF). Los trabajos se envían al confirmar la
+transacción para que vean los datos ya guardados.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EXPORTACIONES_WORKERS', 2),
+                thread_name_prefix='compra-segundo-plano',
+            )
+        return _pool
+
+
+def _ejecutar(funcion, args):
+    try:
+        funcion(*args)
+    except Exception as e:
+        logger.error(f"❌ Error en trabajo en segundo plano {funcion.__name__}: {e}")
+    finally:
+        # Cada hilo del pool abre su propia conexión
+        connection.close()
+
+
+def al_confirmar(funcion, *args):
+    """Ejecuta `funcion(*args)` en el pool cuando se confirme la transacción actual"""
+    transaction.on_commit(lambda: _executor().submit(_ejecutar, funcion, args))
@@ -2,6 +2,30 @@ from rest_framework import serializers
 from .models import Compra, CompraItem
 
 
+def campos_pedidos(request):
+    """Campos de ?fields=a,b,c (sparse fieldset) o None si no se limitan"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    valor = request.query_params.get('fields')
+    if not valor:
+        return None
+    return {campo.strip() for campo in valor.split(',') if campo.strip()}
+
+
+class CamposDinamicosMixin:
+    """
+    Serializa solo los campos pedidos con ?fields= (en lecturas). Los
+    nombres desconocidos se ignoran; sin el parámetro van todos los campos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = campos_pedidos(self.context.get('request'))
+        if campos:
+            for nombre in set(self.fields) - campos:
+                self.fields.pop(nombre)
+
+
 class CompraItemSerializer(serializers.ModelSerializer):
     """Serializer para items de compra con información del producto"""
     producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
@@ -21,7 +45,18 @@ class CompraItemSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'subtotal')
 
 
-class CompraSerializer(serializers.ModelSerializer):
+class CompraListSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Representación liviana para el historial de compras (sin ítems)"""
+    esta_pagada = serializers.BooleanField(read_only=True)
+    items_count = serializers.IntegerField(read_only=True)  # anotado en la consulta
+
+    class Meta:
+        model = Compra
+        fields = ('id', 'fecha', 'total', 'esta_pagada', 'items_count')
+        read_only_fields = fields
+
+
+class CompraSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para compras con items anidados"""
     items = CompraItemSerializer(many=True, read_only=True)
     cliente_nombre = serializers.CharField(source='cliente.nombre', read_only=True)
@@ -0,0 +1,40 @@
+"""
+Señales del almacén de comprobantes PDF (compra/comprobantes.py).
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .comprobantes import ESTADOS_DEVOLUCION, generar_al_pagar, invalidar_por_item
+from .segundo_plano import al_confirmar
+
+# Campos de una devolución que cambian lo que se imprime en el comprobante
+CAMPOS_DEVOLUCION = {'estado', 'cantidad', 'monto_reembolso', 'tipo', 'compra_item'}
+
+
+@receiver(post_save, sender='compra.Compra')
+def generar_comprobante_al_pagar(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or not instance.pagado_en or not getattr(settings, 'COMPROBANTES_AL_PAGAR', True):
+        return
+    if update_fields is not None and 'pagado_en' not in update_fields:
+        return
+    al_confirmar(generar_al_pagar, instance.pk)
+
+
+# Las devoluciones solo avanzan pendiente -> aprobada -> completada (o
+# rechazada): una que no está aprobada ni completada nunca figuró en el
+# comprobante, así que guardarla o borrarla no lo cambia.
+
+@receiver(post_save, sender='promociones.DevolucionProducto')
+def invalidar_comprobante_devolucion(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance.estado not in ESTADOS_DEVOLUCION:
+        return
+    if update_fields is not None and not CAMPOS_DEVOLUCION.intersection(update_fields):
+        return
+    invalidar_por_item(instance.compra_item_id)
+
+
+@receiver(post_delete, sender='promociones.DevolucionProducto')
+def invalidar_comprobante_devolucion_borrada(sender, instance, **kwargs):
+    if instance.estado in ESTADOS_DEVOLUCION:
+        invalidar_por_item(instance.compra_item_id)
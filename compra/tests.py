@@ -0,0 +1,299 @@
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clientes.models import Cliente
+from core import render_pdf
+from notificaciones.models import NotificacionAdmin
+from productos.models import Producto
+from promociones.models import DevolucionProducto
+from usuarios.models import Usuario
+
+from .exportaciones import procesar, recuperar
+from .comprobantes import generar_al_pagar, guardar_comprobante
+from .models import Compra, CompraItem, ComprobanteCompra, ExportacionCompras
+from .pdf import render_comprobante
+
+MEDIA_TEMPORAL = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, EXPORTACIONES_EN_PROCESO=False)
+class ExportacionComprasTests(TestCase):
+    """Las acciones del admin encolan; el archivo se genera fuera del request"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser('export_admin', 'export@admin.local', 'clave-123', rol='admin')
+        cliente = Cliente.objects.create(nombre='Export', email='export@cliente.local')
+        producto = Producto.objects.create(sku='EXP-1', nombre='Producto export', precio=Decimal('10.00'), stock=100)
+        for _ in range(3):
+            compra = Compra.objects.create(cliente=cliente)
+            CompraItem.objects.create(compra=compra, producto=producto, cantidad=2, precio_unitario=Decimal('10.00'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _accion(self, accion):
+        return self.client.post(reverse('admin:compra_compra_changelist'), {
+            'action': accion,
+            '_selected_action': list(Compra.objects.values_list('id', flat=True)),
+        })
+
+    def test_accion_encola_sin_generar_archivo(self):
+        respuesta = self._accion('exportar_excel')
+        self.assertEqual(respuesta.status_code, 302)
+        exportacion = ExportacionCompras.objects.get()
+        self.assertEqual(exportacion.estado, 'pendiente')
+        self.assertEqual(len(exportacion.compra_ids), 3)
+        self.assertFalse(exportacion.archivo)
+
+    def test_procesar_guarda_archivo_y_notifica(self):
+        for accion, tipo in (('exportar_excel', 'excel'), ('exportar_pdf', 'pdf'), ('comprobante_pdf', 'comprobantes')):
+            self._accion(accion)
+            exportacion = procesar(ExportacionCompras.objects.get(tipo=tipo).id)
+            self.assertEqual(exportacion.estado, 'completada', exportacion.error)
+            self.assertEqual(exportacion.filas, 3)
+
+            descarga = self.client.get(reverse('admin:compra_exportacioncompras_descargar', args=[exportacion.id]))
+            self.assertEqual(descarga.status_code, 200)
+            self.assertGreater(len(b''.join(descarga.streaming_content)), 0)
+
+        self.assertEqual(NotificacionAdmin.objects.filter(usuario=self.admin, tipo='exportacion').count(), 3)
+        # Una exportación ya tomada no se procesa dos veces
+        self.assertIsNone(procesar(ExportacionCompras.objects.first().id))
+
+    def test_recupera_exportaciones_abandonadas(self):
+        self._accion('exportar_excel')
+        exportacion = ExportacionCompras.objects.get()
+        # Un worker la tomó y murió
+        ExportacionCompras.objects.filter(pk=exportacion.pk).update(estado='procesando', iniciada=timezone.now())
+        self.assertEqual(recuperar(), 0)
+        self.assertEqual(recuperar(timezone.now() + timedelta(hours=1)), 1)
+
+        ExportacionCompras.objects.filter(pk=exportacion.pk).update(iniciada=timezone.now() - timedelta(hours=1))
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        exportacion.refresh_from_db()
+        self.assertEqual(exportacion.estado, 'completada', exportacion.error)
+        self.assertTrue(exportacion.archivo)
+
+    def test_resultado_de_una_ejecucion_recuperada_se_descarta(self):
+        self._accion('exportar_excel')
+        exportacion = ExportacionCompras.objects.get()
+
+        def recuperada(compra_ids, destino):
+            # Mientras genera, otro worker la da por perdida y la vuelve a la cola
+            ExportacionCompras.objects.filter(pk=exportacion.pk).update(estado='pendiente', iniciada=None)
+            destino.write(b'x')
+            return len(compra_ids)
+
+        with mock.patch.dict('compra.exportaciones.GENERADORES', {'excel': recuperada}):
+            self.assertIsNone(procesar(exportacion.pk))
+        exportacion.refresh_from_db()
+        self.assertEqual(exportacion.estado, 'pendiente')
+        self.assertFalse(exportacion.archivo)
+        self.assertFalse(NotificacionAdmin.objects.filter(tipo='exportacion').exists())
+
+    @override_settings(EXPORTACIONES_EN_PROCESO=True)
+    def test_barrido_de_pendientes_con_pool_en_proceso(self):
+        ExportacionCompras.objects.create(usuario=self.admin, tipo='excel', compra_ids=list(Compra.objects.values_list('id', flat=True)))
+        # Reciente: sigue en la cola del proceso web
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        self.assertEqual(ExportacionCompras.objects.get().estado, 'pendiente')
+
+        ExportacionCompras.objects.update(creada=timezone.now() - timedelta(hours=1))
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        self.assertEqual(ExportacionCompras.objects.get().estado, 'completada')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL)
+class ComprobanteCompraTests(TestCase):
+    """El comprobante de una compra pagada se genera una vez y se sirve con ETag"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('comprobante', 'comprobante@cliente.local', 'clave-123')
+        cls.cliente = Cliente.objects.create(nombre='Comprobante', email='comprobante@cliente.local', usuario=cls.usuario)
+        producto = Producto.objects.create(sku='CMP-1', nombre='Producto comprobante', precio=Decimal('10.00'), stock=100)
+        cls.compra = Compra.objects.create(cliente=cls.cliente, total=Decimal('20.00'), pagado_en=timezone.now())
+        cls.item = CompraItem.objects.create(
+            compra=cls.compra, producto=producto, cantidad=2, precio_unitario=Decimal('10.00')
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+        self.ruta = reverse('compra-receipt', args=[self.compra.id])
+
+    def test_se_genera_una_vez_y_responde_304(self):
+        primera = self.api.get(self.ruta)
+        self.assertEqual(primera.status_code, 200)
+        self.assertTrue(b''.join(primera.streaming_content).startswith(b'%PDF'))
+        comprobante = ComprobanteCompra.objects.get(compra=self.compra)
+        self.assertEqual(primera['ETag'], f'"{comprobante.huella}"')
+
+        with self.assertNumQueries(1):
+            repetida = self.api.get(self.ruta, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(ComprobanteCompra.objects.get(compra=self.compra).generado_en, comprobante.generado_en)
+
+    def test_devolucion_aprobada_invalida(self):
+        comprobante = generar_al_pagar(self.compra.id)
+        devolucion = DevolucionProducto.objects.create(
+            compra_item=self.item, cliente=self.cliente, motivo='Defecto', cantidad=1
+        )
+        # Una solicitud pendiente no cambia la compra
+        self.assertTrue(ComprobanteCompra.objects.filter(compra=self.compra).exists())
+
+        devolucion.aprobar(self.usuario)
+        self.assertFalse(ComprobanteCompra.objects.filter(compra=self.compra).exists())
+
+        respuesta = self.api.get(self.ruta, HTTP_IF_NONE_MATCH=f'"{comprobante.huella}"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], f'"{comprobante.huella}"')
+
+    def test_compra_pendiente_no_se_guarda(self):
+        pendiente = Compra.objects.create(cliente=self.cliente, total=Decimal('5.00'))
+        respuesta = self.api.get(reverse('compra-receipt', args=[pendiente.id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(ComprobanteCompra.objects.filter(compra=pendiente).exists())
+        # El render es determinista: mismo ETag, 304 sin renderizar
+        repetida = self.api.get(reverse('compra-receipt', args=[pendiente.id]), HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_reemplazo_borra_el_archivo_anterior(self):
+        anterior = generar_al_pagar(self.compra.id)
+        storage = anterior.archivo.storage
+        self.assertTrue(storage.exists(anterior.archivo.name))
+
+        Compra.objects.filter(pk=self.compra.pk).update(pago_referencia='REF-NUEVA')
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = guardar_comprobante(Compra.objects.select_related('cliente').get(pk=self.compra.pk))
+        self.assertFalse(storage.exists(anterior.archivo.name))
+        self.assertTrue(storage.exists(nuevo.archivo.name))
+        self.assertEqual(ComprobanteCompra.objects.get(compra=self.compra).archivo.name, nuevo.archivo.name)
+
+    def test_admin_no_edita_items_de_compras_pagadas(self):
+        admin = Usuario.objects.create_superuser('comprobante_admin', 'admin@comprobante.local', 'clave-123', rol='admin')
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('admin:compra_compra_change', args=[self.compra.id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotContains(respuesta, 'name="items-0-cantidad"')
+        self.assertNotContains(respuesta, 'name="total"')
+
+        respuesta = self.client.post(reverse('admin:compra_compraitem_change', args=[self.item.id]), {
+            'compra': self.compra.id, 'producto': self.item.producto_id, 'cantidad': 5, 'precio_unitario': '10.00',
+        })
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertEqual(CompraItem.objects.get(pk=self.item.pk).cantidad, 2)
+
+        pendiente = Compra.objects.create(cliente=self.cliente)
+        respuesta = self.client.get(reverse('admin:compra_compra_change', args=[pendiente.id]))
+        self.assertContains(respuesta, 'name="total"')
+
+
+class CompraListadoTests(TestCase):
+    """El historial usa la representación liviana; ?fields= elige los campos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('historial', 'historial@cliente.local', 'clave-123')
+        cliente = Cliente.objects.create(nombre='Historial', email='historial@cliente.local', usuario=cls.usuario)
+        producto = Producto.objects.create(sku='HIS-1', nombre='Producto historial', precio=Decimal('10.00'), stock=100)
+        for _ in range(3):
+            compra = Compra.objects.create(cliente=cliente, total=Decimal('30.00'))
+            for cantidad in (1, 2):
+                CompraItem.objects.create(compra=compra, producto=producto, cantidad=cantidad, precio_unitario=Decimal('10.00'))
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def test_listado_liviano(self):
+        with self.assertNumQueries(2):  # count + página con el conteo de ítems
+            respuesta = self.api.get(reverse('compra-list'))
+        compra = respuesta.data['results'][0]
+        self.assertEqual(set(compra), {'id', 'fecha', 'total', 'esta_pagada', 'items_count'})
+        self.assertEqual(compra['items_count'], 2)
+
+    def test_campos_pedidos(self):
+        respuesta = self.api.get(reverse('compra-list'), {'fields': 'id,total'})
+        self.assertEqual(set(respuesta.data['results'][0]), {'id', 'total'})
+
+        respuesta = self.api.get(reverse('compra-list'), {'fields': 'id,items'})
+        compra = respuesta.data['results'][0]
+        self.assertEqual(set(compra), {'id', 'items'})
+        self.assertEqual(compra['items'][0]['producto_sku'], 'HIS-1')
+
+        detalle = self.api.get(reverse('compra-detail', args=[compra['id']]), {'fields': 'id,cliente_nombre'})
+        self.assertEqual(detalle.data, {'id': compra['id'], 'cliente_nombre': 'Historial'})
+
+@override_settings(PDF_RENDER_WORKERS=1, PDF_RENDER_MAX_PENDIENTES=1)
+class RenderPdfTests(SimpleTestCase):
+    """Los PDF se dibujan en el pool de procesos, con cola acotada y timeout"""
+
+    datos = {
+        'id': 1, 'fecha': '2025-01-01 10:00', 'cliente': 'Pool', 'total': '10.00',
+        'items': [{'cantidad': 1, 'producto': 'Producto', 'precio_unitario': '10.00', 'subtotal': '10.00'}],
+        'pagado_en': None, 'pago_referencia': None, 'devoluciones': [],
+    }
+
+    def setUp(self):
+        render_pdf.cerrar()
+        self.addCleanup(render_pdf.cerrar)
+
+    def test_mismos_bytes_que_en_proceso(self):
+        self.assertEqual(render_pdf.renderizar(render_comprobante, self.datos), render_comprobante(self.datos))
+
+    def test_cola_llena_y_timeout(self):
+        ocupado = render_pdf.enviar(time.sleep, 1)
+        with self.assertRaises(render_pdf.RenderSaturado):
+            render_pdf.renderizar(render_comprobante, self.datos)
+        ocupado.result()
+
+        with self.assertRaises(render_pdf.RenderTimeout):
+            render_pdf.renderizar(time.sleep, 2, timeout=0.2)
+
+    def test_render_colgado_libera_worker_y_cupo(self):
+        # Con el worker ya levantado, el trabajo colgado está corriendo
+        render_pdf.renderizar(render_comprobante, self.datos)
+        procesos = list(render_pdf._pool._processes.values())
+        with self.assertRaises(render_pdf.RenderTimeout):
+            render_pdf.renderizar(time.sleep, 60, timeout=0.2)
+        for proceso in procesos:
+            proceso.join(5)
+            self.assertFalse(proceso.is_alive())
+        # El único cupo quedó libre: el siguiente render entra sin RenderSaturado
+        self.assertEqual(render_pdf.renderizar(render_comprobante, self.datos), render_comprobante(self.datos))
+
+
+class GenerarDatosMasivosTests(TestCase):
+    """El camino bulk_create conserva las fechas históricas y no genera compras a futuro"""
+
+    def test_fechas_repartidas_en_los_meses(self):
+        ahora = timezone.now()
+        call_command(
+            'generar_datos_masivos', '--compras', '600', '--clientes', '20', '--productos', '10',
+            '--categorias', '2', '--meses', '12', '--workers', '1', stdout=StringIO(),
+        )
+        fechas = list(Compra.objects.filter(observaciones='sintetico').values_list('fecha', flat=True))
+        self.assertEqual(len(fechas), 600)
+        self.assertLessEqual(max(fechas), ahora)
+        self.assertLess(min(fechas), ahora - timedelta(days=300))
+        self.assertGreaterEqual(len({(f.year, f.month) for f in fechas}), 11)
+        # Nada amontonado en las últimas 24 h
+        self.assertLess(sum(f > ahora - timedelta(days=1) for f in fechas), 30)
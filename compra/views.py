@@ -2,7 +2,7 @@ from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Count, Sum
 from django.conf import settings
 from rest_framework.views import APIView
 from django.views.decorators.csrf import csrf_exempt
@@ -10,8 +10,8 @@ from django.utils.decorators import method_decorator
 from django.utils import timezone
 from decimal import Decimal
 from .models import Compra, CompraItem
-from .serializers import CompraSerializer
-from django.http import HttpResponse
+from .serializers import CompraListSerializer, CompraSerializer, campos_pedidos
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,7 +30,7 @@ class IsOwnerOrAdmin(permissions.BasePermission):
 
 
 class CompraViewSet(viewsets.ModelViewSet):
-    queryset = Compra.objects.select_related('cliente').prefetch_related('items__producto').all()
+    queryset = Compra.objects.all()
     serializer_class = CompraSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -50,8 +50,28 @@ class CompraViewSet(viewsets.ModelViewSet):
             )
         serializer.save(cliente=cliente)
 
+    def _lista_liviana(self):
+        """El listado usa CompraListSerializer salvo que ?fields= pida otros campos"""
+        if self.action != 'list':
+            return False
+        campos = campos_pedidos(self.request)
+        return campos is None or campos <= set(CompraListSerializer.Meta.fields)
+
+    def get_serializer_class(self):
+        if self._lista_liviana():
+            return CompraListSerializer
+        return CompraSerializer
+
     def get_queryset(self):
-        qs = super().get_queryset()
+        if self._lista_liviana():
+            # Solo columnas de la compra y el conteo de ítems, sin prefetch
+            # (con GROUP BY el Meta.ordering no se aplica: se ordena explícito)
+            qs = Compra.objects.annotate(items_count=Count('items')).order_by('-fecha')
+        else:
+            qs = Compra.objects.select_related('cliente', 'promocion')
+            campos = campos_pedidos(self.request)
+            if campos is None or 'items' in campos:
+                qs = qs.prefetch_related('items__producto')
         if self.request.user.is_staff:
             return qs
         return qs.filter(cliente__usuario=self.request.user)
@@ -95,6 +115,7 @@ class CompraViewSet(viewsets.ModelViewSet):
                 email=user.email or ''
             )
 
+        from productos import inventario
         from productos.models import Producto
         from promociones.models import Promocion
 
@@ -134,9 +155,10 @@ class CompraViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST
                         )
 
-                    # Verificar producto existe y está activo
+                    # Verificar producto existe y está activo (sin bloquear la fila:
+                    # el descuento de stock es un UPDATE condicional)
                     try:
-                        producto = Producto.objects.select_for_update().get(
+                        producto = Producto.objects.get(
                             pk=prod_id,
                             activo=True
                         )
@@ -146,7 +168,7 @@ class CompraViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST
                         )
 
-                    # ✅ Validar stock disponible
+                    # ✅ Validar stock disponible (la garantía la da inventario.aplicar)
                     if not producto.tiene_stock(cantidad):
                         return Response(
                             {
@@ -168,7 +190,7 @@ class CompraViewSet(viewsets.ModelViewSet):
                     observaciones=observaciones
                 )
 
-                # Crear items y reducir stock
+                # Crear items
                 for item_data in productos_validados:
                     producto = item_data['producto']
                     cantidad = item_data['cantidad']
@@ -182,9 +204,13 @@ class CompraViewSet(viewsets.ModelViewSet):
                         precio_unitario=precio,
                         subtotal=precio * cantidad
                     )
-                    
-                    # ✅ Reducir stock
-                    producto.reducir_stock(cantidad)
+
+                # ✅ Reducir stock: un UPDATE condicional por producto y el libro en un INSERT;
+                # si otra compra se llevó el stock, StockInsuficiente (ValueError) deshace todo
+                inventario.aplicar([
+                    (item_data['producto'], -item_data['cantidad'], 'venta', f'compra:{compra.id}')
+                    for item_data in productos_validados
+                ])
 
                 # Recalcular total (obtener subtotal)
                 compra.recalc_total()
@@ -219,7 +245,7 @@ class CompraViewSet(viewsets.ModelViewSet):
                     usuario=user,
                     titulo='🛒 Carrito confirmado',
                     mensaje=f'Tu pedido #{compra.id} ha sido creado. Procede al pago para completar tu compra.',
-                    tipo='otro',
+                    tipo='compra_creada',
                     datos_extra={
                         'compra_id': compra.id,
                         'total': float(compra.total)
@@ -584,14 +610,21 @@ class StripeWebhookView(APIView):
 
 
 class CompraReceiptView(APIView):
-    """Genera un comprobante PDF de la compra"""
+    """
+    Comprobante PDF de la compra. El de una compra pagada se genera una vez y
+    se sirve desde el almacén de comprobantes (compra/comprobantes.py) con
+    ETag fuerte; un If-None-Match coincidente responde 304 sin leer el archivo.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk: int):
+        from core.render_pdf import RenderError, renderizar
+        from .comprobantes import datos_comprobante, guardar_comprobante, huella
+        from .models import ComprobanteCompra
+        from .pdf import render_comprobante
+
         try:
-            compra = Compra.objects.select_related('cliente').prefetch_related(
-                'items__producto'
-            ).get(pk=pk)
+            compra = Compra.objects.select_related('cliente', 'comprobante').get(pk=pk)
         except Compra.DoesNotExist:
             return Response({'detail': 'Compra no encontrada'}, status=404)
 
@@ -600,79 +633,50 @@ class CompraReceiptView(APIView):
             return Response({'detail': 'No autorizado'}, status=403)
 
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
+            comprobante = compra.comprobante if compra.esta_pagada else None
+        except ComprobanteCompra.DoesNotExist:
+            comprobante = None
+
+        try:
+            if compra.esta_pagada and comprobante is None:
+                comprobante = guardar_comprobante(compra)
+            if comprobante is not None:
+                etag = f'"{comprobante.huella}"'
+                contenido = None
+            else:
+                # Compra pendiente: puede cambiar, se renderiza en cada pedido
+                datos = datos_comprobante(compra)
+                etag = f'"{huella(datos)}"'
+                contenido = None if self._coincide(request, etag) else renderizar(render_comprobante, datos)
         except ImportError:
             return Response(
                 {'detail': 'reportlab no instalado'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        except RenderError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        if self._coincide(request, etag):
+            response = HttpResponseNotModified()
+        elif contenido is not None:
+            response = HttpResponse(contenido, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="comprobante_{compra.id}.pdf"'
+            logger.info(f'Comprobante PDF generado para compra #{compra.id}')
+        else:
+            response = FileResponse(
+                comprobante.archivo.open('rb'),
+                content_type='application/pdf',
+                as_attachment=True,
+                filename=f'comprobante_{compra.id}.pdf',
+            )
+        response['ETag'] = etag
+        # El navegador guarda el PDF pero revalida: tras una devolución cambia el ETag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="comprobante_{compra.id}.pdf"'
-
-        p = canvas.Canvas(response, pagesize=A4)
-        width, height = A4
-        y = height - 40
-
-        # Encabezado
-        p.setFont('Helvetica-Bold', 16)
-        p.drawString(40, y, 'SmartSales365 - Comprobante de Compra')
-        y -= 30
-
-        # Información de la compra
-        p.setFont('Helvetica', 11)
-        p.drawString(40, y, f'Compra ID: {compra.id}')
-        y -= 16
-        p.drawString(40, y, f'Fecha: {compra.fecha.strftime("%Y-%m-%d %H:%M")}')
-        y -= 16
-        p.drawString(40, y, f'Cliente: {compra.cliente.nombre}')
-        y -= 16
-        estado = 'Pagado' if compra.esta_pagada else 'Pendiente'
-        p.drawString(40, y, f'Estado: {estado}')
-        y -= 30
-
-        # Tabla de items
-        p.setFont('Helvetica-Bold', 10)
-        p.drawString(40, y, 'Cant.')
-        p.drawString(90, y, 'Producto')
-        p.drawString(350, y, 'P. Unit.')
-        p.drawString(450, y, 'Subtotal')
-        y -= 14
-        p.line(40, y, 550, y)
-        y -= 10
-
-        p.setFont('Helvetica', 10)
-        for item in compra.items.all():
-            if y < 60:
-                p.showPage()
-                y = height - 40
-
-            p.drawString(40, y, str(item.cantidad))
-            nombre = item.producto.nombre[:40] if item.producto else 'N/A'
-            p.drawString(90, y, nombre)
-            p.drawRightString(420, y, f'${item.precio_unitario}')
-            p.drawRightString(530, y, f'${item.subtotal}')
-            y -= 14
-
-        # Total
-        y -= 10
-        p.line(40, y, 550, y)
-        y -= 20
-        p.setFont('Helvetica-Bold', 12)
-        p.drawRightString(530, y, f'TOTAL: ${compra.total}')
-
-        # Información de pago
-        if compra.esta_pagada:
-            y -= 20
-            p.setFont('Helvetica', 9)
-            p.drawString(40, y, f'Pagado el: {compra.pagado_en.strftime("%Y-%m-%d %H:%M")}')
-            if compra.pago_referencia:
-                y -= 12
-                p.drawString(40, y, f'Referencia: {compra.pago_referencia}')
-
-        p.showPage()
-        p.save()
+    @staticmethod
+    def _coincide(request, etag):
+        from django.utils.http import parse_etags
 
-        logger.info(f'Comprobante PDF generado para compra #{compra.id}')
-        return response
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        return etag in etags or '*' in etags
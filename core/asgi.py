@@ -35,11 +35,13 @@ class LoggingProtocolTypeRouter:
 
     async def __call__(self, scope, receive, send):
         protocol = scope.get('type')
-        self.logger.info(f'📡 ProtocolTypeRouter called for: {protocol}')
+        # HTTP va en debug: loguear cada request cuesta más que instrumentarlo
+        log = self.logger.debug if protocol == 'http' else self.logger.info
+        log(f'📡 ProtocolTypeRouter called for: {protocol}')
 
         application = self.application_mapping.get(protocol)
         if application:
-            self.logger.info(f'✅ Found application for {protocol}')
+            log(f'✅ Found application for {protocol}')
             return await application(scope, receive, send)
         else:
             self.logger.error(f'❌ No application found for {protocol}')
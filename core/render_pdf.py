@@ -0,0 +1,156 @@
+"""
+Servicio de render de PDF en un pool de procesos.
+
+ReportLab es Python puro y ocupa la CPU (y el GIL) mientras dibuja. Bajo
+daphne eso bloquea el pool de hilos de las vistas síncronas y deja sin
+turno a los consumers de WebSocket del mismo proceso. Aquí el dibujo se
+hace en procesos aparte; el proceso web solo extrae los datos de la base,
+envía el trabajo y espera el resultado (bloqueado en un lock, sin el GIL):
+
+    from core.render_pdf import renderizar
+    contenido = renderizar(render_comprobante, datos)
+
+La función de render debe ser una función de módulo (se serializa por
+nombre) que recibe tipos simples y devuelve bytes; no debe tocar la base.
+
+- Cola acotada: como máximo PDF_RENDER_MAX_PENDIENTES trabajos en curso o
+  en espera por proceso web; más allá se lanza RenderSaturado (→ 503).
+- Timeout por trabajo (PDF_RENDER_TIMEOUT): quien espera recibe
+  RenderTimeout. Si el trabajo todavía esperaba se cancela; si ya corría,
+  cancel() no lo detiene y retendría su worker y su cupo, así que se
+  descarta el pool y se terminan sus procesos (los otros renders en curso
+  reciben RenderError). El próximo envío arranca un pool nuevo.
+- Los workers se reciclan cada PDF_RENDER_TAREAS_POR_WORKER trabajos.
+- PDF_RENDER_WORKERS=0 renderiza en el propio proceso (tests, entornos
+  sin multiprocessing).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RenderError(Exception):
+    """El render no se pudo completar"""
+
+
+class RenderSaturado(RenderError):
+    """La cola de render está llena"""
+
+
+class RenderTimeout(RenderError):
+    """El render superó el tiempo máximo"""
+
+
+_pool = None
+_cupos = None
+_lock = threading.Lock()
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def _inicializar_worker(settings_module):
+    # Los renders pueden usar utilidades de Django (timezone, settings)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _obtener_pool():
+    global _pool, _cupos
+    with _lock:
+        if _pool is None:
+            _cupos = threading.BoundedSemaphore(_config('PDF_RENDER_MAX_PENDIENTES', 16))
+            _pool = ProcessPoolExecutor(
+                max_workers=_config('PDF_RENDER_WORKERS', 2),
+                # spawn: no se heredan hilos, locks ni conexiones del proceso web
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),),
+                max_tasks_per_child=_config('PDF_RENDER_TAREAS_POR_WORKER', 200),
+            )
+        return _pool, _cupos
+
+
+def _descartar_pool(pool, terminar=False):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    # shutdown no detiene lo que ya corre: terminar=True mata los procesos
+    procesos = list((pool._processes or {}).values()) if terminar else []
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proceso in procesos:
+        proceso.terminate()
+
+
+def cerrar():
+    """Detiene el pool esperando los trabajos en curso; el próximo envío crea otro"""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _enviar(funcion, args, esperar_cupo=False):
+    pool, cupos = _obtener_pool()
+    if not cupos.acquire(blocking=esperar_cupo):
+        raise RenderSaturado('Hay demasiados PDF en proceso; intenta de nuevo en unos segundos')
+    try:
+        futuro = pool.submit(funcion, *args)
+    except BrokenProcessPool:
+        cupos.release()
+        _descartar_pool(pool)
+        raise RenderError('El pool de render se reinició; intenta de nuevo')
+    except BaseException:
+        cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: cupos.release())
+    return pool, futuro
+
+
+def enviar(funcion, *args):
+    """
+    Envía `funcion(*args)` al pool y devuelve el Future. Lanza RenderSaturado
+    si ya hay PDF_RENDER_MAX_PENDIENTES trabajos pendientes.
+    """
+    return _enviar(funcion, args)[1]
+
+
+def _timeout(timeout):
+    timeout = _config('PDF_RENDER_TIMEOUT', 30) if timeout is None else timeout
+    return timeout or None
+
+
+def renderizar(funcion, *args, timeout=None, esperar_cupo=False):
+    """
+    Ejecuta el render en el pool y espera los bytes (bloquea sin el GIL).
+    timeout=0 espera sin límite; esperar_cupo=True espera turno en vez de
+    lanzar RenderSaturado (trabajos en segundo plano).
+    """
+    if not _config('PDF_RENDER_WORKERS', 2):
+        return funcion(*args)
+
+    timeout = _timeout(timeout)
+    pool, futuro = _enviar(funcion, args, esperar_cupo)
+    try:
+        return futuro.result(timeout=timeout)
+    except FuturesTimeout:
+        if not futuro.cancel():
+            # Ya corría: un render colgado no devolvería nunca su worker
+            _descartar_pool(pool, terminar=True)
+        logger.warning(f'⏱️ Render {funcion.__name__} superó {timeout}s')
+        raise RenderTimeout(f'El PDF tardó más de {timeout}s en generarse')
+    except BrokenProcessPool:
+        _descartar_pool(pool)
+        raise RenderError('Un proceso de render terminó inesperadamente')
+
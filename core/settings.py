@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -68,9 +69,12 @@ INSTALLED_APPS = [
     'reportes_dinamicos',
     'promociones',
     'notificaciones',
+    'monitoreo',
 ]
 
 MIDDLEWARE = [
+    # Primero: mide el tiempo total del resto de la cadena
+    'monitoreo.middleware.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -79,6 +83,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'monitoreo.middleware.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -147,6 +152,10 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Zona horaria de la tienda: define dónde empieza y termina "un día" en
+# reportes, series y entrenamiento del modelo (ver reportes/ventanas.py)
+STORE_TIME_ZONE = os.environ.get('STORE_TIME_ZONE', TIME_ZONE)
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -157,6 +166,49 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
+# Exportaciones del admin (compra/exportaciones.py)
+# - EXPORTACIONES_EN_PROCESO: generar en un pool de hilos del propio proceso web;
+#   en False quedan pendientes para `manage.py procesar_exportaciones`
+# - EXPORTACIONES_WORKERS: hilos del pool (compartido con los comprobantes PDF)
+# - EXPORTACIONES_TIMEOUT: segundos tras los que una exportación en curso o
+#   sin tomar se da por perdida y `procesar_exportaciones` la reintenta
+EXPORTACIONES_EN_PROCESO = os.environ.get('EXPORTACIONES_EN_PROCESO', 'True').lower() in ('1', 'true', 'yes')
+EXPORTACIONES_WORKERS = int(os.environ.get('EXPORTACIONES_WORKERS', '2'))
+EXPORTACIONES_TIMEOUT = int(os.environ.get('EXPORTACIONES_TIMEOUT', '1800'))
+# Generar el comprobante PDF en segundo plano al confirmarse el pago
+# (si no, se genera en la primera descarga)
+COMPROBANTES_AL_PAGAR = os.environ.get('COMPROBANTES_AL_PAGAR', 'True').lower() in ('1', 'true', 'yes')
+
+# Render de PDF en procesos aparte (core/render_pdf.py)
+# - PDF_RENDER_WORKERS: procesos del pool; 0 renderiza en el propio proceso web
+# - PDF_RENDER_MAX_PENDIENTES: trabajos en curso o en cola antes de responder 503
+# - PDF_RENDER_TIMEOUT: segundos que una vista espera un PDF
+# - PDF_RENDER_TAREAS_POR_WORKER: trabajos antes de reciclar un proceso
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', '2'))
+PDF_RENDER_MAX_PENDIENTES = int(os.environ.get('PDF_RENDER_MAX_PENDIENTES', '16'))
+PDF_RENDER_TIMEOUT = float(os.environ.get('PDF_RENDER_TIMEOUT', '30'))
+PDF_RENDER_TAREAS_POR_WORKER = int(os.environ.get('PDF_RENDER_TAREAS_POR_WORKER', '200'))
+# Filas máximas de la tabla de un reporte PDF (ia/generador_reportes.py);
+# el resto se ofrece en CSV/Excel. 0 = sin límite
+PDF_MAX_FILAS = int(os.environ.get('PDF_MAX_FILAS', '5000'))
+# Vigencia (segundos) de los enlaces de descarga de reportes dinámicos
+# (reportes_dinamicos/entrega.py)
+REPORTES_URL_TTL = int(os.environ.get('REPORTES_URL_TTL', '600'))
+# Hilos para las secciones independientes de los reportes compuestos
+# (reportes_dinamicos/ejecutor.py); 0 = en serie
+REPORTES_SECCIONES_WORKERS = int(os.environ.get('REPORTES_SECCIONES_WORKERS', '4'))
+# Segundos que cada proceso reutiliza el índice de promociones vigentes
+# (promociones/vigentes.py) sin enterarse de cambios de otros workers; 0 = no usarlo
+PROMOCIONES_SNAPSHOT_TTL = int(os.environ.get('PROMOCIONES_SNAPSHOT_TTL', '30'))
+# Devoluciones por llamada a los endpoints masivos (promociones/devoluciones.py)
+DEVOLUCIONES_LOTE_MAX = int(os.environ.get('DEVOLUCIONES_LOTE_MAX', '1000'))
+# Campañas de aviso de promociones nuevas (promociones/campanas.py), las envía
+# `manage.py enviar_campanas`
+# - PROMOCIONES_CAMPANA_LOTE: clientes por lote
+# - PROMOCIONES_CAMPANA_INTERVALO: segundos mínimos entre lotes de una campaña
+PROMOCIONES_CAMPANA_LOTE = int(os.environ.get('PROMOCIONES_CAMPANA_LOTE', '200'))
+PROMOCIONES_CAMPANA_INTERVALO = float(os.environ.get('PROMOCIONES_CAMPANA_INTERVALO', '2'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -166,9 +218,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # Django REST Framework
+# - Token y JWT resuelven el usuario desde caché (usuarios/authentication.py)
+# - Basic auth se mantiene para clientes existentes (PBKDF2 en cada request, sin caché)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'usuarios.authentication.CachedTokenAuthentication',
+        'usuarios.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -180,6 +235,21 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# JWT (simplejwt): modo sin estado para HTTP y WebSocket
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('JWT_ACCESS_MINUTES', '30'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.environ.get('JWT_REFRESH_DAYS', '7'))),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
+# Caché de autenticación (token/JWT -> usuario)
+# - AUTH_CACHE_TTL: segundos que una entrada vive en el LRU de cada proceso
+# - AUTH_CACHE_ALIAS: alias de CACHES compartido entre workers (vacío = solo local)
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', '60'))
+AUTH_CACHE_ALIAS = os.environ.get('AUTH_CACHE_ALIAS', '')
+AUTH_CACHE_SHARED_TTL = int(os.environ.get('AUTH_CACHE_SHARED_TTL', '300'))
+
 # drf-spectacular
 SPECTACULAR_SETTINGS = {
     'TITLE': 'SmartSales365 API',
@@ -221,6 +291,7 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+CORS_EXPOSE_HEADERS = ['Server-Timing']
 # Stripe / pagos
 # Usa STRIPE_SECRET_KEY (recomendado). Mantiene compatibilidad con STRIPE_API_KEY
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', os.environ.get('STRIPE_API_KEY', ''))
@@ -236,6 +307,34 @@ VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY', '')
 VAPID_CLAIMS = {
     "sub": f"mailto:{os.environ.get('VAPID_ADMIN_EMAIL', 'admin@smartsales365.com')}"
 }
+# La primera actualización push de un usuario y Topic (p. ej. el estado de un pedido)
+# sale ya; las siguientes dentro de esta ventana se funden en la última
+# (notificaciones/entrega.py); 0 = no agrupar
+PUSH_AGRUPAR_SEGUNDOS = float(os.environ.get('PUSH_AGRUPAR_SEGUNDOS', '10'))
+# Salud de las suscripciones push (notificaciones/salud.py)
+# - PUSH_TIMEOUT: segundos máximos por envío al servicio push
+# - PUSH_FALLOS_MAX: fallos seguidos (timeouts, 5xx) antes de desactivar la suscripción
+# - PUSH_BACKOFF_BASE / PUSH_BACKOFF_MAX: segundos sin enviarle tras un fallo (se duplica por fallo)
+PUSH_TIMEOUT = float(os.environ.get('PUSH_TIMEOUT', '10'))
+PUSH_FALLOS_MAX = int(os.environ.get('PUSH_FALLOS_MAX', '8'))
+PUSH_BACKOFF_BASE = int(os.environ.get('PUSH_BACKOFF_BASE', '300'))
+PUSH_BACKOFF_MAX = int(os.environ.get('PUSH_BACKOFF_MAX', str(24 * 60 * 60)))
+
+# Instrumentación de requests (monitoreo): Server-Timing + /metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', 'True').lower() in ('1', 'true', 'yes')
+
+# Perfilador por muestreo (monitoreo): apagado por defecto
+# - Staff: header X-Profile: 1 o ?_profile=1
+# - Muestreo: fracción de requests a PROFILER_VISTAS que superen PROFILER_SLOW_MS
+# - Límites: pedidos manuales por cliente y minuto, perfiles simultáneos por proceso
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+PROFILER_VISTAS = _csv_env('PROFILER_VISTAS', 'ia-consulta,reportes-dinamicos-avanzados,ia-dashboard')
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', '0.05'))
+PROFILER_SLOW_MS = float(os.environ.get('PROFILER_SLOW_MS', '2000'))
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', '5'))
+PROFILER_MAX_POR_MINUTO = int(os.environ.get('PROFILER_MAX_POR_MINUTO', '6'))
+PROFILER_MAX_CONCURRENTES = int(os.environ.get('PROFILER_MAX_CONCURRENTES', '2'))
 
 # Logging configuration
 LOGGING = {
@@ -21,10 +21,15 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from django.contrib.admin.views.decorators import staff_member_required
+from monitoreo.views import MetricasView
 from . import views
 
 urlpatterns = [
     path('', views.home_view, name='home'),
+    # Swagger dentro del admin (solo staff). Va antes de admin/: el admin
+    # responde 404 a cualquier ruta propia que no reconoce.
+    path('admin/api/schema/', staff_member_required(SpectacularAPIView.as_view()), name='admin-schema'),
+    path('admin/api/docs/', staff_member_required(SpectacularSwaggerView.as_view(url_name='admin-schema')), name='admin-swagger-ui'),
     path('admin/', admin.site.urls),
     path('api/usuarios/', include('usuarios.urls')),
     path('api/clientes/', include('clientes.urls')),
@@ -38,12 +43,11 @@ urlpatterns = [
     path('api/promociones/', include('promociones.urls')),
     path('api/notificaciones/', include('notificaciones.urls')),
     path('api/auth/', include('rest_framework.urls')),
+    # Métricas Prometheus (solo staff)
+    path('metrics', MetricasView.as_view(), name='metrics'),
     # API schema & docs
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    # Swagger dentro del admin (solo staff)
-    path('admin/api/schema/', staff_member_required(SpectacularAPIView.as_view()), name='admin-schema'),
-    path('admin/api/docs/', staff_member_required(SpectacularSwaggerView.as_view(url_name='admin-schema')), name='admin-swagger-ui'),
 ]
 
 if settings.DEBUG:
@@ -1,14 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.template.response import TemplateResponse
 from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Sum
 from datetime import timedelta, date
 from django.utils.html import format_html
 import time
 
 from .models import PrediccionAdminEntry, ConsultaIA, ReporteGenerado
-from compra.models import Compra
+from reportes.series import serie_ventas
+from reportes.ventanas import Ventana
 from .interprete import InterpretadorPrompt, GeneradorConsultas
 from .generador_reportes import GeneradorReportes
 
@@ -32,19 +32,18 @@ class PrediccionAdmin(admin.ModelAdmin):
 		dias_forecast = int(request.GET.get('dias_forecast', 7) or 7)
 		ventana = int(request.GET.get('ventana', 7) or 7)  # para media móvil
 
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias_hist)
-		qs = (
-			Compra.objects.filter(fecha__date__gte=inicio)
-			.values('fecha__date')
-			.annotate(total=Sum('total'))
-		)
-		# Series diarias completas (relleno con 0)
-		historico = []
-		tot_map = {r['fecha__date']: r['total'] or 0 for r in qs}
-		for i in range(dias_hist + 1):
-			d = inicio + timedelta(days=i)
-			historico.append({'fecha': d, 'total': float(tot_map.get(d, 0))})
+		ventana_hist = Ventana.ultimos_dias(dias_hist)
+		# Series diarias completas (relleno con 0 en la base)
+		try:
+			totales = serie_ventas(ventana_hist, 'dia')['total']
+		except ValueError as e:
+			# Ventana por encima de MAX_BUCKETS: se avisa y se muestran 30 días
+			self.message_user(request, f'dias_hist inválido: {e}', level=messages.WARNING)
+			dias_hist = 30
+			ventana_hist = Ventana.ultimos_dias(dias_hist)
+			totales = serie_ventas(ventana_hist, 'dia')['total']
+		hoy = ventana_hist.hasta
+		historico = [{'fecha': d, 'total': total} for d, total in zip(ventana_hist.dias(), totales)]
 
 		# Predicción simple: media móvil de 'ventana' días
 		forecast = []
@@ -8,11 +8,26 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from django.conf import settings
 from django.utils import timezone
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 import csv
 
+from core.render_pdf import renderizar
+
+# Tablas del PDF (GeneradorReportes._tablas_pdf): alto fijo por fila y
+# filas de muestra para calcular el ancho de las columnas
+ALTO_ENCABEZADO = 30
+ALTO_FILA = 22
+MUESTRA_ANCHOS = 200
+
+
+def render_pdf(clase, datos_consulta, interpretacion, *extra):
+    """Dibuja el PDF de `clase` en un worker del pool de render; devuelve los bytes"""
+    return clase(datos_consulta, interpretacion, *extra).dibujar_pdf()
+
 
 class GeneradorReportes:
     """
@@ -66,6 +81,18 @@ class GeneradorReportes:
     
     def generar_pdf(self):
         """Genera reporte en PDF"""
+        return BytesIO(self._renderizar_pdf())
+
+    def _renderizar_pdf(self):
+        # El dibujo corre en otro proceso (core/render_pdf.py): puede lanzar RenderError
+        return renderizar(render_pdf, type(self), self.datos, self.params, *self._args_pdf())
+
+    def _args_pdf(self):
+        """Argumentos extra del constructor que necesita el worker"""
+        return ()
+
+    def dibujar_pdf(self):
+        """Bytes del PDF, dibujados en este proceso"""
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
         
@@ -106,28 +133,81 @@ class GeneradorReportes:
         if not self.datos.get('datos'):
             elements.append(Paragraph("No se encontraron datos para este reporte", styles['Normal']))
             doc.build(elements)
-            buffer.seek(0)
-            return buffer
+            return buffer.getvalue()
         
-        # Crear tabla
+        # Tabla por bloques de una página (ver _tablas_pdf)
         columnas = self.datos.get('columnas', [])
-        datos_tabla = []
-        
-        # Encabezados
-        headers = [col.replace('_', ' ').title() for col in columnas]
-        datos_tabla.append(headers)
-        
-        # Datos
-        for fila in self.datos['datos']:
-            if isinstance(fila, dict):
-                row = [str(fila.get(col, '')) for col in columnas]
-                datos_tabla.append(row)
+        filas = [fila for fila in self.datos['datos'] if isinstance(fila, dict)]
+        limite = getattr(settings, 'PDF_MAX_FILAS', 5000)
+        if limite and len(filas) > limite:
+            aviso_style = ParagraphStyle(
+                'Aviso',
+                parent=styles['Normal'],
+                fontSize=10,
+                textColor=colors.HexColor('#c0392b'),
+                spaceAfter=10,
+            )
+            elements.append(Paragraph(
+                f"Se muestran las primeras {limite:,} de {len(filas):,} filas. "
+                "Para el listado completo genera el reporte en CSV o Excel.",
+                aviso_style
+            ))
+            filas = filas[:limite]
+
+        alto_usado = 0
+        for elemento in elements:
+            alto_usado += elemento.wrap(doc.width, doc.height)[1] + elemento.getSpaceBefore() + elemento.getSpaceAfter()
+        elements.extend(self._tablas_pdf(doc, columnas, filas, alto_usado))
         
-        # Crear tabla
-        tabla = Table(datos_tabla, repeatRows=1)
+        # Resumen si hay métricas
+        if len(self.datos['datos']) > 0:
+            elements.append(Spacer(1, 0.3*inch))
+            resumen_style = ParagraphStyle(
+                'Resumen',
+                parent=styles['Normal'],
+                fontSize=10,
+                textColor=colors.HexColor('#2c3e50'),
+                spaceAfter=6,
+                fontName='Helvetica-Bold'
+            )
+            elements.append(Paragraph(f"Total de registros: {len(self.datos['datos'])}", resumen_style))
+            # Resumen detallado para inventario
+            if self.params.get('tipo_reporte') == 'inventario':
+                try:
+                    total_stock = sum(int(f.get('stock', 0)) for f in self.datos['datos'])
+                    total_valor = sum(float(f.get('valor_inventario', 0)) for f in self.datos['datos'])
+                    elements.append(Paragraph(f"Stock total: {total_stock}", styles['Normal']))
+                    elements.append(Paragraph(f"Valor total de inventario: ${total_valor:,.2f}", styles['Normal']))
+                except Exception:
+                    pass
         
-        # Estilo de tabla
-        tabla.setStyle(TableStyle([
+        # Construir PDF
+        doc.build(elements)
+        return buffer.getvalue()
+    
+    def _tablas_pdf(self, doc, columnas, filas, alto_usado):
+        """
+        Una Table por página en lugar de una sola con todas las filas: el
+        costo de maquetar y partir una Table crece más que linealmente con sus
+        filas. Anchos y altos se calculan una vez (sobre una muestra), así
+        platypus no mide cada celda; el encabezado se repite en cada bloque.
+        """
+        headers = [col.replace('_', ' ').title() for col in columnas]
+        muestra = filas[:MUESTRA_ANCHOS]
+
+        # Ancho natural de cada columna, acotado y escalado al ancho útil
+        anchos = []
+        for col, header in zip(columnas, headers):
+            ancho = stringWidth(header, 'Helvetica-Bold', 11)
+            for fila in muestra:
+                ancho = max(ancho, stringWidth(str(fila.get(col, '')), 'Helvetica', 9))
+            anchos.append(min(max(ancho + 12, 40), doc.width / 2))
+        escala = min(1, doc.width / sum(anchos)) if anchos else 1
+        anchos = [ancho * escala for ancho in anchos]
+        # Caracteres que caben por columna (Helvetica 9 ≈ 4.5 pt por carácter)
+        maximos = [max(int((ancho - 12) / 4.5), 4) for ancho in anchos]
+
+        estilo = TableStyle([
             # Encabezado
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -151,36 +231,38 @@ class GeneradorReportes:
             
             # Filas alternas
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#ecf0f1')]),
-        ]))
-        
-        elements.append(tabla)
-        
-        # Resumen si hay métricas
-        if len(self.datos['datos']) > 0:
-            elements.append(Spacer(1, 0.3*inch))
-            resumen_style = ParagraphStyle(
-                'Resumen',
-                parent=styles['Normal'],
-                fontSize=10,
-                textColor=colors.HexColor('#2c3e50'),
-                spaceAfter=6,
-                fontName='Helvetica-Bold'
+        ])
+
+        # El frame deja 6 pt de margen arriba y abajo
+        disponible = doc.height - 12 - ALTO_ENCABEZADO
+        por_pagina = max(int(disponible // ALTO_FILA), 1)
+        # Una fila de holgura: el alto de los párrafos previos es aproximado
+        primera = int((disponible - alto_usado) // ALTO_FILA) - 1
+        if primera < 1:
+            primera = por_pagina
+
+        tablas = []
+        inicio = 0
+        tamano = primera
+        while inicio < len(filas) or not tablas:
+            bloque = [headers]
+            for fila in filas[inicio:inicio + tamano]:
+                row = []
+                for col, maximo in zip(columnas, maximos):
+                    texto = str(fila.get(col, ''))
+                    row.append(texto if len(texto) <= maximo else texto[:maximo - 1] + '…')
+                bloque.append(row)
+            tabla = Table(
+                bloque,
+                colWidths=anchos,
+                rowHeights=[ALTO_ENCABEZADO] + [ALTO_FILA] * (len(bloque) - 1),
+                repeatRows=1,
             )
-            elements.append(Paragraph(f"Total de registros: {len(self.datos['datos'])}", resumen_style))
-            # Resumen detallado para inventario
-            if self.params.get('tipo_reporte') == 'inventario':
-                try:
-                    total_stock = sum(int(f.get('stock', 0)) for f in self.datos['datos'])
-                    total_valor = sum(float(f.get('valor_inventario', 0)) for f in self.datos['datos'])
-                    elements.append(Paragraph(f"Stock total: {total_stock}", styles['Normal']))
-                    elements.append(Paragraph(f"Valor total de inventario: ${total_valor:,.2f}", styles['Normal']))
-                except Exception:
-                    pass
-        
-        # Construir PDF
-        doc.build(elements)
-        buffer.seek(0)
-        return buffer
+            tabla.setStyle(estilo)
+            tablas.append(tabla)
+            inicio += tamano
+            tamano = por_pagina
+        return tablas
     
     def generar_excel(self):
         """Genera reporte en Excel"""
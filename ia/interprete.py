@@ -6,6 +6,7 @@ import re
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 from django.db.models import Q, Sum, Count, Avg, Max, Min, F
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -389,6 +390,44 @@ class GeneradorConsultas:
         if self.params['fecha_fin']:
             queryset = queryset.filter(**{f'{campo}__lte': self.params['fecha_fin']})
         return queryset
+
+    def _metricas_clientes(self, pagado_por_defecto=None, por_total=None):
+        """
+        Agregados por cliente desde la tabla materializada MetricasCliente
+        (lectura indexada, sin recorrer compras). Devuelve None cuando la
+        consulta no se puede responder con ella: filtros de fecha o solo
+        compras sin pagar; en ese caso se agrega sobre las compras.
+        """
+        from clientes.models import MetricasCliente
+
+        if self.params['fecha_inicio'] or self.params['fecha_fin']:
+            return None
+        pagado = self.params['filtros'].get('pagado', pagado_por_defecto)
+        if pagado is False:
+            return None
+
+        if pagado:
+            cantidad, total, primera, ultima = 'compras_pagadas', 'total_pagado', 'primera_compra_pagada', 'ultima_compra_pagada'
+        else:
+            cantidad, total, primera, ultima = 'cantidad_compras', 'total_comprado', 'primera_compra', 'ultima_compra'
+
+        queryset = MetricasCliente.objects.filter(**{f'{cantidad}__gt': 0}).values(
+            'cliente__nombre',
+            'cliente__email',
+            'cliente__telefono',
+            numero_compras=F(cantidad),
+            monto_total=F(total),
+            fecha_primera=F(primera),
+            fecha_ultima=F(ultima),
+        )
+        if por_total is None:
+            por_total = self.params['orden'] == '-total'
+        queryset = queryset.order_by(f'-{total}' if por_total else 'cliente__nombre')
+
+        if self.params['limite']:
+            queryset = queryset[:self.params['limite']]
+        # Mismas claves que la agregación sobre compras
+        return [{**fila, 'cantidad_compras': fila['numero_compras']} for fila in queryset]
     
     def _consulta_ventas(self):
         """Genera reporte de ventas"""
@@ -476,8 +515,29 @@ class GeneradorConsultas:
             }
 
             # Obtener fecha actual para calcular días desde última compra
-            from django.utils import timezone
-            hoy = timezone.now().date()
+            from reportes.ventanas import dia_local, hoy as hoy_tienda
+            hoy = hoy_tienda()
+
+            metricas = self._metricas_clientes()
+            if metricas is not None:
+                for item in metricas:
+                    cantidad = item['cantidad_compras']
+                    total = item['monto_total'] or 0
+                    primera = dia_local(item['fecha_primera']) if item['fecha_primera'] else None
+                    ultima = dia_local(item['fecha_ultima']) if item['fecha_ultima'] else None
+                    resultado['datos'].append({
+                        'cliente': item['cliente__nombre'],
+                        'email': item['cliente__email'],
+                        'telefono': item['cliente__telefono'] or 'Sin teléfono',
+                        'cantidad_compras': cantidad,
+                        'total_pagado': float(total),
+                        'promedio_compra': float(total) / cantidad if cantidad else 0.0,
+                        'fecha_primera_compra': primera.strftime('%Y-%m-%d') if primera else None,
+                        'fecha_ultima_compra': ultima.strftime('%Y-%m-%d') if ultima else None,
+                        'dias_desde_ultima_compra': (hoy - ultima).days if ultima else None,
+                        'rango_fechas': f"{primera.strftime('%d/%m/%Y') if primera else 'N/A'} - {ultima.strftime('%d/%m/%Y') if ultima else 'N/A'}"
+                    })
+                return resultado
 
             datos = queryset.values(
                 'cliente__nombre',
@@ -498,11 +558,7 @@ class GeneradorConsultas:
                 # Calcular días desde última compra
                 dias_desde_ultima = None
                 if item['fecha_ultima_compra']:
-                    fecha_ultima = item['fecha_ultima_compra'].date() if hasattr(item['fecha_ultima_compra'], 'date') else item['fecha_ultima_compra']
-                    if isinstance(fecha_ultima, str):
-                        from datetime import datetime
-                        fecha_ultima = datetime.fromisoformat(fecha_ultima.replace('Z', '+00:00')).date()
-                    dias_desde_ultima = (hoy - fecha_ultima).days
+                    dias_desde_ultima = (hoy - dia_local(item['fecha_ultima_compra'])).days
 
                 resultado['datos'].append({
                     'cliente': item['cliente__nombre'],
@@ -589,10 +645,13 @@ class GeneradorConsultas:
             'datos': []
         }
         
+        # Totales desde MetricasCliente (los clientes sin compras no tienen fila)
         datos = queryset.annotate(
-            total_compras=Count('compras'),
-            monto_total=Sum('compras__total')
-        ).order_by('-monto_total' if self.params['orden'] == '-total' else 'nombre')
+            total_compras=Coalesce('metricas__cantidad_compras', 0),
+            monto_total=F('metricas__total_comprado'),
+        ).order_by(
+            F('monto_total').desc(nulls_last=True) if self.params['orden'] == '-total' else 'nombre'
+        )
         
         if self.params['limite']:
             datos = datos[:self.params['limite']]
@@ -614,7 +673,7 @@ class GeneradorConsultas:
         from compra.models import CompraItem
 
         # Base queryset con productos activos
-        productos = Producto.objects.filter(activo=True)
+        productos = Producto.objects.select_related('categoria').filter(activo=True)
 
         resultado = {
             'tipo': 'productos',
@@ -668,7 +727,7 @@ class GeneradorConsultas:
         """Genera reporte de inventario"""
         from productos.models import Producto
         
-        queryset = Producto.objects.filter(activo=True)
+        queryset = Producto.objects.select_related('categoria').filter(activo=True)
         
         resultado = {
             'tipo': 'inventario',
@@ -713,18 +772,21 @@ class GeneradorConsultas:
             'datos': []
         }
 
-        datos = queryset.values(
-            'cliente__nombre',
-            'cliente__email'
-        ).annotate(
-            cantidad_compras=Count('id'),
-            monto_total=Sum('total'),
-            fecha_primera=Min('fecha'),
-            fecha_ultima=Max('fecha')
-        ).order_by('-monto_total')
+        # Sin filtro de fechas los agregados salen de MetricasCliente
+        datos = self._metricas_clientes(pagado_por_defecto=True, por_total=True)
+        if datos is None:
+            datos = queryset.values(
+                'cliente__nombre',
+                'cliente__email'
+            ).annotate(
+                cantidad_compras=Count('id'),
+                monto_total=Sum('total'),
+                fecha_primera=Min('fecha'),
+                fecha_ultima=Max('fecha')
+            ).order_by('-monto_total')
 
-        if self.params['limite']:
-            datos = datos[:self.params['limite']]
+            if self.params['limite']:
+                datos = datos[:self.params['limite']]
 
         for item in datos:
             # Formatear rango de fechas
@@ -750,7 +812,7 @@ class GeneradorConsultas:
         from compra.models import CompraItem
 
         # Base con productos activos
-        productos = Producto.objects.filter(activo=True)
+        productos = Producto.objects.select_related('categoria').filter(activo=True)
 
         resultado = {
             'tipo': 'top_productos',
@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg
+from django.db.models import Avg
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
@@ -65,7 +65,7 @@ class ModeloPrediccionVentas:
         Returns:
             DataFrame con features y target
         """
-        from compra.models import Compra
+        from reportes.ventanas import Ventana, totales_por_dia
 
         # Asegurar que dias_historico sea un entero
         if isinstance(dias_historico, (tuple, list)):
@@ -82,24 +82,16 @@ class ModeloPrediccionVentas:
             except (TypeError, ValueError):
                 dias_historico = 90
 
-        hoy = timezone.now().date()
-        inicio = hoy - timedelta(days=dias_historico)
-        
-        # Obtener datos históricos diarios
-        compras = Compra.objects.filter(
-            fecha__date__gte=inicio
-        ).values('fecha__date').annotate(
-            total=Sum('total'),
-            cantidad=Count('id')
-        ).order_by('fecha__date')
+        # Obtener datos históricos diarios (días locales de la tienda)
+        compras = totales_por_dia(Ventana.ultimos_dias(dias_historico))
         
         if len(compras) < 3:
             logger.warning(f"Solo {len(compras)} días de datos. Se necesitan al menos 3 días.")
             return None
         
         # Convertir a DataFrame
-        df = pd.DataFrame(list(compras))
-        df['fecha'] = pd.to_datetime(df['fecha__date'])
+        df = pd.DataFrame(compras)
+        df['fecha'] = pd.to_datetime(df['dia'])
         df = df.sort_values('fecha').reset_index(drop=True)
 
         # Convertir Decimal a float para evitar errores de tipos
@@ -275,25 +267,18 @@ class ModeloPrediccionVentas:
                 }
         
         try:
-            from compra.models import Compra
+            from reportes.ventanas import Ventana, hoy, totales_por_dia
             
             if fecha_inicio is None:
-                fecha_inicio = timezone.now().date()
+                fecha_inicio = hoy()
             
-            # Obtener últimos 7 días para calcular media móvil
-            inicio_hist = fecha_inicio - timedelta(days=7)
-            compras_hist = Compra.objects.filter(
-                fecha__date__gte=inicio_hist,
-                fecha__date__lt=fecha_inicio
-            ).values('fecha__date').annotate(
-                total=Sum('total'),
-                cantidad=Count('id')
-            ).order_by('fecha__date')
+            # Obtener últimos 7 días (sin incluir fecha_inicio) para calcular media móvil
+            compras_hist = totales_por_dia(Ventana(fecha_inicio - timedelta(days=7), fecha_inicio - timedelta(days=1)))
             
             # Preparar datos históricos para calcular features
-            df_hist = pd.DataFrame(list(compras_hist))
+            df_hist = pd.DataFrame(compras_hist)
             if len(df_hist) > 0:
-                df_hist['fecha'] = pd.to_datetime(df_hist['fecha__date'])
+                df_hist['fecha'] = pd.to_datetime(df_hist['dia'])
                 df_hist = df_hist.sort_values('fecha').reset_index(drop=True)
                 # Convertir Decimal a float
                 df_hist['total'] = df_hist['total'].astype(float)
@@ -307,13 +292,12 @@ class ModeloPrediccionVentas:
                 std_movil = 0
                 cantidad_prom = 0
             
-            predicciones = []
+            fechas = [fecha_inicio + timedelta(days=i) for i in range(1, dias_futuros + 1)]
             
-            for i in range(1, dias_futuros + 1):
-                fecha_pred = fecha_inicio + timedelta(days=i)
-                
-                # Preparar features para esta fecha
-                features = np.array([[
+            # Features de todas las fechas: una sola llamada a predict (cada
+            # llamada reparte el trabajo entre los hilos del bosque)
+            features = np.array([
+                [
                     fecha_pred.weekday(),  # dia_semana
                     fecha_pred.day,  # dia_mes
                     fecha_pred.month,  # mes
@@ -321,17 +305,19 @@ class ModeloPrediccionVentas:
                     media_movil,  # media_movil_7
                     std_movil,  # std_movil_7
                     cantidad_prom  # cantidad
-                ]])
-                
-                # Predecir
-                pred = self.model.predict(features)[0]
-                pred = max(0, pred)  # No puede ser negativo
-                
-                predicciones.append({
+                ]
+                for fecha_pred in fechas
+            ]).reshape(-1, 7)
+            valores = self.model.predict(features) if fechas else []
+            
+            predicciones = [
+                {
                     'fecha': fecha_pred.isoformat(),
-                    'total_predicho': round(float(pred), 2),
+                    'total_predicho': round(float(max(0, pred)), 2),  # No puede ser negativo
                     'tipo': 'prediccion'
-                })
+                }
+                for fecha_pred, pred in zip(fechas, valores)
+            ]
             
             return {
                 'success': True,
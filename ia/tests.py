@@ -1,3 +1,33 @@
-from django.test import TestCase
+import re
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from .generador_reportes import GeneradorReportes
+
+
+def _paginas(contenido):
+    return len(re.findall(rb'/Type /Page\b', contenido))
+
+
+class GeneradorReportesPdfTests(SimpleTestCase):
+    """La tabla del PDF se arma por páginas y se corta en PDF_MAX_FILAS"""
+
+    interpretacion = {'tipo_reporte': 'ventas', 'fecha_inicio': None, 'fecha_fin': None, 'agrupar_por': []}
+
+    def _generador(self, filas):
+        datos = {
+            'columnas': ['producto', 'total'],
+            'datos': [{'producto': f'Producto {i} ' + 'x' * (i % 90), 'total': f'{i}.00'} for i in range(filas)],
+        }
+        return GeneradorReportes(datos, self.interpretacion)
+
+    @override_settings(PDF_MAX_FILAS=0)
+    def test_una_tabla_por_pagina(self):
+        contenido = self._generador(100).dibujar_pdf()
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        # 30 filas por página completa, menos en la primera (título)
+        self.assertEqual(_paginas(contenido), 4)
+
+    @override_settings(PDF_MAX_FILAS=10)
+    def test_limite_de_filas(self):
+        self.assertEqual(_paginas(self._generador(100).dibujar_pdf()), 1)
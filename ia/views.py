@@ -9,11 +9,14 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExampl
 from drf_spectacular.types import OpenApiTypes
 import time
 
+from core.render_pdf import RenderError
 from .interprete import InterpretadorPrompt, GeneradorConsultas
 from .generador_reportes import GeneradorReportes
 from .models import ConsultaIA
 from .modelo_ml import ModeloPrediccionVentas
-from compra.models import Compra
+from compra.models import Compra, CompraItem
+from reportes.series import como_puntos, serie_ventas
+from reportes.ventanas import Ventana, hoy as hoy_tienda
 
 
 class HealthView(APIView):
@@ -240,6 +243,10 @@ class ConsultaIAView(APIView):
 				
 				return response
 		
+		except RenderError as e:
+			# Pool de render lleno o lento: el cliente puede reintentar
+			return Response({'detail': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+		
 		except Exception as e:
 			# Guardar error
 			ConsultaIA.objects.create(
@@ -355,34 +362,28 @@ class DashboardPrediccionesView(APIView):
 		categoria = request.query_params.get('categoria', None)
 		entrenar = request.query_params.get('entrenar', 'false').lower() == 'true'
 		
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias_hist)
+		ventana = Ventana.ultimos_dias(dias_hist)
 		
 		# 1. Obtener ventas históricas diarias
-		queryset = Compra.objects.filter(fecha__date__gte=inicio)
+		queryset = Compra.objects.all()
 		
-		# Filtrar por categoría si se especifica
+		# Filtrar por categoría si se especifica. Con un subquery (y no un JOIN
+		# + distinct) una compra con varios ítems de la categoría suma una vez
 		if categoria:
-			queryset = queryset.filter(items__producto__categoria__nombre=categoria).distinct()
+			queryset = queryset.filter(id__in=CompraItem.objects.filter(
+				producto__categoria__nombre=categoria
+			).values('compra_id'))
 		
-		historico_diario = queryset.values('fecha__date').annotate(
-			total=Sum('total'),
-			cantidad=Count('id')
-		).order_by('fecha__date')
-		
-		# Completar días faltantes con 0
-		historico_completo = []
-		tot_map = {r['fecha__date']: r['total'] or 0 for r in historico_diario}
-		cant_map = {r['fecha__date']: r['cantidad'] for r in historico_diario}
-		
-		for i in range(dias_hist + 1):
-			d = inicio + timedelta(days=i)
-			historico_completo.append({
-				'fecha': d.isoformat(),
-				'total': float(tot_map.get(d, 0)),
-				'cantidad': cant_map.get(d, 0),
-				'tipo': 'historico'
-			})
+		# Serie diaria completa con ceros, calculada en la base
+		try:
+			serie = serie_ventas(ventana, 'dia', queryset)
+		except ValueError as e:
+			# dias_hist por encima de MAX_BUCKETS
+			return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+		historico_completo = [
+			{**punto, 'tipo': 'historico'}
+			for punto in como_puntos(serie)
+		]
 		
 		# 2. Obtener predicciones usando RandomForestRegressor
 		modelo = ModeloPrediccionVentas()
@@ -441,7 +442,7 @@ class DashboardPrediccionesView(APIView):
 		
 		# 4. Ventas por categoría (top 5)
 		ventas_categoria = Compra.objects.filter(
-			fecha__date__gte=inicio
+			ventana.filtro()
 		).values(
 			'items__producto__categoria__nombre'
 		).annotate(
@@ -460,7 +461,7 @@ class DashboardPrediccionesView(APIView):
 		
 		# 5. Ventas por cliente (top 5)
 		ventas_cliente = Compra.objects.filter(
-			fecha__date__gte=inicio
+			ventana.filtro()
 		).values(
 			'cliente__nombre'
 		).annotate(
@@ -496,8 +497,8 @@ class DashboardPrediccionesView(APIView):
 			'ventas_por_categoria': categorias_data,
 			'ventas_por_cliente': clientes_data,
 			'periodo': {
-				'inicio': inicio.isoformat(),
-				'fin': hoy.isoformat(),
+				'inicio': ventana.desde.isoformat(),
+				'fin': ventana.hasta.isoformat(),
 				'dias_hist': dias_hist,
 				'dias_pred': dias_pred
 			}
@@ -508,7 +509,7 @@ class DashboardPrediccionesView(APIView):
 		ventana = 7
 		serie = [p['total'] for p in historico]
 		predicciones = []
-		hoy = timezone.now().date()
+		hoy = hoy_tienda()
 		
 		for i in range(1, dias_futuros + 1):
 			ventana_vals = serie[-ventana:] if len(serie) >= ventana else serie
@@ -0,0 +1,85 @@
+"""
+Administración de perfiles de rendimiento en Django Admin.
+"""
+from django.contrib import admin
+from django.http import HttpResponse
+from django.utils.html import format_html, format_html_join
+
+from .models import PerfilRequest
+from .perfilador import a_speedscope
+
+
+@admin.register(PerfilRequest)
+class PerfilRequestAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'fecha', 'vista', 'metodo', 'disparador', 'duracion_badge',
+        'consultas', 'tiempo_bd_ms', 'muestras', 'usuario'
+    ]
+    list_filter = ['disparador', 'vista', 'fecha']
+    search_fields = ['vista', 'ruta']
+    date_hierarchy = 'fecha'
+    readonly_fields = [
+        'fecha', 'vista', 'metodo', 'ruta', 'usuario', 'disparador', 'status_code',
+        'duracion_ms', 'consultas', 'tiempo_bd_ms', 'muestras', 'intervalo_ms',
+        'sql_detalle', 'pilas_colapsadas'
+    ]
+    exclude = ['sql']
+    actions = ['descargar_speedscope', 'descargar_colapsado']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def duracion_badge(self, obj):
+        """Badge de color según la duración del request"""
+        color = '#27ae60' if obj.duracion_ms < 500 else '#f39c12' if obj.duracion_ms < 2000 else '#e74c3c'
+        return format_html(
+            '<span style="background:{};color:white;padding:3px 8px;border-radius:3px;font-size:11px;">{} ms</span>',
+            color, f'{obj.duracion_ms:.0f}'
+        )
+    duracion_badge.short_description = 'Duración'
+    duracion_badge.admin_order_field = 'duracion_ms'
+
+    def sql_detalle(self, obj):
+        """SQL ejecutado, ordenado de mayor a menor duración"""
+        sentencias = sorted(obj.sql or [], key=lambda s: s.get('duracion_ms', 0), reverse=True)
+        if not sentencias:
+            return '-'
+        return format_html(
+            '<table><tr><th>ms</th><th>SQL</th></tr>{}</table>',
+            format_html_join(
+                '', '<tr><td>{}</td><td><code>{}</code></td></tr>',
+                ((s['duracion_ms'], s['sql']) for s in sentencias)
+            )
+        )
+    sql_detalle.short_description = 'SQL ejecutado'
+
+    def _nombre_archivo(self, queryset, extension):
+        if queryset.count() == 1:
+            return f'perfil_{queryset.first().id}.{extension}'
+        return f'perfiles.{extension}'
+
+    def descargar_speedscope(self, request, queryset):
+        """Descarga los perfiles seleccionados para abrir en speedscope.app"""
+        perfiles = [
+            {
+                'nombre': f'{p.vista} #{p.id} ({p.duracion_ms:.0f} ms)',
+                'colapsado': p.pilas_colapsadas,
+                'intervalo_ms': p.intervalo_ms,
+            }
+            for p in queryset
+        ]
+        response = HttpResponse(a_speedscope(perfiles), content_type='application/json')
+        response['Content-Disposition'] = f'attachment; filename="{self._nombre_archivo(queryset, "speedscope.json")}"'
+        return response
+    descargar_speedscope.short_description = 'Descargar perfil (speedscope)'
+
+    def descargar_colapsado(self, request, queryset):
+        """Descarga las pilas en formato collapsed (flamegraph.pl)"""
+        contenido = '\n'.join(p.pilas_colapsadas for p in queryset if p.pilas_colapsadas)
+        response = HttpResponse(contenido + '\n', content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{self._nombre_archivo(queryset, "collapsed.txt")}"'
+        return response
+    descargar_colapsado.short_description = 'Descargar pilas (collapsed)'
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class MonitoreoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoreo'
+    verbose_name = 'Monitoreo y Rendimiento'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from .metricas import instalar_en_conexion
+
+        # Las conexiones se crean perezosamente por hilo: se engancha el
+        # contador de consultas a cada conexión nueva.
+        connection_created.connect(instalar_en_conexion, dispatch_uid='monitoreo_sql')
+        for conexion in connections.all(initialized_only=True):
+            instalar_en_conexion(sender=None, connection=conexion)
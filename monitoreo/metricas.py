@@ -0,0 +1,211 @@
+"""
+Métricas por request: número de consultas SQL, tiempo de base de datos,
+tiempo de serialización (render de la respuesta) y tiempo total.
+
+Las métricas del request en curso viven en una ContextVar, de modo que el
+contador de SQL funciona igual bajo WSGI (un hilo por request) y ASGI
+(sync_to_async copia el contexto al hilo que ejecuta la vista).
+
+Los agregados se guardan en memoria por proceso y se exponen en formato
+texto de Prometheus. Con varios workers cada proceso publica sus propios
+contadores; Prometheus los distingue por la instancia que scrapea.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Buckets de latencia (segundos) y de consultas por request
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Tope de sentencias SQL guardadas por request cuando se captura el detalle
+MAX_SQL_CAPTURADAS = 2000
+
+_metricas_actuales = ContextVar('metricas_request', default=None)
+
+
+class MetricasRequest:
+    """Acumulador de tiempos de un único request"""
+
+    __slots__ = ('inicio', 'consultas', 'tiempo_bd', 'tiempo_render', 'sql')
+
+    def __init__(self, capturar_sql=False):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_render = 0.0
+        # Lista de (sql, segundos); None = no capturar (caso normal)
+        self.sql = [] if capturar_sql else None
+
+    def server_timing(self, total):
+        """Valor del header Server-Timing (duraciones en milisegundos)"""
+        aplicacion = max(total - self.tiempo_bd - self.tiempo_render, 0.0)
+        return (
+            f'db;dur={self.tiempo_bd * 1000:.1f};desc="{self.consultas} consultas", '
+            f'app;dur={aplicacion * 1000:.1f}, '
+            f'render;dur={self.tiempo_render * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+def metricas_actuales():
+    """Métricas del request en curso (None fuera de un request instrumentado)"""
+    return _metricas_actuales.get()
+
+
+def activar_metricas(metricas):
+    return _metricas_actuales.set(metricas)
+
+
+def desactivar_metricas(token):
+    _metricas_actuales.reset(token)
+
+
+def envoltorio_sql(execute, sql, params, many, context):
+    """execute_wrapper que cuenta consultas y tiempo de BD del request actual"""
+    metricas = _metricas_actuales.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        metricas.consultas += 1
+        metricas.tiempo_bd += duracion
+        if metricas.sql is not None and len(metricas.sql) < MAX_SQL_CAPTURADAS:
+            metricas.sql.append((sql, duracion))
+
+
+def instalar_en_conexion(sender, connection, **kwargs):
+    """Receptor de connection_created: engancha el contador a la conexión"""
+    if envoltorio_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(envoltorio_sql)
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus"""
+
+    __slots__ = ('buckets', 'conteos', 'suma', 'total')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)  # último = +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre, etiquetas):
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            yield f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+        yield f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}'
+        yield f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}'
+        yield f'{nombre}_count{{{etiquetas}}} {self.total}'
+
+
+class _MetricasVista:
+    """Agregados de una vista (nombre de URL + método HTTP)"""
+
+    __slots__ = ('latencia', 'consultas', 'tiempo_bd', 'tiempo_render', 'por_status')
+
+    def __init__(self):
+        self.latencia = Histograma(BUCKETS_LATENCIA)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.tiempo_bd = 0.0
+        self.tiempo_render = 0.0
+        self.por_status = {}
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RegistroMetricas:
+    """Registro en memoria (por proceso) de las métricas de todas las vistas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vistas = {}
+
+    def registrar(self, vista, metodo, status, metricas, total):
+        clave = (vista, metodo)
+        with self._lock:
+            agregado = self._vistas.get(clave)
+            if agregado is None:
+                agregado = self._vistas[clave] = _MetricasVista()
+            agregado.latencia.observar(total)
+            agregado.consultas.observar(metricas.consultas)
+            agregado.tiempo_bd += metricas.tiempo_bd
+            agregado.tiempo_render += metricas.tiempo_render
+            agregado.por_status[status] = agregado.por_status.get(status, 0) + 1
+
+    def limpiar(self):
+        with self._lock:
+            self._vistas.clear()
+
+    def exportar_prometheus(self):
+        """Serializa el registro en formato de exposición de Prometheus"""
+        with self._lock:
+            vistas = sorted(self._vistas.items())
+
+            lineas = [
+                '# HELP smartsales_http_requests_total Requests atendidos por vista, método y status.',
+                '# TYPE smartsales_http_requests_total counter',
+            ]
+            for (vista, metodo), agregado in vistas:
+                for status, conteo in sorted(agregado.por_status.items()):
+                    lineas.append(
+                        f'smartsales_http_requests_total{{view="{_escapar(vista)}",'
+                        f'method="{metodo}",status="{status}"}} {conteo}'
+                    )
+
+            lineas += [
+                '# HELP smartsales_http_request_duration_seconds Latencia total del request.',
+                '# TYPE smartsales_http_request_duration_seconds histogram',
+            ]
+            for (vista, metodo), agregado in vistas:
+                etiquetas = f'view="{_escapar(vista)}",method="{metodo}"'
+                lineas.extend(agregado.latencia.lineas('smartsales_http_request_duration_seconds', etiquetas))
+
+            lineas += [
+                '# HELP smartsales_db_queries_per_request Consultas SQL ejecutadas por request.',
+                '# TYPE smartsales_db_queries_per_request histogram',
+            ]
+            for (vista, metodo), agregado in vistas:
+                etiquetas = f'view="{_escapar(vista)}",method="{metodo}"'
+                lineas.extend(agregado.consultas.lineas('smartsales_db_queries_per_request', etiquetas))
+
+            lineas += [
+                '# HELP smartsales_db_duration_seconds_total Tiempo acumulado en base de datos.',
+                '# TYPE smartsales_db_duration_seconds_total counter',
+            ]
+            for (vista, metodo), agregado in vistas:
+                lineas.append(
+                    f'smartsales_db_duration_seconds_total{{view="{_escapar(vista)}",'
+                    f'method="{metodo}"}} {agregado.tiempo_bd:.6f}'
+                )
+
+            lineas += [
+                '# HELP smartsales_render_duration_seconds_total Tiempo acumulado serializando respuestas.',
+                '# TYPE smartsales_render_duration_seconds_total counter',
+            ]
+            for (vista, metodo), agregado in vistas:
+                lineas.append(
+                    f'smartsales_render_duration_seconds_total{{view="{_escapar(vista)}",'
+                    f'method="{metodo}"}} {agregado.tiempo_render:.6f}'
+                )
+
+        return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
@@ -0,0 +1,245 @@
+"""
+Middleware de instrumentación HTTP.
+
+Funciona en modo síncrono (WSGI) y asíncrono (ASGI) sin forzar cambios de
+contexto: Django lo invoca en el modo nativo del stack de middlewares.
+"""
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metricas import (
+    MetricasRequest,
+    activar_metricas,
+    desactivar_metricas,
+    metricas_actuales,
+    registro,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricasMiddleware:
+    """
+    Mide consultas SQL, tiempo de BD, tiempo de serialización y tiempo total
+    de cada request; agrega el header Server-Timing y alimenta los
+    histogramas por nombre de URL que expone /metrics.
+
+    Debe ir primero en MIDDLEWARE para que el tiempo total incluya al resto.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed('Instrumentación deshabilitada (METRICS_ENABLED)')
+
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        metricas = MetricasRequest()
+        token = activar_metricas(metricas)
+        try:
+            response = self.get_response(request)
+        finally:
+            desactivar_metricas(token)
+        return self._finalizar(request, response, metricas)
+
+    async def __acall__(self, request):
+        metricas = MetricasRequest()
+        token = activar_metricas(metricas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            desactivar_metricas(token)
+        return self._finalizar(request, response, metricas)
+
+    def process_template_response(self, request, response):
+        """
+        Las respuestas de DRF se renderizan justo después de este hook:
+        se mide el render (serialización a JSON/HTML) con un callback.
+        """
+        metricas = metricas_actuales()
+        if metricas is not None:
+            inicio = time.perf_counter()
+
+            def _fin_render(respuesta):
+                metricas.tiempo_render += time.perf_counter() - inicio
+
+            response.add_post_render_callback(_fin_render)
+        return response
+
+    def _finalizar(self, request, response, metricas):
+        total = time.perf_counter() - metricas.inicio
+
+        if self.server_timing:
+            response['Server-Timing'] = metricas.server_timing(total)
+
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else '<sin_ruta>'
+        try:
+            registro.registrar(vista, request.method, response.status_code, metricas, total)
+        except Exception as e:
+            # Nunca romper un request por la instrumentación
+            logger.warning(f'⚠️ No se pudieron registrar métricas de {vista}: {e}')
+
+        return response
+
+
+class PerfiladorMiddleware:
+    """
+    Perfilado bajo demanda de vistas pesadas (IA, reportes avanzados,
+    dashboard de predicciones).
+
+    Se activa:
+    - por staff, con el header `X-Profile: 1` o el parámetro `?_profile=1`
+      (en cualquier vista; se descarta si el usuario final no es staff);
+    - por muestreo: una fracción PROFILER_SAMPLE_RATE de los requests a
+      PROFILER_VISTAS, conservando solo los que superan PROFILER_SLOW_MS.
+
+    El pedido manual no es gratis (hilo de muestreo + captura de SQL), así
+    que antes de arrancar el muestreador:
+    - si la sesión ya identifica al usuario, tiene que ser staff; sin sesión
+      ni header Authorization (anónimo) se ignora. Con token el usuario
+      recién se conoce en la vista y se verifica al guardar;
+    - cada cliente (usuario o IP) puede pedir PROFILER_MAX_POR_MINUTO;
+    - nunca hay más de PROFILER_MAX_CONCURRENTES perfiles a la vez por
+      proceso (también cuenta el muestreo).
+
+    Con PROFILER_ENABLED=False el middleware no se carga y no se captura nada.
+    Es solo síncrono a propósito: así corre en el mismo hilo que la vista
+    (también bajo ASGI) y el muestreador puede leer su pila.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed('Perfilador deshabilitado (PROFILER_ENABLED)')
+
+        self.get_response = get_response
+        self.vistas = set(getattr(settings, 'PROFILER_VISTAS', []))
+        self.tasa_muestreo = float(getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0))
+        self.umbral = float(getattr(settings, 'PROFILER_SLOW_MS', 1000)) / 1000
+        self.intervalo = float(getattr(settings, 'PROFILER_INTERVAL_MS', 5)) / 1000
+        self.max_por_minuto = int(getattr(settings, 'PROFILER_MAX_POR_MINUTO', 6))
+        self.cupos = threading.BoundedSemaphore(int(getattr(settings, 'PROFILER_MAX_CONCURRENTES', 2)))
+
+    def __call__(self, request):
+        # Sin MetricasMiddleware hace falta un acumulador propio para el SQL
+        token = None
+        if metricas_actuales() is None:
+            token = activar_metricas(MetricasRequest())
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                desactivar_metricas(token)
+
+        perfil = getattr(request, '_perfil_en_curso', None)
+        if perfil is None:
+            return response
+
+        try:
+            duracion = perfil.finalizar()
+        finally:
+            self.cupos.release()
+        if self._conservar(request, perfil, duracion):
+            try:
+                self._guardar(request, response, perfil, duracion)
+            except Exception as e:
+                logger.error(f'❌ Error guardando perfil de {request.path}: {e}')
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        disparador = self._disparador(request)
+        metricas = metricas_actuales()
+        if disparador is None or metricas is None:
+            return None
+        if not self.cupos.acquire(blocking=False):
+            logger.debug(f'Perfil de {request.path} descartado: ya hay perfiles en curso')
+            return None
+
+        from .perfilador import PerfilEnCurso
+
+        request._perfil_en_curso = PerfilEnCurso(disparador, self.intervalo, metricas)
+        return None
+
+    def _disparador(self, request):
+        if request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1':
+            return 'staff' if self._pedido_permitido(request) else None
+        match = request.resolver_match
+        if (
+            self.tasa_muestreo > 0
+            and match is not None
+            and match.view_name in self.vistas
+            and random.random() < self.tasa_muestreo
+        ):
+            return 'muestreo'
+        return None
+
+    def _pedido_permitido(self, request):
+        usuario = getattr(request, 'user', None)
+        if usuario is not None and usuario.is_authenticated:
+            if not usuario.is_staff:
+                return False
+            cliente = f'u{usuario.pk}'
+        elif 'Authorization' in request.headers:
+            cliente = request.META.get('REMOTE_ADDR', '')
+        else:
+            return False
+
+        # Ventana fija de un minuto por cliente, compartida entre workers si la caché lo es
+        clave = f'perfilador:pedidos:{cliente}:{int(time.time() // 60)}'
+        cache.add(clave, 0, timeout=60)
+        try:
+            pedidos = cache.incr(clave)
+        except ValueError:
+            pedidos = 1
+        return pedidos <= self.max_por_minuto
+
+    def _conservar(self, request, perfil, duracion):
+        if perfil.disparador == 'staff':
+            # DRF propaga el usuario autenticado (token) al HttpRequest
+            usuario = getattr(request, 'user', None)
+            return bool(usuario and usuario.is_authenticated and usuario.is_staff)
+        return duracion >= self.umbral
+
+    def _guardar(self, request, response, perfil, duracion):
+        from .models import PerfilRequest
+
+        metricas = perfil.metricas
+        usuario = getattr(request, 'user', None)
+        match = request.resolver_match
+        PerfilRequest.objects.create(
+            vista=match.view_name if match else '<sin_ruta>',
+            metodo=request.method,
+            ruta=request.get_full_path()[:500],
+            usuario=usuario if usuario and usuario.is_authenticated else None,
+            disparador=perfil.disparador,
+            status_code=response.status_code,
+            duracion_ms=round(duracion * 1000, 2),
+            consultas=metricas.consultas,
+            tiempo_bd_ms=round(metricas.tiempo_bd * 1000, 2),
+            muestras=perfil.muestreador.muestras,
+            intervalo_ms=self.intervalo * 1000,
+            pilas_colapsadas=perfil.muestreador.colapsado(),
+            sql=[{'sql': s, 'duracion_ms': round(d * 1000, 3)} for s, d in perfil.sql],
+        )
+        logger.info(f'🔬 Perfil guardado: {request.path} ({duracion * 1000:.0f} ms, {perfil.disparador})')
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('vista', models.CharField(db_index=True, help_text='Nombre de la URL resuelta', max_length=200)),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.CharField(max_length=500)),
+                ('disparador', models.CharField(choices=[('staff', 'Solicitado por staff'), ('muestreo', 'Muestreo de requests lentos')], max_length=20)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duracion_ms', models.FloatField(verbose_name='Duración (ms)')),
+                ('consultas', models.PositiveIntegerField(default=0, verbose_name='Consultas SQL')),
+                ('tiempo_bd_ms', models.FloatField(default=0, verbose_name='Tiempo BD (ms)')),
+                ('muestras', models.PositiveIntegerField(default=0)),
+                ('intervalo_ms', models.FloatField(verbose_name='Intervalo de muestreo (ms)')),
+                ('pilas_colapsadas', models.TextField(blank=True, help_text='Pilas en formato collapsed (flamegraph)')),
+                ('sql', models.JSONField(blank=True, default=list, help_text='Sentencias SQL ejecutadas con su duración')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='perfiles_request', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Request',
+                'verbose_name_plural': 'Perfiles de Requests',
+                'db_table': 'perfiles_request',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['vista', '-fecha'], name='perfiles_re_vista_15d7c8_idx')],
+            },
+        ),
+    ]
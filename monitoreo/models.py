@@ -0,0 +1,49 @@
+"""
+Modelos de monitoreo de rendimiento.
+"""
+from django.db import models
+from django.conf import settings
+
+
+class PerfilRequest(models.Model):
+    """
+    Perfil de muestreo capturado para un request lento o pedido por staff.
+    Guarda las pilas en formato collapsed y la lista de SQL ejecutado.
+    """
+    DISPARADOR_CHOICES = [
+        ('staff', 'Solicitado por staff'),
+        ('muestreo', 'Muestreo de requests lentos'),
+    ]
+
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+    vista = models.CharField(max_length=200, db_index=True, help_text='Nombre de la URL resuelta')
+    metodo = models.CharField(max_length=10)
+    ruta = models.CharField(max_length=500)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='perfiles_request'
+    )
+    disparador = models.CharField(max_length=20, choices=DISPARADOR_CHOICES)
+    status_code = models.PositiveSmallIntegerField()
+    duracion_ms = models.FloatField(verbose_name='Duración (ms)')
+    consultas = models.PositiveIntegerField(default=0, verbose_name='Consultas SQL')
+    tiempo_bd_ms = models.FloatField(default=0, verbose_name='Tiempo BD (ms)')
+    muestras = models.PositiveIntegerField(default=0)
+    intervalo_ms = models.FloatField(verbose_name='Intervalo de muestreo (ms)')
+    pilas_colapsadas = models.TextField(blank=True, help_text='Pilas en formato collapsed (flamegraph)')
+    sql = models.JSONField(default=list, blank=True, help_text='Sentencias SQL ejecutadas con su duración')
+
+    class Meta:
+        db_table = 'perfiles_request'
+        ordering = ['-fecha']
+        verbose_name = 'Perfil de Request'
+        verbose_name_plural = 'Perfiles de Requests'
+        indexes = [
+            models.Index(fields=['vista', '-fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.vista} - {self.duracion_ms:.0f} ms ({self.fecha:%Y-%m-%d %H:%M})"
@@ -0,0 +1,139 @@
+"""
+Perfilador por muestreo de pila para requests puntuales.
+
+Un hilo auxiliar lee periódicamente la pila del hilo que atiende el request
+(sys._current_frames) y acumula las pilas en formato "collapsed"
+(raíz;...;hoja conteo), que es lo que consumen flamegraph.pl y speedscope.
+Al no instrumentar cada llamada, el costo es proporcional al intervalo de
+muestreo y no a la cantidad de funciones ejecutadas.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Profundidad máxima de pila registrada por muestra
+MAX_PROFUNDIDAD = 128
+
+
+def _nombre_frame(frame):
+    codigo = frame.f_code
+    archivo = os.path.basename(codigo.co_filename)
+    modulo = frame.f_globals.get('__name__', '?')
+    # ';' separa frames en el formato collapsed
+    return f'{modulo}.{codigo.co_name} ({archivo}:{codigo.co_firstlineno})'.replace(';', ',')
+
+
+class MuestreadorPila:
+    """Muestrea la pila de un hilo cada `intervalo` segundos"""
+
+    def __init__(self, thread_id=None, intervalo=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._ejecutar, name='perfilador-muestreo', daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        return self
+
+    def _ejecutar(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            pila = []
+            while frame is not None and len(pila) < MAX_PROFUNDIDAD:
+                pila.append(_nombre_frame(frame))
+                frame = frame.f_back
+            pila.reverse()
+            self.pilas[';'.join(pila)] += 1
+            self.muestras += 1
+
+    def colapsado(self):
+        """Pilas en formato collapsed, una por línea"""
+        return '\n'.join(f'{pila} {conteo}' for pila, conteo in self.pilas.most_common())
+
+
+def parsear_colapsado(texto):
+    """Convierte texto collapsed en lista de (frames, conteo)"""
+    resultado = []
+    for linea in (texto or '').splitlines():
+        pila, _, conteo = linea.rpartition(' ')
+        if not pila or not conteo.isdigit():
+            continue
+        resultado.append((pila.split(';'), int(conteo)))
+    return resultado
+
+
+def a_speedscope(perfiles, exportador='SmartSales365'):
+    """
+    Genera un documento speedscope (https://www.speedscope.app) con un perfil
+    'sampled' por cada entrada de `perfiles`: lista de dicts con las claves
+    nombre, colapsado e intervalo_ms.
+    """
+    frames = []
+    indices = {}
+    salida = []
+
+    for perfil in perfiles:
+        muestras = []
+        pesos = []
+        for pila, conteo in parsear_colapsado(perfil['colapsado']):
+            muestra = []
+            for nombre in pila:
+                if nombre not in indices:
+                    indices[nombre] = len(frames)
+                    frames.append({'name': nombre})
+                muestra.append(indices[nombre])
+            muestras.append(muestra)
+            pesos.append(round(conteo * perfil['intervalo_ms'], 3))
+
+        salida.append({
+            'type': 'sampled',
+            'name': perfil['nombre'],
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(sum(pesos), 3),
+            'samples': muestras,
+            'weights': pesos,
+        })
+
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'exporter': exportador,
+        'name': perfiles[0]['nombre'] if len(perfiles) == 1 else 'Perfiles SmartSales365',
+        'activeProfileIndex': 0,
+        'shared': {'frames': frames},
+        'profiles': salida,
+    })
+
+
+class PerfilEnCurso:
+    """Estado del perfilado de un request: muestreador + captura de SQL"""
+
+    def __init__(self, disparador, intervalo, metricas):
+        self.disparador = disparador
+        self.metricas = metricas
+        self.sql = []
+        self.inicio = time.perf_counter()
+        # Las métricas son compartidas con MetricasMiddleware: se les presta
+        # una lista para que el execute_wrapper registre cada sentencia.
+        metricas.sql = self.sql
+        self.muestreador = MuestreadorPila(intervalo=intervalo).iniciar()
+
+    def finalizar(self):
+        self.muestreador.detener()
+        self.metricas.sql = None
+        return time.perf_counter() - self.inicio
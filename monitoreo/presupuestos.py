@@ -0,0 +1,111 @@
+"""
+Presupuestos de consultas SQL por endpoint.
+
+Herramientas para los tests de regresión de consultas:
+
+- `descubrir_endpoints()` recorre el urlconf y devuelve cada par
+  (nombre de ruta, método HTTP) servido por una vista DRF, incluyendo las
+  acciones de los ViewSets registrados en routers. Sirve para exigir que
+  todo endpoint nuevo tenga su presupuesto declarado.
+- `PresupuestoConsultasMixin` agrega a un TestCase la medición de
+  consultas por request y las aserciones de presupuesto y de crecimiento
+  (la cantidad de consultas no debe depender de la cantidad de filas).
+"""
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from rest_framework.routers import APIRootView
+from rest_framework.views import APIView
+
+METODOS_IGNORADOS = {'options', 'head', 'trace'}
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    nombre: str
+    metodo: str
+    patron: str
+    vista: type
+
+    @property
+    def clave(self):
+        return self.nombre, self.metodo
+
+
+def _recorrer(patrones, prefijo=''):
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            yield from _recorrer(patron.url_patterns, prefijo + str(patron.pattern))
+        else:
+            yield prefijo + str(patron.pattern), patron
+
+
+def _metodos(callback, vista):
+    # Los ViewSets exponen el mapeo método -> acción en el callback
+    acciones = getattr(callback, 'actions', None)
+    if acciones:
+        return [metodo for metodo in acciones if metodo not in METODOS_IGNORADOS]
+    return [
+        metodo for metodo in vista.http_method_names
+        if metodo not in METODOS_IGNORADOS and hasattr(vista, metodo)
+    ]
+
+
+def descubrir_endpoints(urlconf=None):
+    """
+    Endpoints DRF del urlconf, uno por (nombre, método).
+
+    Se omiten las variantes con sufijo de formato (`.json`) que agregan los
+    routers, las raíces de router (no consultan la base) y las rutas sin
+    nombre, que no se pueden resolver con reverse().
+    """
+    endpoints = {}
+    for patron_completo, patron in _recorrer(get_resolver(urlconf).url_patterns):
+        vista = getattr(patron.callback, 'cls', None)
+        if vista is None or not issubclass(vista, APIView) or issubclass(vista, APIRootView):
+            continue
+        if patron.name is None or '(?P<format>' in patron_completo or '<drf_format_suffix' in patron_completo:
+            continue
+        for metodo in _metodos(patron.callback, vista):
+            endpoint = Endpoint(patron.name, metodo.upper(), patron_completo, vista)
+            endpoints.setdefault(endpoint.clave, endpoint)
+    return endpoints
+
+
+class PresupuestoConsultasMixin:
+    """
+    Mixin para TestCase. Cada medición corre dentro de una transacción que
+    se revierte, de modo que los requests que escriben no alteran los datos
+    de la siguiente medición.
+    """
+
+    def medir_consultas(self, funcion, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        """Ejecuta `funcion` y devuelve (resultado, consultas ejecutadas)"""
+        with transaction.atomic(using=using):
+            with CaptureQueriesContext(connections[using]) as capturadas:
+                resultado = funcion(*args, **kwargs)
+            transaction.set_rollback(True, using=using)
+        # SAVEPOINT / RELEASE de la transacción de prueba no cuentan
+        consultas = [
+            q['sql'] for q in capturadas.captured_queries
+            if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+        ]
+        return resultado, consultas
+
+    def assertPresupuesto(self, consultas, maximo, msg=''):
+        if len(consultas) > maximo:
+            detalle = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(consultas, 1))
+            self.fail(f'{msg}: {len(consultas)} consultas, presupuesto {maximo}\n{detalle}')
+
+    def assertConsultasConstantes(self, por_tamano, msg=''):
+        """
+        `por_tamano` mapea cantidad de filas -> lista de consultas. Falla si
+        la cantidad difiere entre tamaños (típico N+1).
+        """
+        conteos = {tamano: len(consultas) for tamano, consultas in por_tamano.items()}
+        if len(set(conteos.values())) > 1:
+            mayor = max(por_tamano, key=lambda t: len(por_tamano[t]))
+            detalle = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(por_tamano[mayor], 1))
+            self.fail(f'{msg}: las consultas crecen con los datos {conteos}\n{detalle}')
@@ -0,0 +1,658 @@
+"""
+Tests del monitoreo: métricas por request (Server-Timing y /metrics),
+presupuestos de consultas SQL por endpoint y perfilador bajo demanda.
+
+Cada endpoint DRF de core/urls.py declara cuántas consultas puede ejecutar
+por request. El test mide todos los endpoints con 10 filas por tabla,
+escala los datos a 1000 filas y vuelve a medir: la cantidad de consultas
+no puede superar el presupuesto ni cambiar entre ambos tamaños.
+
+Al agregar un endpoint, `test_todos_los_endpoints_tienen_presupuesto`
+falla hasta que se declare su entrada en PETICIONES.
+"""
+import re
+import tempfile
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from monitoreo.metricas import (
+    CONTENT_TYPE_PROMETHEUS,
+    MetricasRequest,
+    activar_metricas,
+    desactivar_metricas,
+    registro,
+)
+from monitoreo.middleware import MetricasMiddleware, PerfiladorMiddleware
+from monitoreo.models import PerfilRequest
+from monitoreo.perfilador import a_speedscope
+from monitoreo.presupuestos import PresupuestoConsultasMixin, descubrir_endpoints
+
+TAMANOS = (10, 1000)
+PASSWORD = 'presupuesto-123'
+
+
+@dataclass
+class Peticion:
+    maximo: int             # consultas por request, para cualquier tamaño de datos
+    usuario: str = 'admin'  # 'admin' | 'cliente' | 'anonimo' | 'sesion'
+    pk: str = None          # clave del contexto para rutas de detalle
+    cuerpo: dict = field(default=None)
+    query: str = ''
+
+
+def _producto_nuevo():
+    return {'sku': 'PRES-NUEVO', 'nombre': 'Nuevo', 'precio': '10.00', 'stock': 5}
+
+
+PETICIONES = {
+    # Usuarios
+    ('register', 'POST'): Peticion(2, usuario='anonimo', cuerpo={
+        'username': 'registro_nuevo', 'email': 'registro@presupuesto.local', 'password': PASSWORD,
+    }),
+    ('token-obtain', 'POST'): Peticion(2, usuario='anonimo', cuerpo={'username': 'pres_cliente', 'password': PASSWORD}),
+    ('jwt-obtain', 'POST'): Peticion(1, usuario='anonimo', cuerpo={'username': 'pres_cliente', 'password': PASSWORD}),
+    ('jwt-refresh', 'POST'): Peticion(1, usuario='anonimo', cuerpo={'refresh': '{refresh}'}),
+    ('jwt-verify', 'POST'): Peticion(0, usuario='anonimo', cuerpo={'token': '{refresh}'}),
+    ('usuario-list', 'GET'): Peticion(2),
+    ('usuario-list', 'POST'): Peticion(2, cuerpo={
+        'username': 'usuario_nuevo', 'email': 'nuevo@presupuesto.local', 'password': PASSWORD, 'rol': 'vendedor',
+    }),
+    ('usuario-me', 'GET'): Peticion(0, usuario='cliente'),
+    ('usuario-me', 'PATCH'): Peticion(2, usuario='cliente', cuerpo={'telefono': '555'}),
+    ('usuario-detail', 'GET'): Peticion(1, pk='usuario_cliente'),
+    ('usuario-detail', 'PUT'): Peticion(3, pk='usuario_cliente', cuerpo={
+        'username': 'pres_cliente', 'email': 'cliente@presupuesto.local', 'rol': 'cliente',
+    }),
+    ('usuario-detail', 'PATCH'): Peticion(2, pk='usuario_cliente', cuerpo={'telefono': '555'}),
+    ('usuario-detail', 'DELETE'): Peticion(15, pk='usuario_suelto'),  # + cascada a compras_exportaciones
+
+    # Clientes
+    ('cliente-list', 'GET'): Peticion(2),
+    ('cliente-list', 'POST'): Peticion(1, cuerpo={'nombre': 'Cliente nuevo', 'email': 'nuevo@cliente.local'}),
+    ('cliente-detail', 'GET'): Peticion(1, pk='cliente'),
+    ('cliente-detail', 'PUT'): Peticion(2, pk='cliente', cuerpo={'nombre': 'Cliente editado'}),
+    ('cliente-detail', 'PATCH'): Peticion(2, pk='cliente', cuerpo={'telefono': '555'}),
+    ('cliente-detail', 'DELETE'): Peticion(5, pk='cliente_suelto'),  # + cascada a clientes_metricas
+
+    # Productos
+    ('categoria-list', 'GET'): Peticion(2),
+    ('categoria-list', 'POST'): Peticion(3, cuerpo={'nombre': 'Nueva', 'slug': 'nueva'}),
+    ('categoria-detail', 'GET'): Peticion(1, pk='categoria'),
+    ('categoria-detail', 'PUT'): Peticion(4, pk='categoria', cuerpo={'nombre': 'Editada', 'slug': 'editada'}),
+    ('categoria-detail', 'PATCH'): Peticion(3, pk='categoria', cuerpo={'nombre': 'Editada'}),
+    ('categoria-detail', 'DELETE'): Peticion(3, pk='categoria_suelta'),
+    ('producto-list', 'GET'): Peticion(2, usuario='cliente'),
+    ('producto-list', 'POST'): Peticion(4, cuerpo=_producto_nuevo()),  # stock por el libro: UPDATE condicional + INSERT
+    ('producto-detail', 'GET'): Peticion(1, pk='producto'),
+    ('producto-detail', 'PUT'): Peticion(6, pk='producto', cuerpo={**_producto_nuevo(), 'sku': 'PRES-0000'}),  # ídem + lectura bloqueada del stock
+    ('producto-detail', 'PATCH'): Peticion(5, pk='producto', cuerpo={'stock': 7}),  # ídem
+    ('producto-detail', 'DELETE'): Peticion(5, pk='producto_suelto'),  # incluye el borrado en cascada del libro de inventario
+
+    # Compras
+    ('compra-list', 'GET'): Peticion(2, usuario='cliente'),  # count + página con items_count anotado
+    ('compra-list', 'POST'): Peticion(4, usuario='cliente', cuerpo={'cliente': '{cliente}', 'observaciones': 'directa'}),
+    ('compra-checkout', 'POST'): Peticion(18, usuario='cliente', cuerpo={  # +1 INSERT del libro de inventario
+        'items': [{'producto': '{producto}', 'cantidad': 1}], 'codigo_promocion': 'PRES0000',
+    }),
+    ('compra-detail', 'GET'): Peticion(3, usuario='cliente', pk='compra'),
+    ('compra-detail', 'PUT'): Peticion(8, usuario='cliente', pk='compra', cuerpo={
+        'cliente': '{cliente}', 'observaciones': 'editada',
+    }),
+    ('compra-detail', 'PATCH'): Peticion(7, usuario='cliente', pk='compra', cuerpo={'observaciones': 'editada'}),
+    ('compra-detail', 'DELETE'): Peticion(5, pk='compra_vacia'),  # + cascada a compras_comprobantes
+    ('compra-pay', 'POST'): Peticion(6, usuario='cliente', pk='compra_vacia_cliente', cuerpo={'referencia': 'REF-1'}),
+    ('compra-stripe-session', 'POST'): Peticion(2, usuario='cliente', pk='compra_vacia_cliente'),
+    ('compra-receipt', 'GET'): Peticion(5, usuario='cliente', pk='compra'),  # primera descarga: render + archivo anterior + registro; luego 1
+    ('stripe-public-key', 'GET'): Peticion(0, usuario='anonimo'),
+    ('stripe-webhook', 'POST'): Peticion(0, usuario='anonimo', cuerpo={}),
+
+    # Reportes
+    ('report-summary', 'GET'): Peticion(5),
+    ('report-kpis', 'GET'): Peticion(3),
+    ('report-ventas-por-dia', 'GET'): Peticion(1, query='?dias=30'),
+    ('report-series-ventas', 'GET'): Peticion(1, query='?granularidad=semana&dias=90'),
+    ('report-ventas-por-categoria', 'GET'): Peticion(1, query='?dias=30'),
+    ('report-ventas-por-producto', 'GET'): Peticion(1, query='?dias=30'),
+    ('report-top-clientes', 'GET'): Peticion(1, query='?dias=30'),
+    ('report-rankings-rendimiento', 'GET'): Peticion(1, query='?dias=30'),
+    ('report-health', 'GET'): Peticion(0),
+    ('reportes-dinamicos-avanzados', 'GET'): Peticion(2, query='?prompt=reporte+ejecutivo+del+mes&incluir_insights=false'),
+    ('reportes-dinamicos-avanzados', 'POST'): Peticion(2, cuerpo={
+        'prompt': 'reporte ejecutivo del mes', 'formato': 'pantalla', 'incluir_insights': False,
+    }),
+    ('reportes-dinamicos-descarga', 'GET'): Peticion(0, usuario='anonimo', query='?archivo=invalido'),
+
+    # IA
+    ('ia-health', 'GET'): Peticion(0),
+    ('ia-consulta', 'GET'): Peticion(2, query='?prompt=reporte+ejecutivo+del+mes&incluir_insights=false'),
+    ('ia-consulta', 'POST'): Peticion(2, cuerpo={'prompt': 'ventas de los últimos 30 días por producto'}),
+    ('ia-historial', 'GET'): Peticion(1),
+    ('ia-dashboard', 'GET'): Peticion(4, query='?dias_hist=30&dias_pred=7'),
+    ('ia-entrenar-modelo', 'POST'): Peticion(1, cuerpo={'dias_historico': 30}),
+
+    # Promociones y devoluciones
+    ('promocion-list', 'GET'): Peticion(2, usuario='cliente'),
+    ('promocion-detail', 'GET'): Peticion(1, usuario='cliente', pk='promocion'),
+    ('promocion-validar', 'POST'): Peticion(1, usuario='cliente', cuerpo={'codigo': 'PRES0000', 'monto': '100'}),
+    ('devolucion-list', 'GET'): Peticion(3, usuario='cliente'),
+    ('devolucion-list', 'POST'): Peticion(7, usuario='cliente', cuerpo={
+        'compra_item': '{compra_item}', 'tipo': 'devolucion', 'motivo': 'Defecto', 'cantidad': 1,
+    }),
+    ('devolucion-detail', 'GET'): Peticion(2, usuario='cliente', pk='devolucion'),
+    ('devolucion-detail', 'PUT'): Peticion(7, usuario='cliente', pk='devolucion', cuerpo={
+        'compra_item': '{compra_item}', 'cliente': '{cliente}', 'motivo': 'Editada', 'cantidad': 1,
+    }),
+    ('devolucion-detail', 'PATCH'): Peticion(3, usuario='cliente', pk='devolucion', cuerpo={'motivo': 'Editada'}),
+    ('devolucion-detail', 'DELETE'): Peticion(3, usuario='cliente', pk='devolucion'),
+    ('devolucion-cancelar', 'POST'): Peticion(3, usuario='cliente', pk='devolucion'),
+    ('devolucion-aprobar-lote', 'POST'): Peticion(3, cuerpo={'ids': ['{devolucion}'], 'respuesta': 'Aprobada'}),
+    ('devolucion-rechazar-lote', 'POST'): Peticion(2, cuerpo={'ids': ['{devolucion}'], 'respuesta': 'Rechazada'}),
+    ('devolucion-completar-lote', 'POST'): Peticion(5, cuerpo={'ids': ['{devolucion_aprobada}']}),
+
+    # Notificaciones
+    ('admin-notifications-polling', 'GET'): Peticion(1),
+    ('vapid-public-key', 'GET'): Peticion(0, usuario='anonimo'),
+    ('push-subscription-list', 'GET'): Peticion(2, usuario='cliente'),
+    ('push-subscription-list', 'POST'): Peticion(3, usuario='cliente', cuerpo={
+        'endpoint': 'https://push.example/nueva', 'p256dh': 'clave', 'auth': 'auth',
+    }),
+    ('push-subscription-detail', 'GET'): Peticion(1, usuario='cliente', pk='suscripcion'),
+    ('push-subscription-detail', 'PUT'): Peticion(3, usuario='cliente', pk='suscripcion', cuerpo={
+        'endpoint': 'https://push.example/editada', 'p256dh': 'clave', 'auth': 'auth',
+    }),
+    ('push-subscription-detail', 'PATCH'): Peticion(2, usuario='cliente', pk='suscripcion', cuerpo={'activa': False}),
+    ('push-subscription-detail', 'DELETE'): Peticion(3, usuario='cliente', pk='suscripcion'),
+    ('push-subscription-activar', 'POST'): Peticion(2, usuario='cliente', pk='suscripcion'),
+    ('push-subscription-desactivar', 'POST'): Peticion(2, usuario='cliente', pk='suscripcion'),
+    ('notificacion-historial-list', 'GET'): Peticion(2, usuario='cliente'),
+    ('notificacion-historial-detail', 'GET'): Peticion(1, usuario='cliente', pk='notificacion'),
+    ('notificacion-historial-marcar-todas-leidas', 'POST'): Peticion(0, usuario='cliente'),
+    ('notificacion-admin-list', 'GET'): Peticion(2),
+    ('notificacion-admin-list', 'POST'): Peticion(1, cuerpo={'tipo': 'sistema', 'titulo': 'Aviso', 'mensaje': 'Hola'}),
+    ('notificacion-admin-detail', 'GET'): Peticion(1, pk='notificacion_admin'),
+    ('notificacion-admin-detail', 'PUT'): Peticion(2, pk='notificacion_admin', cuerpo={
+        'tipo': 'sistema', 'titulo': 'Editada', 'mensaje': 'Hola',
+    }),
+    ('notificacion-admin-detail', 'PATCH'): Peticion(2, pk='notificacion_admin', cuerpo={'titulo': 'Editada'}),
+    ('notificacion-admin-detail', 'DELETE'): Peticion(2, pk='notificacion_admin'),
+
+    # Infraestructura
+    ('metrics', 'GET'): Peticion(0),
+    ('schema', 'GET'): Peticion(0),
+    ('swagger-ui', 'GET'): Peticion(0),
+    ('admin-schema', 'GET'): Peticion(11, usuario='sesion'),
+    ('admin-swagger-ui', 'GET'): Peticion(11, usuario='sesion'),
+}
+
+
+def _formatear(valor, contexto):
+    if isinstance(valor, str):
+        return valor.format(**contexto)
+    if isinstance(valor, dict):
+        return {clave: _formatear(v, contexto) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_formatear(v, contexto) for v in valor]
+    return valor
+
+
+def poblar(desde, hasta, admin, cliente):
+    """
+    Crea las filas [desde, hasta) de cada tabla que leen los endpoints.
+    Las compras, devoluciones, suscripciones y notificaciones pertenecen a
+    los usuarios de prueba para que los listados crezcan con el tamaño.
+    """
+    from clientes.models import Cliente
+    from compra.models import Compra, CompraItem
+    from ia.models import ConsultaIA
+    from notificaciones.models import NotificacionAdmin, NotificacionEnviada, PushSubscription
+    from productos.models import Categoria, Producto
+    from promociones.models import DevolucionProducto, Promocion
+    from usuarios.models import Usuario
+
+    rango = range(desde, hasta)
+    ahora = timezone.now()
+    password = make_password(PASSWORD)
+
+    categorias = Categoria.objects.bulk_create(
+        Categoria(nombre=f'Categoría {i}', slug=f'pres-categoria-{i}') for i in rango
+    )
+    productos = Producto.objects.bulk_create(
+        Producto(
+            sku=f'PRES-{i:04d}', nombre=f'Producto {i}', precio=Decimal('10.00') + i,
+            stock=10 ** 6, categoria=categorias[i - desde],
+        )
+        for i in rango
+    )
+    usuarios = Usuario.objects.bulk_create(
+        Usuario(username=f'pres_usuario_{i}', email=f'u{i}@presupuesto.local', password=password) for i in rango
+    )
+    clientes = Cliente.objects.bulk_create(
+        Cliente(nombre=f'Cliente {i}', email=f'c{i}@presupuesto.local', usuario=usuarios[i - desde], asignado_a=admin)
+        for i in rango
+    )
+    promociones = Promocion.objects.bulk_create(
+        Promocion(codigo=f'PRES{i:04d}', nombre=f'Promo {i}', valor_descuento=Decimal('10'),
+                  fecha_inicio=ahora - timedelta(days=30))
+        for i in rango
+    )
+    compras = Compra.objects.bulk_create(
+        Compra(
+            cliente=cliente, total=Decimal('30.00') + i, pagado_en=ahora - timedelta(days=i % 60),
+            pago_referencia=f'REF-{i}', promocion=promociones[i - desde],
+        )
+        for i in rango
+    )
+    # fecha es auto_now_add: se reparte en los últimos 60 días después de crear
+    for i, compra in zip(rango, compras):
+        compra.fecha = ahora - timedelta(days=i % 60, hours=i % 24)
+    Compra.objects.bulk_update(compras, ['fecha'])
+
+    items = CompraItem.objects.bulk_create(
+        CompraItem(
+            compra=compra, producto=productos[(i - desde + j) % len(productos)], cantidad=1 + j,
+            precio_unitario=Decimal('10.00'), subtotal=Decimal('10.00') * (1 + j),
+        )
+        for i, compra in zip(rango, compras) for j in range(2)
+    )
+    DevolucionProducto.objects.bulk_create(
+        DevolucionProducto(
+            compra_item=items[2 * (i - desde)], cliente=cliente, motivo=f'Motivo {i}', cantidad=1,
+            monto_reembolso=Decimal('10.00'),
+        )
+        for i in rango
+    )
+    PushSubscription.objects.bulk_create(
+        PushSubscription(usuario=cliente.usuario, endpoint=f'https://push.example/{i}', p256dh='clave', auth='auth')
+        for i in rango
+    )
+    NotificacionEnviada.objects.bulk_create(
+        NotificacionEnviada(usuario=cliente.usuario, tipo='otro', titulo=f'Aviso {i}', mensaje='Hola', estado='enviada')
+        for i in rango
+    )
+    NotificacionAdmin.objects.bulk_create(
+        NotificacionAdmin(usuario=admin, tipo='sistema', titulo=f'Aviso {i}', mensaje='Hola') for i in rango
+    )
+    ConsultaIA.objects.bulk_create(
+        ConsultaIA(usuario=admin, prompt=f'ventas {i}', resultado={'datos': []}, tiempo_ejecucion=0.1) for i in rango
+    )
+    return {
+        'categoria': categorias[0].pk,
+        'producto': productos[0].pk,
+        'usuario_suelto': usuarios[0].pk,
+        'cliente_suelto': clientes[0].pk,
+        'promocion': promociones[0].pk,
+        'compra': compras[0].pk,
+        'compra_item': items[0].pk,
+    }
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    STRIPE_PUBLISHABLE_KEY='pk_test_presupuesto',
+    STRIPE_SECRET_KEY='sk_test_presupuesto',
+    STRIPE_WEBHOOK_SECRET='whsec_presupuesto',
+    VAPID_PUBLIC_KEY='clave-publica-presupuesto',
+    PROFILER_ENABLED=False,
+)
+class PresupuestoConsultasTests(PresupuestoConsultasMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from clientes.models import Cliente
+        from compra.models import Compra
+        from notificaciones.models import NotificacionAdmin, NotificacionEnviada, PushSubscription
+        from productos.models import Categoria, Producto
+        from promociones.models import DevolucionProducto
+        from usuarios.models import Usuario
+
+        cls.admin = Usuario.objects.create_user(
+            'pres_admin', 'admin@presupuesto.local', PASSWORD, rol='admin', is_staff=True,
+        )
+        cls.usuario_cliente = Usuario.objects.create_user(
+            'pres_cliente', 'cliente@presupuesto.local', PASSWORD, rol='cliente',
+        )
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario_cliente, nombre='Cliente Presupuesto', asignado_a=cls.admin)
+        cls.tokens = {
+            'admin': Token.objects.create(user=cls.admin).key,
+            'cliente': Token.objects.create(user=cls.usuario_cliente).key,
+        }
+
+        cls.contexto = poblar(0, TAMANOS[0], cls.admin, cls.cliente)
+        cls.contexto.update({
+            'usuario_cliente': cls.usuario_cliente.pk,
+            'refresh': str(RefreshToken.for_user(cls.usuario_cliente)),
+            'cliente': cls.cliente.pk,
+            # Objetos sin dependientes, para los DELETE
+            'categoria_suelta': Categoria.objects.create(nombre='Suelta', slug='suelta').pk,
+            'producto_suelto': Producto.objects.create(sku='PRES-SUELTO', nombre='Suelto', precio=1).pk,
+            'compra_vacia': Compra.objects.create(cliente=cls.cliente).pk,
+            'compra_vacia_cliente': Compra.objects.create(cliente=cls.cliente, total=Decimal('15.00')).pk,
+            'devolucion': DevolucionProducto.objects.filter(cliente=cls.cliente).first().pk,
+            'devolucion_aprobada': DevolucionProducto.objects.filter(cliente=cls.cliente).last().pk,
+            'suscripcion': PushSubscription.objects.filter(usuario=cls.usuario_cliente).first().pk,
+            'notificacion': NotificacionEnviada.objects.filter(usuario=cls.usuario_cliente).first().pk,
+            'notificacion_admin': NotificacionAdmin.objects.filter(usuario=cls.admin).first().pk,
+        })
+        DevolucionProducto.objects.filter(pk=cls.contexto['devolucion_aprobada']).update(estado='aprobada')
+
+    def setUp(self):
+        from notificaciones.push_service import push_service
+
+        # Sin claves VAPID el servicio push no sale a la red
+        parche = mock.patch.object(push_service, 'vapid_private_key', '')
+        parche.start()
+        self.addCleanup(parche.stop)
+        # El entrenamiento no debe pisar el modelo de la instalación local
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        parche = mock.patch('ia.modelo_ml.MODEL_PATH', f'{directorio.name}/modelo.pkl')
+        parche.start()
+        self.addCleanup(parche.stop)
+        # Ni los comprobantes PDF guardados
+        ajuste = override_settings(MEDIA_ROOT=directorio.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+
+    def _request(self, clave, peticion):
+        nombre, metodo = clave
+        cliente = APIClient()
+        if peticion.usuario == 'sesion':
+            cliente.force_login(self.admin)
+        elif peticion.usuario in self.tokens:
+            cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[peticion.usuario]}')
+        kwargs = {'pk': self.contexto[peticion.pk]} if peticion.pk else {}
+        ruta = reverse(nombre, kwargs=kwargs) + peticion.query
+        cuerpo = _formatear(peticion.cuerpo, self.contexto)
+        respuesta = cliente.generic(metodo, ruta, data=_json(cuerpo), content_type='application/json')
+        if getattr(respuesta, 'streaming', False):
+            b''.join(respuesta.streaming_content)
+        return respuesta
+
+    def _medir(self, clave, peticion):
+        # El primer request calienta cachés de proceso (ContentType, esquema, ...)
+        self.medir_consultas(self._request, clave, peticion)
+        respuesta, consultas = self.medir_consultas(self._request, clave, peticion)
+        self.assertLess(
+            respuesta.status_code, 500,
+            f'{clave}: status {respuesta.status_code} {getattr(respuesta, "content", b"")[:300]}',
+        )
+        return consultas
+
+    def test_todos_los_endpoints_tienen_presupuesto(self):
+        descubiertos = set(descubrir_endpoints())
+        faltantes = sorted(descubiertos - set(PETICIONES))
+        sobrantes = sorted(set(PETICIONES) - descubiertos)
+        self.assertEqual(faltantes, [], 'Endpoints sin presupuesto de consultas declarado')
+        self.assertEqual(sobrantes, [], 'Presupuestos de endpoints que ya no existen')
+
+    def test_consultas_dentro_del_presupuesto_y_constantes(self):
+        from ia.modelo_ml import ModeloPrediccionVentas
+
+        # Con un modelo entrenado los reportes recorren también las predicciones
+        ModeloPrediccionVentas().entrenar(dias_historico=90)
+        mediciones = {clave: {} for clave in PETICIONES}
+        previo = 0
+        for tamano in TAMANOS:
+            if tamano > previo and previo:
+                poblar(previo, tamano, self.admin, self.cliente)
+            previo = tamano
+            for clave, peticion in PETICIONES.items():
+                with self.subTest(endpoint=clave, filas=tamano):
+                    consultas = self._medir(clave, peticion)
+                    mediciones[clave][tamano] = consultas
+                    self.assertPresupuesto(consultas, peticion.maximo, f'{clave} con {tamano} filas')
+
+        for clave in PETICIONES:
+            if len(mediciones[clave]) < len(TAMANOS):
+                continue
+            with self.subTest(endpoint=clave):
+                self.assertConsultasConstantes(mediciones[clave], str(clave))
+
+
+class ConsultasFueraDeLaAPITests(PresupuestoConsultasMixin, TestCase):
+    """Acciones del admin y consultas de IA que recorren filas fuera de la API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from clientes.models import Cliente
+        from usuarios.models import Usuario
+
+        cls.admin = Usuario.objects.create_user('pres_admin', 'admin@presupuesto.local', PASSWORD, is_staff=True)
+        usuario = Usuario.objects.create_user('pres_cliente', 'cliente@presupuesto.local', PASSWORD)
+        cls.cliente = Cliente.objects.create(usuario=usuario, nombre='Cliente Presupuesto')
+        poblar(0, TAMANOS[0], cls.admin, cls.cliente)
+
+    def _assertConstanteAlEscalar(self, funcion):
+        por_tamano = {}
+        previo = 0
+        for tamano in TAMANOS:
+            if previo:
+                poblar(previo, tamano, self.admin, self.cliente)
+            previo = tamano
+            _, por_tamano[tamano] = self.medir_consultas(funcion)
+        self.assertConsultasConstantes(por_tamano, funcion.__name__)
+
+    def _exportacion(self, tipo):
+        import io
+        from compra.exportaciones import GENERADORES
+        from compra.models import Compra
+
+        # Lo que escala con la selección es la generación del archivo (fuera
+        # del request); la acción del admin solo encola los ids
+        def exportar():
+            GENERADORES[tipo](list(Compra.objects.values_list('id', flat=True)), io.BytesIO())
+        exportar.__name__ = f'exportar_{tipo}'
+        return exportar
+
+    def test_exportar_excel(self):
+        self._assertConstanteAlEscalar(self._exportacion('excel'))
+
+    def test_exportar_pdf(self):
+        self._assertConstanteAlEscalar(self._exportacion('pdf'))
+
+    def test_exportar_comprobantes(self):
+        self._assertConstanteAlEscalar(self._exportacion('comprobantes'))
+
+    def test_consultas_ia_de_productos(self):
+        from ia.interprete import GeneradorConsultas, InterpretadorPrompt
+
+        def inventario_y_productos():
+            for prompt in ('inventario de productos', 'productos más vendidos'):
+                GeneradorConsultas(InterpretadorPrompt(prompt).interpretar()).generar_consulta()
+        self._assertConstanteAlEscalar(inventario_y_productos)
+
+
+def _json(cuerpo):
+    import json
+    return json.dumps(cuerpo) if cuerpo is not None else ''
+
+
+class MetricasTests(TestCase):
+    """Server-Timing, conteo de SQL con execute_wrapper y exposición en /metrics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from usuarios.models import Usuario
+
+        cls.staff = Usuario.objects.create_user('metricas_staff', 'staff@metricas.local', PASSWORD, is_staff=True)
+        cls.cliente = Usuario.objects.create_user('metricas_cliente', 'cliente@metricas.local', PASSWORD)
+
+    def setUp(self):
+        registro.limpiar()
+
+    def _consultas(self, respuesta):
+        return int(re.search(r'desc="(\d+) consultas"', respuesta['Server-Timing']).group(1))
+
+    def test_server_timing_cuenta_las_consultas_del_request(self):
+        api = APIClient()
+        api.force_authenticate(self.staff)
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = api.get(reverse('categoria-list'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._consultas(respuesta), len(capturadas))
+        for metrica in ('db;dur=', 'app;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metrica, respuesta['Server-Timing'])
+        self.assertIn(
+            'smartsales_http_requests_total{view="categoria-list",method="GET",status="200"} 1',
+            registro.exportar_prometheus(),
+        )
+
+    def test_solo_se_cuenta_el_sql_del_request_activo(self):
+        from usuarios.models import Usuario
+
+        metricas = MetricasRequest(capturar_sql=True)
+        token = activar_metricas(metricas)
+        try:
+            Usuario.objects.count()
+            list(Usuario.objects.filter(is_staff=True))
+        finally:
+            desactivar_metricas(token)
+        Usuario.objects.count()
+
+        self.assertEqual(metricas.consultas, 2)
+        self.assertEqual([sql.split()[0] for sql, _ in metricas.sql], ['SELECT', 'SELECT'])
+        self.assertGreater(metricas.tiempo_bd, 0)
+
+    def _request(self):
+        return RequestFactory().get('/instrumentado/')
+
+    def test_modo_sincrono(self):
+        from usuarios.models import Usuario
+
+        def vista(request):
+            Usuario.objects.count()
+            return HttpResponse('ok')
+
+        middleware = MetricasMiddleware(vista)
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertEqual(self._consultas(middleware(self._request())), 1)
+
+    def test_modo_asincrono(self):
+        from usuarios.models import Usuario
+
+        async def vista(request):
+            # sync_to_async copia el contexto: la consulta cuenta para este request
+            await sync_to_async(Usuario.objects.count)()
+            return HttpResponse('ok')
+
+        middleware = MetricasMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        respuesta = async_to_sync(middleware)(self._request())
+        self.assertEqual(self._consultas(respuesta), 1)
+        self.assertIn('view="<sin_ruta>"', registro.exportar_prometheus())
+
+    def test_configuracion(self):
+        with override_settings(METRICS_SERVER_TIMING=False):
+            respuesta = MetricasMiddleware(lambda request: HttpResponse('ok'))(self._request())
+        self.assertNotIn('Server-Timing', respuesta)
+        with override_settings(METRICS_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                MetricasMiddleware(lambda request: HttpResponse('ok'))
+
+    def test_metrics_solo_staff(self):
+        ruta = reverse('metrics')
+        self.assertEqual(APIClient().get(ruta).status_code, 401)
+
+        api = APIClient()
+        api.force_authenticate(self.cliente)
+        self.assertEqual(api.get(ruta).status_code, 403)
+
+        api.force_authenticate(self.staff)
+        respuesta = api.get(ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], CONTENT_TYPE_PROMETHEUS)
+        self.assertIn('# TYPE smartsales_http_request_duration_seconds histogram', respuesta.content.decode())
+
+
+@override_settings(PROFILER_ENABLED=True, PROFILER_SAMPLE_RATE=0, PROFILER_MAX_POR_MINUTO=2, PROFILER_MAX_CONCURRENTES=1)
+class PerfiladorTests(TestCase):
+    """Quién puede pedir un perfil, cuántos a la vez y cuáles se guardan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from usuarios.models import Usuario
+
+        cls.staff = Usuario.objects.create_user('perf_staff', 'staff@perfil.local', PASSWORD, is_staff=True)
+        cls.cliente = Usuario.objects.create_user('perf_cliente', 'cliente@perfil.local', PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        self.iniciados = []
+        # Usuario que resuelve la autenticación de DRF dentro de la vista (token)
+        self.usuario_vista = None
+
+        def vista(request):
+            self.middleware.process_view(request, vista, (), {})
+            self.iniciados.append(hasattr(request, '_perfil_en_curso'))
+            if self.usuario_vista is not None:
+                request.user = self.usuario_vista
+            return HttpResponse('ok')
+
+        self.middleware = PerfiladorMiddleware(vista)
+
+    def _pedir(self, usuario=None, **headers):
+        request = RequestFactory().get('/api/reportes/?_profile=1', **headers)
+        request.user = usuario or AnonymousUser()
+        request.resolver_match = None
+        return self.middleware(request)
+
+    def test_anonimo_y_no_staff_no_inician_el_muestreador(self):
+        self._pedir()
+        self._pedir(self.cliente)
+        self.assertEqual(self.iniciados, [False, False])
+
+    def test_limite_por_cliente(self):
+        for _ in range(3):
+            self._pedir(self.staff)
+        self.assertEqual(self.iniciados, [True, True, False])
+        self.assertEqual(PerfilRequest.objects.filter(disparador='staff', usuario=self.staff).count(), 2)
+
+    def test_limite_de_perfiles_simultaneos(self):
+        self.middleware.cupos.acquire()
+        try:
+            self._pedir(self.staff)
+        finally:
+            self.middleware.cupos.release()
+        self._pedir(self.staff)
+        self.assertEqual(self.iniciados, [False, True])
+
+    def test_con_token_solo_se_guarda_si_es_staff(self):
+        self.usuario_vista = self.cliente
+        self._pedir(HTTP_AUTHORIZATION='Token abc')
+        self.assertFalse(PerfilRequest.objects.exists())
+
+        self.usuario_vista = self.staff
+        self._pedir(HTTP_AUTHORIZATION='Token abc')
+        self.assertEqual(self.iniciados, [True, True])
+        self.assertEqual(PerfilRequest.objects.get().usuario, self.staff)
+
+
+class SpeedscopeTests(SimpleTestCase):
+
+    def test_pilas_colapsadas_a_speedscope(self):
+        import json
+
+        documento = json.loads(a_speedscope([{'nombre': 'GET /x', 'colapsado': 'a;b 3\na;c 1', 'intervalo_ms': 5}]))
+        self.assertEqual([f['name'] for f in documento['shared']['frames']], ['a', 'b', 'c'])
+        perfil = documento['profiles'][0]
+        self.assertEqual((perfil['type'], perfil['unit']), ('sampled', 'milliseconds'))
+        self.assertEqual(perfil['samples'], [[0, 1], [0, 2]])
+        self.assertEqual(perfil['weights'], [15, 5])
+        self.assertEqual(perfil['endValue'], 20)
@@ -0,0 +1,19 @@
+from django.http import HttpResponse
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from .metricas import CONTENT_TYPE_PROMETHEUS, registro
+
+
+class MetricasView(APIView):
+    """
+    Exposición de métricas en formato texto de Prometheus (solo staff).
+    Para scrapear, usar el token de un usuario staff:
+    Authorization: Token <token>
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        return HttpResponse(registro.exportar_prometheus(), content_type=CONTENT_TYPE_PROMETHEUS)
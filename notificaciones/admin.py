@@ -3,18 +3,23 @@ Administración de notificaciones push en Django Admin.
 """
 from django.contrib import admin
 from django.utils.html import format_html
+from django.utils import timezone
+from . import salud
 from .models import PushSubscription, NotificacionEnviada
 
 
 @admin.register(PushSubscription)
 class PushSubscriptionAdmin(admin.ModelAdmin):
     list_display = [
-        'id', 'usuario', 'endpoint_corto', 'activa_badge',
+        'id', 'usuario', 'endpoint_corto', 'activa_badge', 'salud_badge',
         'user_agent_corto', 'fecha_creacion', 'ultima_notificacion'
     ]
     list_filter = ['activa', 'fecha_creacion']
     search_fields = ['usuario__username', 'usuario__email', 'endpoint', 'user_agent']
-    readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
+    readonly_fields = [
+        'fecha_creacion', 'fecha_actualizacion', 'fallos_consecutivos', 'ultimo_exito',
+        'ultimo_fallo', 'latencia_ms', 'reintentar_desde'
+    ]
     date_hierarchy = 'fecha_creacion'
     
     fieldsets = (
@@ -24,6 +29,9 @@ class PushSubscriptionAdmin(admin.ModelAdmin):
         ('Información de Suscripción', {
             'fields': ('endpoint', 'p256dh', 'auth', 'user_agent')
         }),
+        ('Salud', {
+            'fields': ('fallos_consecutivos', 'ultimo_exito', 'ultimo_fallo', 'latencia_ms', 'reintentar_desde')
+        }),
         ('Fechas', {
             'fields': ('fecha_creacion', 'fecha_actualizacion', 'ultima_notificacion'),
             'classes': ('collapse',)
@@ -53,17 +61,27 @@ class PushSubscriptionAdmin(admin.ModelAdmin):
         )
     activa_badge.short_description = 'Estado'
     
+    def salud_badge(self, obj):
+        """Fallos seguidos y latencia promedio del endpoint"""
+        if obj.fallos_consecutivos:
+            color = '#e74c3c' if obj.reintentar_desde else '#f39c12'
+            return format_html('<span style="color:{};">● {} fallo(s)</span>', color, obj.fallos_consecutivos)
+        if obj.latencia_ms is None:
+            return format_html('<span style="color:#95a5a6;">● Sin envíos</span>')
+        return format_html('<span style="color:#27ae60;">● {} ms</span>', obj.latencia_ms)
+    salud_badge.short_description = 'Salud'
+    
     actions = ['activar_suscripciones', 'desactivar_suscripciones']
     
     def activar_suscripciones(self, request, queryset):
         """Acción para activar múltiples suscripciones"""
-        updated = queryset.update(activa=True)
+        updated = queryset.update(**salud.REINICIO)
         self.message_user(request, f'{updated} suscripción(es) activada(s).')
     activar_suscripciones.short_description = 'Activar suscripciones seleccionadas'
     
     def desactivar_suscripciones(self, request, queryset):
         """Acción para desactivar múltiples suscripciones"""
-        updated = queryset.update(activa=False)
+        updated = queryset.update(activa=False, fecha_actualizacion=timezone.now())
         self.message_user(request, f'{updated} suscripción(es) desactivada(s).')
     desactivar_suscripciones.short_description = 'Desactivar suscripciones seleccionadas'
 
@@ -0,0 +1,133 @@
+"""
+Políticas de entrega Web Push por tipo de notificación.
+
+Sin cabeceras, cada mensaje salía con TTL 0 (se descarta si el dispositivo
+no está conectado), sin urgencia y sin Topic, y cada cambio de un pedido
+era una entrega aparte. Aquí cada tipo define (RFC 8030):
+
+- ttl: segundos que el servicio push guarda el mensaje para un
+  dispositivo desconectado;
+- urgencia: very-low | low | normal | high (el dispositivo puede
+  posponer las de baja urgencia para ahorrar batería);
+- topic: plantilla sobre datos_extra (p. ej. 'pedido-{compra_id}'). Un
+  mensaje pendiente con el mismo Topic se reemplaza: al reconectarse el
+  dispositivo recibe solo el último estado del pedido;
+- agrupar: la primera actualización del usuario y Topic sale enseguida y
+  abre una ventana de PUSH_AGRUPAR_SEGUNDOS; las que llegan dentro de la
+  ventana se funden y al cerrarla se envía solo la última.
+
+La ventana abierta y la versión más reciente de cada usuario y Topic viven
+en la caché; el envío diferido lo hace un timer del proceso y, si al
+disparar hay una versión más nueva, se descarta. Un reinicio pierde solo
+esos envíos diferidos (nunca el primero), y aun así el Topic hace que el
+servicio push se quede con el último mensaje entregado. Con una caché
+compartida (Redis) agrupa entre procesos; con la caché local, dentro de
+cada proceso.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+HORA = 60 * 60
+
+
+@dataclass(frozen=True)
+class Politica:
+    ttl: int
+    urgencia: str = 'normal'
+    topic: Optional[str] = None
+    agrupar: bool = False
+
+    def topic_para(self, datos_extra):
+        """Topic del mensaje, o None si el tipo no tiene o faltan datos para la plantilla"""
+        if not self.topic:
+            return None
+        try:
+            topic = self.topic.format_map(datos_extra or {})
+        except (KeyError, IndexError):
+            return None
+        # El Topic admite hasta 32 caracteres del alfabeto base64url
+        return re.sub(r'[^A-Za-z0-9_-]', '-', topic)[:32]
+
+    def cabeceras(self, topic=None):
+        cabeceras = {'Urgency': self.urgencia}
+        if topic:
+            cabeceras['Topic'] = topic
+        return cabeceras
+
+
+POLITICAS = {
+    # Ciclo de vida del pedido: un solo Topic por pedido, el último estado reemplaza al anterior
+    'compra_creada': Politica(ttl=HORA, urgencia='normal', topic='pedido-{compra_id}', agrupar=True),
+    # La confirmación de pago no espera a la ventana: sale siempre enseguida
+    'compra_exitosa': Politica(ttl=24 * HORA, urgencia='high', topic='pedido-{compra_id}'),
+    'cambio_estado': Politica(ttl=24 * HORA, urgencia='normal', topic='pedido-{compra_id}', agrupar=True),
+    # Promociones: pierden valor rápido; un dispositivo desconectado solo recibe la última
+    'promocion': Politica(ttl=12 * HORA, urgencia='low', topic='promociones'),
+}
+
+POR_DEFECTO = Politica(ttl=24 * HORA)
+
+
+def politica(tipo):
+    return POLITICAS.get(tipo, POR_DEFECTO)
+
+
+def ventana():
+    return getattr(settings, 'PUSH_AGRUPAR_SEGUNDOS', 10)
+
+
+def _clave(usuario_id, topic):
+    return f'push:agrupar:{usuario_id}:{topic}'
+
+
+def abrir_ventana(usuario_id, topic, segundos=None):
+    """
+    True si no había una ventana abierta para el usuario y Topic: la abre y
+    el llamador envía ya. False si la actualización cae dentro de una ventana.
+    """
+    segundos = ventana() if segundos is None else segundos
+    return cache.add(f'{_clave(usuario_id, topic)}:ventana', time.time(), timeout=math.ceil(segundos))
+
+
+def agrupar(usuario_id, topic, enviar, segundos=None):
+    """
+    Programa `enviar()` al cerrar la ventana abierta del usuario y Topic. Si
+    antes llega otra actualización con el mismo Topic, solo se envía la
+    nueva. Devuelve el timer (los tests pueden esperarlo con join()).
+    """
+    segundos = ventana() if segundos is None else segundos
+    clave = _clave(usuario_id, topic)
+    ahora = time.time()
+    apertura = cache.get(f'{clave}:ventana', ahora)
+    version = uuid.uuid4().hex
+    cache.set(clave, version, timeout=math.ceil(segundos) + 60)
+
+    timer = threading.Timer(max(apertura + segundos - ahora, 0), _disparar, (clave, version, enviar))
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _disparar(clave, version, enviar):
+    if cache.get(clave) != version:
+        logger.debug(f'Push {clave} reemplazado por una actualización más nueva')
+        return
+    try:
+        enviar()
+    except Exception as e:
+        logger.error(f'❌ Error enviando push agrupado {clave}: {e}')
+    finally:
+        # El timer corre en su propio hilo, con su propia conexión
+        connection.close()
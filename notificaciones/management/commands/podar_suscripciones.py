@@ -0,0 +1,32 @@
+"""
+Limpieza en bloque de suscripciones push (notificaciones/salud.py).
+
+Desactiva las que acumulan PUSH_FALLOS_MAX fallos seguidos, las que fallan
+y no tienen un envío exitoso en --dias-sin-exito días, y los duplicados de
+un mismo usuario y navegador (queda la más reciente). Borra las inactivas
+sin cambios en --dias-inactivas días.
+
+Uso:
+    python manage.py podar_suscripciones
+    python manage.py podar_suscripciones --simular
+    python manage.py podar_suscripciones --dias-sin-exito 15 --dias-inactivas 60
+"""
+from django.core.management.base import BaseCommand
+
+from notificaciones.salud import podar
+
+
+class Command(BaseCommand):
+    help = 'Desactiva y borra en bloque suscripciones push muertas, viejas o duplicadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-sin-exito', type=int, default=30, help='Días sin un envío exitoso (default: 30)')
+        parser.add_argument('--dias-inactivas', type=int, default=90, help='Días de inactividad antes de borrar (default: 90)')
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta, no modifica nada')
+
+    def handle(self, *args, **options):
+        resultado = podar(options['dias_sin_exito'], options['dias_inactivas'], options['simular'])
+        verbo = 'se tocarían' if options['simular'] else 'procesadas'
+        for regla, cantidad in resultado.items():
+            self.stdout.write(f'{regla:<12} {cantidad:>6} {verbo}')
+        self.stdout.write(self.style.SUCCESS(f'Total: {sum(resultado.values())}'))
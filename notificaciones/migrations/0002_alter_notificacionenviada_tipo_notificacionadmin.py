@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacionenviada',
+            name='tipo',
+            field=models.CharField(choices=[('compra_exitosa', 'Compra Exitosa'), ('cambio_estado', 'Cambio de Estado'), ('promocion', 'Promoción'), ('nueva_compra', 'Nueva Compra (Admin)'), ('nuevo_pago', 'Nuevo Pago (Admin)'), ('otro', 'Otro')], db_index=True, max_length=50),
+        ),
+        migrations.CreateModel(
+            name='NotificacionAdmin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('nueva_compra', 'Nueva Compra'), ('nuevo_pago', 'Nuevo Pago'), ('sistema', 'Sistema'), ('stock_bajo', 'Stock Bajo'), ('error_pago', 'Error de Pago')], db_index=True, max_length=20)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('url', models.URLField(blank=True, help_text='URL para redirigir al hacer clic')),
+                ('datos', models.JSONField(blank=True, help_text='Datos adicionales de la notificación (compra_id, cliente_id, etc.)', null=True)),
+                ('creada', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('usuario', models.ForeignKey(limit_choices_to={'rol__in': ['admin', 'vendedor']}, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_admin', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notificación Admin',
+                'verbose_name_plural': 'Notificaciones Admin',
+                'db_table': 'notificaciones_admin',
+                'ordering': ['-creada'],
+                'indexes': [models.Index(fields=['usuario', '-creada'], name='notificacio_usuario_121fe5_idx'), models.Index(fields=['tipo', '-creada'], name='notificacio_tipo_e7389a_idx'), models.Index(fields=['-creada'], name='notificacio_creada_47b77c_idx')],
+            },
+        ),
+    ]
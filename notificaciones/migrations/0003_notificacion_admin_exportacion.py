@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0002_alter_notificacionenviada_tipo_notificacionadmin'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacionadmin',
+            name='tipo',
+            field=models.CharField(choices=[('nueva_compra', 'Nueva Compra'), ('nuevo_pago', 'Nuevo Pago'), ('sistema', 'Sistema'), ('stock_bajo', 'Stock Bajo'), ('error_pago', 'Error de Pago'), ('exportacion', 'Exportación')], db_index=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0003_notificacion_admin_exportacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificacionenviada',
+            name='tipo',
+            field=models.CharField(choices=[('compra_creada', 'Compra Creada'), ('compra_exitosa', 'Compra Exitosa'), ('cambio_estado', 'Cambio de Estado'), ('promocion', 'Promoción'), ('nueva_compra', 'Nueva Compra (Admin)'), ('nuevo_pago', 'Nuevo Pago (Admin)'), ('otro', 'Otro')], db_index=True, max_length=50),
+        ),
+    ]
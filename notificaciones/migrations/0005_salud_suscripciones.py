@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0004_tipo_compra_creada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='fallos_consecutivos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='latencia_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Promedio móvil del tiempo de envío al servicio push', null=True),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='reintentar_desde',
+            field=models.DateTimeField(blank=True, help_text='Tras un fallo no se le envía antes de esta fecha', null=True),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='ultimo_exito',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pushsubscription',
+            name='ultimo_fallo',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
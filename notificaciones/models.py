@@ -44,6 +44,20 @@ class PushSubscription(models.Model):
         blank=True,
         help_text='Fecha de la última notificación enviada'
     )
+    # Salud del endpoint (notificaciones/salud.py)
+    fallos_consecutivos = models.PositiveIntegerField(default=0)
+    ultimo_exito = models.DateTimeField(null=True, blank=True)
+    ultimo_fallo = models.DateTimeField(null=True, blank=True)
+    latencia_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Promedio móvil del tiempo de envío al servicio push'
+    )
+    reintentar_desde = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Tras un fallo no se le envía antes de esta fecha'
+    )
 
     class Meta:
         db_table = 'push_subscriptions'
@@ -64,6 +78,7 @@ class NotificacionEnviada(models.Model):
     Historial de notificaciones enviadas para auditoría y debugging.
     """
     TIPO_CHOICES = [
+        ('compra_creada', 'Compra Creada'),
         ('compra_exitosa', 'Compra Exitosa'),
         ('cambio_estado', 'Cambio de Estado'),
         ('promocion', 'Promoción'),
@@ -137,6 +152,7 @@ class NotificacionAdmin(models.Model):
         ('sistema', 'Sistema'),
         ('stock_bajo', 'Stock Bajo'),
         ('error_pago', 'Error de Pago'),
+        ('exportacion', 'Exportación'),
     ]
 
     usuario = models.ForeignKey(
@@ -4,11 +4,14 @@ Usa VAPID (Voluntary Application Server Identification) para autenticación.
 """
 import logging
 import json
+import time
 from typing import Optional, Dict, Any, List
-from pywebpush import webpush, WebPushException
+from pywebpush import WebPushException
 from django.conf import settings
 from django.utils import timezone
+from . import entrega, salud
 from .models import PushSubscription, NotificacionEnviada, NotificacionAdmin
+from .webpush_sender import WebPushSender
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +26,48 @@ class PushNotificationService:
         self.vapid_private_key = getattr(settings, 'VAPID_PRIVATE_KEY', None)
         self.vapid_public_key = getattr(settings, 'VAPID_PUBLIC_KEY', None)
         self.vapid_claims = getattr(settings, 'VAPID_CLAIMS', {})
+        self.sender = None
         
         if not self.vapid_private_key or not self.vapid_public_key:
             logger.warning(
                 'VAPID keys not configured. Push notifications will not work. '
                 'Generate keys with: python manage.py generate_vapid_keys'
             )
+        else:
+            # La clave se parsea una vez; las cabeceras VAPID se firman por audiencia
+            try:
+                self.sender = WebPushSender(self.vapid_private_key, self.vapid_claims)
+            except Exception as e:
+                logger.error(f'VAPID_PRIVATE_KEY inválida, no se enviarán notificaciones: {e}')
+    
+    def serializar_payload(
+        self,
+        titulo: str,
+        mensaje: str,
+        tipo: str = 'otro',
+        datos_extra: Optional[Dict[str, Any]] = None,
+        url: Optional[str] = None
+    ) -> str:
+        """
+        JSON del mensaje push. Las difusiones lo arman una vez y lo pasan a
+        send_notification(payload=...) para cada destinatario.
+        """
+        payload = {
+            'title': titulo,
+            'body': mensaje,
+            'icon': '/icon-192x192.png',  # Ajusta según tu app
+            'badge': '/badge-72x72.png',
+            'data': {
+                'tipo': tipo,
+                'timestamp': timezone.now().isoformat(),
+                **(datos_extra or {})
+            }
+        }
+        
+        if url:
+            payload['data']['url'] = url
+        
+        return json.dumps(payload)
     
     def send_notification(
         self,
@@ -37,7 +76,9 @@ class PushNotificationService:
         mensaje: str,
         tipo: str = 'otro',
         datos_extra: Optional[Dict[str, Any]] = None,
-        url: Optional[str] = None
+        url: Optional[str] = None,
+        payload: Optional[str] = None,
+        agrupar: bool = True
     ) -> Dict[str, Any]:
         """
         Envía una notificación push a todas las suscripciones activas del usuario.
@@ -49,125 +90,99 @@ class PushNotificationService:
             tipo: Tipo de notificación (compra_exitosa, cambio_estado, etc.)
             datos_extra: Datos adicionales para el payload
             url: URL para abrir al hacer clic en la notificación
+            payload: JSON ya serializado con serializar_payload() (difusiones)
+            agrupar: False envía ya aunque el tipo agrupe actualizaciones (entrega.py)
         
         Returns:
             Dict con resumen del envío (exitosos, fallidos)
         """
-        if not self.vapid_private_key:
+        if self.sender is None:
             logger.error('No se pueden enviar notificaciones: VAPID keys no configuradas')
             return {'exitosos': 0, 'fallidos': 0, 'error': 'VAPID keys no configuradas'}
         
-        # Obtener todas las suscripciones activas del usuario
-        subscriptions = PushSubscription.objects.filter(
-            usuario=usuario,
-            activa=True
-        )
+        # TTL, urgencia y Topic según el tipo
+        politica = entrega.politica(tipo)
+        topic = politica.topic_para(datos_extra)
+        if agrupar and politica.agrupar and topic and entrega.ventana() > 0 and not entrega.abrir_ventana(usuario.pk, topic):
+            # Dentro de la ventana del Topic: al cerrarla sale solo la última actualización
+            entrega.agrupar(usuario.pk, topic, lambda: self.send_notification(
+                usuario, titulo, mensaje, tipo, datos_extra, url, payload, agrupar=False
+            ))
+            return {'exitosos': 0, 'fallidos': 0, 'agrupada': True}
+        cabeceras = politica.cabeceras(topic)
         
-        if not subscriptions.exists():
+        # Suscripciones activas fuera de backoff, las más sanas primero (salud.py)
+        ahora = timezone.now()
+        subscriptions = list(salud.enviables(PushSubscription.objects.filter(usuario=usuario), ahora))
+        
+        if not subscriptions:
             logger.info(f'Usuario {usuario.username} no tiene suscripciones activas')
             return {'exitosos': 0, 'fallidos': 0, 'mensaje': 'Sin suscripciones activas'}
         
-        # Preparar payload
-        payload = {
-            'title': titulo,
-            'body': mensaje,
-            'icon': '/icon-192x192.png',  # Ajusta según tu app
-            'badge': '/badge-72x72.png',
-            'data': {
-                'tipo': tipo,
-                'timestamp': timezone.now().isoformat(),
-                **(datos_extra or {})
-            }
-        }
-        
-        if url:
-            payload['data']['url'] = url
+        # Un solo JSON para todas las suscripciones
+        if payload is None:
+            payload = self.serializar_payload(titulo, mensaje, tipo, datos_extra, url)
         
         exitosos = 0
         fallidos = 0
+        historial = []
+        timeout = getattr(settings, 'PUSH_TIMEOUT', 10)
         
         for subscription in subscriptions:
-            try:
-                # Preparar información de la suscripción
-                subscription_info = {
-                    "endpoint": subscription.endpoint,
-                    "keys": {
-                        "p256dh": subscription.p256dh,
-                        "auth": subscription.auth
-                    }
+            # Preparar información de la suscripción
+            subscription_info = {
+                "endpoint": subscription.endpoint,
+                "keys": {
+                    "p256dh": subscription.p256dh,
+                    "auth": subscription.auth
                 }
-                
+            }
+            inicio = time.perf_counter()
+            try:
                 # Enviar notificación
-                webpush(
-                    subscription_info=subscription_info,
-                    data=json.dumps(payload),
-                    vapid_private_key=self.vapid_private_key,
-                    vapid_claims=self.vapid_claims
-                )
-                
-                # Actualizar última notificación
-                subscription.ultima_notificacion = timezone.now()
-                subscription.save(update_fields=['ultima_notificacion'])
-                
-                # Guardar en historial como exitoso
-                NotificacionEnviada.objects.create(
-                    usuario=usuario,
-                    subscription=subscription,
-                    tipo=tipo,
-                    titulo=titulo,
-                    mensaje=mensaje,
-                    datos_extra=datos_extra,
-                    estado='exitoso'
-                )
-                
+                self.sender.enviar(subscription_info, payload, ttl=politica.ttl, headers=cabeceras, timeout=timeout)
+                salud.registrar_exito(subscription, (time.perf_counter() - inicio) * 1000, ahora)
+                estado, error_msg = 'exitoso', ''
                 exitosos += 1
                 logger.info(f'Notificación enviada a {usuario.username} (subscription {subscription.id})')
                 
-            except WebPushException as e:
-                fallidos += 1
-                error_msg = str(e)
-                
-                # Si el error indica que la suscripción expiró, desactivarla
-                if e.response and e.response.status_code in [404, 410]:
-                    subscription.activa = False
-                    subscription.save(update_fields=['activa'])
-                    logger.warning(f'Suscripción {subscription.id} desactivada (error {e.response.status_code})')
-                
-                # Guardar en historial como fallido
-                NotificacionEnviada.objects.create(
-                    usuario=usuario,
-                    subscription=subscription,
-                    tipo=tipo,
-                    titulo=titulo,
-                    mensaje=mensaje,
-                    datos_extra=datos_extra,
-                    estado='fallido',
-                    error=error_msg
-                )
-                
-                logger.error(f'Error al enviar notificación a {usuario.username}: {error_msg}')
-                
             except Exception as e:
+                # WebPushException trae la respuesta del servicio push; timeouts y errores de red no
+                response = getattr(e, 'response', None)
+                status_code = response.status_code if response is not None else None
+                estado, error_msg = 'fallido', str(e)
                 fallidos += 1
-                error_msg = str(e)
                 
-                NotificacionEnviada.objects.create(
-                    usuario=usuario,
-                    subscription=subscription,
-                    tipo=tipo,
-                    titulo=titulo,
-                    mensaje=mensaje,
-                    datos_extra=datos_extra,
-                    estado='fallido',
-                    error=error_msg
-                )
+                if salud.registrar_fallo(subscription, status_code, ahora):
+                    logger.warning(
+                        f'Suscripción {subscription.id} desactivada '
+                        f'(error {status_code}, {subscription.fallos_consecutivos} fallos seguidos)'
+                    )
                 
-                logger.error(f'Error inesperado al enviar notificación: {error_msg}', exc_info=True)
+                if isinstance(e, WebPushException):
+                    logger.error(f'Error al enviar notificación a {usuario.username}: {error_msg}')
+                else:
+                    logger.error(f'Error inesperado al enviar notificación: {error_msg}', exc_info=True)
+            
+            # Historial para auditoría (se guarda todo junto al final)
+            historial.append(NotificacionEnviada(
+                usuario=usuario,
+                subscription=subscription,
+                tipo=tipo,
+                titulo=titulo,
+                mensaje=mensaje,
+                datos_extra=datos_extra,
+                estado=estado,
+                error=error_msg
+            ))
+        
+        salud.guardar(subscriptions)
+        NotificacionEnviada.objects.bulk_create(historial)
 
         return {
             'exitosos': exitosos,
             'fallidos': fallidos,
-            'total': subscriptions.count()
+            'total': len(subscriptions)
         }
 
     def get_administradores(self):
@@ -192,6 +207,7 @@ class PushNotificationService:
             Dict con resumen del envío a todos los admins
         """
         administradores = self.get_administradores()
+        payload = self.serializar_payload(titulo, mensaje, tipo, datos_extra, url)
         total_exitosos = 0
         total_fallidos = 0
         resultados = []
@@ -203,7 +219,8 @@ class PushNotificationService:
                 mensaje=mensaje,
                 tipo=tipo,
                 datos_extra=datos_extra,
-                url=url
+                url=url,
+                payload=payload
             )
             resultados.append({
                 'admin': admin.username,
@@ -220,9 +237,10 @@ class PushNotificationService:
             'detalles': resultados
         }
 
-    def send_to_all_clientes(self, titulo: str, mensaje: str, tipo: str = 'promocion', datos_extra: Optional[Dict[str, Any]] = None, url: Optional[str] = None) -> Dict[str, Any]:
+    def send_to_all_clientes(self, titulo: str, mensaje: str, tipo: str = 'promocion', datos_extra: Optional[Dict[str, Any]] = None, url: Optional[str] = None, segmento: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Envía una notificación push a todos los clientes activos.
+        Envía una notificación push a todos los clientes activos con alguna
+        suscripción utilizable, o solo a los de un segmento.
 
         Args:
             titulo: Título de la notificación
@@ -230,12 +248,15 @@ class PushNotificationService:
             tipo: Tipo de notificación
             datos_extra: Datos adicionales para el payload
             url: URL para abrir al hacer clic en la notificación
+            segmento: Criterios de promociones/segmentos.py (None = todos)
 
         Returns:
             Dict con resumen del envío a todos los clientes
         """
-        from usuarios.models import Usuario
-        clientes = Usuario.objects.filter(rol='cliente', is_active=True)
+        from promociones import segmentos
+        # Una consulta para la audiencia; los clientes sin suscripciones no se recorren
+        clientes = segmentos.usuarios(segmento).iterator(chunk_size=500)
+        payload = self.serializar_payload(titulo, mensaje, tipo, datos_extra, url)
         total_exitosos = 0
         total_fallidos = 0
         resultados = []
@@ -247,7 +268,8 @@ class PushNotificationService:
                 mensaje=mensaje,
                 tipo=tipo,
                 datos_extra=datos_extra,
-                url=url
+                url=url,
+                payload=payload
             )
             resultados.append({
                 'cliente': cliente.username,
@@ -353,9 +375,10 @@ class PushNotificationService:
         )
 
 
-    def send_nueva_promocion_clientes(self, promocion) -> Dict[str, Any]:
+    def contenido_nueva_promocion(self, promocion) -> Dict[str, Any]:
         """
-        Notifica a todos los clientes sobre una nueva promoción.
+        Título, mensaje, datos y URL del aviso de una nueva promoción
+        (argumentos de send_notification sin el usuario).
 
         Args:
             promocion: Instancia del modelo Promocion
@@ -365,14 +388,11 @@ class PushNotificationService:
         else:
             descuento_texto = f"${promocion.valor_descuento} de descuento"
 
-        titulo = '🎉 ¡Nueva Promoción Disponible!'
-        mensaje = f"{descuento_texto} en {promocion.nombre}. {promocion.descripcion[:50]}..."
-
-        return self.send_to_all_clientes(
-            titulo=titulo,
-            mensaje=mensaje,
-            tipo='promocion',
-            datos_extra={
+        return {
+            'titulo': '🎉 ¡Nueva Promoción Disponible!',
+            'mensaje': f"{descuento_texto} en {promocion.nombre}. {promocion.descripcion[:50]}...",
+            'tipo': 'promocion',
+            'datos_extra': {
                 'promocion_id': promocion.id,
                 'codigo': promocion.codigo,
                 'tipo_descuento': promocion.tipo_descuento,
@@ -380,8 +400,19 @@ class PushNotificationService:
                 'monto_minimo': float(promocion.monto_minimo) if promocion.monto_minimo else None,
                 'fecha_fin': promocion.fecha_fin.isoformat() if promocion.fecha_fin else None
             },
-            url=f'/productos?promocion={promocion.codigo}'
-        )
+            'url': f'/productos?promocion={promocion.codigo}',
+        }
+
+    def send_nueva_promocion_clientes(self, promocion) -> Dict[str, Any]:
+        """
+        Notifica a los clientes del segmento de la promoción, de una vez.
+        Al crear una promoción el aviso va por campaña en lotes
+        (promociones/campanas.py).
+
+        Args:
+            promocion: Instancia del modelo Promocion
+        """
+        return self.send_to_all_clientes(**self.contenido_nueva_promocion(promocion), segmento=promocion.segmento)
 
     def send_admin_notification(
         self,
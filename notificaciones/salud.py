@@ -0,0 +1,130 @@
+"""
+Salud de las suscripciones push.
+
+Antes solo se desactivaba una suscripción cuando el servicio push
+respondía 404/410; un endpoint muerto que no responde (timeout) o da 5xx
+se volvía a intentar en cada difusión y se llevaba buena parte del
+tiempo del envío. Ahora cada suscripción guarda fallos consecutivos,
+último éxito/fallo y latencia, y:
+
+- tras un fallo no se le envía hasta `reintentar_desde` (PUSH_BACKOFF_BASE
+  segundos, el doble por cada fallo seguido, hasta PUSH_BACKOFF_MAX);
+- con PUSH_FALLOS_MAX fallos seguidos, o 404/410, se desactiva;
+- al enviar, las más sanas (menos fallos, menor latencia) van primero;
+- los cambios de un envío se guardan con un bulk_update.
+
+`manage.py podar_suscripciones` desactiva y borra en bloque las muertas,
+las viejas sin éxitos y los duplicados de un mismo navegador.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import PushSubscription
+
+logger = logging.getLogger(__name__)
+
+# bulk_update y update() no tocan el auto_now de fecha_actualizacion: al
+# desactivar se fija a mano, porque la poda cuenta los días desde ahí
+CAMPOS = [
+    'activa', 'fallos_consecutivos', 'ultimo_exito', 'ultimo_fallo',
+    'latencia_ms', 'reintentar_desde', 'ultima_notificacion', 'fecha_actualizacion',
+]
+
+# Valores al (re)activar una suscripción: vuelve a empezar sin backoff
+REINICIO = {'activa': True, 'fallos_consecutivos': 0, 'reintentar_desde': None}
+
+# Peso de la última medición en el promedio móvil de latencia
+ALFA = 0.3
+
+
+def _fallos_max():
+    return getattr(settings, 'PUSH_FALLOS_MAX', 8)
+
+
+def backoff(fallos):
+    base = getattr(settings, 'PUSH_BACKOFF_BASE', 300)
+    maximo = getattr(settings, 'PUSH_BACKOFF_MAX', 24 * 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (fallos - 1), maximo))
+
+
+def enviables(queryset, ahora=None):
+    """Las activas fuera de backoff, las más sanas primero"""
+    ahora = ahora or timezone.now()
+    return queryset.filter(
+        Q(reintentar_desde__isnull=True) | Q(reintentar_desde__lte=ahora),
+        activa=True,
+    ).order_by('fallos_consecutivos', F('latencia_ms').asc(nulls_last=True))
+
+
+def registrar_exito(subscription, latencia_ms, ahora):
+    subscription.fallos_consecutivos = 0
+    subscription.reintentar_desde = None
+    subscription.ultimo_exito = ahora
+    subscription.ultima_notificacion = ahora
+    latencia_ms = round(latencia_ms)
+    if subscription.latencia_ms is not None:
+        latencia_ms = round(ALFA * latencia_ms + (1 - ALFA) * subscription.latencia_ms)
+    subscription.latencia_ms = latencia_ms
+
+
+def registrar_fallo(subscription, status_code, ahora):
+    """Anota el fallo; devuelve True si la suscripción quedó desactivada"""
+    subscription.fallos_consecutivos += 1
+    subscription.ultimo_fallo = ahora
+    if status_code in (404, 410) or subscription.fallos_consecutivos >= _fallos_max():
+        subscription.activa = False
+        subscription.reintentar_desde = None
+        subscription.fecha_actualizacion = ahora
+        return True
+    subscription.reintentar_desde = ahora + backoff(subscription.fallos_consecutivos)
+    return False
+
+
+def guardar(subscriptions):
+    """Una sola escritura para todas las suscripciones de un envío"""
+    PushSubscription.objects.bulk_update(subscriptions, CAMPOS)
+
+
+def _duplicadas():
+    # Del mismo usuario y navegador queda activa solo la más reciente con éxito
+    mas_reciente = PushSubscription.objects.filter(
+        usuario=OuterRef('usuario'), user_agent=OuterRef('user_agent'), activa=True
+    ).order_by(F('ultimo_exito').desc(nulls_last=True), '-fecha_actualizacion', '-id').values('pk')[:1]
+    return PushSubscription.objects.filter(activa=True).exclude(user_agent='').exclude(pk=Subquery(mas_reciente))
+
+
+def podar(dias_sin_exito=30, dias_inactivas=90, simular=False):
+    """
+    Limpieza en bloque; devuelve cuántas filas tocó cada regla:
+    - muertas: activas con PUSH_FALLOS_MAX fallos seguidos o más;
+    - sin_exito: activas que fallan y no tuvieron un éxito en `dias_sin_exito`;
+    - duplicadas: activas de un mismo usuario y navegador salvo la más reciente;
+    - borradas: inactivas sin cambios en `dias_inactivas` (las que se
+      desactivan en esta misma pasada empiezan a contar desde ahora).
+    """
+    ahora = timezone.now()
+    activas = PushSubscription.objects.filter(activa=True)
+    reglas = {
+        'muertas': activas.filter(fallos_consecutivos__gte=_fallos_max()),
+        'sin_exito': activas.filter(fallos_consecutivos__gt=0).filter(
+            Q(ultimo_exito__lt=ahora - timedelta(days=dias_sin_exito))
+            | Q(ultimo_exito__isnull=True, fecha_creacion__lt=ahora - timedelta(days=dias_sin_exito))
+        ),
+        'duplicadas': _duplicadas(),
+    }
+    resultado = {}
+    for regla, queryset in reglas.items():
+        resultado[regla] = queryset.count() if simular else queryset.update(
+            activa=False, reintentar_desde=None, fecha_actualizacion=ahora
+        )
+
+    viejas = PushSubscription.objects.filter(activa=False, fecha_actualizacion__lt=ahora - timedelta(days=dias_inactivas))
+    resultado['borradas'] = viejas.count() if simular else viejas.delete()[0]
+
+    if not simular:
+        logger.info(f'🧹 Suscripciones push podadas: {resultado}')
+    return resultado
@@ -1,7 +1,235 @@
 """
 Tests para el módulo de notificaciones push.
 """
-from django.test import TestCase
+import base64
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from pywebpush import WebPushException
 
+from usuarios.models import Usuario
+
+from . import entrega, salud
+from .models import PushSubscription
+from .push_service import PushNotificationService
+from .webpush_sender import WebPushSender
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def _suscripcion(endpoint):
+    publica = ec.generate_private_key(ec.SECP256R1()).public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return {'endpoint': endpoint, 'keys': {'p256dh': _b64(publica), 'auth': _b64(b'0123456789abcdef')}}
+
+
+class WebPushSenderTests(SimpleTestCase):
+    """Cabeceras VAPID firmadas una vez por audiencia y vueltas a firmar antes de vencer"""
+
+    def setUp(self):
+        clave = ec.generate_private_key(ec.SECP256R1()).private_numbers().private_value.to_bytes(32, 'big')
+        self.sesion = mock.Mock()
+        self.sesion.post.return_value = mock.Mock(status_code=201)
+        self.sender = WebPushSender(_b64(clave), {'sub': 'mailto:admin@test.local'}, crear_sesion=lambda: self.sesion)
+
+    def _claims(self, llamada):
+        token = llamada.kwargs['headers']['Authorization'].split('t=')[1].split(',')[0]
+        cuerpo = token.split('.')[1]
+        return json.loads(base64.urlsafe_b64decode(cuerpo + '=' * (-len(cuerpo) % 4)))
+
+    def test_una_firma_por_audiencia(self):
+        with mock.patch.object(self.sender.vapid, 'sign', wraps=self.sender.vapid.sign) as firmar:
+            for i in range(3):
+                self.sender.enviar(_suscripcion(f'https://fcm.googleapis.com/fcm/send/{i}'), '{"title": "Hola"}')
+                self.sender.enviar(_suscripcion(f'https://updates.push.services.mozilla.com/wpush/v2/{i}'), '{}')
+        self.assertEqual(firmar.call_count, 2)
+
+        audiencias = [self._claims(llamada)['aud'] for llamada in self.sesion.post.call_args_list]
+        self.assertEqual(audiencias[:2], ['https://fcm.googleapis.com', 'https://updates.push.services.mozilla.com'])
+
+    def test_vuelve_a_firmar_cerca_del_vencimiento(self):
+        suscripcion = _suscripcion('https://fcm.googleapis.com/fcm/send/1')
+        with mock.patch('notificaciones.webpush_sender.time.time', return_value=1_000_000):
+            primera = self.sender.cabeceras_vapid(suscripcion['endpoint'])
+        with mock.patch('notificaciones.webpush_sender.time.time', return_value=1_000_000 + self.sender.vigencia - self.sender.margen):
+            self.assertNotEqual(self.sender.cabeceras_vapid(suscripcion['endpoint']), primera)
+
+    def test_error_del_servicio_push(self):
+        self.sesion.post.return_value = mock.Mock(status_code=410, reason='Gone', text='')
+        with self.assertRaises(WebPushException) as error:
+            self.sender.enviar(_suscripcion('https://fcm.googleapis.com/fcm/send/1'), '{}')
+        self.assertEqual(error.exception.response.status_code, 410)
+
+
+class PoliticasEntregaTests(TestCase):
+    """TTL, urgencia y Topic por tipo; las actualizaciones de un pedido se agrupan"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user('push_cliente', 'push@cliente.local', 'clave-123')
+        for i in range(2):
+            PushSubscription.objects.create(usuario=self.usuario, endpoint=f'https://push.local/{i}', p256dh='k', auth='a')
+        self.servicio = PushNotificationService()
+        self.servicio.sender = mock.Mock()
+
+    def test_cabeceras_segun_tipo(self):
+        self.servicio.send_notification(self.usuario, 'Promo', 'Hola', tipo='promocion', datos_extra={'promocion_id': 1})
+        self.assertEqual(self.servicio.sender.enviar.call_count, 2)
+        llamada = self.servicio.sender.enviar.call_args
+        self.assertEqual(llamada.kwargs['ttl'], 12 * 60 * 60)
+        self.assertEqual(llamada.kwargs['headers'], {'Urgency': 'low', 'Topic': 'promociones'})
+
+    def _estado(self, tipo, mensaje):
+        return self.servicio.send_notification(self.usuario, 'Pedido', mensaje, tipo=tipo, datos_extra={'compra_id': 7})
+
+    def test_primera_actualizacion_sale_ya_y_las_siguientes_se_agrupan(self):
+        with mock.patch.object(entrega, 'agrupar') as agrupar:
+            self.assertEqual(self._estado('cambio_estado', 'Preparando')['exitosos'], 2)
+            self.assertTrue(self._estado('cambio_estado', 'Enviado')['agrupada'])
+        self.assertEqual(self.servicio.sender.enviar.call_count, 2)
+
+        usuario_id, topic, enviar = agrupar.call_args.args
+        self.assertEqual((usuario_id, topic), (self.usuario.pk, 'pedido-7'))
+        self.assertEqual(enviar()['exitosos'], 2)
+        self.assertEqual(
+            self.servicio.sender.enviar.call_args.kwargs['headers'], {'Urgency': 'normal', 'Topic': 'pedido-7'}
+        )
+
+    def test_confirmacion_de_pago_no_espera_a_la_ventana(self):
+        with mock.patch.object(entrega, 'agrupar') as agrupar:
+            self._estado('compra_creada', 'Creado')
+            self.assertEqual(self._estado('compra_exitosa', 'Pagado')['exitosos'], 2)
+        agrupar.assert_not_called()
+        self.assertEqual(
+            self.servicio.sender.enviar.call_args.kwargs['headers'], {'Urgency': 'high', 'Topic': 'pedido-7'}
+        )
+
+
+class AgruparTests(SimpleTestCase):
+    """La primera actualización abre la ventana; dentro de ella solo sale la última"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ventana_por_usuario_y_topic(self):
+        self.assertTrue(entrega.abrir_ventana(1, 'pedido-1', segundos=1))
+        self.assertFalse(entrega.abrir_ventana(1, 'pedido-1', segundos=1))
+        self.assertTrue(entrega.abrir_ventana(1, 'pedido-2', segundos=1))
+        self.assertTrue(entrega.abrir_ventana(2, 'pedido-1', segundos=1))
+
+    def test_ultima_gana(self):
+        enviados = []
+        for topic in ('pedido-1', 'pedido-2'):
+            entrega.abrir_ventana(1, topic, segundos=0.05)
+        timers = [
+            entrega.agrupar(1, 'pedido-1', lambda: enviados.append('preparando'), segundos=0.05),
+            entrega.agrupar(1, 'pedido-1', lambda: enviados.append('enviado'), segundos=0.05),
+            entrega.agrupar(1, 'pedido-2', lambda: enviados.append('otro pedido'), segundos=0.05),
+        ]
+        for timer in timers:
+            timer.join()
+        self.assertEqual(sorted(enviados), ['enviado', 'otro pedido'])
+
+
+class SaludSuscripcionesTests(TestCase):
+    """Backoff tras fallos, desactivación de endpoints muertos y poda en bloque"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('salud_cliente', 'salud@cliente.local', 'clave-123')
+        self.sana = PushSubscription.objects.create(usuario=self.usuario, endpoint='https://push.local/sana', p256dh='k', auth='a')
+        self.caida = PushSubscription.objects.create(usuario=self.usuario, endpoint='https://push.local/caida', p256dh='k', auth='a')
+        self.servicio = PushNotificationService()
+        self.servicio.sender = mock.Mock()
+        self.respuestas = {}
+
+        def enviar(subscription_info, payload, **kwargs):
+            status_code = self.respuestas.get(subscription_info['endpoint'])
+            if status_code:
+                raise WebPushException('Push failed', response=mock.Mock(status_code=status_code))
+
+        self.servicio.sender.enviar.side_effect = enviar
+
+    def _enviar(self):
+        return self.servicio.send_notification(self.usuario, 'Hola', 'Mensaje', tipo='otro')
+
+    def _endpoints(self):
+        return [llamada.args[0]['endpoint'] for llamada in self.servicio.sender.enviar.call_args_list]
+
+    def test_backoff_tras_fallo_y_desactivacion_por_410(self):
+        self.respuestas['https://push.local/caida'] = 503
+        self.assertEqual(self._enviar()['fallidos'], 1)
+        self.caida.refresh_from_db()
+        self.assertEqual(self.caida.fallos_consecutivos, 1)
+        self.assertGreater(self.caida.reintentar_desde, timezone.now())
+
+        # En backoff no se le envía
+        self.servicio.sender.enviar.reset_mock()
+        self.assertEqual(self._enviar(), {'exitosos': 1, 'fallidos': 0, 'total': 1})
+        self.assertEqual(self._endpoints(), ['https://push.local/sana'])
+
+        # Vencido el backoff se reintenta: un 410 la desactiva
+        PushSubscription.objects.filter(pk=self.caida.pk).update(reintentar_desde=timezone.now())
+        self.respuestas['https://push.local/caida'] = 410
+        self._enviar()
+        self.caida.refresh_from_db()
+        self.assertFalse(self.caida.activa)
+
+        self.sana.refresh_from_db()
+        self.assertEqual(self.sana.fallos_consecutivos, 0)
+        self.assertIsNotNone(self.sana.ultimo_exito)
+        self.assertIsNotNone(self.sana.latencia_ms)
+
+    def test_las_mas_sanas_primero(self):
+        PushSubscription.objects.filter(pk=self.sana.pk).update(latencia_ms=50)
+        PushSubscription.objects.filter(pk=self.caida.pk).update(fallos_consecutivos=2)
+        self._enviar()
+        self.assertEqual(self._endpoints(), ['https://push.local/sana', 'https://push.local/caida'])
+
+    def test_podar_suscripciones(self):
+        hace_meses = timezone.now() - timedelta(days=120)
+        PushSubscription.objects.filter(pk=self.caida.pk).update(fallos_consecutivos=1, fecha_creacion=hace_meses)
+        navegador = {'usuario': self.usuario, 'p256dh': 'k', 'auth': 'a', 'user_agent': 'Firefox 131'}
+        vieja = PushSubscription.objects.create(endpoint='https://push.local/ff-1', **navegador)
+        nueva = PushSubscription.objects.create(endpoint='https://push.local/ff-2', **navegador)
+        PushSubscription.objects.filter(pk=vieja.pk).update(ultimo_exito=hace_meses)
+        PushSubscription.objects.filter(pk=nueva.pk).update(ultimo_exito=timezone.now())
+        borrable = PushSubscription.objects.create(usuario=self.usuario, endpoint='https://push.local/vieja', p256dh='k', auth='a', activa=False)
+        PushSubscription.objects.filter(pk=borrable.pk).update(fecha_actualizacion=hace_meses)
+
+        call_command('podar_suscripciones', '--simular', stdout=StringIO())
+        self.assertEqual(PushSubscription.objects.filter(activa=True).count(), 4)
+
+        call_command('podar_suscripciones', stdout=StringIO())
+        self.assertEqual(
+            set(PushSubscription.objects.filter(activa=True).values_list('endpoint', flat=True)),
+            {'https://push.local/sana', 'https://push.local/ff-2'},
+        )
+        self.assertFalse(PushSubscription.objects.filter(pk=borrable.pk).exists())
+
+    def test_desactivada_en_la_poda_no_se_borra_en_la_misma_pasada(self):
+        hace_meses = timezone.now() - timedelta(days=120)
+        PushSubscription.objects.filter(pk=self.caida.pk).update(
+            fallos_consecutivos=8, fecha_creacion=hace_meses, fecha_actualizacion=hace_meses
+        )
+        with override_settings(PUSH_FALLOS_MAX=8):
+            self.assertEqual(salud.podar(dias_inactivas=90), {'muertas': 1, 'sin_exito': 0, 'duplicadas': 0, 'borradas': 0})
+        self.caida.refresh_from_db()
+        self.assertFalse(self.caida.activa)
+
+        # Lo mismo si la desactiva un 410 al enviar
+        PushSubscription.objects.filter(pk=self.sana.pk).update(fecha_actualizacion=hace_meses)
+        self.respuestas['https://push.local/sana'] = 410
+        self._enviar()
+        self.assertEqual(salud.podar(dias_inactivas=90)['borradas'], 0)
+        self.assertEqual(PushSubscription.objects.filter(activa=False).count(), 2)
@@ -9,6 +9,7 @@ from django.conf import settings
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
+from . import salud
 from .models import PushSubscription, NotificacionEnviada, NotificacionAdmin
 from .serializers import PushSubscriptionSerializer, NotificacionEnviadaSerializer, NotificacionAdminSerializer
 
@@ -38,7 +39,9 @@ class PushSubscriptionViewSet(viewsets.ModelViewSet):
             existing.p256dh = serializer.validated_data['p256dh']
             existing.auth = serializer.validated_data['auth']
             existing.user_agent = serializer.validated_data.get('user_agent', '')
-            existing.activa = True
+            # Reactivada: vuelve a empezar sin fallos ni backoff
+            for campo, valor in salud.REINICIO.items():
+                setattr(existing, campo, valor)
             existing.save()
             self.instance = existing
         else:
@@ -55,7 +58,8 @@ class PushSubscriptionViewSet(viewsets.ModelViewSet):
         """Desactiva una suscripción push"""
         subscription = self.get_object()
         subscription.activa = False
-        subscription.save(update_fields=['activa'])
+        # fecha_actualizacion (auto_now) marca desde cuándo está inactiva
+        subscription.save(update_fields=['activa', 'fecha_actualizacion'])
         return Response({'status': 'Suscripción desactivada'})
     
     @extend_schema(
@@ -67,8 +71,9 @@ class PushSubscriptionViewSet(viewsets.ModelViewSet):
     def activar(self, request, pk=None):
         """Activa una suscripción push"""
         subscription = self.get_object()
-        subscription.activa = True
-        subscription.save(update_fields=['activa'])
+        for campo, valor in salud.REINICIO.items():
+            setattr(subscription, campo, valor)
+        subscription.save(update_fields=list(salud.REINICIO))
         return Response({'status': 'Suscripción activada'})
 
 
@@ -151,7 +156,7 @@ class NotificacionAdminViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.rol not in ['admin', 'vendedor']:
             return NotificacionAdmin.objects.none()
-        return NotificacionAdmin.objects.filter(usuario=user)
+        return NotificacionAdmin.objects.select_related('usuario').filter(usuario=user)
 
     def get_permissions(self):
         """Verificar permisos de admin/vendedor"""
@@ -219,7 +224,7 @@ class AdminNotificationPollingView(APIView):
             )
 
         # Obtener notificaciones recientes (últimas 20)
-        notifications = NotificacionAdmin.objects.filter(
+        notifications = NotificacionAdmin.objects.select_related('usuario').filter(
             usuario=user
         ).order_by('-creada')[:20]
 
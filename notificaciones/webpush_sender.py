@@ -0,0 +1,92 @@
+"""
+Envío Web Push reutilizando lo que no cambia entre mensajes.
+
+pywebpush.webpush() por cada suscripción vuelve a leer la clave privada
+VAPID, firma un JWT nuevo (una firma ECDSA) y abre una conexión HTTP
+nueva, aunque miles de mensajes vayan al mismo servicio push. Además
+escribe `aud` y `exp` en el dict de claims que recibe: con claims
+compartidos, el `aud` del primer endpoint quedaba para todos.
+
+WebPushSender:
+
+- parsea la clave privada una sola vez, al crearse;
+- guarda las cabeceras VAPID firmadas por audiencia (origen del endpoint:
+  https://fcm.googleapis.com, https://updates.push.services.mozilla.com,
+  ...) y las vuelve a firmar cuando les queda menos de MARGEN de vigencia;
+- reutiliza una requests.Session por hilo (keep-alive por servicio push).
+
+El payload se serializa una vez por difusión (serializar_payload en
+push_service.py). El cifrado sí es por mensaje: cada suscripción tiene
+sus propias claves y RFC 8291 pide clave efímera y salt nuevos por mensaje.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from py_vapid import Vapid
+from pywebpush import WebPusher, WebPushException
+
+logger = logging.getLogger(__name__)
+
+# Vigencia del JWT VAPID (RFC 8292 admite hasta 24 h)
+VIGENCIA = 12 * 60 * 60
+# Se vuelve a firmar cuando le queda menos que esto
+MARGEN = 60 * 60
+
+
+def audiencia(endpoint):
+    """Origen del endpoint: el `aud` del JWT VAPID"""
+    url = urlparse(endpoint)
+    return f'{url.scheme}://{url.netloc}'
+
+
+class WebPushSender:
+    """Envía mensajes Web Push con la clave VAPID ya cargada y cabeceras firmadas en caché"""
+
+    def __init__(self, vapid_private_key, vapid_claims, vigencia=VIGENCIA, margen=MARGEN, crear_sesion=requests.Session):
+        self.vapid = Vapid.from_string(private_key=vapid_private_key)
+        self.claims = {k: v for k, v in vapid_claims.items() if k not in ('aud', 'exp')}
+        self.vigencia = vigencia
+        self.margen = margen
+        self.crear_sesion = crear_sesion
+        self._cabeceras = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def cabeceras_vapid(self, endpoint):
+        """Cabeceras Authorization para el servicio push del endpoint (firmadas una vez por audiencia)"""
+        aud = audiencia(endpoint)
+        ahora = int(time.time())
+        firmadas = self._cabeceras.get(aud)
+        if firmadas is None or firmadas[0] - self.margen <= ahora:
+            exp = ahora + self.vigencia
+            firmadas = (exp, self.vapid.sign({**self.claims, 'aud': aud, 'exp': exp}))
+            with self._lock:
+                self._cabeceras[aud] = firmadas
+        return firmadas[1]
+
+    def _sesion(self):
+        sesion = getattr(self._local, 'sesion', None)
+        if sesion is None:
+            sesion = self._local.sesion = self.crear_sesion()
+        return sesion
+
+    def enviar(self, subscription_info, data, ttl=0, headers=None, timeout=None):
+        """
+        Cifra `data` (str ya serializado) para la suscripción y lo envía.
+        Lanza WebPushException si el servicio push responde con error,
+        igual que pywebpush.webpush().
+        """
+        cabeceras = dict(self.cabeceras_vapid(subscription_info['endpoint']))
+        cabeceras.update(headers or {})
+        response = WebPusher(subscription_info, requests_session=self._sesion()).send(
+            data, cabeceras, ttl=ttl, timeout=timeout
+        )
+        if response.status_code > 202:
+            raise WebPushException(
+                f'Push failed: {response.status_code} {response.reason}\nResponse body:{response.text}',
+                response=response,
+            )
+        return response
@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
-from .models import Producto, Categoria
+from .inventario import StockInsuficiente, guardar_sin_stock, mover
+from .models import Producto, Categoria, MovimientoStock
 
 
 @admin.register(Categoria)
@@ -89,3 +90,46 @@ class ProductoAdmin(admin.ModelAdmin):
 			)
 		return format_html('<p style="color: #999;">No hay imagen cargada</p>')
 	imagen_preview.short_description = 'Vista Previa'
+
+	def save_model(self, request, obj, form, change):
+		"""El stock editado entra al libro como movimiento en vez de pisar la columna"""
+		nuevo = obj.stock
+		if change:
+			anterior = form.initial.get('stock', nuevo)
+			# Se guarda todo menos el stock: las ventas en curso no se pierden
+			guardar_sin_stock(obj)
+		else:
+			anterior = 0
+			obj.stock = 0
+			obj.save()
+		obj.stock = anterior
+		
+		if nuevo != anterior:
+			try:
+				mover(obj, nuevo - anterior, 'ajuste' if change else 'inicial', f'admin:{request.user.username}')
+			except StockInsuficiente as e:
+				self.message_user(request, f'Stock no ajustado: {e}', level=messages.ERROR)
+
+
+@admin.register(MovimientoStock)
+class MovimientoStockAdmin(admin.ModelAdmin):
+	"""Libro de inventario: solo lectura, los movimientos no se editan"""
+	list_display = ('fecha', 'producto', 'cantidad_badge', 'motivo', 'referencia')
+	list_filter = ('motivo', 'fecha')
+	search_fields = ('producto__sku', 'producto__nombre', 'referencia')
+	list_select_related = ('producto',)
+	date_hierarchy = 'fecha'
+
+	def cantidad_badge(self, obj):
+		color = 'green' if obj.cantidad > 0 else 'red'
+		return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, f'{obj.cantidad:+d}')
+	cantidad_badge.short_description = 'Cantidad'
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
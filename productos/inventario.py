@@ -0,0 +1,146 @@
+"""
+Libro de inventario (MovimientoStock) y su proyección en Producto.stock.
+
+Leer el stock, restarle y guardar pierde actualizaciones cuando una venta y
+una devolución tocan el mismo producto a la vez, y bloquear la fila pone en
+fila a todos. Aquí cada cambio es:
+
+- un UPDATE condicional `stock = stock + n` (con `stock >= -n` si resta):
+  la base lo aplica de forma atómica y, si no alcanza, no toca la fila;
+- una fila en MovimientoStock que nunca se edita.
+
+aplicar() procesa lotes (devoluciones, reposiciones, los ítems de una
+compra): suma los movimientos por producto, hace un UPDATE por producto y
+un solo INSERT para el libro, todo o nada.
+
+`manage.py verificar_stock` compara la proyección con la suma del libro y
+puede reconstruirla.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import MovimientoStock, Producto
+
+logger = logging.getLogger(__name__)
+
+# Filas por INSERT al escribir el libro
+LOTE = 1000
+
+
+class StockInsuficiente(ValueError):
+    """Un movimiento dejaría el stock de un producto en negativo"""
+
+
+def _mensaje(producto_id, neto):
+    producto = Producto.objects.filter(pk=producto_id).values('nombre', 'stock').first()
+    if producto is None:
+        return f'Producto {producto_id} no existe'
+    return f"Stock insuficiente para {producto['nombre']}. Disponible: {producto['stock']}, Solicitado: {-neto}"
+
+
+def aplicar(movimientos):
+    """
+    Aplica un lote de movimientos [(producto o id, cantidad, motivo, referencia), ...].
+
+    Un UPDATE condicional por producto con el neto del lote y un INSERT
+    para el libro, en una transacción: si a un producto no le alcanza el
+    stock se lanza StockInsuficiente y no se aplica nada.
+    Devuelve {producto_id: neto aplicado}.
+    """
+    filas = []
+    netos = defaultdict(int)
+    for producto, cantidad, motivo, referencia in movimientos:
+        if not cantidad:
+            continue
+        producto_id = getattr(producto, 'pk', producto)
+        netos[producto_id] += cantidad
+        filas.append(MovimientoStock(
+            producto_id=producto_id, cantidad=cantidad, motivo=motivo, referencia=referencia
+        ))
+    if not filas:
+        return {}
+
+    with transaction.atomic():
+        # Siempre en orden de id: dos lotes concurrentes no se bloquean en cruz
+        for producto_id in sorted(netos):
+            neto = netos[producto_id]
+            productos = Producto.objects.filter(pk=producto_id)
+            if neto < 0:
+                productos = productos.filter(stock__gte=-neto)
+            if not productos.update(stock=F('stock') + neto):
+                raise StockInsuficiente(_mensaje(producto_id, neto))
+        MovimientoStock.objects.bulk_create(filas, batch_size=LOTE)
+
+    return dict(netos)
+
+
+def mover(producto, cantidad, motivo, referencia=''):
+    """Un solo movimiento; actualiza también `producto.stock` en memoria"""
+    aplicar([(producto, cantidad, motivo, referencia)])
+    producto.stock += cantidad
+
+
+def guardar_sin_stock(producto):
+    """Guarda el producto sin escribir la columna stock (solo la cambian los movimientos)"""
+    producto.save(update_fields=[
+        f.name for f in producto._meta.concrete_fields if not f.primary_key and f.name != 'stock'
+    ])
+
+
+def _total_libro(producto_id):
+    return MovimientoStock.objects.filter(producto_id=producto_id).aggregate(total=Sum('cantidad'))['total'] or 0
+
+
+def diferencias():
+    """[(producto_id, sku, stock, total del libro)] de los productos descuadrados"""
+    # Stock y suma del libro en la misma consulta: una sola foto de ambos
+    libro = (
+        MovimientoStock.objects.filter(producto=OuterRef('pk'))
+        .order_by().values('producto').annotate(total=Sum('cantidad')).values('total')
+    )
+    return list(
+        Producto.objects.annotate(libro=Coalesce(Subquery(libro), 0))
+        .exclude(stock=F('libro'))
+        .order_by('id')
+        .values_list('id', 'sku', 'stock', 'libro')
+    )
+
+
+def reconstruir(producto_id):
+    """Lleva Producto.stock a la suma del libro; devuelve el stock resultante"""
+    with transaction.atomic():
+        # Bloqueo solo aquí: ningún movimiento puede entrar entre la suma y el UPDATE
+        list(Producto.objects.select_for_update().filter(pk=producto_id).values_list('pk', flat=True))
+        total = _total_libro(producto_id)
+        if total < 0:
+            raise StockInsuficiente(f'El libro del producto {producto_id} suma {total}; no se puede reconstruir')
+        Producto.objects.filter(pk=producto_id).update(stock=total)
+    logger.info(f'📦 Stock del producto {producto_id} reconstruido desde el libro: {total}')
+    return total
+
+
+def registrar_ajustes(descuadres, referencia='verificar_stock'):
+    """
+    Asienta en el libro la diferencia de cada descuadre (toma la proyección como válida).
+
+    Como reconstruir(), bloquea el producto y vuelve a leer stock y libro
+    antes de escribir: un movimiento que entró después de diferencias() no
+    se cuenta dos veces. Devuelve la cantidad de ajustes registrados.
+    """
+    registrados = 0
+    for producto_id in sorted({producto_id for producto_id, *_ in descuadres}):
+        with transaction.atomic():
+            stock = Producto.objects.select_for_update().filter(pk=producto_id).values_list('stock', flat=True).first()
+            if stock is None:
+                continue
+            diferencia = stock - _total_libro(producto_id)
+            if diferencia:
+                MovimientoStock.objects.create(
+                    producto_id=producto_id, cantidad=diferencia, motivo='ajuste', referencia=referencia
+                )
+                registrados += 1
+    return registrados
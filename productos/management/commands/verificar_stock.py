@@ -0,0 +1,59 @@
+"""
+Compara Producto.stock con la suma del libro de inventario (MovimientoStock)
+y, opcionalmente, corrige los descuadres.
+
+Las escrituras que no pasan por productos/inventario.py (`update()`,
+`bulk_create`, cargas masivas) dejan el stock fuera del libro:
+
+- --reconstruir: el libro manda; el stock pasa a ser la suma de movimientos.
+- --registrar-ajustes: el stock manda; se asienta un movimiento 'ajuste'
+  por la diferencia (para adoptar productos cargados por fuera).
+
+Uso:
+    python manage.py verificar_stock
+    python manage.py verificar_stock --reconstruir
+    python manage.py verificar_stock --registrar-ajustes
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.inventario import StockInsuficiente, diferencias, reconstruir, registrar_ajustes
+
+
+class Command(BaseCommand):
+    help = 'Verifica el stock de los productos contra el libro de inventario'
+
+    def add_arguments(self, parser):
+        acciones = parser.add_mutually_exclusive_group()
+        acciones.add_argument('--reconstruir', action='store_true', help='Recalcula el stock desde el libro')
+        acciones.add_argument(
+            '--registrar-ajustes', action='store_true',
+            help='Asienta la diferencia como movimiento de ajuste',
+        )
+        parser.add_argument('--mostrar', type=int, default=20, help='Descuadres a listar (default: 20)')
+
+    def handle(self, *args, **options):
+        descuadres = diferencias()
+        if not descuadres:
+            self.stdout.write(self.style.SUCCESS('✅ El stock de todos los productos coincide con el libro'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'⚠️ {len(descuadres):,} productos descuadrados'))
+        for producto_id, sku, stock, libro in descuadres[:options['mostrar']]:
+            self.stdout.write(f'  - {sku} (#{producto_id}): stock {stock}, libro {libro}')
+
+        if options['registrar_ajustes']:
+            registrados = registrar_ajustes(descuadres)
+            self.stdout.write(self.style.SUCCESS(f'📝 {registrados:,} ajustes registrados en el libro'))
+        elif options['reconstruir']:
+            fallidos = 0
+            for producto_id, *_ in descuadres:
+                try:
+                    reconstruir(producto_id)
+                except StockInsuficiente as e:
+                    fallidos += 1
+                    self.stderr.write(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'🔧 {len(descuadres) - fallidos:,} productos reconstruidos desde el libro'
+            ))
+            if fallidos:
+                raise CommandError(f'{fallidos} productos con el libro en negativo')
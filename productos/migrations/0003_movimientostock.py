@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def stock_inicial(apps, schema_editor):
+    """El stock actual de cada producto abre su libro de inventario"""
+    Producto = apps.get_model('productos', 'Producto')
+    MovimientoStock = apps.get_model('productos', 'MovimientoStock')
+    MovimientoStock.objects.bulk_create(
+        [
+            MovimientoStock(producto_id=producto_id, cantidad=stock, motivo='inicial', referencia='migracion')
+            for producto_id, stock in Producto.objects.filter(stock__gt=0).values_list('id', 'stock').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_imagen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField()),
+                ('motivo', models.CharField(choices=[('inicial', 'Stock inicial'), ('venta', 'Venta'), ('devolucion', 'Devolución'), ('cambio', 'Cambio de producto'), ('reposicion', 'Reposición'), ('ajuste', 'Ajuste manual')], max_length=20)),
+                ('referencia', models.CharField(blank=True, max_length=100)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de stock',
+                'verbose_name_plural': 'Movimientos de stock',
+                'db_table': 'movimientos_stock',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='movimientos_product_53c0f6_idx'), models.Index(fields=['referencia'], name='movimientos_referen_9864c2_idx')],
+            },
+        ),
+        migrations.RunPython(stock_inicial, migrations.RunPython.noop),
+    ]
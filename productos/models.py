@@ -65,12 +65,10 @@ class Producto(models.Model):
 		"""Verifica si hay stock suficiente"""
 		return self.stock >= cantidad
 	
-	def reducir_stock(self, cantidad):
-		"""Reduce el stock de forma segura"""
-		if not self.tiene_stock(cantidad):
-			raise ValueError(f'Stock insuficiente para {self.nombre}. Disponible: {self.stock}')
-		self.stock -= cantidad
-		self.save(update_fields=['stock'])
+	def reducir_stock(self, cantidad, motivo='venta', referencia=''):
+		"""Reduce el stock de forma segura (movimiento en el libro de inventario)"""
+		from .inventario import mover
+		mover(self, -cantidad, motivo, referencia)
 	
 	def save(self, *args, **kwargs):
 		"""Optimiza la imagen al guardar"""
@@ -100,3 +98,40 @@ class Producto(models.Model):
 				import logging
 				logger = logging.getLogger(__name__)
 				logger.warning(f'Error optimizando imagen para producto {self.id}: {str(e)}')
+
+
+class MovimientoStock(models.Model):
+	"""
+	Libro de inventario: cada cambio de stock es una fila que no se edita.
+	Producto.stock es la proyección (suma de movimientos); se mantiene con
+	productos/inventario.py y se verifica con `manage.py verificar_stock`.
+	"""
+	MOTIVOS = [
+		('inicial', 'Stock inicial'),
+		('venta', 'Venta'),
+		('devolucion', 'Devolución'),
+		('cambio', 'Cambio de producto'),
+		('reposicion', 'Reposición'),
+		('ajuste', 'Ajuste manual'),
+	]
+
+	producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='movimientos')
+	# Positivo: entra stock; negativo: sale
+	cantidad = models.IntegerField()
+	motivo = models.CharField(max_length=20, choices=MOTIVOS)
+	# Origen del movimiento, p. ej. 'compra:15' o 'devolucion:8'
+	referencia = models.CharField(max_length=100, blank=True)
+	fecha = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		db_table = 'movimientos_stock'
+		ordering = ['-fecha']
+		verbose_name = 'Movimiento de stock'
+		verbose_name_plural = 'Movimientos de stock'
+		indexes = [
+			models.Index(fields=['producto', 'fecha']),
+			models.Index(fields=['referencia']),
+		]
+
+	def __str__(self):
+		return f"{self.producto_id} {self.cantidad:+d} ({self.motivo})"
@@ -1,4 +1,6 @@
+from django.db import transaction
 from rest_framework import serializers
+from .inventario import StockInsuficiente, guardar_sin_stock, mover
 from .models import Producto, Categoria
 
 
@@ -30,3 +32,37 @@ class ProductoSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.imagen.url)
             return obj.imagen.url
         return None
+    
+    def create(self, validated_data):
+        """El stock inicial abre el libro de inventario"""
+        stock = validated_data.pop('stock', 0)
+        with transaction.atomic():
+            producto = super().create(validated_data)
+            if stock:
+                self._mover(producto, stock, 'inicial')
+        return producto
+    
+    def update(self, instance, validated_data):
+        """Un cambio de stock se asienta como ajuste; el resto de campos no pisa la columna"""
+        nuevo = validated_data.pop('stock', None)
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        # Todo o nada: si el ajuste falla, los demás campos tampoco se guardan
+        with transaction.atomic():
+            guardar_sin_stock(instance)
+            if nuevo is not None:
+                # El ajuste se calcula contra el stock actual, no el leído al abrir la request
+                instance.stock = Producto.objects.select_for_update().values_list('stock', flat=True).get(pk=instance.pk)
+                if nuevo != instance.stock:
+                    self._mover(instance, nuevo - instance.stock, 'ajuste')
+        return instance
+    
+    def _mover(self, producto, cantidad, motivo):
+        try:
+            mover(producto, cantidad, motivo, self._referencia())
+        except StockInsuficiente as e:
+            raise serializers.ValidationError({'stock': str(e)})
+    
+    def _referencia(self):
+        request = self.context.get('request')
+        return f'api:{request.user.username}' if request else 'api'
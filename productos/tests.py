@@ -1,3 +1,126 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework import serializers
+
+from clientes.models import Cliente
+from compra.models import Compra, CompraItem
+from promociones.models import DevolucionProducto
+
+from .inventario import StockInsuficiente, aplicar, diferencias, mover, registrar_ajustes
+from .models import MovimientoStock, Producto
+from .serializers import ProductoSerializer
+
+
+def _producto(sku, stock):
+    producto = Producto.objects.create(sku=sku, nombre=sku, precio=Decimal('10.00'))
+    mover(producto, stock, 'inicial')
+    return producto
+
+
+def _stock(producto):
+    return Producto.objects.values_list('stock', flat=True).get(pk=producto.pk)
+
+
+class InventarioTests(TestCase):
+    """Movimientos de stock con UPDATE condicional y libro de inventario"""
+
+    def test_instancias_desactualizadas_no_pierden_ventas(self):
+        producto = _producto('INV-1', 10)
+        una, otra = Producto.objects.get(pk=producto.pk), Producto.objects.get(pk=producto.pk)
+
+        una.reducir_stock(3)
+        otra.reducir_stock(4)
+        self.assertEqual(_stock(producto), 3)
+        with self.assertRaises(StockInsuficiente):
+            otra.reducir_stock(4)
+        self.assertEqual(_stock(producto), 3)
+
+    def test_lote_neto_por_producto_y_todo_o_nada(self):
+        a, b = _producto('INV-A', 5), _producto('INV-B', 2)
+
+        self.assertEqual(aplicar([(a, -2, 'venta', 'x'), (a, -3, 'venta', 'x'), (b.pk, 4, 'reposicion', 'x')]), {a.pk: -5, b.pk: 4})
+        self.assertEqual((_stock(a), _stock(b)), (0, 6))
+
+        movimientos = MovimientoStock.objects.count()
+        with self.assertRaises(StockInsuficiente):
+            aplicar([(b, -1, 'venta', 'y'), (a, -1, 'venta', 'y')])
+        self.assertEqual((_stock(a), _stock(b), MovimientoStock.objects.count()), (0, 6, movimientos))
+
+    def test_cambio_sin_stock_de_reemplazo_no_restaura(self):
+        original, reemplazo = _producto('INV-O', 0), _producto('INV-R', 0)
+        cliente = Cliente.objects.create(nombre='Inventario', email='inventario@cliente.local')
+        item = CompraItem.objects.create(
+            compra=Compra.objects.create(cliente=cliente), producto=original, cantidad=2, precio_unitario=Decimal('10.00')
+        )
+        devolucion = DevolucionProducto.objects.create(
+            compra_item=item, cliente=cliente, motivo='Talla', cantidad=2, tipo='cambio', estado='aprobada'
+        )
+
+        with self.assertRaises(ValueError):
+            devolucion.completar(producto_reemplazo=reemplazo)
+        self.assertEqual(_stock(original), 0)
+
+        mover(reemplazo, 5, 'reposicion')
+        devolucion.completar(producto_reemplazo=reemplazo)
+        self.assertEqual((_stock(original), _stock(reemplazo)), (2, 3))
+        self.assertEqual(DevolucionProducto.objects.get(pk=devolucion.pk).estado, 'completada')
+
+    def test_verificar_stock_reconstruye_desde_el_libro(self):
+        producto = _producto('INV-V', 7)
+        Producto.objects.filter(pk=producto.pk).update(stock=99)
+
+        salida = StringIO()
+        call_command('verificar_stock', stdout=salida)
+        self.assertIn('INV-V', salida.getvalue())
+        self.assertEqual(_stock(producto), 99)
+
+        call_command('verificar_stock', '--reconstruir', stdout=StringIO())
+        self.assertEqual(_stock(producto), 7)
+
+        Producto.objects.filter(pk=producto.pk).update(stock=12)
+        call_command('verificar_stock', '--registrar-ajustes', stdout=StringIO())
+        salida = StringIO()
+        call_command('verificar_stock', stdout=salida)
+        self.assertIn('coincide', salida.getvalue())
+
+    def test_registrar_ajustes_recalcula_antes_de_escribir(self):
+        producto = _producto('INV-AJ', 5)
+        Producto.objects.filter(pk=producto.pk).update(stock=8)
+        descuadres = diferencias()
+        self.assertEqual(descuadres, [(producto.pk, 'INV-AJ', 8, 5)])
+
+        # Una venta entra entre la verificación y el ajuste
+        mover(producto, -2, 'venta')
+        self.assertEqual(registrar_ajustes(descuadres), 1)
+        self.assertEqual(diferencias(), [])
+        self.assertEqual(_stock(producto), 6)
+        self.assertEqual(registrar_ajustes(descuadres), 0)
+
+
+class ProductoSerializerTests(TestCase):
+    """El stock que llega por la API se asienta como ajuste en el libro"""
+
+    def test_ajuste_contra_el_stock_actual(self):
+        producto = _producto('SER-1', 10)
+        desactualizado = Producto.objects.get(pk=producto.pk)
+        mover(producto, -3, 'venta')
+
+        serializer = ProductoSerializer(desactualizado, data={'stock': 10}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(_stock(producto), 10)
+        self.assertEqual(diferencias(), [])
 
-# Create your tests here.
+    def test_ajuste_rechazado_no_guarda_otros_campos(self):
+        producto = _producto('SER-2', 4)
+        serializer = ProductoSerializer(producto, data={'nombre': 'Nuevo', 'stock': 1}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with mock.patch('productos.serializers.mover', side_effect=StockInsuficiente('sin stock')):
+            with self.assertRaises(serializers.ValidationError):
+                serializer.save()
+        self.assertEqual(Producto.objects.get(pk=producto.pk).nombre, 'SER-2')
+        self.assertEqual(_stock(producto), 4)
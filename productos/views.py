@@ -4,7 +4,7 @@ from .serializers import ProductoSerializer, CategoriaSerializer
 
 
 class ProductoViewSet(viewsets.ModelViewSet):
-	queryset = Producto.objects.all()
+	queryset = Producto.objects.select_related('categoria').all()
 	serializer_class = ProductoSerializer
 	permission_classes = [permissions.IsAuthenticated]
 	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
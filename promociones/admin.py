@@ -1,7 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Promocion, DevolucionProducto
+from productos.inventario import StockInsuficiente
+from . import campanas
+from . import devoluciones as lote
+from . import segmentos
+from .models import CampanaPromocion, Promocion, DevolucionProducto
 
 
 @admin.register(Promocion)
@@ -24,6 +28,10 @@ class PromocionAdmin(admin.ModelAdmin):
         ('Límites de Uso', {
             'fields': ('usos_maximos', 'usos_actuales')
         }),
+        ('Audiencia de la campaña', {
+            'fields': ('segmento',),
+            'description': 'Criterios: categoria (+ dias), total_minimo, inactivos_dias. Vacío = todos los clientes.'
+        }),
     )
     
     def tipo_badge(self, obj):
@@ -70,6 +78,77 @@ class PromocionAdmin(admin.ModelAdmin):
     usos_info.short_description = 'Usos'
 
 
+
+@admin.register(CampanaPromocion)
+class CampanaPromocionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'promocion', 'estado_badge', 'audiencia', 'inicio_programado', 'progreso', 'creada', 'finalizada']
+    list_filter = ['estado', 'creada']
+    list_select_related = ['promocion']
+    search_fields = ['promocion__codigo', 'promocion__nombre']
+    readonly_fields = [
+        'promocion', 'estado', 'progreso', 'total_destinatarios', 'procesados', 'enviados', 'fallidos',
+        'ultimo_usuario_id', 'proximo_lote', 'error', 'creada', 'iniciada', 'finalizada',
+    ]
+    fields = ['promocion', 'estado', 'inicio_programado', 'segmento', 'progreso', 'error', 'creada', 'iniciada', 'finalizada']
+    
+    actions = ['pausar_campanas', 'reanudar_campanas', 'cancelar_campanas']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Una vez fijado el corte de la audiencia, el segmento no cambia
+        if obj and obj.iniciada:
+            return self.readonly_fields + ['segmento']
+        return self.readonly_fields
+    
+    def has_add_permission(self, request):
+        # Se crean al guardar una promoción nueva (signals.py)
+        return False
+    
+    def audiencia(self, obj):
+        return segmentos.describir(obj.segmento)
+    audiencia.short_description = 'Audiencia'
+    
+    def estado_badge(self, obj):
+        colores = {
+            'programada': '#95a5a6',
+            'enviando': '#3498db',
+            'pausada': '#f39c12',
+            'completada': '#27ae60',
+            'cancelada': '#e74c3c',
+        }
+        return format_html(
+            '<span style="background:{}; color:white; padding:3px 8px; border-radius:3px;">{}</span>',
+            colores.get(obj.estado, '#95a5a6'),
+            obj.get_estado_display()
+        )
+    estado_badge.short_description = 'Estado'
+    
+    def progreso(self, obj):
+        if obj.total_destinatarios is None:
+            return format_html('<span style="color:#95a5a6;">Sin iniciar</span>')
+        return format_html(
+            '<span style="color:#27ae60;">{} enviados</span> · '
+            '<span style="color:#e74c3c;">{} fallidos</span> · '
+            '<span style="color:#7f8c8d;">{} pendientes de {}</span>',
+            obj.enviados,
+            obj.fallidos,
+            obj.pendientes,
+            obj.total_destinatarios
+        )
+    progreso.short_description = 'Progreso'
+    
+    def pausar_campanas(self, request, queryset):
+        self.message_user(request, f'{campanas.pausar(queryset)} campaña(s) pausada(s)')
+    pausar_campanas.short_description = "⏸ Pausar campañas seleccionadas"
+    
+    def reanudar_campanas(self, request, queryset):
+        self.message_user(request, f'{campanas.reanudar(queryset)} campaña(s) reanudada(s)')
+    reanudar_campanas.short_description = "▶ Reanudar campañas seleccionadas"
+    
+    def cancelar_campanas(self, request, queryset):
+        self.message_user(request, f'{campanas.cancelar(queryset)} campaña(s) cancelada(s)')
+    cancelar_campanas.short_description = "✗ Cancelar campañas seleccionadas"
+
+
 @admin.register(DevolucionProducto)
 class DevolucionProductoAdmin(admin.ModelAdmin):
     list_display = ['id', 'cliente', 'tipo_badge', 'estado_badge', 'producto_info', 'cantidad', 'monto_reembolso', 'fecha_solicitud']
@@ -96,7 +175,7 @@ class DevolucionProductoAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['aprobar_devoluciones', 'rechazar_devoluciones']
+    actions = ['aprobar_devoluciones', 'rechazar_devoluciones', 'completar_devoluciones']
     
     def tipo_badge(self, obj):
         color = '#3498db' if obj.tipo == 'devolucion' else '#9b59b6'
@@ -131,20 +210,38 @@ class DevolucionProductoAdmin(admin.ModelAdmin):
         )
     producto_info.short_description = 'Producto'
     
+    def _procesar_lote(self, request, transicion, ids, hecho, **extra):
+        """Transición masiva (promociones/devoluciones.py); todo o nada"""
+        if ids:
+            try:
+                transicion(ids, **extra)
+            except (lote.LoteInvalido, StockInsuficiente) as e:
+                self.message_user(request, f'No se procesó ninguna: {e}', level=messages.ERROR)
+                return
+        self.message_user(request, f'{len(ids)} devolución(es) {hecho}')
+    
     def aprobar_devoluciones(self, request, queryset):
-        aprobadas = 0
-        for devolucion in queryset:
-            if devolucion.puede_aprobar():
-                devolucion.aprobar(usuario=request.user, respuesta='Aprobado desde admin')
-                aprobadas += 1
-        self.message_user(request, f'{aprobadas} devolución(es) aprobada(s)')
+        ids = list(queryset.filter(estado='pendiente').values_list('id', flat=True))
+        self._procesar_lote(
+            request, lote.aprobar, ids, 'aprobada(s)', usuario=request.user, respuesta='Aprobado desde admin'
+        )
     aprobar_devoluciones.short_description = "✓ Aprobar devoluciones seleccionadas"
     
     def rechazar_devoluciones(self, request, queryset):
-        rechazadas = 0
-        for devolucion in queryset:
-            if devolucion.puede_rechazar():
-                devolucion.rechazar(usuario=request.user, respuesta='Rechazado desde admin')
-                rechazadas += 1
-        self.message_user(request, f'{rechazadas} devolución(es) rechazada(s)')
+        ids = list(queryset.filter(estado='pendiente').values_list('id', flat=True))
+        self._procesar_lote(
+            request, lote.rechazar, ids, 'rechazada(s)', usuario=request.user, respuesta='Rechazado desde admin'
+        )
     rechazar_devoluciones.short_description = "✗ Rechazar devoluciones seleccionadas"
+    
+    def completar_devoluciones(self, request, queryset):
+        # Los cambios necesitan producto de reemplazo; sin él quedan aprobados
+        aprobadas = queryset.filter(estado='aprobada').exclude(tipo='cambio', producto_reemplazo__isnull=True)
+        reemplazos = dict(
+            aprobadas.filter(producto_reemplazo__isnull=False).values_list('id', 'producto_reemplazo_id')
+        )
+        ids = list(aprobadas.values_list('id', flat=True))
+        self._procesar_lote(
+            request, lote.completar, ids, 'completada(s), stock restaurado', reemplazos=reemplazos
+        )
+    completar_devoluciones.short_description = "📦 Completar devoluciones aprobadas (restaura stock)"
@@ -0,0 +1,191 @@
+"""
+Campañas de aviso de promociones a los clientes.
+
+Antes, guardar una promoción nueva notificaba a todos los clientes dentro
+de la señal post_save, de a uno: el request del admin quedaba esperando.
+Ahora la señal solo registra una CampanaPromocion y el envío lo hace
+`python manage.py enviar_campanas`:
+
+- La audiencia es el segmento de la promoción (segmentos.py: categoría
+  comprada, total pagado, clientes inactivos; vacío = todos los clientes
+  con suscripciones push utilizables). Al enviar el primer lote la campaña
+  fija el corte: la fecha con la que se evalúa el segmento y el último id
+  de usuario existente. Cada lote pide a la base los siguientes clientes
+  del segmento con ese corte (pk > cursor), así que no se guarda ninguna
+  lista de ids: los usuarios nuevos no entran y quien deja de cumplir el
+  segmento (se desuscribe, vuelve a comprar) ya no recibe el aviso.
+- Cada llamada a procesar_lote() envía un lote de PROMOCIONES_CAMPANA_LOTE
+  clientes de la audiencia, recorridos por id, y no vuelve a tocar la
+  campaña hasta PROMOCIONES_CAMPANA_INTERVALO segundos después: el ritmo
+  no depende de cuántos workers corran.
+- El lote se toma con un UPDATE condicional sobre el cursor y el estado:
+  dos workers no envían el mismo lote, y una campaña pausada no envía más
+  (el lote en curso termina).
+- El avance (procesados, enviados, fallidos) se suma con F() al terminar
+  cada lote y se ve en el admin, donde se puede pausar, reanudar o
+  cancelar. No se envía nada antes de `inicio_programado`.
+- Si la promoción se desactiva o vence, la campaña se cancela.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from . import segmentos
+from .models import CampanaPromocion
+
+logger = logging.getLogger(__name__)
+
+ACTIVAS = ('programada', 'enviando')
+
+
+def _lote():
+    return getattr(settings, 'PROMOCIONES_CAMPANA_LOTE', 200)
+
+
+def _intervalo():
+    return timedelta(seconds=getattr(settings, 'PROMOCIONES_CAMPANA_INTERVALO', 2))
+
+
+def programar(promocion, inicio=None):
+    """Registra la campaña de aviso de la promoción; por defecto arranca con su vigencia"""
+    inicio = inicio or max(timezone.now(), promocion.fecha_inicio)
+    campana = CampanaPromocion.objects.create(
+        promocion=promocion, inicio_programado=inicio, segmento=promocion.segmento or {}
+    )
+    logger.info(
+        f'📣 Campaña #{campana.id} programada para {promocion.codigo} ({inicio:%Y-%m-%d %H:%M}): '
+        f'{segmentos.describir(campana.segmento)}'
+    )
+    return campana
+
+
+def audiencia(campana):
+    """Clientes de la audiencia de la campaña con su corte, por id (None si todavía no empezó)"""
+    if campana.audiencia_fecha is None:
+        return None
+    return segmentos.usuarios(campana.segmento, campana.audiencia_fecha).filter(pk__lte=campana.audiencia_hasta_id)
+
+
+def pendientes(ahora=None):
+    """Ids de las campañas a las que les toca un lote"""
+    ahora = ahora or timezone.now()
+    return list(
+        CampanaPromocion.objects.filter(
+            Q(proximo_lote__isnull=True) | Q(proximo_lote__lte=ahora),
+            estado__in=ACTIVAS,
+            inicio_programado__lte=ahora,
+        ).order_by('inicio_programado').values_list('id', flat=True)
+    )
+
+
+def _terminar(campana_id, estado, ahora, error=''):
+    CampanaPromocion.objects.filter(pk=campana_id, estado__in=ACTIVAS).update(
+        estado=estado, finalizada=ahora, error=error
+    )
+
+
+def procesar_lote(campana_id):
+    """
+    Envía el siguiente lote de la campaña si le toca. Devuelve la campaña
+    actualizada, o None si no le tocaba o el lote lo tomó otro worker.
+    """
+    from notificaciones.push_service import push_service
+
+    ahora = timezone.now()
+    campana = CampanaPromocion.objects.select_related('promocion').filter(
+        Q(proximo_lote__isnull=True) | Q(proximo_lote__lte=ahora),
+        pk=campana_id,
+        estado__in=ACTIVAS,
+        inicio_programado__lte=ahora,
+    ).first()
+    if campana is None:
+        return None
+
+    promocion = campana.promocion
+    if not promocion.activa or (promocion.fecha_fin and promocion.fecha_fin < ahora):
+        _terminar(campana.pk, 'cancelada', ahora, 'La promoción ya no está activa o venció')
+        logger.info(f'📣 Campaña #{campana.pk} cancelada: {promocion.codigo} ya no está vigente')
+        return CampanaPromocion.objects.get(pk=campana.pk)
+
+    from usuarios.models import Usuario
+
+    lote = _lote()
+    cambios = {'estado': 'enviando', 'proximo_lote': ahora + _intervalo()}
+    if campana.audiencia_fecha is None:
+        # Primer lote: se fija el corte de la audiencia
+        campana.audiencia_fecha = cambios['audiencia_fecha'] = ahora
+        campana.audiencia_hasta_id = cambios['audiencia_hasta_id'] = Usuario.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    siguientes = audiencia(campana).filter(pk__gt=campana.ultimo_usuario_id)
+    usuarios = list(siguientes[:lote])
+    if usuarios:
+        cambios['ultimo_usuario_id'] = usuarios[-1].pk
+    if campana.iniciada is None:
+        cambios['iniciada'] = ahora
+    if 'audiencia_fecha' in cambios:
+        # Una campaña que ya venía enviando conserva lo que procesó antes
+        cambios['total_destinatarios'] = campana.procesados + (
+            len(usuarios) if len(usuarios) < lote else siguientes.count()
+        )
+    if not usuarios:
+        cambios.update(estado='completada', finalizada=ahora)
+
+    # Tomar el lote: si otro worker avanzó el cursor o la pausaron, no se envía
+    tomado = CampanaPromocion.objects.filter(
+        pk=campana.pk, estado=campana.estado, ultimo_usuario_id=campana.ultimo_usuario_id
+    ).update(**cambios)
+    if not tomado or not usuarios:
+        return CampanaPromocion.objects.get(pk=campana.pk) if tomado else None
+
+    contenido = push_service.contenido_nueva_promocion(promocion)
+    payload = push_service.serializar_payload(**contenido)
+    enviados = fallidos = 0
+    for usuario in usuarios:
+        try:
+            resultado = push_service.send_notification(usuario=usuario, payload=payload, **contenido)
+        except Exception as e:
+            logger.error(f'❌ Campaña #{campana.pk}: error notificando a {usuario.pk}: {e}')
+            resultado = {'fallidos': 1}
+        if resultado.get('exitosos'):
+            enviados += 1
+        elif resultado.get('fallidos'):
+            fallidos += 1
+
+    CampanaPromocion.objects.filter(pk=campana.pk).update(
+        procesados=F('procesados') + len(usuarios),
+        enviados=F('enviados') + enviados,
+        fallidos=F('fallidos') + fallidos,
+    )
+    if len(usuarios) < lote:
+        # Último lote: no hace falta otra vuelta para descubrirlo
+        CampanaPromocion.objects.filter(pk=campana.pk, estado='enviando').update(
+            estado='completada', finalizada=timezone.now()
+        )
+
+    campana = CampanaPromocion.objects.get(pk=campana.pk)
+    logger.info(
+        f'📣 Campaña #{campana.pk}: lote de {len(usuarios)} clientes '
+        f'({campana.enviados} enviados, {campana.fallidos} fallidos, {campana.pendientes} pendientes)'
+    )
+    return campana
+
+
+def pausar(queryset):
+    """Detiene las campañas activas del queryset; devuelve cuántas"""
+    return queryset.filter(estado__in=ACTIVAS).update(estado='pausada')
+
+
+def reanudar(queryset):
+    """Las campañas pausadas siguen desde su cursor; devuelve cuántas"""
+    pausadas = queryset.filter(estado='pausada')
+    return (
+        pausadas.filter(iniciada__isnull=True).update(estado='programada')
+        + pausadas.filter(iniciada__isnull=False).update(estado='enviando')
+    )
+
+
+def cancelar(queryset):
+    """Cancela las campañas no terminadas del queryset; devuelve cuántas"""
+    return queryset.filter(estado__in=ACTIVAS + ('pausada',)).update(estado='cancelada', finalizada=timezone.now())
@@ -0,0 +1,175 @@
+"""
+Transiciones masivas de devoluciones (aprobar, rechazar, completar).
+
+Tras un pico de ventas soporte procesa cientos de devoluciones; hacerlo de
+a una (DevolucionProducto.aprobar/rechazar/completar) cuesta varias
+consultas y un save por devolución. Aquí un lote:
+
+- se carga en una consulta (bloqueando las filas) y se valida completo: si
+  algún id no existe o no admite la transición se lanza LoteInvalido con
+  el motivo por id y no se aplica nada;
+- se guarda con un UPDATE para todo el lote (los valores son los mismos) y
+  bulk_update solo para lo que varía por fila (producto de reemplazo);
+- al completar, los movimientos de stock se suman por producto y se
+  aplican con productos.inventario.aplicar (un UPDATE por SKU);
+- invalida de una vez los comprobantes de las compras afectadas (update y
+  bulk_update no emiten post_save, ver compra/signals.py);
+- encola una sola tarea en segundo plano que avisa a cada cliente una vez.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DevolucionProducto
+
+logger = logging.getLogger(__name__)
+
+TITULOS = {
+    'aprobada': '✅ Devolución aprobada',
+    'rechazada': '❌ Devolución rechazada',
+    'completada': '📦 Devolución completada',
+}
+
+
+class LoteInvalido(ValueError):
+    """Ids del lote que no existen o no admiten la transición: {id: motivo}"""
+
+    def __init__(self, errores):
+        self.errores = errores
+        super().__init__(f'{len(errores)} devoluciones no se pueden procesar')
+
+
+def _maximo():
+    return getattr(settings, 'DEVOLUCIONES_LOTE_MAX', 1000)
+
+
+def _cargar(ids, puede, verbo):
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    if not ids:
+        raise LoteInvalido({'ids': 'Se requiere al menos un id'})
+    if len(ids) > _maximo():
+        raise LoteInvalido({'ids': f'Máximo {_maximo()} devoluciones por lote'})
+
+    devoluciones = DevolucionProducto.objects.select_for_update(of=('self',)).select_related(
+        'compra_item', 'cliente'
+    ).in_bulk(ids)
+    errores = {}
+    for devolucion_id in ids:
+        devolucion = devoluciones.get(devolucion_id)
+        if devolucion is None:
+            errores[devolucion_id] = 'No existe'
+        elif not puede(devolucion):
+            errores[devolucion_id] = f"No se puede {verbo} una devolución en estado '{devolucion.estado}'"
+    if errores:
+        raise LoteInvalido(errores)
+    return [devoluciones[i] for i in ids]
+
+
+def _despues(devoluciones, estado):
+    if estado in ('aprobada', 'completada'):
+        from compra.comprobantes import invalidar_por_items
+        invalidar_por_items([d.compra_item_id for d in devoluciones])
+
+    por_usuario = defaultdict(list)
+    for devolucion in devoluciones:
+        if devolucion.cliente.usuario_id:
+            por_usuario[devolucion.cliente.usuario_id].append(devolucion.pk)
+    if por_usuario:
+        from compra.segundo_plano import al_confirmar
+        al_confirmar(notificar_clientes, dict(por_usuario), estado)
+
+    logger.info(f'📦 {len(devoluciones)} devoluciones {estado}s en lote')
+
+
+def _transicion(ids, puede, verbo, estado, campo_fecha, usuario, respuesta):
+    with transaction.atomic():
+        devoluciones = _cargar(ids, puede, verbo)
+        cambios = {'estado': estado, campo_fecha: timezone.now(), 'respuesta_admin': respuesta, 'atendido_por': usuario}
+        # Mismos valores para todo el lote: un UPDATE, sin el CASE por fila de bulk_update
+        DevolucionProducto.objects.filter(pk__in=[d.pk for d in devoluciones]).update(**cambios)
+        for devolucion in devoluciones:
+            for campo, valor in cambios.items():
+                setattr(devolucion, campo, valor)
+        _despues(devoluciones, estado)
+    return devoluciones
+
+
+def aprobar(ids, usuario, respuesta=''):
+    """pendiente → aprobada para todo el lote"""
+    return _transicion(ids, DevolucionProducto.puede_aprobar, 'aprobar', 'aprobada', 'fecha_aprobacion', usuario, respuesta)
+
+
+def rechazar(ids, usuario, respuesta=''):
+    """pendiente → rechazada para todo el lote"""
+    return _transicion(ids, DevolucionProducto.puede_rechazar, 'rechazar', 'rechazada', 'fecha_rechazo', usuario, respuesta)
+
+
+def completar(ids, reemplazos=None):
+    """
+    aprobada → completada para todo el lote. `reemplazos` = {devolución_id:
+    producto_id} para los cambios. Restaura el stock devuelto y descuenta
+    los reemplazos en un solo lote del libro de inventario: si algún
+    reemplazo no tiene stock no se completa ninguna (StockInsuficiente).
+    """
+    from productos.inventario import aplicar
+    from productos.models import Producto
+
+    reemplazos = {int(k): int(v) for k, v in (reemplazos or {}).items()}
+    with transaction.atomic():
+        devoluciones = _cargar(ids, DevolucionProducto.puede_completar, 'completar')
+
+        productos = Producto.objects.in_bulk(set(reemplazos.values()))
+        errores = {}
+        for devolucion in devoluciones:
+            producto_id = reemplazos.get(devolucion.pk)
+            if devolucion.tipo == 'cambio' and producto_id is None:
+                errores[devolucion.pk] = 'Debe especificar el producto de reemplazo'
+            elif producto_id is not None and producto_id not in productos:
+                errores[devolucion.pk] = f'Producto de reemplazo {producto_id} no existe'
+        if errores:
+            raise LoteInvalido(errores)
+
+        ahora = timezone.now()
+        movimientos = []
+        con_reemplazo = []
+        for devolucion in devoluciones:
+            referencia = f'devolucion:{devolucion.pk}'
+            movimientos.append((devolucion.compra_item.producto_id, devolucion.cantidad, 'devolucion', referencia))
+            if devolucion.pk in reemplazos:
+                devolucion.producto_reemplazo_id = reemplazos[devolucion.pk]
+                con_reemplazo.append(devolucion)
+                if devolucion.tipo == 'cambio':
+                    movimientos.append((devolucion.producto_reemplazo_id, -devolucion.cantidad, 'cambio', referencia))
+            devolucion.estado = 'completada'
+            devolucion.fecha_completado = ahora
+
+        aplicar(movimientos)
+        DevolucionProducto.objects.filter(pk__in=[d.pk for d in devoluciones]).update(
+            estado='completada', fecha_completado=ahora
+        )
+        # Solo el producto de reemplazo varía por devolución
+        DevolucionProducto.objects.bulk_update(con_reemplazo, ['producto_reemplazo'], batch_size=500)
+        _despues(devoluciones, 'completada')
+    return devoluciones
+
+
+def notificar_clientes(por_usuario, estado):
+    """Un aviso push por cliente con sus devoluciones del lote (corre en segundo plano)"""
+    from notificaciones.push_service import push_service
+    from usuarios.models import Usuario
+
+    for usuario in Usuario.objects.filter(pk__in=por_usuario):
+        ids = por_usuario[usuario.pk]
+        numeros = ', '.join(f'#{i}' for i in ids)
+        push_service.send_notification(
+            usuario=usuario,
+            titulo=TITULOS[estado],
+            mensaje=f'Tu solicitud de devolución {numeros} está {estado}.' if len(ids) == 1
+            else f'Tus solicitudes de devolución {numeros} están {estado}s.',
+            tipo='cambio_estado',
+            datos_extra={'devoluciones': ids, 'estado': estado},
+            url='/mis-devoluciones',
+        )
@@ -0,0 +1,38 @@
+"""
+Worker de campañas de promociones (promociones/campanas.py).
+
+En cada vuelta envía un lote de cada campaña a la que le toca (ya pasó su
+inicio programado y el intervalo desde su último lote). Varias instancias
+pueden convivir: cada lote se toma con un UPDATE condicional.
+
+Uso:
+    python manage.py enviar_campanas              # bucle continuo
+    python manage.py enviar_campanas --una-vez    # un lote por campaña y termina (cron)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from promociones.campanas import pendientes, procesar_lote
+
+
+class Command(BaseCommand):
+    help = 'Envía por lotes los avisos de las campañas de promociones programadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Un lote de cada campaña pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=1, help='Segundos entre vueltas (default: 1)')
+
+    def handle(self, *args, **options):
+        while True:
+            for campana_id in pendientes():
+                campana = procesar_lote(campana_id)
+                if campana is not None:
+                    estilo = self.style.SUCCESS if campana.estado == 'completada' else self.style.WARNING
+                    self.stdout.write(estilo(
+                        f'{campana}: {campana.enviados} enviados, {campana.fallidos} fallidos, '
+                        f'{campana.pendientes} pendientes'
+                    ))
+            if options['una_vez']:
+                return
+            time.sleep(options['intervalo'])
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['fecha_inicio', 'fecha_fin'], name='promociones_vigentes_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0002_promocion_vigentes_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampanaPromocion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('programada', 'Programada'), ('enviando', 'Enviando'), ('pausada', 'Pausada'), ('completada', 'Completada'), ('cancelada', 'Cancelada')], db_index=True, default='programada', max_length=20)),
+                ('inicio_programado', models.DateTimeField(default=django.utils.timezone.now, help_text='No se envía nada antes de esta fecha')),
+                ('proximo_lote', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_usuario_id', models.BigIntegerField(default=0)),
+                ('total_destinatarios', models.PositiveIntegerField(blank=True, help_text='Se calcula al enviar el primer lote', null=True)),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('enviados', models.PositiveIntegerField(default=0, help_text='Clientes con al menos un envío exitoso')),
+                ('fallidos', models.PositiveIntegerField(default=0, help_text='Clientes con envíos y ninguno exitoso')),
+                ('error', models.TextField(blank=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('iniciada', models.DateTimeField(blank=True, null=True)),
+                ('finalizada', models.DateTimeField(blank=True, null=True)),
+                ('promocion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campanas', to='promociones.promocion')),
+            ],
+            options={
+                'verbose_name': 'Campaña de promoción',
+                'verbose_name_plural': 'Campañas de promociones',
+                'db_table': 'promociones_campanas',
+                'ordering': ['-creada'],
+                'indexes': [models.Index(fields=['estado', 'inicio_programado'], name='promociones_estado_4592bf_idx')],
+            },
+        ),
+    ]
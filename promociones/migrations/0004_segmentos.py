@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0003_campanapromocion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campanapromocion',
+            name='destinatarios',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='campanapromocion',
+            name='segmento',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='promocion',
+            name='segmento',
+            field=models.JSONField(blank=True, default=dict, help_text='Ej: {"categoria": 3, "dias": 90}, {"total_minimo": 500}, {"inactivos_dias": 120}'),
+        ),
+    ]
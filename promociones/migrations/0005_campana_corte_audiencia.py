@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:31
+
+from django.db import migrations, models
+
+
+def corte_desde_destinatarios(apps, schema_editor):
+    """Las campañas que ya guardaron su lista de ids siguen con el mismo corte"""
+    CampanaPromocion = apps.get_model('promociones', 'CampanaPromocion')
+    for campana in CampanaPromocion.objects.filter(destinatarios__isnull=False).iterator():
+        campana.audiencia_fecha = campana.iniciada or campana.creada
+        campana.audiencia_hasta_id = max(campana.destinatarios, default=0)
+        campana.save(update_fields=['audiencia_fecha', 'audiencia_hasta_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promociones', '0004_segmentos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campanapromocion',
+            name='audiencia_fecha',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='campanapromocion',
+            name='audiencia_hasta_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(corte_desde_destinatarios, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='campanapromocion',
+            name='destinatarios',
+        ),
+    ]
@@ -1,9 +1,24 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from decimal import Decimal
 
 
+class PromocionQuerySet(models.QuerySet):
+    def vigentes(self, ahora=None):
+        """Las mismas condiciones que esta_vigente(), resueltas en la base"""
+        ahora = ahora or timezone.now()
+        return self.filter(
+            Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=ahora),
+            # usos_maximos vacío o 0 = uso ilimitado
+            Q(usos_maximos__isnull=True) | Q(usos_maximos=0) | Q(usos_actuales__lt=F('usos_maximos')),
+            activa=True,
+            fecha_inicio__lte=ahora,
+        )
+
+
 class Promocion(models.Model):
     """
     Promociones con descuentos.
@@ -54,6 +69,15 @@ class Promocion(models.Model):
     
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    # A quién avisa la campaña (promociones/segmentos.py); vacío = todos los clientes
+    segmento = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Ej: {"categoria": 3, "dias": 90}, {"total_minimo": 500}, {"inactivos_dias": 120}'
+    )
+    
+    objects = PromocionQuerySet.as_manager()
+    
     class Meta:
         db_table = 'promociones'
         ordering = ['-fecha_creacion']
@@ -62,6 +86,12 @@ class Promocion(models.Model):
         indexes = [
             models.Index(fields=['codigo', 'activa']),
             models.Index(fields=['fecha_inicio', 'fecha_fin']),
+            # Promocion.objects.vigentes(): solo recorre las activas
+            models.Index(
+                fields=['fecha_inicio', 'fecha_fin'],
+                condition=Q(activa=True),
+                name='promociones_vigentes_idx',
+            ),
         ]
     
     def __str__(self):
@@ -69,6 +99,13 @@ class Promocion(models.Model):
             return f"{self.codigo} - {self.valor_descuento}%"
         return f"{self.codigo} - ${self.valor_descuento}"
     
+    def clean(self):
+        from .segmentos import validar
+        try:
+            self.segmento = validar(self.segmento)
+        except ValidationError as e:
+            raise ValidationError({'segmento': e.messages})
+    
     def esta_vigente(self):
         """Verifica si la promoción está vigente"""
         ahora = timezone.now()
@@ -116,6 +153,71 @@ class Promocion(models.Model):
         self.save(update_fields=['usos_actuales'])
 
 
+
+class CampanaPromocion(models.Model):
+    """
+    Aviso push de una promoción a los clientes de su segmento, enviado en
+    lotes por `manage.py enviar_campanas` (promociones/campanas.py). Guarda
+    el corte de la audiencia y el avance para poder pausarla y reanudarla
+    donde quedó.
+    """
+    ESTADO_CHOICES = [
+        ('programada', 'Programada'),
+        ('enviando', 'Enviando'),
+        ('pausada', 'Pausada'),
+        ('completada', 'Completada'),
+        ('cancelada', 'Cancelada'),
+    ]
+    
+    promocion = models.ForeignKey(Promocion, on_delete=models.CASCADE, related_name='campanas')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='programada', db_index=True)
+    inicio_programado = models.DateTimeField(default=timezone.now, help_text='No se envía nada antes de esta fecha')
+    proximo_lote = models.DateTimeField(null=True, blank=True)
+    
+    # Copiado de la promoción al programarla; el primer lote fija el corte de
+    # la audiencia (fecha de evaluación del segmento y último usuario incluido)
+    segmento = models.JSONField(default=dict, blank=True)
+    audiencia_fecha = models.DateTimeField(null=True, blank=True, editable=False)
+    audiencia_hasta_id = models.BigIntegerField(null=True, blank=True, editable=False)
+    
+    # Avance: los clientes se recorren por id, el cursor es el último procesado
+    ultimo_usuario_id = models.BigIntegerField(default=0)
+    total_destinatarios = models.PositiveIntegerField(null=True, blank=True, help_text='Se calcula al enviar el primer lote')
+    procesados = models.PositiveIntegerField(default=0)
+    enviados = models.PositiveIntegerField(default=0, help_text='Clientes con al menos un envío exitoso')
+    fallidos = models.PositiveIntegerField(default=0, help_text='Clientes con envíos y ninguno exitoso')
+    error = models.TextField(blank=True)
+    
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    finalizada = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'promociones_campanas'
+        ordering = ['-creada']
+        verbose_name = 'Campaña de promoción'
+        verbose_name_plural = 'Campañas de promociones'
+        indexes = [
+            models.Index(fields=['estado', 'inicio_programado']),
+        ]
+    
+    def __str__(self):
+        return f"Campaña #{self.id} - {self.get_estado_display()}"
+    
+    def clean(self):
+        from .segmentos import validar
+        try:
+            self.segmento = validar(self.segmento)
+        except ValidationError as e:
+            raise ValidationError({'segmento': e.messages})
+    
+    @property
+    def pendientes(self):
+        if self.total_destinatarios is None:
+            return None
+        return max(self.total_destinatarios - self.procesados, 0)
+
+
 class DevolucionProducto(models.Model):
     """
     Gestión de devoluciones con patrón Estado.
@@ -245,24 +347,22 @@ class DevolucionProducto(models.Model):
         if self.tipo == 'cambio' and not producto_reemplazo:
             raise ValueError("Debe especificar el producto de reemplazo")
         
-        self.estado = 'completada'
-        self.fecha_completado = timezone.now()
-        
         if producto_reemplazo:
             self.producto_reemplazo = producto_reemplazo
         
-        # Restaurar stock del producto devuelto
-        producto_original = self.compra_item.producto
-        producto_original.stock += self.cantidad
-        producto_original.save(update_fields=['stock'])
-        
-        # Reducir stock del producto de reemplazo
+        # Restaurar stock del devuelto y descontar el reemplazo en un solo lote:
+        # si el reemplazo no alcanza, tampoco se restaura nada
+        from productos.inventario import aplicar
+        referencia = f'devolucion:{self.pk}'
+        movimientos = [(self.compra_item.producto_id, self.cantidad, 'devolucion', referencia)]
         if self.tipo == 'cambio' and self.producto_reemplazo:
-            if not self.producto_reemplazo.tiene_stock(self.cantidad):
-                raise ValueError(f"Stock insuficiente del producto de reemplazo")
-            self.producto_reemplazo.reducir_stock(self.cantidad)
+            movimientos.append((self.producto_reemplazo, -self.cantidad, 'cambio', referencia))
         
-        self.save()
+        with transaction.atomic():
+            aplicar(movimientos)
+            self.estado = 'completada'
+            self.fecha_completado = timezone.now()
+            self.save()
     
     def dentro_de_garantia(self, dias_garantia=30):
         """Verifica si la solicitud está dentro del período de garantía"""
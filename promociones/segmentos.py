@@ -0,0 +1,108 @@
+"""
+Segmentos de clientes para las campañas de promociones.
+
+Sin segmento una campaña avisa a todos los clientes con suscripción push;
+una promoción de una categoría no necesita llegar a toda la base. Un
+segmento es un dict (Promocion.segmento, copiado a la campaña) con
+criterios opcionales que se combinan con AND:
+
+    {'categoria': 3, 'dias': 90}   compraron (pagado) algo de la categoría 3 en 90 días
+    {'total_minimo': 500}          llevan pagado en total 500 o más (MetricasCliente)
+    {'inactivos_dias': 120}        compraron alguna vez y no pagan una compra hace 120 días
+
+usuarios() resuelve la audiencia en una sola consulta (EXISTS sobre las
+compras de la categoría, las métricas materializadas del cliente y sus
+suscripciones push utilizables). La campaña fija la fecha de corte en su
+primer lote y recorre el resultado de a lotes por id (campanas.py).
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+# Días hacia atrás para 'categoria' si no se indica 'dias'
+DIAS_POR_DEFECTO = 90
+
+CRITERIOS = ('categoria', 'dias', 'total_minimo', 'inactivos_dias')
+
+
+def validar(segmento):
+    """Normaliza el segmento ({} = todos los clientes); ValidationError si no es válido"""
+    if not segmento:
+        return {}
+    if not isinstance(segmento, dict):
+        raise ValidationError('El segmento debe ser un objeto JSON')
+    desconocidos = set(segmento) - set(CRITERIOS)
+    if desconocidos:
+        raise ValidationError(f"Criterios desconocidos: {', '.join(sorted(desconocidos))}. Válidos: {', '.join(CRITERIOS)}")
+    if 'dias' in segmento and 'categoria' not in segmento:
+        raise ValidationError("'dias' solo se usa junto con 'categoria'")
+
+    normalizado = {}
+    for campo in ('categoria', 'dias', 'inactivos_dias'):
+        if campo in segmento:
+            try:
+                valor = int(segmento[campo])
+            except (TypeError, ValueError):
+                raise ValidationError(f"'{campo}' debe ser un número entero")
+            if valor <= 0:
+                raise ValidationError(f"'{campo}' debe ser mayor a 0")
+            normalizado[campo] = valor
+    if 'total_minimo' in segmento:
+        try:
+            total = Decimal(str(segmento['total_minimo']))
+        except InvalidOperation:
+            raise ValidationError("'total_minimo' debe ser un monto")
+        if total <= 0:
+            raise ValidationError("'total_minimo' debe ser mayor a 0")
+        normalizado['total_minimo'] = str(total)
+    if 'categoria' in normalizado:
+        from productos.models import Categoria
+        if not Categoria.objects.filter(pk=normalizado['categoria']).exists():
+            raise ValidationError(f"La categoría {normalizado['categoria']} no existe")
+    return normalizado
+
+
+def describir(segmento):
+    """Texto corto para el admin"""
+    if not segmento:
+        return 'Todos los clientes'
+    partes = []
+    if 'categoria' in segmento:
+        partes.append(f"compraron categoría #{segmento['categoria']} en {segmento.get('dias', DIAS_POR_DEFECTO)} días")
+    if 'total_minimo' in segmento:
+        partes.append(f"pagaron ${segmento['total_minimo']} o más")
+    if 'inactivos_dias' in segmento:
+        partes.append(f"sin compras hace {segmento['inactivos_dias']} días")
+    return ' y '.join(partes)
+
+
+def usuarios(segmento=None, ahora=None):
+    """Clientes del segmento con alguna suscripción push utilizable, por id (una consulta)"""
+    from compra.models import CompraItem
+    from notificaciones.models import PushSubscription
+    from notificaciones.salud import enviables
+    from usuarios.models import Usuario
+
+    segmento = segmento or {}
+    ahora = ahora or timezone.now()
+    suscritos = enviables(PushSubscription.objects.filter(usuario=OuterRef('pk')), ahora)
+    queryset = Usuario.objects.filter(Exists(suscritos), rol='cliente', is_active=True)
+
+    if 'categoria' in segmento:
+        desde = ahora - timedelta(days=segmento.get('dias', DIAS_POR_DEFECTO))
+        compraron = CompraItem.objects.filter(
+            compra__cliente__usuario=OuterRef('pk'),
+            compra__pagado_en__lte=ahora,
+            compra__fecha__gte=desde,
+            producto__categoria_id=segmento['categoria'],
+        )
+        queryset = queryset.filter(Exists(compraron))
+    if 'total_minimo' in segmento:
+        queryset = queryset.filter(perfil_cliente__metricas__total_pagado__gte=Decimal(segmento['total_minimo']))
+    if 'inactivos_dias' in segmento:
+        corte = ahora - timedelta(days=segmento['inactivos_dias'])
+        queryset = queryset.filter(perfil_cliente__metricas__ultima_compra_pagada__lt=corte)
+    return queryset.order_by('id')
@@ -1,9 +1,11 @@
 """
 Señales para el modelo de Promociones.
-Se activa cuando se crea una nueva promoción desde el admin para notificar a clientes.
+Se activa cuando se crea una nueva promoción desde el admin para programar el aviso a clientes,
+y mantiene al día el índice de promociones vigentes (vigentes.py).
 """
 import logging
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.apps import apps
 
@@ -11,25 +13,21 @@ logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender='promociones.Promocion')
-def notificar_promocion_clientes(sender, instance, created, **kwargs):
+def programar_campana_promocion(sender, instance, created, **kwargs):
     """
-    Señal que se activa cuando se guarda una promoción.
-    Solo notifica cuando se crea una nueva promoción (no cuando se actualiza).
+    Al crear una promoción activa registra su campaña de aviso a los clientes
+    de su segmento.
+    El envío lo hace `manage.py enviar_campanas` en lotes (campanas.py);
+    el guardado no espera a las notificaciones.
     """
     if created and instance.activa:
-        try:
-            logger.info(f'Enviando notificación de nueva promoción: {instance.nombre} ({instance.codigo})')
+        from .campanas import programar
+        programar(instance)
 
-            # Importar aquí para evitar dependencias circulares
-            from notificaciones.push_service import push_service
-            resultado = push_service.send_nueva_promocion_clientes(instance)
 
-            logger.info(
-                f'Notificación de promoción enviada: '
-                f'{resultado.get("clientes_notificados", 0)} clientes notificados, '
-                f'{resultado.get("total_exitosos", 0)} envíos exitosos, '
-                f'{resultado.get("total_fallidos", 0)} fallidos'
-            )
-
-        except Exception as e:
-            logger.error(f'Error al enviar notificación de promoción {instance.id}: {str(e)}', exc_info=True)
+@receiver(post_save, sender='promociones.Promocion')
+@receiver(post_delete, sender='promociones.Promocion')
+def invalidar_promociones_vigentes(sender, instance, **kwargs):
+    """Recarga el snapshot de vigentes cuando el cambio ya es visible para otras conexiones"""
+    from .vigentes import invalidar
+    transaction.on_commit(invalidar)
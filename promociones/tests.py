@@ -1,3 +1,298 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clientes import metricas
+from clientes.models import Cliente
+from compra.models import Compra, CompraItem
+from notificaciones.models import PushSubscription
+from notificaciones.push_service import push_service
+from productos.inventario import mover
+from productos.models import Categoria, MovimientoStock, Producto
+from usuarios.models import Usuario
+
+from . import campanas, segmentos
+from . import vigentes as indice_vigentes
+from .models import CampanaPromocion, DevolucionProducto, Promocion
+
+
+def _promocion(codigo, **campos):
+    return Promocion.objects.create(codigo=codigo, nombre=codigo, valor_descuento=10, **campos)
+
+
+class PromocionVigentesTests(TestCase):
+    """Promocion.objects.vigentes() filtra en la base igual que esta_vigente()"""
+
+    def test_mismas_condiciones_que_esta_vigente(self):
+        ahora = timezone.now()
+        _promocion('ABIERTA')
+        _promocion('CON_FIN', fecha_fin=ahora + timedelta(days=1))
+        _promocion('CON_CUPO', usos_maximos=5, usos_actuales=4)
+        _promocion('CUPO_CERO', usos_maximos=0, usos_actuales=3)
+        _promocion('VENCIDA', fecha_fin=ahora - timedelta(days=1))
+        _promocion('FUTURA', fecha_inicio=ahora + timedelta(days=1))
+        _promocion('AGOTADA', usos_maximos=2, usos_actuales=2)
+        _promocion('INACTIVA', activa=False)
+
+        esperadas = {p.codigo for p in Promocion.objects.all() if p.esta_vigente()}
+        self.assertEqual(set(Promocion.objects.vigentes().values_list('codigo', flat=True)), esperadas)
+        self.assertEqual(esperadas, {'ABIERTA', 'CON_FIN', 'CON_CUPO', 'CUPO_CERO'})
+
+
+class IndiceVigentesTests(TransactionTestCase):
+    """Listado y validar leen el índice en memoria; los cambios lo invalidan"""
+
+    def setUp(self):
+        indice_vigentes.invalidar()
+        self.addCleanup(indice_vigentes.invalidar)
+        usuario = Usuario.objects.create_user('promo_cliente', 'promo@cliente.local', 'clave-123')
+        self.api = APIClient()
+        self.api.force_authenticate(usuario)
+        self.promocion = _promocion('VERANO', usos_maximos=1)
+        _promocion('VENCIDA', fecha_fin=timezone.now() - timedelta(days=1))
+
+    def _codigos(self):
+        respuesta = self.api.get(reverse('promocion-list'), {'vigentes': 'true'})
+        return [p['codigo'] for p in respuesta.data['results']]
+
+    def test_listado_y_validar_sin_consultas(self):
+        self.assertEqual(self._codigos(), ['VERANO'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._codigos(), ['VERANO'])
+            respuesta = self.api.post(reverse('promocion-validar'), {'codigo': 'verano', 'monto': '100'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['descuento'], '10.00')
+
+        vencida = self.api.post(reverse('promocion-validar'), {'codigo': 'VENCIDA', 'monto': '100'})
+        self.assertEqual(vencida.status_code, 400)
+
+    def test_cambios_invalidan_el_indice(self):
+        self.assertEqual(self._codigos(), ['VERANO'])
+
+        # Se agota el cupo: deja de listarse y de validarse
+        self.promocion.incrementar_uso()
+        self.assertEqual(self._codigos(), [])
+        respuesta = self.api.post(reverse('promocion-validar'), {'codigo': 'VERANO', 'monto': '100'})
+        self.assertEqual(respuesta.status_code, 400)
+
+        _promocion('INVIERNO')
+        self.assertEqual(self._codigos(), ['INVIERNO'])
+        Promocion.objects.filter(codigo='INVIERNO').delete()
+        self.assertEqual(self._codigos(), [])
+
+
+class DevolucionesLoteTests(TestCase):
+    """Transiciones masivas: validación del lote completo, un UPDATE y stock por producto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('lote_admin', 'lote@admin.local', 'clave-123', is_staff=True)
+        cls.usuario = Usuario.objects.create_user('lote_cliente', 'lote@cliente.local', 'clave-123')
+        cliente = Cliente.objects.create(usuario=cls.usuario, nombre='Lote', email='lote@cliente.local')
+        cls.productos = [Producto.objects.create(sku=f'LOTE-{i}', nombre=f'Lote {i}', precio=Decimal('10.00')) for i in range(2)]
+        compra = Compra.objects.create(cliente=cliente)
+        cls.ids = [
+            DevolucionProducto.objects.create(
+                compra_item=CompraItem.objects.create(
+                    compra=compra, producto=cls.productos[i % 2], cantidad=2, precio_unitario=Decimal('10.00')
+                ),
+                cliente=cliente, motivo='Defecto', cantidad=2,
+            ).pk
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        parche = mock.patch('compra.segundo_plano.al_confirmar')
+        self.al_confirmar = parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_aprobar_y_completar_un_update_por_producto(self):
+        respuesta = self.api.post(reverse('devolucion-aprobar-lote'), {'ids': self.ids, 'respuesta': 'Ok'}, format='json')
+        self.assertEqual(respuesta.data['procesadas'], 5)
+        self.assertEqual(set(DevolucionProducto.objects.values_list('estado', flat=True)), {'aprobada'})
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.api.post(reverse('devolucion-completar-lote'), {'ids': self.ids}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        actualizaciones = [q for q in consultas.captured_queries if q['sql'].startswith('UPDATE "productos"')]
+        self.assertEqual(len(actualizaciones), 2)
+        self.assertEqual(list(Producto.objects.order_by('id').values_list('stock', flat=True)), [6, 4])
+        self.assertEqual(MovimientoStock.objects.filter(motivo='devolucion').count(), 5)
+
+        # Un aviso por cliente y transición, con todas sus devoluciones
+        self.al_confirmar.assert_called_with(mock.ANY, {self.usuario.pk: self.ids}, 'completada')
+
+    def test_lote_invalido_no_aplica_nada(self):
+        ruta = reverse('devolucion-completar-lote')
+        respuesta = self.api.post(ruta, {'ids': [self.ids[0], 999999]}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(set(respuesta.data['errores']), {self.ids[0], 999999})
+
+        DevolucionProducto.objects.filter(pk=self.ids[0]).update(estado='aprobada', tipo='cambio')
+        mover(self.productos[1], 1, 'reposicion')
+        respuesta = self.api.post(ruta, {'ids': self.ids[:1], 'reemplazos': {str(self.ids[0]): self.productos[1].pk}}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(DevolucionProducto.objects.get(pk=self.ids[0]).estado, 'aprobada')
+        self.assertEqual(list(Producto.objects.order_by('id').values_list('stock', flat=True)), [0, 1])
+
+    def test_solo_staff(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        respuesta = cliente.post(reverse('devolucion-rechazar-lote'), {'ids': self.ids}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+
+
+@override_settings(PROMOCIONES_CAMPANA_LOTE=2, PROMOCIONES_CAMPANA_INTERVALO=60)
+class CampanasTests(TestCase):
+    """Crear una promoción solo programa la campaña; el worker envía por lotes"""
+
+    def setUp(self):
+        self.clientes = []
+        for i in range(5):
+            usuario = Usuario.objects.create_user(f'campana_{i}', f'campana{i}@cliente.local', 'clave-123')
+            PushSubscription.objects.create(usuario=usuario, endpoint=f'https://push.local/{i}', p256dh='k', auth='a')
+            self.clientes.append(usuario)
+        Usuario.objects.create_user('sin_suscripcion', 'sin@cliente.local', 'clave-123')
+
+        def enviar(usuario, **contenido):
+            return {'exitosos': 0, 'fallidos': 1} if usuario == self.clientes[0] else {'exitosos': 1, 'fallidos': 0}
+
+        parche = mock.patch.object(push_service, 'send_notification', side_effect=enviar)
+        self.enviar = parche.start()
+        self.addCleanup(parche.stop)
+
+    def _siguiente(self, campana):
+        # Simula que ya pasó el intervalo entre lotes
+        CampanaPromocion.objects.filter(pk=campana.pk).update(proximo_lote=timezone.now())
+        return campanas.procesar_lote(campana.pk)
+
+    def test_lotes_con_intervalo_pausa_y_reanudacion(self):
+        promocion = _promocion('CAMPANA')
+        self.enviar.assert_not_called()
+        campana = promocion.campanas.get()
+        self.assertEqual(campanas.pendientes(), [campana.pk])
+
+        campana = campanas.procesar_lote(campana.pk)
+        self.assertEqual((campana.estado, campana.total_destinatarios, campana.procesados), ('enviando', 5, 2))
+        self.assertEqual((campana.enviados, campana.fallidos), (1, 1))
+        # El intervalo todavía no pasó
+        self.assertIsNone(campanas.procesar_lote(campana.pk))
+
+        campanas.pausar(CampanaPromocion.objects.all())
+        self.assertIsNone(self._siguiente(campana))
+        self.assertEqual(self.enviar.call_count, 2)
+
+        campanas.reanudar(CampanaPromocion.objects.all())
+        self.assertEqual(self._siguiente(campana).procesados, 4)
+        campana = self._siguiente(campana)
+        self.assertEqual((campana.estado, campana.enviados, campana.fallidos, campana.pendientes), ('completada', 4, 1, 0))
+        self.assertEqual(
+            [llamada.kwargs['usuario'] for llamada in self.enviar.call_args_list], self.clientes
+        )
+
+    def test_inicio_programado_y_promocion_desactivada(self):
+        promocion = _promocion('FUTURA', fecha_inicio=timezone.now() + timedelta(days=1))
+        campana = promocion.campanas.get()
+        self.assertEqual(campana.inicio_programado, promocion.fecha_inicio)
+        self.assertEqual(campanas.pendientes(), [])
+        self.assertIsNone(campanas.procesar_lote(campana.pk))
+
+        CampanaPromocion.objects.filter(pk=campana.pk).update(inicio_programado=timezone.now())
+        Promocion.objects.filter(pk=promocion.pk).update(activa=False)
+        self.assertEqual(campanas.procesar_lote(campana.pk).estado, 'cancelada')
+        self.enviar.assert_not_called()
+
+
+class SegmentosTests(TestCase):
+    """La audiencia de un segmento sale de una consulta y la campaña la congela al empezar"""
+
+    def setUp(self):
+        self.electro = Categoria.objects.create(nombre='Electro', slug='electro')
+        hogar = Categoria.objects.create(nombre='Hogar', slug='hogar')
+        ahora = timezone.now()
+        # (categoría comprada, total pagado, hace cuántos días), None = sin compras
+        historial = {
+            'reciente': (self.electro, '600.00', 10),
+            'hogar': (hogar, '100.00', 10),
+            'dormido': (self.electro, '50.00', 200),
+            'nuevo': None,
+        }
+        self.usuarios = {}
+        for nombre, compra in historial.items():
+            usuario = Usuario.objects.create_user(f'seg_{nombre}', f'{nombre}@segmento.local', 'clave-123')
+            PushSubscription.objects.create(usuario=usuario, endpoint=f'https://push.local/{nombre}', p256dh='k', auth='a')
+            self.usuarios[nombre] = usuario
+            if compra:
+                self._comprar(usuario, *compra, ahora=ahora)
+        metricas.recalcular(Cliente.objects.values_list('id', flat=True))
+
+    def _comprar(self, usuario, categoria, total, dias, ahora=None):
+        ahora = ahora or timezone.now()
+        cliente, _ = Cliente.objects.get_or_create(usuario=usuario, defaults={'nombre': usuario.username, 'email': usuario.email})
+        producto = Producto.objects.create(sku=f'SEG-{usuario.pk}-{categoria.pk}', nombre='Segmento', precio=Decimal(total), categoria=categoria)
+        compra = Compra.objects.create(cliente=cliente, total=Decimal(total), pagado_en=ahora)
+        Compra.objects.filter(pk=compra.pk).update(fecha=ahora - timedelta(days=dias))
+        CompraItem.objects.create(compra=compra, producto=producto, cantidad=1, precio_unitario=Decimal(total))
+
+    def _ids(self, *nombres):
+        return sorted(self.usuarios[nombre].pk for nombre in nombres)
+
+    def test_criterios_en_una_consulta(self):
+        casos = [
+            ({}, ('reciente', 'hogar', 'dormido', 'nuevo')),
+            ({'categoria': self.electro.pk, 'dias': 30}, ('reciente',)),
+            ({'categoria': self.electro.pk, 'dias': 365}, ('reciente', 'dormido')),
+            ({'total_minimo': '500'}, ('reciente',)),
+            ({'inactivos_dias': 120}, ('dormido',)),
+            ({'categoria': self.electro.pk, 'dias': 365, 'inactivos_dias': 120}, ('dormido',)),
+        ]
+        for segmento, esperados in casos:
+            with self.subTest(segmento=segmento), self.assertNumQueries(1):
+                self.assertEqual(list(segmentos.usuarios(segmento).values_list('id', flat=True)), self._ids(*esperados))
+
+    def test_validar(self):
+        self.assertEqual(segmentos.validar({'total_minimo': 500}), {'total_minimo': '500'})
+        for invalido in ({'pais': 'BO'}, {'dias': 30}, {'categoria': 999}, {'inactivos_dias': -1}, {'total_minimo': 'mucho'}):
+            with self.subTest(segmento=invalido), self.assertRaises(ValidationError):
+                segmentos.validar(invalido)
+
+        promocion = Promocion(codigo='SEG-MAL', nombre='Seg', valor_descuento=10, segmento={'pais': 'BO'})
+        with self.assertRaises(ValidationError) as error:
+            promocion.full_clean()
+        self.assertIn('segmento', error.exception.message_dict)
+
+    @override_settings(PROMOCIONES_CAMPANA_LOTE=1)
+    def test_campana_con_segmento_congela_la_audiencia(self):
+        with mock.patch.object(push_service, 'send_notification', return_value={'exitosos': 1, 'fallidos': 0}) as enviar:
+            promocion = _promocion('ELECTRO', segmento={'categoria': self.electro.pk, 'dias': 365})
+            campana = promocion.campanas.get()
+            self.assertEqual(campana.segmento, promocion.segmento)
+
+            campana = campanas.procesar_lote(campana.pk)
+            self.assertEqual(campana.total_destinatarios, 2)
+            self.assertEqual(list(campanas.audiencia(campana).values_list('id', flat=True)), self._ids('reciente', 'dormido'))
+
+            # Quien entra al segmento después, o se registra después, no cambia la audiencia en curso
+            self._comprar(self.usuarios['nuevo'], self.electro, '80.00', 1)
+            tardio = Usuario.objects.create_user('seg_tardio', 'tardio@segmento.local', 'clave-123')
+            PushSubscription.objects.create(usuario=tardio, endpoint='https://push.local/tardio', p256dh='k', auth='a')
+            self._comprar(tardio, self.electro, '80.00', 1)
+            for _ in range(2):
+                CampanaPromocion.objects.filter(pk=campana.pk).update(proximo_lote=timezone.now())
+                campana = campanas.procesar_lote(campana.pk)
+
+        self.assertEqual((campana.estado, campana.enviados, campana.pendientes), ('completada', 2, 0))
+        self.assertEqual(
+            [llamada.kwargs['usuario'].pk for llamada in enviar.call_args_list], self._ids('reciente', 'dormido')
+        )
@@ -1,10 +1,11 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.db import transaction
 from .models import Promocion, DevolucionProducto
 from .serializers import PromocionSerializer, DevolucionProductoSerializer, DevolucionCreateSerializer
+from . import vigentes as indice_vigentes
 import logging
 
 logger = logging.getLogger('promociones')
@@ -27,10 +28,19 @@ class PromocionViewSet(viewsets.ReadOnlyModelViewSet):
         # Filtro adicional para mostrar solo vigentes
         vigentes = self.request.query_params.get('vigentes', None)
         if vigentes == 'true':
-            # Filtrar manualmente las vigentes
-            return [p for p in queryset if p.esta_vigente()]
+            return queryset.vigentes()
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        """?vigentes=true se sirve desde el índice en memoria (vigentes.py)"""
+        if request.query_params.get('vigentes') == 'true' and indice_vigentes.disponible():
+            promociones = indice_vigentes.promociones_vigentes()
+            page = self.paginate_queryset(promociones)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(promociones, many=True).data)
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['post'])
     def validar(self, request):
         """
@@ -46,13 +56,19 @@ class PromocionViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            promocion = Promocion.objects.get(codigo=codigo.upper())
-        except Promocion.DoesNotExist:
-            return Response(
-                {'detail': 'Código de promoción inválido'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        promocion = None
+        if indice_vigentes.disponible():
+            promocion = indice_vigentes.promocion_vigente(codigo.upper())
+        
+        if promocion is None:
+            # Fuera del índice: inexistente o no vigente, la base dice cuál
+            try:
+                promocion = Promocion.objects.get(codigo=codigo.upper())
+            except Promocion.DoesNotExist:
+                return Response(
+                    {'detail': 'Código de promoción inválido'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
         
         if not promocion.esta_vigente():
             return Response(
@@ -98,14 +114,18 @@ class DevolucionProductoViewSet(viewsets.ModelViewSet):
         Los admin/staff ven todas.
         """
         user = self.request.user
+        # El serializer lee cliente, producto y fecha de compra de cada fila
+        queryset = DevolucionProducto.objects.select_related(
+            'cliente', 'compra_item__producto', 'compra_item__compra'
+        )
         if user.is_staff:
-            return DevolucionProducto.objects.all()
+            return queryset
         
         # Obtener el cliente del usuario
         from clientes.models import Cliente
         try:
             cliente = Cliente.objects.get(usuario=user)
-            return DevolucionProducto.objects.filter(cliente=cliente)
+            return queryset.filter(cliente=cliente)
         except Cliente.DoesNotExist:
             return DevolucionProducto.objects.none()
     
@@ -179,3 +199,72 @@ class DevolucionProductoViewSet(viewsets.ModelViewSet):
             'detail': 'Solicitud cancelada exitosamente',
             'devolucion': DevolucionProductoSerializer(devolucion).data
         })
+    
+    # === PROCESAMIENTO MASIVO (staff) ===
+    
+    def _procesar_lote(self, request, transicion, **extra):
+        """Aplica una transición masiva de promociones/devoluciones.py a `ids`"""
+        from productos.inventario import StockInsuficiente
+        from . import devoluciones as lote
+        
+        ids = request.data.get('ids')
+        try:
+            ids = [int(i) for i in ids] if isinstance(ids, list) else None
+        except (TypeError, ValueError):
+            ids = None
+        if not ids:
+            return Response(
+                {'detail': 'Se requiere "ids": lista de ids de devoluciones'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            procesadas = getattr(lote, transicion)(ids, **extra)
+        except lote.LoteInvalido as e:
+            return Response(
+                {'detail': str(e), 'errores': e.errores},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except StockInsuficiente as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'procesadas': len(procesadas),
+            'ids': [devolucion.pk for devolucion in procesadas],
+        })
+    
+    @action(detail=False, methods=['post'], url_path='aprobar-lote', permission_classes=[IsAdminUser])
+    def aprobar_lote(self, request):
+        """
+        Aprueba un lote de devoluciones pendientes.
+        Body: { "ids": [1, 2, 3], "respuesta": "Aprobado" }
+        """
+        return self._procesar_lote(
+            request, 'aprobar', usuario=request.user, respuesta=request.data.get('respuesta', '')
+        )
+    
+    @action(detail=False, methods=['post'], url_path='rechazar-lote', permission_classes=[IsAdminUser])
+    def rechazar_lote(self, request):
+        """
+        Rechaza un lote de devoluciones pendientes.
+        Body: { "ids": [1, 2, 3], "respuesta": "Fuera de garantía" }
+        """
+        return self._procesar_lote(
+            request, 'rechazar', usuario=request.user, respuesta=request.data.get('respuesta', '')
+        )
+    
+    @action(detail=False, methods=['post'], url_path='completar-lote', permission_classes=[IsAdminUser])
+    def completar_lote(self, request):
+        """
+        Completa un lote de devoluciones aprobadas (restaura stock por producto).
+        Body: { "ids": [1, 2, 3], "reemplazos": {"2": 15} }  (producto de reemplazo de los cambios)
+        """
+        reemplazos = request.data.get('reemplazos') or {}
+        try:
+            reemplazos = {int(k): int(v) for k, v in reemplazos.items()}
+        except (AttributeError, TypeError, ValueError):
+            return Response(
+                {'detail': '"reemplazos" debe ser un objeto {id_devolucion: id_producto}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self._procesar_lote(request, 'completar', reemplazos=reemplazos)
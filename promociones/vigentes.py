@@ -0,0 +1,109 @@
+"""
+Índice en memoria de las promociones vigentes.
+
+La tienda pide `?vigentes=true` en cada página y valida códigos en el
+carrito; el conjunto de promociones vigentes es chico y cambia poco, así
+que cada proceso guarda una foto (snapshot) y ambos caminos la leen sin ir
+a la base:
+
+- Se recarga con Promocion.objects.vigentes() cuando se invalida o vence.
+- Se invalida al guardar o borrar una Promocion (signals.py, al confirmar
+  la transacción); incrementar_uso() también guarda, así que un cupo que
+  se agota deja de verse enseguida en este proceso.
+- Vence a los PROMOCIONES_SNAPSHOT_TTL segundos (cambios hechos por otros
+  workers) o antes, cuando la próxima promoción empieza o termina.
+- Guarda valores, no instancias: cada request recibe instancias nuevas.
+- Dentro de una transacción, o con PROMOCIONES_SNAPSHOT_TTL=0, no se usa:
+  la foto no ve lo que la transacción aún no confirmó.
+
+El checkout (CompraViewSet.checkout) sigue leyendo la base: ahí el cupo de
+usos tiene que ser exacto.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_snapshot = None
+_generacion = 0
+
+
+def _ttl():
+    return getattr(settings, 'PROMOCIONES_SNAPSHOT_TTL', 30)
+
+
+def disponible():
+    """Si el request actual puede leer el snapshot en vez de la base"""
+    return _ttl() > 0 and not connection.in_atomic_block
+
+
+def invalidar():
+    """Descarta el snapshot; el próximo acceso lo recarga"""
+    global _snapshot, _generacion
+    with _lock:
+        _snapshot = None
+        _generacion += 1
+
+
+def _cargar():
+    from .models import Promocion
+
+    ahora = timezone.now()
+    promociones = list(Promocion.objects.vigentes(ahora))
+
+    # El conjunto cambia solo cuando una promoción empieza o termina
+    limites = [ahora + timedelta(seconds=_ttl())]
+    limites += [p.fecha_fin for p in promociones if p.fecha_fin]
+    proximo_inicio = Promocion.objects.filter(activa=True, fecha_inicio__gt=ahora).aggregate(
+        inicio=Min('fecha_inicio')
+    )['inicio']
+    if proximo_inicio:
+        limites.append(proximo_inicio)
+
+    campos = tuple(f.attname for f in Promocion._meta.concrete_fields)
+    filas = tuple(tuple(getattr(p, campo) for campo in campos) for p in promociones)
+    por_codigo = {p.codigo: i for i, p in enumerate(promociones)}
+    logger.debug(f'🏷️ Snapshot de promociones vigentes: {len(filas)} promociones')
+    return {'vence': min(limites), 'campos': campos, 'filas': filas, 'por_codigo': por_codigo}
+
+
+def _actual():
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and timezone.now() <= snapshot['vence']:
+        return snapshot
+
+    generacion = _generacion
+    snapshot = _cargar()
+    with _lock:
+        # Si se invalidó mientras cargábamos, esta foto ya nació vieja
+        if generacion == _generacion:
+            _snapshot = snapshot
+    return snapshot
+
+
+def _instancia(snapshot, fila):
+    from .models import Promocion
+    return Promocion.from_db('default', snapshot['campos'], fila)
+
+
+def promociones_vigentes():
+    """Promociones vigentes en el orden del modelo (-fecha_creacion)"""
+    snapshot = _actual()
+    return [_instancia(snapshot, fila) for fila in snapshot['filas']]
+
+
+def promocion_vigente(codigo):
+    """La promoción vigente con ese código (ya en mayúsculas), o None"""
+    snapshot = _actual()
+    indice = snapshot['por_codigo'].get(codigo)
+    if indice is None:
+        return None
+    return _instancia(snapshot, snapshot['filas'][indice])
@@ -0,0 +1,224 @@
+"""
+Motor de rankings de rendimiento.
+
+Todos los rankings del período (productos, clientes, categorías) y las
+métricas generales salen de UNA consulta: un CTE filtra las compras del
+período una sola vez, se agregan por producto y por cliente, las categorías
+se derivan del agregado por producto y `RANK() OVER (...)` ordena cada
+grupo. El producto y el cliente estrella son la fila 1 de su ranking, sin
+volver a consultar.
+
+Requiere funciones de ventana (PostgreSQL, SQLite >= 3.25).
+
+Uso:
+    rankings = calcular_rankings(dias=30, limit=10)
+    rankings.productos[0]['nombre']
+    rankings.como_dict()  # mismo formato que /api/reportes/rankings/rendimiento/
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import connection
+
+from clientes.models import Cliente
+from compra.models import Compra, CompraItem
+from productos.models import Categoria, Producto
+
+from .ventanas import Ventana
+
+
+def _tabla(modelo):
+    return connection.ops.quote_name(modelo._meta.db_table)
+
+
+def _columna(modelo, campo):
+    return connection.ops.quote_name(modelo._meta.get_field(campo).column)
+
+
+def _sql():
+    c = lambda campo: _columna(Compra, campo)  # noqa: E731
+    i = lambda campo: _columna(CompraItem, campo)  # noqa: E731
+    p = lambda campo: _columna(Producto, campo)  # noqa: E731
+    return f"""
+        WITH compras_periodo AS (
+            SELECT {c('id')} AS id, {c('cliente')} AS cliente_id, {c('total')} AS total
+            FROM {_tabla(Compra)}
+            WHERE {c('fecha')} >= %s AND {c('fecha')} < %s
+        ),
+        por_producto AS (
+            SELECT it.{i('producto')} AS id,
+                   SUM(it.{i('cantidad')}) AS unidades,
+                   SUM(it.{i('precio_unitario')} * it.{i('cantidad')}) AS ingresos
+            FROM {_tabla(CompraItem)} it
+            JOIN compras_periodo cp ON cp.id = it.{i('compra')}
+            GROUP BY it.{i('producto')}
+        ),
+        por_cliente AS (
+            SELECT cliente_id AS id, SUM(total) AS ingresos, COUNT(*) AS ordenes
+            FROM compras_periodo
+            GROUP BY cliente_id
+        ),
+        por_categoria AS (
+            SELECT pr.{p('categoria')} AS id,
+                   SUM(pp.unidades) AS unidades,
+                   SUM(pp.ingresos) AS ingresos,
+                   COUNT(*) AS productos
+            FROM por_producto pp
+            JOIN {_tabla(Producto)} pr ON pr.{p('id')} = pp.id
+            GROUP BY pr.{p('categoria')}
+        ),
+        rankeado AS (
+            SELECT 'producto' AS tipo, id, unidades, ingresos, NULL AS ordenes, NULL AS productos,
+                   RANK() OVER (ORDER BY unidades DESC) AS ranking,
+                   ROW_NUMBER() OVER (ORDER BY unidades DESC, id) AS fila
+            FROM por_producto
+            UNION ALL
+            SELECT 'cliente', id, NULL, ingresos, ordenes, NULL,
+                   RANK() OVER (ORDER BY ingresos DESC),
+                   ROW_NUMBER() OVER (ORDER BY ingresos DESC, id)
+            FROM por_cliente
+            UNION ALL
+            SELECT 'categoria', id, unidades, ingresos, NULL, productos,
+                   RANK() OVER (ORDER BY ingresos DESC),
+                   ROW_NUMBER() OVER (ORDER BY ingresos DESC, id)
+            FROM por_categoria
+            UNION ALL
+            SELECT 'general', NULL,
+                   (SELECT SUM(unidades) FROM por_producto),
+                   (SELECT SUM(total) FROM compras_periodo),
+                   (SELECT COUNT(*) FROM compras_periodo),
+                   NULL, 1, 1
+        )
+        SELECT r.tipo, r.unidades, r.ingresos, r.ordenes, r.productos, r.ranking,
+               pr.{p('nombre')}, pr.{p('sku')}, cat.{_columna(Categoria, 'nombre')},
+               cl.{_columna(Cliente, 'nombre')}, cl.{_columna(Cliente, 'email')}
+        FROM rankeado r
+        LEFT JOIN {_tabla(Producto)} pr
+               ON r.tipo = 'producto' AND pr.{p('id')} = r.id
+        LEFT JOIN {_tabla(Categoria)} cat
+               ON cat.{_columna(Categoria, 'id')} = CASE
+                   WHEN r.tipo = 'producto' THEN pr.{p('categoria')}
+                   WHEN r.tipo = 'categoria' THEN r.id
+               END
+        LEFT JOIN {_tabla(Cliente)} cl
+               ON r.tipo = 'cliente' AND cl.{_columna(Cliente, 'id')} = r.id
+        WHERE r.fila <= %s
+        ORDER BY r.tipo, r.fila
+    """
+
+
+def _decimal(valor):
+    # SQLite devuelve float/int para columnas decimales (con ruido de coma
+    # flotante en las sumas); PostgreSQL, Decimal. Se redondea a centavos.
+    if valor is None:
+        return Decimal('0')
+    valor = valor if isinstance(valor, Decimal) else Decimal(str(valor))
+    return valor.quantize(Decimal('0.01'))
+
+
+@dataclass
+class Rankings:
+    dias: int
+    inicio: object
+    fin: object
+    productos: list = field(default_factory=list)
+    clientes: list = field(default_factory=list)
+    categorias: list = field(default_factory=list)
+    metricas_generales: dict = field(default_factory=dict)
+
+    @property
+    def producto_estrella(self):
+        if not self.productos:
+            return None
+        p = self.productos[0]
+        return {
+            'nombre': p['nombre'],
+            'sku': p['sku'],
+            'categoria': p['categoria'],
+            'unidades_vendidas': p['unidades_vendidas'],
+            'ingresos_generados': p['ingresos_totales'],
+        }
+
+    @property
+    def cliente_estrella(self):
+        if not self.clientes:
+            return None
+        c = self.clientes[0]
+        return {
+            'nombre': c['nombre'],
+            'email': c['email'],
+            'total_compras': c['total_compras'],
+            'numero_ordenes': c['numero_ordenes'],
+        }
+
+    def como_dict(self):
+        """Formato de respuesta de RankingsPerformanceView"""
+        return {
+            'periodo_dias': self.dias,
+            'fecha_inicio': self.inicio.isoformat(),
+            'fecha_fin': self.fin.isoformat(),
+
+            # Rankings principales
+            'productos_mas_vendidos': self.productos,
+            'clientes_mas_activos': self.clientes,
+            'categorias_mas_rentables': self.categorias,
+
+            # Métricas destacadas
+            'metricas_generales': self.metricas_generales,
+
+            # Estrellas del período
+            'producto_estrella': self.producto_estrella,
+            'cliente_estrella': self.cliente_estrella,
+        }
+
+
+def calcular_rankings(dias=30, limit=10):
+    """Rankings de los últimos `dias` días, `limit` filas por ranking"""
+    ventana = Ventana.ultimos_dias(dias)
+
+    rankings = Rankings(dias=dias, inicio=ventana.desde, fin=ventana.hasta)
+    with connection.cursor() as cursor:
+        cursor.execute(_sql(), [
+            connection.ops.adapt_datetimefield_value(ventana.inicio),
+            connection.ops.adapt_datetimefield_value(ventana.fin),
+            limit,
+        ])
+        filas = cursor.fetchall()
+
+    for tipo, unidades, ingresos, ordenes, productos, ranking, nombre, sku, categoria, cliente, email in filas:
+        ingresos = _decimal(ingresos)
+        if tipo == 'producto':
+            rankings.productos.append({
+                'ranking': ranking,
+                'nombre': nombre,
+                'sku': sku,
+                'categoria': categoria,
+                'unidades_vendidas': unidades,
+                'ingresos_totales': float(ingresos),
+                'precio_promedio': float(ingresos / unidades) if unidades else 0.0,
+            })
+        elif tipo == 'cliente':
+            rankings.clientes.append({
+                'ranking': ranking,
+                'nombre': cliente,
+                'email': email,
+                'total_compras': float(ingresos),
+                'numero_ordenes': ordenes,
+                'promedio_por_orden': float(ingresos / ordenes) if ordenes else 0.0,
+            })
+        elif tipo == 'categoria':
+            rankings.categorias.append({
+                'ranking': ranking,
+                'nombre': categoria,
+                'unidades_vendidas': unidades,
+                'ingresos_totales': float(ingresos),
+                'productos_en_categoria': productos,
+            })
+        else:
+            rankings.metricas_generales = {
+                'total_ventas': float(ingresos),
+                'total_ordenes': ordenes or 0,
+                'total_productos_vendidos': unidades or 0,
+                'promedio_por_orden': float(ingresos) / max(ordenes or 1, 1),
+            }
+    return rankings
@@ -0,0 +1,158 @@
+"""
+Series temporales de ventas con relleno de huecos, por hora, día, semana o mes.
+
+La base agrega por bucket (`Trunc(..., tzinfo=STORE_TIME_ZONE)`) y los
+buckets sin ventas se completan con cero:
+
+- PostgreSQL: `generate_series` genera el calendario de buckets y un
+  LEFT JOIN contra el agregado devuelve la serie completa en una consulta.
+- Otras bases: el calendario se arma en Python y se combina con el agregado
+  (misma consulta de agregación, una sola ida a la base).
+
+El resultado son arreglos paralelos, más compactos que un dict por punto:
+
+    serie_ventas(Ventana.ultimos_dias(365), 'mes')
+    {'granularidad': 'mes', 'desde': '...', 'hasta': '...',
+     'buckets': ['2025-10-01', ...], 'total': [1520.5, ...], 'cantidad': [31, ...]}
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import Trunc
+
+from .ventanas import zona_tienda
+
+# granularidad -> (kind de Trunc, intervalo de generate_series)
+GRANULARIDADES = {
+    'hora': ('hour', '1 hour'),
+    'dia': ('day', '1 day'),
+    'semana': ('week', '1 week'),
+    'mes': ('month', '1 month'),
+}
+# Tope de puntos por serie (una hora por bucket durante ~7 meses)
+MAX_BUCKETS = 5000
+
+
+def _truncar(momento, granularidad):
+    """Inicio del bucket que contiene `momento` (datetime local sin zona)"""
+    if granularidad == 'hora':
+        return momento.replace(minute=0, second=0, microsecond=0)
+    dia = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularidad == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidad == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def _siguiente(bucket, granularidad):
+    if granularidad == 'hora':
+        return bucket + timedelta(hours=1)
+    if granularidad == 'dia':
+        return bucket + timedelta(days=1)
+    if granularidad == 'semana':
+        return bucket + timedelta(weeks=1)
+    return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _limites(ventana, granularidad):
+    """Primer y último bucket de la ventana, como datetimes locales sin zona"""
+    primero = _truncar(datetime.combine(ventana.desde, time.min), granularidad)
+    ultimo = _truncar(datetime.combine(ventana.hasta, time.max), granularidad)
+    return primero, ultimo
+
+
+def _validar(ventana, granularidad):
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"granularidad inválida '{granularidad}'. Opciones: {', '.join(GRANULARIDADES)}")
+    dias = (ventana.hasta - ventana.desde).days + 1
+    if dias < 1:
+        raise ValueError('la fecha inicial es posterior a la final')
+    aproximado = {'hora': dias * 24, 'dia': dias, 'semana': dias // 7 + 1, 'mes': dias // 28 + 1}[granularidad]
+    if aproximado > MAX_BUCKETS:
+        raise ValueError(f'la serie tendría ~{aproximado} puntos (máximo {MAX_BUCKETS}); usa una granularidad mayor')
+
+
+def calendario(ventana, granularidad):
+    """Inicio de cada bucket de la ventana, en orden"""
+    primero, ultimo = _limites(ventana, granularidad)
+    buckets = []
+    actual = primero
+    while actual <= ultimo:
+        buckets.append(actual)
+        actual = _siguiente(actual, granularidad)
+    return buckets
+
+
+def _agregado(queryset, ventana, granularidad):
+    return (
+        queryset.filter(ventana.filtro())
+        .annotate(bucket=Trunc('fecha', GRANULARIDADES[granularidad][0], tzinfo=zona_tienda()))
+        .values('bucket')
+        .annotate(total=Sum('total'), cantidad=Count('id'))
+        .order_by()
+    )
+
+
+def _filas_postgres(agregado, ventana, granularidad):
+    # Trunc(..., tzinfo) en PostgreSQL produce `DATE_TRUNC(kind, fecha AT TIME
+    # ZONE tz)`: un timestamp local sin zona, comparable con generate_series
+    sql, params = agregado.query.sql_with_params()
+    primero, ultimo = _limites(ventana, granularidad)
+    consulta = f"""
+        WITH agregados AS ({sql})
+        SELECT b.bucket, COALESCE(a.total, 0), COALESCE(a.cantidad, 0)
+        FROM generate_series(%s::timestamp, %s::timestamp, %s::interval) AS b(bucket)
+        LEFT JOIN agregados a ON a.bucket = b.bucket
+        ORDER BY b.bucket
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(consulta, [*params, primero, ultimo, GRANULARIDADES[granularidad][1]])
+        return cursor.fetchall()
+
+
+def _filas_calendario(agregado, ventana, granularidad):
+    zona = zona_tienda()
+    por_bucket = {}
+    for fila in agregado:
+        # El ORM devuelve el bucket como datetime aware en la zona de la tienda
+        bucket = fila['bucket'].astimezone(zona).replace(tzinfo=None)
+        por_bucket[bucket] = (fila['total'], fila['cantidad'])
+    return [(bucket, *por_bucket.get(bucket, (0, 0))) for bucket in calendario(ventana, granularidad)]
+
+
+def serie_ventas(ventana, granularidad='dia', queryset=None):
+    """
+    Total vendido y cantidad de compras por bucket dentro de la ventana,
+    sin huecos. `queryset` permite acotar las compras (p. ej. por categoría).
+    Lanza ValueError si la granularidad no existe o la serie es demasiado larga.
+    """
+    _validar(ventana, granularidad)
+    if queryset is None:
+        from compra.models import Compra
+        queryset = Compra.objects.all()
+
+    agregado = _agregado(queryset, ventana, granularidad)
+    if connection.vendor == 'postgresql':
+        filas = _filas_postgres(agregado, ventana, granularidad)
+    else:
+        filas = _filas_calendario(agregado, ventana, granularidad)
+
+    formato = (lambda b: b.isoformat(timespec='minutes')) if granularidad == 'hora' else (lambda b: b.date().isoformat())
+    return {
+        'granularidad': granularidad,
+        'desde': ventana.desde.isoformat(),
+        'hasta': ventana.hasta.isoformat(),
+        'buckets': [formato(bucket) for bucket, _, _ in filas],
+        'total': [float(total or 0) for _, total, _ in filas],
+        'cantidad': [int(cantidad or 0) for _, _, cantidad in filas],
+    }
+
+
+def como_puntos(serie):
+    """Serie en el formato clásico: una lista de {'fecha', 'total', 'cantidad'}"""
+    return [
+        {'fecha': bucket, 'total': total, 'cantidad': cantidad}
+        for bucket, total, cantidad in zip(serie['buckets'], serie['total'], serie['cantidad'])
+    ]
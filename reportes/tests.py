@@ -1,3 +1,103 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from clientes.metricas import recalcular
+from clientes.models import Cliente
+from compra.models import Compra
+from usuarios.models import Usuario
+
+from .series import MAX_BUCKETS, calendario, serie_ventas
+from .ventanas import Ventana
+
+
+class CalendarioTests(TestCase):
+
+    def test_semanas_empiezan_en_lunes(self):
+        buckets = calendario(Ventana(date(2025, 1, 1), date(2025, 1, 14)), 'semana')
+        self.assertEqual([b.date() for b in buckets], [date(2024, 12, 30), date(2025, 1, 6), date(2025, 1, 13)])
+
+    def test_meses_cruzan_el_anio(self):
+        buckets = calendario(Ventana(date(2024, 11, 15), date(2025, 2, 3)), 'mes')
+        self.assertEqual(
+            [b.date() for b in buckets],
+            [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)],
+        )
+
+    def test_horas_cubren_el_dia_completo(self):
+        buckets = calendario(Ventana(date(2025, 3, 1), date(2025, 3, 2)), 'hora')
+        self.assertEqual(len(buckets), 48)
+
+    def test_granularidad_invalida(self):
+        with self.assertRaises(ValueError):
+            serie_ventas(Ventana(date(2025, 1, 1), date(2025, 1, 2)), 'trimestre')
+
+
+@override_settings(STORE_TIME_ZONE='America/La_Paz')
+class SerieVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Serie')
+        utc = ZoneInfo('UTC')
+        # 02:00 UTC del 2 de enero es aún 1 de enero en La Paz (UTC-4)
+        for momento, total in [
+            (datetime(2025, 1, 2, 2, 0, tzinfo=utc), '10.00'),
+            (datetime(2025, 1, 2, 15, 0, tzinfo=utc), '5.50'),
+            (datetime(2025, 1, 5, 12, 0, tzinfo=utc), '7.00'),
+        ]:
+            compra = Compra.objects.create(cliente=cliente, total=Decimal(total))
+            Compra.objects.filter(pk=compra.pk).update(fecha=momento)
+
+    def test_dias_locales_con_huecos_en_cero(self):
+        serie = serie_ventas(Ventana(date(2025, 1, 1), date(2025, 1, 5)), 'dia')
+        self.assertEqual(serie['buckets'], ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04', '2025-01-05'])
+        self.assertEqual(serie['total'], [10.0, 5.5, 0.0, 0.0, 7.0])
+        self.assertEqual(serie['cantidad'], [1, 1, 0, 0, 1])
+
+    def test_semana_agrega_todos_los_dias(self):
+        serie = serie_ventas(Ventana(date(2025, 1, 1), date(2025, 1, 5)), 'semana')
+        self.assertEqual(serie['buckets'], ['2024-12-30'])
+        self.assertEqual(serie['total'], [22.5])
+
+
+class VentanaExcedidaTests(TestCase):
+    """Una ventana con más puntos que MAX_BUCKETS es un 400, no un 500"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('serie', 'serie@test.local', 'clave-123'))
+
+    def test_ventas_por_dia(self):
+        url = reverse('report-ventas-por-dia')
+        self.assertEqual(self.client.get(url, {'dias': 30}).status_code, 200)
+        respuesta = self.client.get(url, {'dias': MAX_BUCKETS + 10})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('máximo', respuesta.json()['detail'])
+
+
+class TopClientesTests(TestCase):
+    """dias=0 sigue siendo el día de hoy; el histórico se pide con periodo=total"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('top', 'top@test.local', 'clave-123'))
+        hoy = Cliente.objects.create(nombre='Hoy')
+        antiguo = Cliente.objects.create(nombre='Antiguo')
+        Compra.objects.create(cliente=hoy, total=Decimal('10.00'))
+        compra = Compra.objects.create(cliente=antiguo, total=Decimal('500.00'))
+        Compra.objects.filter(pk=compra.pk).update(fecha=timezone.now() - timedelta(days=400))
+        recalcular([hoy.id, antiguo.id])
+
+    def _clientes(self, **params):
+        respuesta = self.client.get(reverse('report-top-clientes'), params)
+        return [c['cliente'] for c in respuesta.json()['clientes']]
+
+    def test_dias_cero_es_hoy_y_periodo_total_el_historico(self):
+        self.assertEqual(self._clientes(dias=0), ['Hoy'])
+        self.assertEqual(self._clientes(periodo='total'), ['Antiguo', 'Hoy'])
@@ -3,6 +3,7 @@ from .views import (
     SummaryReportView,
     KPIReportView,
     VentasPorDiaView,
+    SerieVentasView,
     VentasPorCategoriaView,
     VentasPorProductoView,
     TopClientesView,
@@ -14,6 +15,7 @@ urlpatterns = [
     path('summary/', SummaryReportView.as_view(), name='report-summary'),
     path('kpis/', KPIReportView.as_view(), name='report-kpis'),
     path('series/ventas-por-dia/', VentasPorDiaView.as_view(), name='report-ventas-por-dia'),
+    path('series/ventas/', SerieVentasView.as_view(), name='report-series-ventas'),
     path('ventas/por-categoria/', VentasPorCategoriaView.as_view(), name='report-ventas-por-categoria'),
     path('ventas/por-producto/', VentasPorProductoView.as_view(), name='report-ventas-por-producto'),
     path('ventas/top-clientes/', TopClientesView.as_view(), name='report-top-clientes'),
@@ -0,0 +1,96 @@
+"""
+Ventanas de tiempo para filtrar compras por días locales de la tienda.
+
+`fecha__date__gte=...` envuelve la columna en una conversión de zona
+horaria + DATE() y la base ya no puede usar los índices sobre `fecha` ni
+`(cliente, -fecha)`. Aquí un rango de días locales se traduce a un rango
+semiabierto de timestamps, `inicio <= fecha < fin`, con los límites
+calculados en la zona horaria de la tienda (STORE_TIME_ZONE):
+
+    ventana = Ventana.ultimos_dias(30)
+    Compra.objects.filter(ventana.filtro())
+    totales_por_dia(ventana)  # [{'dia': date, 'total': ..., 'cantidad': ...}]
+
+El agrupamiento por día usa `TruncDay(tzinfo=...)` en la misma zona, de
+modo que filtros y series coinciden en qué es "un día".
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+
+
+def zona_tienda():
+    return ZoneInfo(getattr(settings, 'STORE_TIME_ZONE', None) or settings.TIME_ZONE)
+
+
+def hoy():
+    """Fecha actual en la zona de la tienda"""
+    return timezone.localdate(timezone=zona_tienda())
+
+
+def inicio_del_dia(fecha):
+    """Medianoche local de `fecha` como datetime aware"""
+    return datetime.combine(fecha, time.min, tzinfo=zona_tienda())
+
+
+def truncar_dia(campo='fecha'):
+    return TruncDay(campo, tzinfo=zona_tienda())
+
+
+def dia_local(valor):
+    """Fecha local de un valor devuelto por `truncar_dia` (o de una fecha)"""
+    if isinstance(valor, datetime):
+        return valor.astimezone(zona_tienda()).date()
+    return valor
+
+
+@dataclass(frozen=True)
+class Ventana:
+    """Días locales [desde, hasta], ambos incluidos"""
+    desde: date
+    hasta: date
+
+    @classmethod
+    def ultimos_dias(cls, dias, hasta=None):
+        """Desde hace `dias` días hasta `hasta` (hoy por defecto), inclusive"""
+        hasta = hasta or hoy()
+        return cls(hasta - timedelta(days=dias), hasta)
+
+    @property
+    def inicio(self):
+        return inicio_del_dia(self.desde)
+
+    @property
+    def fin(self):
+        # Límite exclusivo: medianoche del día siguiente a `hasta`
+        return inicio_del_dia(self.hasta + timedelta(days=1))
+
+    def filtro(self, campo='fecha'):
+        return Q(**{f'{campo}__gte': self.inicio, f'{campo}__lt': self.fin})
+
+    def dias(self):
+        """Cada fecha de la ventana, en orden"""
+        return [self.desde + timedelta(days=i) for i in range((self.hasta - self.desde).days + 1)]
+
+
+def totales_por_dia(ventana, queryset=None):
+    """
+    Total vendido y cantidad de compras por día local dentro de la ventana.
+    Solo devuelve los días con ventas, ordenados.
+    """
+    if queryset is None:
+        from compra.models import Compra
+        queryset = Compra.objects.all()
+    filas = (
+        queryset.filter(ventana.filtro())
+        .annotate(dia=truncar_dia())
+        .values('dia')
+        .annotate(total=Sum('total'), cantidad=Count('id'))
+        .order_by('dia')
+    )
+    return [{**fila, 'dia': dia_local(fila['dia'])} for fila in filas]
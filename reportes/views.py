@@ -1,15 +1,16 @@
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDate
-from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date
+
+from django.db.models import F, Sum, Count
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 
-from compra.models import Compra, CompraItem
+from compra.models import Compra
 from productos.models import Producto
-from clientes.models import Cliente
-from django.db.models import F, Value, Case, When, IntegerField
+from clientes.models import Cliente, MetricasCliente
+from .series import como_puntos, serie_ventas
+from .ventanas import Ventana, hoy
+from django.db.models import Value, Case, When, IntegerField
 from django.db.models.functions import Coalesce
 
 
@@ -40,12 +41,11 @@ class KPIReportView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get(self, request):
-		hoy = timezone.now().date()
-		hace_30 = hoy - timedelta(days=30)
+		ultimos_30 = Ventana.ultimos_dias(30)
 
 		total_ventas = Compra.objects.aggregate(total=Sum('total'))['total'] or 0
-		ventas_30d = Compra.objects.filter(fecha__date__gte=hace_30).aggregate(total=Sum('total'))['total'] or 0
-		ordenes_30d = Compra.objects.filter(fecha__date__gte=hace_30).count()
+		ventas_30d = Compra.objects.filter(ultimos_30.filtro()).aggregate(total=Sum('total'))['total'] or 0
+		ordenes_30d = Compra.objects.filter(ultimos_30.filtro()).count()
 
 		return Response({
 			'kpis': {
@@ -63,30 +63,39 @@ class VentasPorDiaView(APIView):
 
 	def get(self, request):
 		# Parámetros
-		dias = int(request.query_params.get('dias', 30))
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias)
+		try:
+			dias = int(request.query_params.get('dias', 30))
+			serie = serie_ventas(Ventana.ultimos_dias(dias))
+		except ValueError as e:
+			# Ventana con más puntos que MAX_BUCKETS o `dias` no numérico
+			return Response({'detail': str(e)}, status=400)
+		return Response({'serie': como_puntos(serie)})
 
-		qs = (
-			Compra.objects.filter(fecha__date__gte=inicio)
-			.annotate(dia=TruncDate('fecha'))
-			.values('dia')
-			.annotate(total=Sum('total'), cantidad=Count('id'))
-			.order_by('dia')
-		)
 
-		mapa = {r['dia']: r for r in qs}
-		serie = []
-		for i in range(dias + 1):
-			d = inicio + timedelta(days=i)
-			r = mapa.get(d, None)
-			serie.append({
-				'fecha': d.isoformat(),
-				'total': float((r or {}).get('total') or 0),
-				'cantidad': (r or {}).get('cantidad') or 0
-			})
+class SerieVentasView(APIView):
+	"""
+	Serie de ventas por hora, día, semana o mes, completa con ceros.
+	Devuelve arreglos paralelos: buckets, total y cantidad.
 
-		return Response({'serie': serie})
+	Parámetros:
+	- granularidad: hora | dia | semana | mes (default: dia)
+	- dias: días hacia atrás desde hoy (default: 30)
+	- desde / hasta: fechas ISO (YYYY-MM-DD); reemplazan a `dias`
+	"""
+	permission_classes = [permissions.IsAuthenticated]
+
+	def get(self, request):
+		granularidad = request.query_params.get('granularidad', 'dia')
+		try:
+			desde = request.query_params.get('desde')
+			hasta = request.query_params.get('hasta')
+			if desde:
+				ventana = Ventana(date.fromisoformat(desde), date.fromisoformat(hasta) if hasta else hoy())
+			else:
+				ventana = Ventana.ultimos_dias(int(request.query_params.get('dias', 30)))
+			return Response(serie_ventas(ventana, granularidad))
+		except ValueError as e:
+			return Response({'detail': str(e)}, status=400)
 
 
 class VentasPorCategoriaView(APIView):
@@ -94,11 +103,10 @@ class VentasPorCategoriaView(APIView):
 
 	def get(self, request):
 		dias = int(request.query_params.get('dias', 30))
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias)
+		ventana = Ventana.ultimos_dias(dias)
 
 		qs = (
-			Compra.objects.filter(fecha__date__gte=inicio)
+			Compra.objects.filter(ventana.filtro())
 			.values('items__producto__categoria__nombre')
 			.annotate(total=Sum('items__subtotal'), cantidad=Count('items'))
 			.order_by('-total')
@@ -122,11 +130,10 @@ class VentasPorProductoView(APIView):
 	def get(self, request):
 		dias = int(request.query_params.get('dias', 30))
 		limit = int(request.query_params.get('limit', 10))
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias)
+		ventana = Ventana.ultimos_dias(dias)
 
 		qs = (
-			Compra.objects.filter(fecha__date__gte=inicio)
+			Compra.objects.filter(ventana.filtro())
 			.values('items__producto__nombre', 'items__producto__sku')
 			.annotate(total=Sum('items__subtotal'), cantidad=Sum('items__cantidad'))
 			.order_by('-total')[:limit]
@@ -146,20 +153,35 @@ class VentasPorProductoView(APIView):
 
 
 class TopClientesView(APIView):
+	"""
+	Clientes con más compras.
+
+	Parámetros:
+	- dias: días hacia atrás desde hoy (default: 30; 0 = solo hoy)
+	- periodo: 'total' para el histórico completo (ignora `dias`)
+	- limit: cantidad de clientes (default: 10)
+	"""
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get(self, request):
 		dias = int(request.query_params.get('dias', 30))
 		limit = int(request.query_params.get('limit', 10))
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias)
 
-		qs = (
-			Compra.objects.filter(fecha__date__gte=inicio)
-			.values('cliente__nombre')
-			.annotate(total=Sum('total'), ordenes=Count('id'))
-			.order_by('-total')[:limit]
-		)
+		if request.query_params.get('periodo') == 'total':
+			# Histórico completo: lectura indexada de la tabla de métricas
+			qs = (
+				MetricasCliente.objects
+				.values('cliente__nombre', total=F('total_comprado'), ordenes=F('cantidad_compras'))
+				.order_by('-total_comprado')[:limit]
+			)
+		else:
+			ventana = Ventana.ultimos_dias(dias)
+			qs = (
+				Compra.objects.filter(ventana.filtro())
+				.values('cliente__nombre')
+				.annotate(total=Sum('total'), ordenes=Count('id'))
+				.order_by('-total')[:limit]
+			)
 
 		data = [
 			{
@@ -181,134 +203,12 @@ class RankingsPerformanceView(APIView):
 	permission_classes = [permissions.IsAuthenticated]
 
 	def get(self, request):
+		from .rankings import calcular_rankings
+
 		dias = int(request.query_params.get('dias', 30))
 		limit = int(request.query_params.get('limit', 10))
-		hoy = timezone.now().date()
-		inicio = hoy - timedelta(days=dias)
-
-		# Ranking de productos más vendidos
-		productos_ranking = (
-			CompraItem.objects.filter(
-				compra__fecha__date__gte=inicio
-			).values(
-				'producto__nombre',
-				'producto__sku',
-				'producto__categoria__nombre'
-			).annotate(
-				total_vendido=Sum('cantidad'),
-				ingresos_totales=Sum(F('precio_unitario') * F('cantidad')),
-				precio_promedio=Sum(F('precio_unitario') * F('cantidad')) / Sum('cantidad')
-			).order_by('-total_vendido')[:limit]
-		)
-
-		# Ranking de clientes más activos
-		clientes_ranking = (
-			Compra.objects.filter(fecha__date__gte=inicio)
-			.values('cliente__nombre', 'cliente__email')
-			.annotate(
-				total_compras=Sum('total'),
-				numero_ordenes=Count('id'),
-				promedio_compra=Sum('total') / Count('id')
-			).order_by('-total_compras')[:limit]
-		)
-
-		# Ranking de categorías más rentables
-		categorias_ranking = (
-			CompraItem.objects.filter(
-				compra__fecha__date__gte=inicio
-			).values('producto__categoria__nombre')
-			.annotate(
-				total_vendido=Sum('cantidad'),
-				ingresos_totales=Sum(F('precio_unitario') * F('cantidad')),
-				numero_productos=Count('producto', distinct=True)
-			).order_by('-ingresos_totales')[:limit]
-		)
-
-		# Métricas de rendimiento generales
-		total_ventas = Compra.objects.filter(fecha__date__gte=inicio).aggregate(
-			total=Sum('total'), count=Count('id')
-		)
-		total_productos_vendidos = CompraItem.objects.filter(
-			compra__fecha__date__gte=inicio
-		).aggregate(total=Sum('cantidad'))['total'] or 0
-
-		# Producto estrella (más vendido)
-		producto_estrella = productos_ranking.first()
-		producto_estrella_data = None
-		if producto_estrella:
-			producto_estrella_data = {
-				'nombre': producto_estrella['producto__nombre'],
-				'sku': producto_estrella['producto__sku'],
-				'categoria': producto_estrella['producto__categoria__nombre'],
-				'unidades_vendidas': producto_estrella['total_vendido'],
-				'ingresos_generados': float(producto_estrella['ingresos_totales'])
-			}
-
-		# Cliente estrella (más compras)
-		cliente_estrella = clientes_ranking.first()
-		cliente_estrella_data = None
-		if cliente_estrella:
-			cliente_estrella_data = {
-				'nombre': cliente_estrella['cliente__nombre'],
-				'email': cliente_estrella['cliente__email'],
-				'total_compras': float(cliente_estrella['total_compras']),
-				'numero_ordenes': cliente_estrella['numero_ordenes']
-			}
-
-		return Response({
-			'periodo_dias': dias,
-			'fecha_inicio': inicio.isoformat(),
-			'fecha_fin': hoy.isoformat(),
-
-			# Rankings principales
-			'productos_mas_vendidos': [
-				{
-					'ranking': i + 1,
-					'nombre': p['producto__nombre'],
-					'sku': p['producto__sku'],
-					'categoria': p['producto__categoria__nombre'],
-					'unidades_vendidas': p['total_vendido'],
-					'ingresos_totales': float(p['ingresos_totales']),
-					'precio_promedio': float(p['precio_promedio'])
-				}
-				for i, p in enumerate(productos_ranking)
-			],
-
-			'clientes_mas_activos': [
-				{
-					'ranking': i + 1,
-					'nombre': c['cliente__nombre'],
-					'email': c['cliente__email'],
-					'total_compras': float(c['total_compras']),
-					'numero_ordenes': c['numero_ordenes'],
-					'promedio_por_orden': float(c['promedio_compra'])
-				}
-				for i, c in enumerate(clientes_ranking)
-			],
-
-			'categorias_mas_rentables': [
-				{
-					'ranking': i + 1,
-					'nombre': c['producto__categoria__nombre'],
-					'unidades_vendidas': c['total_vendido'],
-					'ingresos_totales': float(c['ingresos_totales']),
-					'productos_en_categoria': c['numero_productos']
-				}
-				for i, c in enumerate(categorias_ranking)
-			],
-
-			# Métricas destacadas
-			'metricas_generales': {
-				'total_ventas': float(total_ventas['total'] or 0),
-				'total_ordenes': total_ventas['count'] or 0,
-				'total_productos_vendidos': total_productos_vendidos,
-				'promedio_por_orden': float(total_ventas['total'] or 0) / max(total_ventas['count'] or 1, 1)
-			},
-
-			# Estrellas del período
-			'producto_estrella': producto_estrella_data,
-			'cliente_estrella': cliente_estrella_data
-		})
+		# Una sola consulta con funciones de ventana (ver reportes/rankings.py)
+		return Response(calcular_rankings(dias=dias, limit=limit).como_dict())
 
 
 class HealthReportView(APIView):
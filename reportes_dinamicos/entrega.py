@@ -0,0 +1,112 @@
+"""
+Entrega de los archivos de reportes dinámicos sin base64 dentro del JSON.
+
+El data URI en `archivo` agranda el PDF un 33%, obliga a tener varias
+copias en memoria y a codificar/parsear megabytes de JSON en ambos lados.
+Modos (parámetro `entrega` o header Accept):
+
+- base64 (por defecto): el data URI de siempre en `archivo`; los clientes
+  existentes no cambian.
+- url: el archivo se guarda en el storage de medios y la respuesta trae
+  `archivo_url`, un enlace firmado que vence a los REPORTES_URL_TTL
+  segundos (lo sirve DescargaReporteView).
+- binario (o `Accept: <tipo del formato>`, p. ej. application/pdf): la
+  vista responde el archivo directamente con su Content-Type.
+
+Los archivos vencidos se borran con `manage.py limpiar_reportes_dinamicos`.
+"""
+import base64
+import uuid
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+DIRECTORIO = 'reportes_dinamicos'
+SAL = 'reportes_dinamicos.descarga'
+MODOS = ('base64', 'url', 'binario')
+
+# formato -> (Content-Type, extensión)
+TIPOS = {
+    'pdf': ('application/pdf', 'pdf'),
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+}
+
+
+def _ttl():
+    return getattr(settings, 'REPORTES_URL_TTL', 600)
+
+
+def modo_entrega(request, formato, pedido=None):
+    """'base64', 'url' o 'binario' según el parámetro `entrega` y el header Accept"""
+    if pedido in MODOS:
+        return pedido
+    aceptados = {tipo.split(';')[0].strip() for tipo in request.headers.get('Accept', '').split(',')}
+    if TIPOS[formato][0] in aceptados:
+        return 'binario'
+    return 'base64'
+
+
+def nombre_descarga(formato):
+    return f"reporte_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{TIPOS[formato][1]}"
+
+
+def respuesta_binaria(contenido, formato):
+    response = HttpResponse(contenido, content_type=TIPOS[formato][0])
+    response['Content-Disposition'] = f'attachment; filename="{nombre_descarga(formato)}"'
+    return response
+
+
+def data_uri(contenido, formato):
+    return f"data:{TIPOS[formato][0]};base64,{base64.b64encode(contenido).decode()}"
+
+
+def guardar(contenido, formato):
+    """Guarda el archivo con un nombre no adivinable; devuelve el nombre en el storage"""
+    nombre = nombre_descarga(formato)
+    base, extension = nombre.rsplit('.', 1)
+    return default_storage.save(f'{DIRECTORIO}/{base}_{uuid.uuid4().hex}.{extension}', ContentFile(contenido))
+
+
+def enlace(request, nombre):
+    """URL absoluta y firmada para descargar `nombre`, con su vencimiento"""
+    firma = signing.TimestampSigner(salt=SAL).sign(nombre)
+    ruta = f"{reverse('reportes-dinamicos-descarga')}?{urlencode({'archivo': firma})}"
+    return {
+        'archivo_url': request.build_absolute_uri(ruta),
+        'archivo_expira': (timezone.now() + timedelta(seconds=_ttl())).isoformat(),
+    }
+
+
+def abrir(firma):
+    """
+    Nombre en el storage del archivo firmado. Lanza signing.SignatureExpired
+    si el enlace venció y signing.BadSignature si no es válido.
+    """
+    nombre = signing.TimestampSigner(salt=SAL).unsign(firma, max_age=_ttl())
+    if not nombre.startswith(f'{DIRECTORIO}/') or '..' in nombre:
+        raise signing.BadSignature('Archivo fuera del directorio de reportes')
+    return nombre
+
+
+def limpiar(antiguedad=None):
+    """Borra los archivos con más de `antiguedad` segundos (por defecto el TTL); devuelve cuántos"""
+    limite = timezone.now() - timedelta(seconds=_ttl() if antiguedad is None else antiguedad)
+    try:
+        _, archivos = default_storage.listdir(DIRECTORIO)
+    except FileNotFoundError:
+        return 0
+    borrados = 0
+    for archivo in archivos:
+        nombre = f'{DIRECTORIO}/{archivo}'
+        if default_storage.get_modified_time(nombre) < limite:
+            default_storage.delete(nombre)
+            borrados += 1
+    return borrados
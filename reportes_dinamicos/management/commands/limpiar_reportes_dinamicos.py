@@ -0,0 +1,25 @@
+"""
+Borra los archivos de reportes dinámicos cuyos enlaces de descarga ya
+vencieron (reportes_dinamicos/entrega.py). Pensado para cron.
+
+Uso:
+    python manage.py limpiar_reportes_dinamicos
+    python manage.py limpiar_reportes_dinamicos --antiguedad 3600
+"""
+from django.core.management.base import BaseCommand
+
+from reportes_dinamicos.entrega import limpiar
+
+
+class Command(BaseCommand):
+    help = 'Elimina los archivos de reportes dinámicos con enlaces vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--antiguedad', type=int, default=None,
+            help='Segundos de antigüedad mínima (default: REPORTES_URL_TTL)',
+        )
+
+    def handle(self, *args, **options):
+        borrados = limpiar(options['antiguedad'])
+        self.stdout.write(self.style.SUCCESS(f'🧹 {borrados} archivos de reportes eliminados'))
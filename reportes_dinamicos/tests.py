@@ -1,3 +1,101 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
 
-# Create your tests here
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from usuarios.models import Usuario
+
+from .ejecutor import ReporteCompuesto
+
+MEDIA_TEMPORAL = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORAL, PDF_RENDER_WORKERS=0)
+class EntregaReportesTests(TestCase):
+    """El archivo del reporte se entrega como enlace firmado, binario o data URI"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_TEMPORAL, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('entrega_admin', 'entrega@admin.local', 'clave-123', is_staff=True)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.ruta = reverse('reportes-dinamicos-avanzados')
+
+    def _reporte(self, **extra):
+        cuerpo = {'prompt': 'reporte ejecutivo del mes', 'formato': 'pdf', 'incluir_insights': False}
+        return self.api.post(self.ruta, {**cuerpo, **extra.pop('cuerpo', {})}, format='json', **extra)
+
+    def test_enlace_firmado(self):
+        respuesta = self._reporte(cuerpo={'entrega': 'url'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('archivo', respuesta.data)
+
+        descarga = APIClient().get(respuesta.data['archivo_url'])
+        self.assertEqual(descarga.status_code, 200)
+        self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+
+        invalida = APIClient().get(reverse('reportes-dinamicos-descarga'), {'archivo': 'reportes_dinamicos/otro.pdf:firma'})
+        self.assertEqual(invalida.status_code, 404)
+
+    def test_enlace_vencido(self):
+        url = self._reporte(cuerpo={'entrega': 'url'}).data['archivo_url']
+        with override_settings(REPORTES_URL_TTL=-1):
+            self.assertEqual(APIClient().get(url).status_code, 410)
+
+    def test_binario_por_accept_y_base64(self):
+        binario = self._reporte(HTTP_ACCEPT='application/pdf')
+        self.assertEqual(binario['Content-Type'], 'application/pdf')
+        self.assertTrue(binario.content.startswith(b'%PDF'))
+
+        compatible = self._reporte(cuerpo={'entrega': 'base64'})
+        self.assertTrue(compatible.data['archivo'].startswith('data:application/pdf;base64,'))
+
+    def test_por_defecto_data_uri(self):
+        respuesta = self._reporte()
+        self.assertTrue(respuesta.data['archivo'].startswith('data:application/pdf;base64,'))
+        self.assertNotIn('archivo_url', respuesta.data)
+
+
+@override_settings(REPORTES_SECCIONES_WORKERS=4)
+class ReporteCompuestoTests(SimpleTestCase):
+    """Las secciones independientes corren en paralelo; las entradas compartidas, una vez"""
+
+    def test_paralelo_con_dependencias_y_memo(self):
+        cargas = []
+
+        def modelo():
+            cargas.append(1)
+            time.sleep(0.1)
+            return 10
+
+        def seccion(valor):
+            def correr(reporte):
+                time.sleep(0.2)
+                return reporte.memo('modelo', modelo) + valor
+            return correr
+
+        reporte = ReporteCompuesto()
+        reporte.seccion('a', seccion(1))
+        reporte.seccion('b', seccion(2))
+        reporte.seccion('suma', lambda r: r['a'] + r['b'], depende=('a', 'b'))
+
+        inicio = time.perf_counter()
+        resultados = reporte.ejecutar()
+        self.assertLess(time.perf_counter() - inicio, 0.45)
+        self.assertEqual(resultados['suma'], 23)
+        self.assertEqual(len(cargas), 1)
+        self.assertEqual(set(reporte.tiempos_ms), {'a', 'b', 'suma'})
+
+    def test_dependencia_no_declarada(self):
+        with self.assertRaises(ValueError):
+            ReporteCompuesto().seccion('insights', lambda r: None, depende=('ventas',))
@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('avanzados/', views.ReportesDinamicosAvanzadosView.as_view(), name='reportes-dinamicos-avanzados'),
+    path('descargas/', views.DescargaReporteView.as_view(), name='reportes-dinamicos-descarga'),
 ]
@@ -13,20 +13,24 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
 from rest_framework.decorators import api_view
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 from django.utils import timezone
-from django.db.models import Sum, Count, F, Q, Avg, Max, Min
-from datetime import datetime, timedelta
+from django.db.models import Sum, Count, Q, Avg, Max, Min
+from datetime import datetime
 import json
 
 # Importar módulos existentes
+from core.render_pdf import RenderError
 from ia.interprete import InterpretadorPrompt, GeneradorConsultas
 from ia.generador_reportes import GeneradorReportes
 from ia.modelo_ml import ModeloPrediccionVentas
-from reportes.views import RankingsPerformanceView
+from reportes.rankings import calcular_rankings
+from reportes.ventanas import Ventana, hoy, totales_por_dia
 from compra.models import Compra, CompraItem
 from productos.models import Producto
 from clientes.models import Cliente
+from .ejecutor import ReporteCompuesto
+from .entrega import data_uri, enlace, guardar, modo_entrega, respuesta_binaria
 
 
 class ReportesDinamicosAvanzadosView(APIView):
@@ -42,6 +46,11 @@ class ReportesDinamicosAvanzadosView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_content_negotiation(self, request, force=False):
+        # Accept: application/pdf (u otro tipo de archivo) pide la entrega binaria
+        # (ver entrega.py); sin renderer que coincida se responde JSON en lugar de 406
+        return super().perform_content_negotiation(request, force=True)
+
     @extend_schema(
         summary='Generar reporte dinámico avanzado con IA y ML',
         description='''
@@ -92,9 +101,9 @@ class ReportesDinamicosAvanzadosView(APIView):
                 location=OpenApiParameter.QUERY,
                 description='Consulta en lenguaje natural (requerido)',
                 examples=[
-                    "Predice las ventas para el próximo mes y compáralas con el mes pasado en PDF",
-                    "Análisis predictivo de productos estrella para los próximos 30 días",
-                    "Reporte ejecutivo: rendimiento vs predicciones del trimestre"
+                    OpenApiExample('Predicción comparativa', value="Predice las ventas para el próximo mes y compáralas con el mes pasado en PDF"),
+                    OpenApiExample('Productos estrella', value="Análisis predictivo de productos estrella para los próximos 30 días"),
+                    OpenApiExample('Reporte ejecutivo', value="Reporte ejecutivo: rendimiento vs predicciones del trimestre"),
                 ]
             ),
             OpenApiParameter(
@@ -118,6 +127,18 @@ class ReportesDinamicosAvanzadosView(APIView):
                 location=OpenApiParameter.QUERY,
                 description='Incluir análisis e insights automáticos',
                 default=True
+            ),
+            OpenApiParameter(
+                name='entrega',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description=(
+                    'Cómo se entrega el archivo: base64 (data URI en `archivo`), '
+                    'url (enlace firmado de corta duración en `archivo_url`, recomendado para archivos grandes) '
+                    'o binario (el archivo en la respuesta; también con Accept: application/pdf, etc.)'
+                ),
+                enum=['base64', 'url', 'binario'],
+                default='base64'
             )
         ],
         responses={
@@ -138,9 +159,9 @@ class ReportesDinamicosAvanzadosView(APIView):
                                 'Aumentar inventario de productos de alta predicción',
                                 'Implementar promociones en categorías con baja proyección'
                             ],
-                            'datos': {...}
+                            'datos': {}
                         },
-                        'archivo': 'data:application/pdf;base64,...'
+                        'archivo': 'data:application/pdf;base64,JVBERi0xLjQK...'
                     }
                 ]
             },
@@ -166,11 +187,13 @@ class ReportesDinamicosAvanzadosView(APIView):
                 formato = request.query_params.get('formato', 'pantalla').lower()
                 dias_prediccion = int(request.query_params.get('dias_prediccion', 30))
                 incluir_insights = request.query_params.get('incluir_insights', 'true').lower() == 'true'
+                entrega = request.query_params.get('entrega')
             else:  # POST
                 prompt = request.data.get('prompt', '').strip()
                 formato = request.data.get('formato', 'pantalla').lower()
                 dias_prediccion = int(request.data.get('dias_prediccion', 30))
                 incluir_insights = request.data.get('incluir_insights', True)
+                entrega = request.data.get('entrega')
 
             if not prompt:
                 return Response(
@@ -220,6 +243,9 @@ class ReportesDinamicosAvanzadosView(APIView):
             # 5. Generar reporte en formato solicitado
             generador = GeneradorReportesAvanzado(datos['datos'], interpretacion, insights_extra)
             archivo = generador.generar(formato)
+            modo = modo_entrega(request, formato, entrega) if archivo is not None else None
+            if modo == 'binario':
+                return respuesta_binaria(archivo.getvalue(), formato)
 
             # 6. Preparar respuesta
             response_data = {
@@ -237,18 +263,27 @@ class ReportesDinamicosAvanzadosView(APIView):
                 }
             }
 
+            # Tiempo de cada sección de los reportes compuestos (ejecutor.py)
+            if datos.get('secciones_ms'):
+                response_data['reporte']['secciones_ms'] = datos['secciones_ms']
+
             # Agregar insights si se generaron
             if insights_extra:
                 response_data['reporte'].update(insights_extra)
 
-            # Agregar archivo si no es pantalla
-            if formato != 'pantalla':
-                response_data['archivo'] = archivo
-            else:
+            # Agregar archivo si no es pantalla: data URI o, si se pide, enlace firmado
+            if formato == 'pantalla':
                 response_data['datos'] = datos['datos']
+            elif modo == 'url':
+                response_data.update(enlace(request, guardar(archivo.getvalue(), formato)))
+            else:
+                response_data['archivo'] = data_uri(archivo.getvalue(), formato) if archivo is not None else None
 
             return Response(response_data)
 
+        except RenderError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response(
                 {'error': f'Error interno: {str(e)}'},
@@ -295,7 +330,7 @@ class ReportesDinamicosAvanzadosView(APIView):
                 'predicciones': predicciones_result['predicciones'],
                 'modelo': 'RandomForestRegressor',
                 'periodo_prediccion': f'Próximos {dias_prediccion} días',
-                'fecha_base': timezone.now().date().isoformat()
+                'fecha_base': hoy().isoformat()
             }
 
             return {'success': True, 'datos': datos}
@@ -303,31 +338,33 @@ class ReportesDinamicosAvanzadosView(APIView):
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    @staticmethod
+    def _predicciones(reporte, dias_prediccion):
+        """Sección de predicciones: el modelo se carga una vez por reporte"""
+        return reporte.memo('modelo', ModeloPrediccionVentas).predecir(dias_futuros=dias_prediccion)
+
     def _generar_reporte_comparativo(self, dias_prediccion, interpretacion):
         """Genera comparación entre datos históricos y predicciones"""
         try:
-            # Obtener datos históricos (últimos 30 días)
-            fecha_inicio = timezone.now() - timedelta(days=30)
-            ventas_historicas = (
-                Compra.objects.filter(fecha__date__gte=fecha_inicio)
-                .values('fecha__date')
-                .annotate(total=F('total'))
-                .order_by('fecha__date')
-            )
-
-            # Obtener predicciones
-            modelo = ModeloPrediccionVentas()
-            predicciones_result = modelo.predecir(dias_futuros=dias_prediccion)
+            # Histórico (últimos 30 días) y predicciones son independientes: corren en paralelo
+            reporte = ReporteCompuesto()
+            reporte.seccion('historico', lambda r: [
+                {'fecha': fila['dia'].isoformat(), 'total': float(fila['total'] or 0), 'cantidad': fila['cantidad']}
+                for fila in totales_por_dia(Ventana.ultimos_dias(30))
+            ])
+            reporte.seccion('predicciones', lambda r: self._predicciones(r, dias_prediccion))
+            reporte.ejecutar()
+            predicciones_result = reporte['predicciones']
 
             datos = {
                 'tipo': 'comparacion_historico_prediccion',
-                'historico': list(ventas_historicas),
+                'historico': reporte['historico'],
                 'predicciones': predicciones_result.get('predicciones', []) if predicciones_result.get('success') else [],
                 'periodo_comparacion': '30 días históricos vs predicciones',
                 'dias_prediccion': dias_prediccion
             }
 
-            return {'success': True, 'datos': datos}
+            return {'success': True, 'datos': datos, 'secciones_ms': reporte.tiempos_ms}
 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -336,30 +373,26 @@ class ReportesDinamicosAvanzadosView(APIView):
         """Analiza rendimiento de productos/clientes usando predicciones"""
         try:
             # Obtener rankings de rendimiento
-            rankings_view = RankingsPerformanceView()
-            rankings_data = rankings_view.get(None).data
-
-            # Analizar con ML
-            modelo = ModeloPrediccionVentas()
-
+            reporte = ReporteCompuesto()
+            reporte.seccion('rankings', lambda r: calcular_rankings().como_dict())
             # Agregar análisis predictivo a los rankings
-            productos_analisis = []
-            for producto in rankings_data.get('productos_mas_vendidos', []):
+            reporte.seccion('productos', lambda r: [
                 # Aquí se podría agregar lógica más compleja
-                productos_analisis.append({
-                    **producto,
-                    'potencial_crecimiento': 'Alto' if producto['ingresos_totales'] > 1000 else 'Medio'
-                })
+                {**producto, 'potencial_crecimiento': 'Alto' if producto['ingresos_totales'] > 1000 else 'Medio'}
+                for producto in r['rankings'].get('productos_mas_vendidos', [])
+            ], depende=('rankings',))
+            reporte.ejecutar()
+            rankings_data = reporte['rankings']
 
             datos = {
                 'tipo': 'analisis_rendimiento_ml',
-                'productos_analisis': productos_analisis,
+                'productos_analisis': reporte['productos'],
                 'clientes_analisis': rankings_data.get('clientes_mas_activos', []),
                 'categorias_analisis': rankings_data.get('categorias_mas_rentables', []),
                 'modelo_usado': 'RandomForestRegressor'
             }
 
-            return {'success': True, 'datos': datos}
+            return {'success': True, 'datos': datos, 'secciones_ms': reporte.tiempos_ms}
 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -367,22 +400,20 @@ class ReportesDinamicosAvanzadosView(APIView):
     def _generar_reporte_ejecutivo_ml(self, dias_prediccion, interpretacion):
         """Genera reporte ejecutivo con insights basados en ML"""
         try:
-            # Obtener métricas generales
-            hoy = timezone.now().date()
-            mes_pasado = hoy - timedelta(days=30)
-
-            ventas_mes_actual = Compra.objects.filter(fecha__date__gte=mes_pasado).aggregate(
+            # Métricas del mes y predicciones en paralelo; los insights las combinan
+            reporte = ReporteCompuesto()
+            reporte.seccion('ventas_mes', lambda r: Compra.objects.filter(Ventana.ultimos_dias(30).filtro()).aggregate(
                 total=Sum('total'), count=Count('id')
+            ))
+            reporte.seccion('predicciones', lambda r: self._predicciones(r, dias_prediccion))
+            reporte.seccion(
+                'insights',
+                lambda r: self._calcular_insights_ejecutivos(r['ventas_mes'], r['predicciones'], dias_prediccion),
+                depende=('ventas_mes', 'predicciones'),
             )
-
-            # Obtener predicciones
-            modelo = ModeloPrediccionVentas()
-            predicciones_result = modelo.predecir(dias_futuros=dias_prediccion)
-
-            # Calcular insights
-            insights = self._calcular_insights_ejecutivos(
-                ventas_mes_actual, predicciones_result, dias_prediccion
-            )
+            reporte.ejecutar()
+            ventas_mes_actual = reporte['ventas_mes']
+            predicciones_result = reporte['predicciones']
 
             datos = {
                 'tipo': 'reporte_ejecutivo_ml',
@@ -392,10 +423,10 @@ class ReportesDinamicosAvanzadosView(APIView):
                     'ticket_promedio': float(ventas_mes_actual['total'] or 0) / max(ventas_mes_actual['count'] or 1, 1)
                 },
                 'predicciones': predicciones_result.get('predicciones', []) if predicciones_result.get('success') else [],
-                'insights': insights
+                'insights': reporte['insights']
             }
 
-            return {'success': True, 'datos': datos}
+            return {'success': True, 'datos': datos, 'secciones_ms': reporte.tiempos_ms}
 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -404,7 +435,8 @@ class ReportesDinamicosAvanzadosView(APIView):
         """Calcula insights ejecutivos basados en datos y predicciones"""
         insights = []
 
-        total_ventas = ventas_actuales['total'] or 0
+        # Sum() devuelve Decimal y las predicciones son float
+        total_ventas = float(ventas_actuales['total'] or 0)
         num_ordenes = ventas_actuales['count'] or 0
 
         # Insight 1: Tendencia general
@@ -478,12 +510,52 @@ class ReportesDinamicosAvanzadosView(APIView):
         }
 
 
+class DescargaReporteView(APIView):
+    """
+    Descarga de un reporte guardado mediante el enlace firmado que devuelve
+    ReportesDinamicosAvanzadosView (entrega=url). La firma es la credencial:
+    vence a los REPORTES_URL_TTL segundos.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        summary='Descargar un reporte dinámico generado',
+        parameters=[OpenApiParameter(name='archivo', type=str, location=OpenApiParameter.QUERY, required=True)],
+        responses={200: {'description': 'Archivo del reporte'}, 404: {'description': 'Enlace inválido'}, 410: {'description': 'Enlace vencido'}},
+        tags=['Reportes Dinámicos Avanzados']
+    )
+    def get(self, request):
+        from django.core import signing
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse
+        from .entrega import abrir
+
+        try:
+            nombre = abrir(request.query_params.get('archivo', ''))
+        except signing.SignatureExpired:
+            return Response({'detail': 'El enlace de descarga venció'}, status=status.HTTP_410_GONE)
+        except signing.BadSignature:
+            return Response({'detail': 'Enlace de descarga inválido'}, status=status.HTTP_404_NOT_FOUND)
+
+        if not default_storage.exists(nombre):
+            return Response({'detail': 'El enlace de descarga venció'}, status=status.HTTP_410_GONE)
+        base, extension = nombre.rsplit('/', 1)[-1].rsplit('.', 1)
+        return FileResponse(
+            default_storage.open(nombre, 'rb'),
+            as_attachment=True,
+            # reporte_<fecha>_<uuid>.<ext> -> reporte_<fecha>.<ext>
+            filename=f"{base.rsplit('_', 1)[0]}.{extension}",
+        )
+
+
 class GeneradorReportesAvanzado(GeneradorReportes):
     """Generador de reportes avanzado con insights de ML"""
 
     def __init__(self, datos_consulta, interpretacion, insights_extra=None):
-        super().__init__(datos_consulta, interpretacion)
+        # El constructor base llama a _generar_titulo, que lee insights_extra
         self.insights_extra = insights_extra or {}
+        super().__init__(datos_consulta, interpretacion)
 
     def _generar_titulo(self):
         """Genera título más inteligente para reportes avanzados"""
@@ -498,8 +570,19 @@ class GeneradorReportesAvanzado(GeneradorReportes):
 
         return base_titulo
 
-    def generar_pdf(self):
-        """Genera PDF con insights adicionales"""
+    def _args_pdf(self):
+        return (self.insights_extra,)
+
+    def dibujar_pdf(self):
+        """Bytes del PDF con insights, dibujados en este proceso"""
+        from io import BytesIO
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
 
@@ -559,10 +642,7 @@ class GeneradorReportesAvanzado(GeneradorReportes):
         elements.extend(self._generar_contenido_pdf())
 
         doc.build(elements)
-
-        buffer.seek(0)
-        import base64
-        return f"data:application/pdf;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+        return buffer.getvalue()
 
     def _generar_contenido_pdf(self):
         """Genera contenido PDF estándar (similar al padre)"""
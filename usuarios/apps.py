@@ -5,3 +5,9 @@ class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
     verbose_name = 'Usuarios'
+
+    def ready(self):
+        # Invalidación de la caché de autenticación
+        from . import signals  # noqa: F401
+        # Registra los esquemas OpenAPI de los autenticadores
+        from . import schema  # noqa: F401
@@ -0,0 +1,210 @@
+"""
+Autenticación de la API con resolución de usuario cacheada.
+
+`TokenAuthentication` de DRF consulta authtoken_token JOIN usuarios en cada
+request. Aquí la resolución token -> usuario se guarda en un LRU acotado
+en memoria del proceso y, opcionalmente, en una caché compartida (Redis)
+para que todos los workers se beneficien del mismo acierto.
+
+La caché guarda dos tipos de entrada: token -> id de usuario y id ->
+campos del usuario. Se invalidan por señales al borrar un token o al
+guardar o borrar un usuario (ver usuarios/signals.py). En otros procesos la entrada
+local sobrevive como máximo AUTH_CACHE_TTL segundos.
+
+`CachedJWTAuthentication` valida JWT de simplejwt sin tocar la base (la
+firma es HMAC) y resuelve el usuario con la misma caché, indexada por id.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt import exceptions as jwt_exceptions
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+class CacheLRU:
+    """LRU con expiración por entrada, seguro entre hilos"""
+
+    def __init__(self, max_entradas, ttl):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+_cache_local = None
+_cache_local_lock = threading.Lock()
+
+
+def cache_local():
+    global _cache_local
+    if _cache_local is None:
+        with _cache_local_lock:
+            if _cache_local is None:
+                _cache_local = CacheLRU(
+                    getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', 10000),
+                    getattr(settings, 'AUTH_CACHE_TTL', 60),
+                )
+    return _cache_local
+
+
+def cache_compartida():
+    """Caché de Django configurada en AUTH_CACHE_ALIAS, o None"""
+    alias = getattr(settings, 'AUTH_CACHE_ALIAS', '')
+    if not alias:
+        return None
+    from django.core.cache import caches
+    return caches[alias]
+
+
+def clave_token(key):
+    # El token nunca se usa como clave en claro fuera del proceso
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def clave_usuario(user_id):
+    return f'auth:usuario:{user_id}'
+
+
+# Nunca se copian a la caché (compartida entre workers, p. ej. Redis)
+CAMPOS_EXCLUIDOS = {'password'}
+
+
+def _serializar_usuario(usuario):
+    # El hash queda diferido: si algo lo pide, se lee de la base
+    campos = [f for f in usuario._meta.concrete_fields if f.attname not in CAMPOS_EXCLUIDOS]
+    return tuple(f.attname for f in campos), tuple(getattr(usuario, f.attname) for f in campos)
+
+
+def _reconstruir_usuario(datos):
+    # Una instancia nueva por request: nada de estado compartido entre hilos
+    nombres, valores = datos
+    return get_user_model().from_db('default', nombres, valores)
+
+
+def _leer(clave):
+    datos = cache_local().obtener(clave)
+    if datos is not None:
+        return datos
+    compartida = cache_compartida()
+    if compartida is not None:
+        datos = compartida.get(clave)
+        if datos is not None:
+            cache_local().guardar(clave, datos)
+    return datos
+
+
+def _escribir(clave, datos):
+    cache_local().guardar(clave, datos)
+    compartida = cache_compartida()
+    if compartida is not None:
+        compartida.set(clave, datos, getattr(settings, 'AUTH_CACHE_SHARED_TTL', 300))
+
+
+def invalidar_token(key):
+    clave = clave_token(key)
+    cache_local().eliminar(clave)
+    compartida = cache_compartida()
+    if compartida is not None:
+        compartida.delete(clave)
+
+
+def invalidar_usuario(user_id):
+    """
+    Elimina el usuario de ambas cachés. Los tokens cacheados solo guardan el
+    id, así que quedan resolviendo al usuario actualizado sin invalidarlos.
+    """
+    clave = clave_usuario(user_id)
+    cache_local().eliminar(clave)
+    compartida = cache_compartida()
+    if compartida is not None:
+        compartida.delete(clave)
+
+
+def usuario_por_id(user_id):
+    """Usuario desde la caché o, si no está, desde la base (None si no existe)"""
+    clave = clave_usuario(user_id)
+    datos = _leer(clave)
+    if datos is not None:
+        return _reconstruir_usuario(datos)
+    usuario = get_user_model()._default_manager.filter(pk=user_id).first()
+    if usuario is not None:
+        _escribir(clave, _serializar_usuario(usuario))
+    return usuario
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Igual que TokenAuthentication (header `Authorization: Token <key>`),
+    pero sin consultar la base cuando el token ya fue resuelto.
+    """
+
+    def authenticate_credentials(self, key):
+        clave = clave_token(key)
+        user_id = _leer(clave)
+        if user_id is None:
+            usuario, token = super().authenticate_credentials(key)
+            _escribir(clave, usuario.pk)
+            _escribir(clave_usuario(usuario.pk), _serializar_usuario(usuario))
+            return usuario, token
+
+        usuario = usuario_por_id(user_id)
+        if usuario is None or not usuario.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return usuario, self.get_model()(key=key, user_id=user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT sin estado (header `Authorization: Bearer <access>`). La firma y la
+    expiración se validan en memoria; el usuario sale de la caché.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise jwt_exceptions.InvalidToken('El token no contiene identificación de usuario')
+
+        usuario = usuario_por_id(user_id)
+        if usuario is None:
+            raise exceptions.AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+        if not usuario.is_active:
+            raise exceptions.AuthenticationFailed('El usuario está inactivo', code='user_inactive')
+        return usuario
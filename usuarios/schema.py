@@ -0,0 +1,11 @@
+"""
+Extensiones de drf-spectacular para los autenticadores de usuarios/.
+
+El esquema de simplejwt solo resuelve la clase exacta JWTAuthentication:
+sin esto la documentación no mostraría el header `Bearer` de la API.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = 'usuarios.authentication.CachedJWTAuthentication'
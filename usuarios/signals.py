@@ -0,0 +1,29 @@
+"""
+Señales que mantienen coherente la caché de autenticación.
+
+Se invalida de inmediato y otra vez al confirmar la transacción: si un
+request concurrente vuelve a cachear el valor viejo antes del commit, la
+segunda invalidación lo descarta.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidar_token, invalidar_usuario
+
+
+def _invalidar(funcion, *args):
+    funcion(*args)
+    transaction.on_commit(lambda: funcion(*args))
+
+
+@receiver(post_delete, sender='authtoken.Token')
+def invalidar_token_borrado(sender, instance, **kwargs):
+    _invalidar(invalidar_token, instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidar_usuario_modificado(sender, instance, **kwargs):
+    _invalidar(invalidar_usuario, instance.pk)
@@ -1,3 +1,86 @@
+import base64
+
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from monitoreo.presupuestos import PresupuestoConsultasMixin
+
+from .authentication import _leer, cache_local, clave_usuario
+from .models import Usuario
+
+
+class AutenticacionCacheadaTests(PresupuestoConsultasMixin, TestCase):
+    """La caché de autenticación no debe sobrevivir a cambios del usuario o del token"""
+
+    def setUp(self):
+        cache_local().limpiar()
+        self.usuario = Usuario.objects.create_user('auth_cache', 'auth@cache.local', 'clave-123')
+        self.token = Token.objects.create(user=self.usuario)
+        self.ruta = reverse('usuario-me')
+
+    def _cliente(self, header):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=header)
+        return cliente
+
+    def _jwt(self):
+        respuesta = APIClient().post(
+            reverse('jwt-obtain'), {'username': 'auth_cache', 'password': 'clave-123'}, format='json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data['access']
+
+    def test_token_cacheado_no_consulta_la_base(self):
+        cliente = self._cliente(f'Token {self.token.key}')
+        self.assertEqual(cliente.get(self.ruta).status_code, 200)
+        respuesta, consultas = self.medir_consultas(cliente.get, self.ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(consultas, [])
+
+    def test_jwt_no_consulta_la_base(self):
+        cliente = self._cliente(f'Bearer {self._jwt()}')
+        self.assertEqual(cliente.get(self.ruta).status_code, 200)
+        respuesta, consultas = self.medir_consultas(cliente.get, self.ruta)
+        self.assertEqual(respuesta.data['username'], 'auth_cache')
+        self.assertEqual(consultas, [])
+
+    def test_token_borrado_deja_de_autenticar(self):
+        cliente = self._cliente(f'Token {self.token.key}')
+        self.assertEqual(cliente.get(self.ruta).status_code, 200)
+        self.token.delete()
+        self.assertEqual(cliente.get(self.ruta).status_code, 401)
+
+    def test_usuario_desactivado_deja_de_autenticar(self):
+        por_token = self._cliente(f'Token {self.token.key}')
+        por_jwt = self._cliente(f'Bearer {self._jwt()}')
+        self.assertEqual(por_token.get(self.ruta).status_code, 200)
+        self.assertEqual(por_jwt.get(self.ruta).status_code, 200)
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(por_token.get(self.ruta).status_code, 401)
+        self.assertEqual(por_jwt.get(self.ruta).status_code, 401)
+
+    def test_cambios_del_usuario_se_reflejan(self):
+        cliente = self._cliente(f'Token {self.token.key}')
+        self.assertEqual(cliente.get(self.ruta).data['telefono'], '')
+        Usuario.objects.filter(pk=self.usuario.pk).update(telefono='111')
+        # update() no emite señales: la entrada sigue vigente hasta su TTL
+        self.assertEqual(cliente.get(self.ruta).data['telefono'], '')
+        self.usuario.telefono = '222'
+        self.usuario.save()
+        self.assertEqual(cliente.get(self.ruta).data['telefono'], '222')
+
+    def test_la_cache_no_guarda_el_hash_de_la_clave(self):
+        cliente = self._cliente(f'Token {self.token.key}')
+        self.assertEqual(cliente.get(self.ruta).status_code, 200)
+        nombres, valores = _leer(clave_usuario(self.usuario.pk))
+        self.assertNotIn('password', nombres)
+        self.assertNotIn(self.usuario.password, valores)
 
-# Create your tests here.
+    def test_basic_auth_sigue_disponible(self):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'auth_cache:clave-123').decode())
+        self.assertEqual(cliente.get(self.ruta).status_code, 200)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UsuarioViewSet, RegisterView, EmailOrUsernameTokenView
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from .views import UsuarioViewSet, RegisterView, EmailOrUsernameTokenView, EmailOrUsernameJWTView
 
 router = DefaultRouter()
 router.register(r'', UsuarioViewSet, basename='usuario')
@@ -9,5 +10,8 @@ urlpatterns = [
 	# Endpoints específicos primero para evitar colisión con lookup del router
 	path('register/', RegisterView.as_view(), name='register'),
 	path('token/', EmailOrUsernameTokenView.as_view(), name='token-obtain'),
+	path('jwt/', EmailOrUsernameJWTView.as_view(), name='jwt-obtain'),
+	path('jwt/refresh/', TokenRefreshView.as_view(), name='jwt-refresh'),
+	path('jwt/verify/', TokenVerifyView.as_view(), name='jwt-verify'),
 	path('', include(router.urls)),
 ]
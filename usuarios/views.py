@@ -87,16 +87,17 @@ class EmailOrUsernameTokenView(APIView):
 	permission_classes = [permissions.AllowAny]
 	authentication_classes = []
 
-	def post(self, request):
+	def autenticar(self, request):
+		"""Devuelve (usuario, None) o (None, Response de error)"""
 		data = request.data
 		username = (data.get('username') or '').strip()
 		email = (data.get('email') or '').strip()
 		password = (data.get('password') or '')
 
 		if not username and not email:
-			return Response({'detail': 'username o email requerido'}, status=400)
+			return None, Response({'detail': 'username o email requerido'}, status=400)
 		if not password:
-			return Response({'detail': 'password requerido'}, status=400)
+			return None, Response({'detail': 'password requerido'}, status=400)
 
 		user = None
 		# Si en username viene un correo, úsalo como email
@@ -110,7 +111,29 @@ class EmailOrUsernameTokenView(APIView):
 			user = Usuario.objects.filter(username__iexact=username).order_by('id').first()
 
 		if not user or not user.is_active or not user.check_password(password):
-			return Response({'detail': 'Credenciales inválidas'}, status=400)
+			return None, Response({'detail': 'Credenciales inválidas'}, status=400)
+		return user, None
+
+	def post(self, request):
+		user, error = self.autenticar(request)
+		if error is not None:
+			return error
 
 		token, _ = Token.objects.get_or_create(user=user)
 		return Response({'token': token.key})
+
+
+class EmailOrUsernameJWTView(EmailOrUsernameTokenView):
+	"""Igual que EmailOrUsernameTokenView pero emite un par JWT (access/refresh).
+	El access token se valida sin consultar la base (ver usuarios/authentication.py).
+	"""
+
+	def post(self, request):
+		from rest_framework_simplejwt.tokens import RefreshToken
+
+		user, error = self.autenticar(request)
+		if error is not None:
+			return error
+
+		refresh = RefreshToken.for_user(user)
+		return Response({'access': str(refresh.access_token), 'refresh': str(refresh)})